@@ -0,0 +1,158 @@
+import { createClient } from '@/lib/supabase/server'
+import { requireAuth } from '@/lib/auth/utils'
+import { VIEWER_COMMENT_COLUMNS, type ViewerComment } from '@/lib/documents/view'
+import { NextRequest, NextResponse } from 'next/server'
+
+export const runtime = 'nodejs'
+export const dynamic = 'force-dynamic'
+export const maxDuration = 300
+
+const POLL_INTERVAL_MS = 1000
+const PING_INTERVAL_MS = 15_000
+
+/**
+ * Server-sent events for an analysis job (`?job=<id>`).
+ *
+ * The job may run in another instance, so the route follows it through the
+ * database: it polls the job row and the comments stored since the last poll
+ * and pushes what is new.
+ *
+ * Events:
+ * - `progress`: job status plus analyses.progress, whenever it changes
+ * - `issue`: a comment stored for the job (sent once per comment id)
+ * - `done` / `failed`: the job finished; the stream closes after either
+ *
+ * The stream also closes shortly before maxDuration; EventSource reconnects on
+ * its own and the client drops issues it has already seen.
+ */
+export async function GET(
+  request: NextRequest,
+  context: { params: Promise<{ id: string }> }
+) {
+  let user
+  try {
+    user = await requireAuth()
+  } catch {
+    return NextResponse.json({ error: 'Unauthorized' }, { status: 401 })
+  }
+
+  const supabase = await createClient()
+  const { id: documentId } = await context.params
+  const jobId = request.nextUrl.searchParams.get('job')
+
+  if (!jobId) {
+    return NextResponse.json({ error: 'Missing job parameter' }, { status: 400 })
+  }
+
+  const { data: document } = await supabase
+    .from('documents')
+    .select('id')
+    .eq('id', documentId)
+    .eq('user_id', user.id)
+    .single()
+
+  if (!document) {
+    return NextResponse.json({ error: 'Document not found' }, { status: 404 })
+  }
+
+  const encoder = new TextEncoder()
+  const deadline = Date.now() + (maxDuration - 10) * 1000
+
+  let closed = false
+  const stream = new ReadableStream({
+    async start(controller) {
+      const send = (event: string, data: unknown) => {
+        if (closed) return
+        controller.enqueue(encoder.encode(`event: ${event}\ndata: ${JSON.stringify(data)}\n\n`))
+      }
+
+      // Only rows from the last sent created_at on are read again; ids at that
+      // timestamp are remembered because one insert can share it across rows
+      let lastCreatedAt: string | null = null
+      let seenAtLast = new Set<string>()
+      let lastProgress = ''
+      let lastPing = Date.now()
+      controller.enqueue(encoder.encode('retry: 3000\n\n'))
+
+      try {
+        while (!closed && !request.signal.aborted && Date.now() < deadline) {
+          let commentQuery = supabase
+            .from('comments')
+            .select(VIEWER_COMMENT_COLUMNS)
+            .eq('analysis_id', jobId)
+            .eq('is_ai_generated', true)
+          if (lastCreatedAt) commentQuery = commentQuery.gte('created_at', lastCreatedAt)
+
+          const [{ data: job }, { data: comments }] = await Promise.all([
+            supabase
+              .from('analyses')
+              .select('id, status, issues_found, error_message, progress')
+              .eq('id', jobId)
+              .eq('document_id', documentId)
+              .maybeSingle(),
+            commentQuery
+              .order('created_at', { ascending: true })
+              .order('id', { ascending: true }),
+          ])
+
+          if (!job) {
+            send('failed', { error: 'Analysis job not found' })
+            break
+          }
+
+          for (const comment of (comments || []) as ViewerComment[]) {
+            if (comment.created_at === lastCreatedAt && seenAtLast.has(comment.id)) continue
+            if (comment.created_at !== lastCreatedAt) {
+              lastCreatedAt = comment.created_at
+              seenAtLast = new Set()
+            }
+            seenAtLast.add(comment.id)
+            send('issue', comment)
+          }
+
+          const progress = JSON.stringify([job.status, job.progress])
+          if (progress !== lastProgress) {
+            lastProgress = progress
+            send('progress', { status: job.status, ...job.progress })
+          }
+
+          if (job.status === 'completed') {
+            send('done', { job_id: job.id, issues_found: job.issues_found })
+            break
+          }
+          if (job.status === 'failed') {
+            send('failed', { job_id: job.id, error: job.error_message })
+            break
+          }
+
+          if (!closed && Date.now() - lastPing > PING_INTERVAL_MS) {
+            controller.enqueue(encoder.encode(': ping\n\n'))
+            lastPing = Date.now()
+          }
+          await new Promise(resolve => setTimeout(resolve, POLL_INTERVAL_MS))
+        }
+      } catch (error) {
+        console.error('[ANALYZE] Event stream error:', error)
+      } finally {
+        closed = true
+        try {
+          controller.close()
+        } catch {
+          // The client already cancelled the stream
+        }
+      }
+    },
+    cancel() {
+      closed = true
+    },
+  })
+
+  return new Response(stream, {
+    headers: {
+      'Content-Type': 'text/event-stream',
+      'Cache-Control': 'no-cache, no-transform',
+      Connection: 'keep-alive',
+      'X-Accel-Buffering': 'no',
+    },
+  })
+}
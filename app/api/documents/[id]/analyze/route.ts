@@ -1,36 +1,40 @@
 import { createClient } from '@/lib/supabase/server'
 import { requireAuth } from '@/lib/auth/utils'
-import { NextRequest, NextResponse } from 'next/server'
-import { getDefaultProvider } from '@/lib/ai/provider'
-import { extractTextFromPDF, extractTextFromDOCX, parseDocumentStructure } from '@/lib/document-processing/extractor'
-import { withTimeout, TIMEOUTS, TimeoutError } from '@/lib/utils/timeout'
+import { NextRequest, NextResponse, after } from 'next/server'
+import { getDefaultQueue } from '@/lib/jobs/queue'
+import { createAnalysisWorkerPool } from '@/lib/analysis/pipeline'
+import type { AnalysisJobMode } from '@/lib/analysis/pipeline'
+import { getModelName, getPrimaryProvider } from '@/lib/ai/provider'
 
 // Vercel serverless function configuration
 export const runtime = 'nodejs'
-export const maxDuration = 60 // Maximum duration in seconds (Vercel Pro limit)
-
+export const maxDuration = 300 // The queued job is kicked off in after(), which shares this budget
+
+/**
+ * Queue an analysis run for a document.
+ * Returns 202 with the job id immediately; the work happens in a worker.
+ *
+ * Body (optional): `{ mode: 'full' | 'incremental' }`. Re-analyzing an analyzed
+ * document requires an explicit mode; incremental only re-runs changed clauses.
+ */
 export async function POST(
   request: NextRequest,
   context: { params: Promise<{ id: string }> }
 ) {
-  const startTime = Date.now()
-  let documentId: string | null = null
-
   try {
-    console.log('[ANALYZE] Starting analysis request')
+    console.log('[ANALYZE] Queueing analysis request')
 
     const user = await requireAuth()
     const supabase = await createClient()
-    const { id } = await context.params
-    documentId = id
-
-    console.log('[ANALYZE] Document ID:', documentId)
-    console.log('[ANALYZE] User ID:', user.id)
+    const { id: documentId } = await context.params
+    const body = await request.json().catch(() => ({}))
+    const mode: AnalysisJobMode | undefined =
+      body?.mode === 'full' || body?.mode === 'incremental' ? body.mode : undefined
 
     // Get document
     const { data: document, error: docError } = await supabase
       .from('documents')
-      .select('*')
+      .select('id, status')
       .eq('id', documentId)
       .eq('user_id', user.id)
       .single()
@@ -43,261 +47,127 @@ export async function POST(
       )
     }
 
-    console.log('[ANALYZE] Document found:', {
-      filename: document.filename,
-      fileType: document.file_type,
-      status: document.status
-    })
-
-    if (document.status === 'analyzed') {
-      console.log('[ANALYZE] Document already analyzed')
+    if (document.status === 'analyzed' && !mode) {
       return NextResponse.json(
         { error: 'Document already analyzed. Use re-analyze if you want to analyze again.' },
         { status: 400 }
       )
     }
 
-    // Update status to processing
-    console.log('[ANALYZE] Setting status to processing')
-    await supabase
-      .from('documents')
-      .update({ status: 'processing' })
-      .eq('id', documentId)
+    const queue = getDefaultQueue()
 
-    // Download document from storage
-    console.log('[ANALYZE] Downloading file from storage:', document.storage_path)
-    const downloadStart = Date.now()
-
-    const { data: fileData, error: downloadError} = await supabase.storage
-      .from('documents')
-      .download(document.storage_path)
-
-    if (downloadError || !fileData) {
-      console.error('[ANALYZE] Download error:', downloadError)
-      throw new Error('Failed to download document from storage: ' + downloadError?.message)
-    }
-
-    const downloadDuration = Date.now() - downloadStart
-    console.log('[ANALYZE] File downloaded in', downloadDuration, 'ms, size:', fileData.size)
-
-    // Extract text based on file type
-    const buffer = Buffer.from(await fileData.arrayBuffer())
-    let processedDoc
-
-    console.log('[ANALYZE] Extracting text, file type:', document.file_type)
-    const extractStart = Date.now()
+    // Don't queue a second run while one is still pending or running
+    const { data: activeJob } = await supabase
+      .from('analyses')
+      .select('id, status')
+      .eq('document_id', documentId)
+      .in('status', ['pending', 'in_progress'])
+      .limit(1)
+      .maybeSingle()
 
-    if (document.file_type === 'application/pdf') {
-      processedDoc = await extractTextFromPDF(buffer)
-    } else if (document.file_type.includes('wordprocessingml')) {
-      processedDoc = await extractTextFromDOCX(buffer)
-    } else {
-      throw new Error(`Unsupported file type: ${document.file_type}. Please upload PDF or DOCX files.`)
+    if (activeJob) {
+      return NextResponse.json(
+        { success: true, job_id: activeJob.id, status: activeJob.status },
+        { status: 202 }
+      )
     }
 
-    const extractDuration = Date.now() - extractStart
-    console.log('[ANALYZE] Text extracted in', extractDuration, 'ms')
-    console.log('[ANALYZE] Extracted text length:', processedDoc.text.length, 'chars')
-    console.log('[ANALYZE] Word count:', processedDoc.wordCount)
+    const providerName = getPrimaryProvider()
+    const modelVersion = getModelName(providerName)
 
-    // Parse document structure
-    console.log('[ANALYZE] Parsing document structure')
-    const parseStart = Date.now()
-    const clauses = parseDocumentStructure(processedDoc.text)
-    const parseDuration = Date.now() - parseStart
-    console.log('[ANALYZE] Parsed', clauses.length, 'clauses in', parseDuration, 'ms')
+    const job = await queue.enqueue({
+      document_id: documentId,
+      requested_by: user.id,
+      ai_provider: providerName,
+      model_version: modelVersion,
+      max_attempts: parseInt(process.env.ANALYSIS_MAX_ATTEMPTS || '3', 10),
+      payload: { mode: mode || 'full' },
+    })
 
-    // Update document with extracted info
-    console.log('[ANALYZE] Updating document metadata')
     await supabase
       .from('documents')
-      .update({
-        page_count: processedDoc.pageCount,
-        word_count: processedDoc.wordCount,
-        has_scanned_pages: processedDoc.hasScannedPages,
-      })
+      .update({ status: 'processing' })
       .eq('id', documentId)
 
-    // Insert clauses
-    if (clauses.length > 0) {
-      console.log('[ANALYZE] Inserting', clauses.length, 'clauses')
-      const { error: clausesError } = await supabase.from('document_clauses').insert(
-        clauses.map(clause => ({
-          document_id: documentId,
-          ...clause,
-        }))
-      )
+    console.log('[ANALYZE] Job queued:', job.id, 'mode:', mode || 'full')
 
-      if (clausesError) {
-        console.warn('[ANALYZE] Error inserting clauses:', clausesError)
-        // Don't fail the whole analysis if clause insertion fails
-      }
-    }
+    // Start draining right away instead of waiting for the next cron tick
+    after(async () => {
+      const pool = createAnalysisWorkerPool(queue, { concurrency: 1 })
+      const stats = await pool.drain({ maxJobs: 1 })
+      console.log('[ANALYZE] Inline worker finished:', stats)
+    })
 
-    // Get AI provider configuration
-    console.log('[ANALYZE] Initializing AI provider')
-    const provider = getDefaultProvider()
-    const providerName = process.env.AI_PROVIDER || 'mock'
-    console.log('[ANALYZE] Using AI provider:', providerName)
+    return NextResponse.json(
+      { success: true, job_id: job.id, status: job.status },
+      { status: 202 }
+    )
+  } catch (error: any) {
+    console.error('[ANALYZE] Failed to queue analysis:', error)
+    const statusCode = error.message === 'Unauthorized' ? 401 : 500
+    return NextResponse.json(
+      { error: error.message || 'Failed to queue analysis' },
+      { status: statusCode }
+    )
+  }
+}
 
-    // Create analysis record
-    const modelVersion = providerName === 'mock' ? 'mock-v1' :
-                        providerName === 'claude-sonnet-4' ? 'claude-sonnet-4.5-20250929' :
-                        providerName === 'gpt-4' ? 'gpt-4-turbo' : 'unknown'
+/**
+ * Status of the latest analysis job for a document (or `?job=<id>`)
+ */
+export async function GET(
+  request: NextRequest,
+  context: { params: Promise<{ id: string }> }
+) {
+  try {
+    const user = await requireAuth()
+    const supabase = await createClient()
+    const { id: documentId } = await context.params
+    const jobId = request.nextUrl.searchParams.get('job')
 
-    const { data: analysis, error: analysisError } = await supabase
-      .from('analyses')
-      .insert({
-        document_id: documentId,
-        ai_provider: providerName,
-        model_version: modelVersion,
-        status: 'in_progress',
-      })
-      .select()
+    const { data: document } = await supabase
+      .from('documents')
+      .select('id, status')
+      .eq('id', documentId)
+      .eq('user_id', user.id)
       .single()
 
-    if (analysisError) {
-      console.error('[ANALYZE] Failed to create analysis record:', analysisError)
-      throw new Error('Failed to create analysis record: ' + analysisError.message)
+    if (!document) {
+      return NextResponse.json({ error: 'Document not found' }, { status: 404 })
     }
 
-    console.log('[ANALYZE] Analysis record created:', analysis.id)
-
-    // Run AI analysis with timeout
-    console.log('[ANALYZE] Starting AI analysis')
-    const aiStart = Date.now()
-
-    const aiResponse = await withTimeout(
-      provider.analyze({
-        documentText: processedDoc.text,
-        contractType: document.contract_type || undefined,
-      }),
-      TIMEOUTS.AI_ANALYSIS,
-      'AI analysis timed out. The document may be too long or complex. Please try a shorter document or contact support.'
-    )
-
-    const aiDuration = Date.now() - aiStart
-    console.log('[ANALYZE] AI analysis completed in', aiDuration, 'ms')
-    console.log('[ANALYZE] Found', aiResponse.analysis.issues.length, 'issues')
-
-    // Store analysis results
-    await supabase
+    let query = supabase
       .from('analyses')
-      .update({
-        status: 'completed',
-        completed_at: new Date().toISOString(),
-        tokens_used: aiResponse.tokens_used,
-        cost_usd: aiResponse.cost_usd,
-        issues_found: aiResponse.analysis.issues.length,
-        high_risk_count: aiResponse.analysis.issues.filter(i => i.risk_level === 'high' || i.risk_level === 'critical').length,
-        medium_risk_count: aiResponse.analysis.issues.filter(i => i.risk_level === 'medium').length,
-        low_risk_count: aiResponse.analysis.issues.filter(i => i.risk_level === 'low').length,
-      })
-      .eq('id', analysis.id)
-
-    // Store AI-generated comments
-    const comments = aiResponse.analysis.issues.map(issue => ({
-      document_id: documentId,
-      analysis_id: analysis.id,
-      comment_type: issue.risk_level === 'critical' || issue.risk_level === 'high' ? 'warning' : 'suggestion',
-      risk_level: issue.risk_level,
-      title: issue.title,
-      content: issue.description,
-      suggested_revision: issue.suggested_revision,
-      is_ai_generated: true,
-      confidence_score: issue.confidence,
-      legal_references: issue.legal_references || [],
-      status: 'open',
-    }))
+      .select('id, status, attempts, max_attempts, started_at, completed_at, issues_found, error_message, progress')
+      .eq('document_id', documentId)
 
-    if (comments.length > 0) {
-      await supabase.from('comments').insert(comments)
+    if (jobId) {
+      query = query.eq('id', jobId)
     }
 
-    // Update document status and scores
-    await supabase
-      .from('documents')
-      .update({
-        status: 'analyzed',
-        analyzed_at: new Date().toISOString(),
-        overall_risk_score: aiResponse.analysis.overall_risk_score,
-        compliance_score: aiResponse.analysis.compliance_score,
-        contract_type: aiResponse.analysis.contract_type,
-      })
-      .eq('id', documentId)
-
-    // Create audit log
-    await supabase.from('audit_logs').insert({
-      user_id: user.id,
-      action: 'analysis_completed',
-      resource_type: 'document',
-      resource_id: documentId,
-      details: {
-        analysis_id: analysis.id,
-        issues_found: aiResponse.analysis.issues.length,
-        tokens_used: aiResponse.tokens_used,
-      },
-    })
+    const { data: job } = await query
+      .order('started_at', { ascending: false })
+      .limit(1)
+      .maybeSingle()
 
-    const totalDuration = Date.now() - startTime
-    console.log('[ANALYZE] ✅ Analysis completed successfully in', totalDuration, 'ms')
+    if (!job) {
+      return NextResponse.json({ error: 'No analysis job found' }, { status: 404 })
+    }
 
     return NextResponse.json({
-      success: true,
-      analysis_id: analysis.id,
-      issues_found: aiResponse.analysis.issues.length,
-      overall_risk_score: aiResponse.analysis.overall_risk_score,
-      duration_ms: totalDuration,
+      job_id: job.id,
+      status: job.status,
+      document_status: document.status,
+      attempts: job.attempts,
+      max_attempts: job.max_attempts,
+      started_at: job.started_at,
+      completed_at: job.completed_at,
+      issues_found: job.issues_found,
+      progress: job.progress,
+      error: job.error_message,
     })
-
   } catch (error: any) {
-    const totalDuration = Date.now() - startTime
-    console.error('[ANALYZE] ❌ Analysis failed after', totalDuration, 'ms')
-    console.error('[ANALYZE] Error details:', error)
-
-    // Determine user-friendly error message
-    let userMessage = 'Analysis failed. Please try again.'
-    let statusCode = 500
-
-    if (error instanceof TimeoutError) {
-      userMessage = error.message
-      statusCode = 408 // Request Timeout
-      console.error('[ANALYZE] Timeout error:', error.message)
-    } else if (error.message?.includes('Unsupported file type')) {
-      userMessage = error.message
-      statusCode = 400
-    } else if (error.message?.includes('not found')) {
-      userMessage = error.message
-      statusCode = 404
-    } else if (error.message) {
-      userMessage = error.message
-    }
-
-    // Update document status to failed if we have a documentId
-    if (documentId) {
-      try {
-        const supabase = await createClient()
-        await supabase
-          .from('documents')
-          .update({
-            status: 'failed',
-            updated_at: new Date().toISOString()
-          })
-          .eq('id', documentId)
-
-        console.log('[ANALYZE] Document status updated to failed')
-      } catch (updateError) {
-        console.error('[ANALYZE] Failed to update document status:', updateError)
-      }
-    }
-
-    return NextResponse.json(
-      {
-        error: userMessage,
-        error_type: error instanceof TimeoutError ? 'timeout' : 'processing_error',
-        duration_ms: totalDuration,
-      },
-      { status: statusCode }
-    )
+    const statusCode = error.message === 'Unauthorized' ? 401 : 500
+    return NextResponse.json({ error: error.message }, { status: statusCode })
   }
 }
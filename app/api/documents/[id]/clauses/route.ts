@@ -0,0 +1,44 @@
+import { createClient } from '@/lib/supabase/server'
+import { requireAuth } from '@/lib/auth/utils'
+import { NextRequest, NextResponse } from 'next/server'
+import { listClauseRange, parseRange } from '@/lib/documents/view'
+
+export const runtime = 'nodejs'
+
+/**
+ * Clauses of a document by range (`?offset=&limit=`), for the viewer's
+ * windowed rendering. Ordered as in the document.
+ */
+export async function GET(
+  request: NextRequest,
+  context: { params: Promise<{ id: string }> }
+) {
+  try {
+    const user = await requireAuth()
+    const supabase = await createClient()
+    const { id: documentId } = await context.params
+    const { offset, limit } = parseRange(request.nextUrl.searchParams)
+
+    // The ownership check runs alongside the range query; RLS already limits
+    // the rows, this keeps the route to the owner like the page itself
+    const [{ data: document }, clauses] = await Promise.all([
+      supabase
+        .from('documents')
+        .select('id')
+        .eq('id', documentId)
+        .eq('user_id', user.id)
+        .maybeSingle(),
+      listClauseRange(supabase, documentId, offset, limit),
+    ])
+
+    if (!document) {
+      return NextResponse.json({ error: 'Document not found' }, { status: 404 })
+    }
+
+    return NextResponse.json({ offset, clauses })
+  } catch (error: any) {
+    console.error('[VIEWER] Range request failed:', error)
+    const statusCode = error.message === 'Unauthorized' ? 401 : 500
+    return NextResponse.json({ error: error.message }, { status: statusCode })
+  }
+}
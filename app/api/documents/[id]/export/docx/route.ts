@@ -0,0 +1,195 @@
+import { createHash } from 'crypto'
+import { createClient } from '@/lib/supabase/server'
+import { requireAuth } from '@/lib/auth/utils'
+import { NextRequest, NextResponse, after } from 'next/server'
+import { exportDocx } from '@/lib/export/docx'
+import { withTimeout, TIMEOUTS } from '@/lib/utils/timeout'
+
+export const runtime = 'nodejs'
+export const maxDuration = 60
+
+const DOCX_TYPE = 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
+// Longest the download waits for the cache upload before dropping the copy
+const CACHE_STALL_MS = 5000
+
+/**
+ * Download the document as DOCX with the analysis as tracked changes and
+ * margin comments (lib/export/docx.ts).
+ *
+ * The file is streamed while it is generated, and the same chunks are streamed
+ * into the exports bucket, so the archive is never held in memory. The copy is
+ * keyed by the document, its latest completed analysis and a hash of the
+ * exported comments, so repeat downloads redirect to it until the document is
+ * re-analyzed or a comment is edited, resolved, rejected or deleted.
+ */
+export async function GET(
+  request: NextRequest,
+  context: { params: Promise<{ id: string }> }
+) {
+  try {
+    const user = await requireAuth()
+    const supabase = await createClient()
+    const { id: documentId } = await context.params
+
+    const [{ data: document }, { data: analysis }] = await Promise.all([
+      supabase
+        .from('documents')
+        .select('id, filename, file_type, storage_path')
+        .eq('id', documentId)
+        .eq('user_id', user.id)
+        .single(),
+      supabase
+        .from('analyses')
+        .select('id, completed_at')
+        .eq('document_id', documentId)
+        .eq('status', 'completed')
+        .order('started_at', { ascending: false })
+        .limit(1)
+        .maybeSingle(),
+    ])
+
+    if (!document) {
+      return NextResponse.json({ error: 'Document not found' }, { status: 404 })
+    }
+    if (!analysis) {
+      return NextResponse.json({ error: 'Analyze the document before exporting it' }, { status: 409 })
+    }
+
+    const { data: comments, error: commentsError } = await supabase
+      .from('comments')
+      .select('id, clause_id, title, content, suggested_revision, risk_level, legal_references, updated_at')
+      .eq('document_id', documentId)
+      .neq('status', 'rejected')
+      .order('created_at', { ascending: true })
+
+    if (commentsError) throw new Error(`Failed to load comments: ${commentsError.message}`)
+
+    const commentsHash = createHash('sha256')
+    for (const comment of comments || []) commentsHash.update(`${comment.id}:${comment.updated_at}\n`)
+    const cachePath = `${user.id}/${documentId}/${analysis.id}-${commentsHash.digest('hex').slice(0, 16)}.docx`
+    const filename = `${document.filename.replace(/\.(docx|pdf)$/i, '')} - review.docx`
+
+    const { data: cached } = await supabase.storage
+      .from('exports')
+      .createSignedUrl(cachePath, 60, { download: filename })
+    if (cached?.signedUrl) {
+      console.log('[EXPORT] Cache hit:', cachePath)
+      return NextResponse.redirect(cached.signedUrl)
+    }
+
+    const isDocx = document.file_type.includes('wordprocessingml')
+    const [{ data: clauses, error: clausesError }, original] = await Promise.all([
+      supabase
+        .from('document_clauses')
+        .select('id, content, clause_type, start_char, end_char, order_index')
+        .eq('document_id', documentId)
+        .order('order_index', { ascending: true }),
+      isDocx
+        ? withTimeout(supabase.storage.from('documents').download(document.storage_path), TIMEOUTS.FILE_DOWNLOAD, 'Document download timed out')
+        : Promise.resolve(null),
+    ])
+
+    if (clausesError) throw new Error(`Failed to load clauses: ${clausesError.message}`)
+    if (original?.error || (isDocx && !original?.data)) {
+      throw new Error('Failed to download document from storage: ' + original?.error?.message)
+    }
+
+    const startTime = Date.now()
+    const { stream, stats } = exportDocx(
+      original?.data ? Buffer.from(await original.data.arrayBuffer()) : null,
+      clauses || [],
+      comments || [],
+      { date: analysis.completed_at ? new Date(analysis.completed_at) : undefined }
+    )
+    console.log('[EXPORT] Generating DOCX:', documentId, stats)
+
+    // The response and the cache upload read the same chunks. The next chunk
+    // is generated once both took the previous one; a cache upload that stalls
+    // is dropped rather than slowing the download down.
+    let cache: ReadableStreamDefaultController<Uint8Array> | null = null
+    let cacheDrained: () => void = () => {}
+    const cacheBody = new ReadableStream<Uint8Array>({
+      start(controller) {
+        cache = controller
+      },
+      pull() {
+        cacheDrained()
+      },
+      cancel() {
+        cache = null
+        cacheDrained()
+      },
+    })
+    const dropCache = (reason: string) => {
+      if (!cache) return
+      console.warn('[EXPORT] Not caching export:', reason)
+      // An errored body aborts the upload, so no partial file is stored
+      cache.error(new Error(reason))
+      cache = null
+      cacheDrained()
+    }
+
+    const upload = supabase.storage.from('exports').upload(cachePath, cacheBody, {
+      contentType: DOCX_TYPE,
+      upsert: true,
+      duplex: 'half',
+    }).then(({ error }) => {
+      // An upload that ended early must not hold the download back
+      if (error) dropCache(error.message)
+    })
+
+    let bytes = 0
+    const body = new ReadableStream<Uint8Array>({
+      async pull(controller) {
+        try {
+          const { value, done: end } = await stream.next()
+          if (end) {
+            controller.close()
+            cache?.close()
+            cache = null
+            console.log('[EXPORT] Generated', bytes, 'bytes in', Date.now() - startTime, 'ms')
+            return
+          }
+          bytes += value.length
+          const chunk = new Uint8Array(value.buffer, value.byteOffset, value.length)
+          controller.enqueue(chunk)
+          if (cache) {
+            cache.enqueue(chunk)
+            if (cache.desiredSize !== null && cache.desiredSize <= 0) {
+              let timer: NodeJS.Timeout | undefined
+              const drained = await Promise.race([
+                new Promise<boolean>(resolve => { cacheDrained = () => resolve(true) }),
+                new Promise<boolean>(resolve => { timer = setTimeout(resolve, CACHE_STALL_MS, false) }),
+              ])
+              clearTimeout(timer)
+              if (!drained) dropCache('storage upload stalled')
+            }
+          }
+        } catch (error) {
+          console.error('[EXPORT] Generation failed:', error)
+          controller.error(error)
+          dropCache('generation failed')
+        }
+      },
+      async cancel() {
+        await stream.return(undefined)
+        dropCache('download cancelled')
+      },
+    })
+
+    // Keeps the function alive until storage confirmed the copy
+    after(() => upload)
+
+    return new Response(body, {
+      headers: {
+        'Content-Type': DOCX_TYPE,
+        'Content-Disposition': `attachment; filename="${filename.replace(/[^\x20-\x7e]|"/g, '_')}"; filename*=UTF-8''${encodeURIComponent(filename)}`,
+        'Cache-Control': 'private, no-store',
+      },
+    })
+  } catch (error: any) {
+    console.error('[EXPORT] Export failed:', error)
+    const statusCode = error.message === 'Unauthorized' ? 401 : 500
+    return NextResponse.json({ error: error.message || 'Export failed' }, { status: statusCode })
+  }
+}
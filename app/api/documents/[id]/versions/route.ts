@@ -0,0 +1,161 @@
+import { createClient } from '@/lib/supabase/server'
+import { requireAuth } from '@/lib/auth/utils'
+import { NextRequest, NextResponse, after } from 'next/server'
+import { validateUpload, buildStoragePath } from '@/lib/document-processing/upload'
+import { getDefaultQueue } from '@/lib/jobs/queue'
+import { createAnalysisWorkerPool } from '@/lib/analysis/pipeline'
+import { getModelName, getPrimaryProvider } from '@/lib/ai/provider'
+
+export const runtime = 'nodejs'
+export const maxDuration = 300 // The incremental job is kicked off in after(), which shares this budget
+
+/**
+ * Upload a new version of a document and queue an incremental re-analysis:
+ * only clauses whose content changed since the previous version are sent to the AI.
+ */
+export async function POST(
+  request: NextRequest,
+  context: { params: Promise<{ id: string }> }
+) {
+  try {
+    const user = await requireAuth()
+    const supabase = await createClient()
+    const { id: documentId } = await context.params
+
+    const { data: document, error: docError } = await supabase
+      .from('documents')
+      .select('id, status, storage_path')
+      .eq('id', documentId)
+      .eq('user_id', user.id)
+      .single()
+
+    if (docError || !document) {
+      return NextResponse.json({ error: 'Document not found' }, { status: 404 })
+    }
+
+    if (document.status === 'processing') {
+      return NextResponse.json(
+        { error: 'Document is being analyzed. Wait for the analysis to finish before uploading a new version.' },
+        { status: 409 }
+      )
+    }
+
+    const formData = await request.formData()
+    const file = formData.get('file') as File
+    const changesSummary = formData.get('changes_summary') as string | null
+
+    if (!file) {
+      return NextResponse.json({ error: 'No file provided' }, { status: 400 })
+    }
+
+    const validationError = validateUpload(file)
+    if (validationError) {
+      return NextResponse.json({ error: validationError }, { status: 400 })
+    }
+
+    const filePath = buildStoragePath(user.id, file.name)
+    const { error: uploadError } = await supabase.storage
+      .from('documents')
+      .upload(filePath, await file.arrayBuffer(), {
+        contentType: file.type,
+        upsert: false,
+      })
+
+    if (uploadError) {
+      console.error('[VERSIONS] Storage upload error:', uploadError)
+      return NextResponse.json({ error: 'Failed to upload file to storage' }, { status: 500 })
+    }
+
+    const { data: latest } = await supabase
+      .from('document_versions')
+      .select('version_number')
+      .eq('document_id', documentId)
+      .order('version_number', { ascending: false })
+      .limit(1)
+      .maybeSingle()
+
+    // The original upload becomes version 1 the first time a new version arrives
+    const versions: Array<Record<string, any>> = latest ? [] : [{
+      document_id: documentId,
+      version_number: 1,
+      storage_path: document.storage_path,
+      created_by: user.id,
+    }]
+    const versionNumber = latest ? latest.version_number + 1 : 2
+    versions.push({
+      document_id: documentId,
+      version_number: versionNumber,
+      storage_path: filePath,
+      created_by: user.id,
+      ...(changesSummary ? { changes_summary: changesSummary } : {}),
+    })
+
+    const { error: versionError } = await supabase.from('document_versions').insert(versions)
+    if (versionError) {
+      console.error('[VERSIONS] Failed to record version:', versionError)
+      await supabase.storage.from('documents').remove([filePath])
+      return NextResponse.json(
+        { error: 'Failed to record document version', details: versionError.message },
+        { status: 500 }
+      )
+    }
+
+    await supabase
+      .from('documents')
+      .update({
+        storage_path: filePath,
+        filename: file.name,
+        file_size: file.size,
+        file_type: file.type,
+        status: 'processing',
+      })
+      .eq('id', documentId)
+
+    const queue = getDefaultQueue()
+    const providerName = getPrimaryProvider()
+    const modelVersion = getModelName(providerName)
+
+    const job = await queue.enqueue({
+      document_id: documentId,
+      requested_by: user.id,
+      ai_provider: providerName,
+      model_version: modelVersion,
+      max_attempts: parseInt(process.env.ANALYSIS_MAX_ATTEMPTS || '3', 10),
+      payload: { mode: 'incremental', version_number: versionNumber },
+    })
+
+    console.log('[VERSIONS] Version', versionNumber, 'uploaded, job queued:', job.id)
+
+    await supabase.from('audit_logs').insert({
+      user_id: user.id,
+      organization_id: user.organization_id,
+      action: 'document_version_upload',
+      resource_type: 'document',
+      resource_id: documentId,
+      details: {
+        version_number: versionNumber,
+        filename: file.name,
+        file_size: file.size,
+        analysis_id: job.id,
+      },
+    })
+
+    after(async () => {
+      const pool = createAnalysisWorkerPool(queue, { concurrency: 1 })
+      const stats = await pool.drain({ maxJobs: 1 })
+      console.log('[VERSIONS] Inline worker finished:', stats)
+    })
+
+    return NextResponse.json(
+      { success: true, version_number: versionNumber, job_id: job.id, status: job.status },
+      { status: 202 }
+    )
+  } catch (error: any) {
+    console.error('[VERSIONS] Version upload error:', error)
+    const statusCode = error.message === 'Unauthorized' ? 401 : 500
+    return NextResponse.json(
+      { error: error.message || 'Internal server error' },
+      { status: statusCode }
+    )
+  }
+}
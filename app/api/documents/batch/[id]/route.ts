@@ -0,0 +1,52 @@
+import { createClient } from '@/lib/supabase/server'
+import { requireAuth } from '@/lib/auth/utils'
+import { NextRequest, NextResponse } from 'next/server'
+import { summarizeBatch } from '@/lib/document-processing/batch'
+
+/**
+ * Progress and aggregate status of a batch: per-status job counts, issue
+ * totals and the latest analysis of every document
+ */
+export async function GET(
+  request: NextRequest,
+  context: { params: Promise<{ id: string }> }
+) {
+  try {
+    const user = await requireAuth()
+    const supabase = await createClient()
+    const { id: batchId } = await context.params
+
+    const { data: batch } = await supabase
+      .from('document_batches')
+      .select('*')
+      .eq('id', batchId)
+      .eq('user_id', user.id)
+      .single()
+
+    if (!batch) {
+      return NextResponse.json({ error: 'Batch not found' }, { status: 404 })
+    }
+
+    // One round-trip: documents with their analyses embedded
+    const { data: documents, error } = await supabase
+      .from('documents')
+      .select('id, filename, status, overall_risk_score, analyses(id, status, issues_found, high_risk_count, started_at)')
+      .eq('batch_id', batchId)
+      .order('created_at', { ascending: true })
+
+    if (error) {
+      throw new Error('Failed to load batch documents: ' + error.message)
+    }
+
+    return NextResponse.json({
+      batch_id: batch.id,
+      name: batch.name,
+      created_at: batch.created_at,
+      total_files: batch.total_files,
+      ...summarizeBatch(documents || []),
+    })
+  } catch (error: any) {
+    const statusCode = error.message === 'Unauthorized' ? 401 : 500
+    return NextResponse.json({ error: error.message }, { status: statusCode })
+  }
+}
@@ -0,0 +1,202 @@
+import { createClient } from '@/lib/supabase/server'
+import { requireAuth } from '@/lib/auth/utils'
+import { NextRequest, NextResponse, after } from 'next/server'
+import { buildStoragePath } from '@/lib/document-processing/upload'
+import { expandBatchFiles } from '@/lib/document-processing/batch'
+import type { RejectedFile } from '@/lib/document-processing/batch'
+import { mapWithConcurrency } from '@/lib/utils/concurrency'
+import { getDefaultQueue } from '@/lib/jobs/queue'
+import { createAnalysisWorkerPool } from '@/lib/analysis/pipeline'
+import { TIMEOUTS } from '@/lib/utils/timeout'
+import { getModelName, getPrimaryProvider } from '@/lib/ai/provider'
+
+export const runtime = 'nodejs'
+export const maxDuration = 300 // Uploads plus the after() drain share this budget
+
+/**
+ * Upload many contracts at once and queue their analyses.
+ *
+ * Form fields:
+ * - `files`: one or more PDF/DOCX files or ZIP archives of them (repeat the field)
+ * - `batch_id` (optional): add to an existing batch, so large portfolios can be
+ *   sent in several requests
+ * - `name` (optional): batch name, e.g. the data room
+ * - `analyze` (optional): `false` to upload without queueing analyses
+ *
+ * Files are uploaded to storage with bounded concurrency, all document rows
+ * are inserted in one statement and all jobs queued in another. Invalid files
+ * are listed in `rejected` rather than failing the batch.
+ * Returns 202; follow progress with GET /api/documents/batch/<id>.
+ */
+export async function POST(request: NextRequest) {
+  try {
+    const user = await requireAuth()
+    const supabase = await createClient()
+
+    const formData = await request.formData()
+    const files = formData.getAll('files').filter((value): value is File => typeof value !== 'string')
+    const batchId = formData.get('batch_id') as string | null
+    const name = formData.get('name') as string | null
+    const analyze = formData.get('analyze') !== 'false'
+
+    if (files.length === 0) {
+      return NextResponse.json({ error: 'No files provided' }, { status: 400 })
+    }
+
+    const expanded = await expandBatchFiles(files)
+    const rejected: RejectedFile[] = expanded.rejected
+    if (expanded.files.length === 0) {
+      return NextResponse.json({ error: 'No valid PDF or DOCX files in the batch', rejected }, { status: 400 })
+    }
+
+    let batch: { id: string; total_files: number }
+    if (batchId) {
+      const { data, error } = await supabase
+        .from('document_batches')
+        .select('id, total_files')
+        .eq('id', batchId)
+        .eq('user_id', user.id)
+        .single()
+      if (error || !data) {
+        return NextResponse.json({ error: 'Batch not found' }, { status: 404 })
+      }
+      batch = data
+    } else {
+      const { data, error } = await supabase
+        .from('document_batches')
+        .insert({
+          user_id: user.id,
+          organization_id: user.organization_id,
+          name,
+        })
+        .select('id, total_files')
+        .single()
+      if (error || !data) {
+        console.error('[BATCH] Failed to create batch:', error)
+        return NextResponse.json(
+          { error: 'Failed to create batch', details: error?.message },
+          { status: 500 }
+        )
+      }
+      batch = data
+    }
+
+    const uploadStart = Date.now()
+    const concurrency = parseInt(process.env.BATCH_UPLOAD_CONCURRENCY || '6', 10)
+    const uploads = await mapWithConcurrency(expanded.files, concurrency, async file => {
+      const path = buildStoragePath(user.id, file.name)
+      const { error } = await supabase.storage
+        .from('documents')
+        .upload(path, file.data, { contentType: file.type, upsert: false })
+      if (error) {
+        console.error('[BATCH] Storage upload error:', file.name, error.message)
+      }
+      return { file, path, error: error?.message }
+    })
+
+    const uploaded = uploads.filter(upload => !upload.error)
+    for (const upload of uploads) {
+      if (upload.error) rejected.push({ name: upload.file.name, error: 'Failed to upload file to storage' })
+    }
+    console.log('[BATCH]', uploaded.length, 'of', uploads.length, 'files uploaded in', Date.now() - uploadStart, 'ms')
+
+    if (uploaded.length === 0) {
+      return NextResponse.json({ error: 'Failed to upload files to storage', rejected }, { status: 500 })
+    }
+
+    const { data: documents, error: dbError } = await supabase
+      .from('documents')
+      .insert(uploaded.map(({ file, path }) => ({
+        user_id: user.id,
+        ...(user.organization_id ? { organization_id: user.organization_id } : {}),
+        batch_id: batch.id,
+        filename: file.name,
+        file_size: file.size,
+        file_type: file.type,
+        storage_path: path,
+        status: analyze ? 'processing' : 'uploading',
+      })))
+      .select('id, filename, status')
+
+    if (dbError || !documents) {
+      console.error('[BATCH] Failed to create document records:', dbError)
+      await supabase.storage.from('documents').remove(uploaded.map(upload => upload.path))
+      return NextResponse.json(
+        { error: 'Failed to create document records', details: dbError?.message },
+        { status: 500 }
+      )
+    }
+
+    await supabase
+      .from('document_batches')
+      .update({ total_files: batch.total_files + documents.length })
+      .eq('id', batch.id)
+
+    let jobIds: string[] = []
+    if (analyze) {
+      const queue = getDefaultQueue()
+      const providerName = getPrimaryProvider()
+      const modelVersion = getModelName(providerName)
+
+      try {
+        const jobs = await queue.enqueueMany(documents.map(document => ({
+          document_id: document.id,
+          requested_by: user.id,
+          ai_provider: providerName,
+          model_version: modelVersion,
+          max_attempts: parseInt(process.env.ANALYSIS_MAX_ATTEMPTS || '3', 10),
+          payload: { mode: 'full', batch_id: batch.id },
+        })))
+        jobIds = jobs.map(job => job.id)
+      } catch (error) {
+        // Leave the documents analyzable from the viewer instead of stuck in processing
+        await supabase
+          .from('documents')
+          .update({ status: 'uploading' })
+          .in('id', documents.map(document => document.id))
+        throw error
+      }
+
+      // Start on the queue right away; the cron worker picks up whatever is left
+      after(async () => {
+        const pool = createAnalysisWorkerPool(queue)
+        const deadline = Date.now() + (maxDuration - 10) * 1000 - TIMEOUTS.AI_ANALYSIS_JOB
+        const stats = await pool.drain({ deadline, maxJobs: jobIds.length })
+        console.log('[BATCH] Inline worker finished:', stats)
+      })
+    }
+
+    await supabase.from('audit_logs').insert({
+      user_id: user.id,
+      organization_id: user.organization_id,
+      action: 'batch_upload',
+      resource_type: 'document_batch',
+      resource_id: batch.id,
+      details: {
+        files: documents.length,
+        rejected: rejected.length,
+        analyses_queued: jobIds.length,
+      },
+    })
+
+    console.log('[BATCH] Batch', batch.id, ':', documents.length, 'documents,', jobIds.length, 'jobs queued')
+
+    return NextResponse.json(
+      {
+        success: true,
+        batch_id: batch.id,
+        documents,
+        job_ids: jobIds,
+        rejected,
+      },
+      { status: 202 }
+    )
+  } catch (error: any) {
+    console.error('[BATCH] Batch upload error:', error)
+    const statusCode = error.message === 'Unauthorized' ? 401 : 500
+    return NextResponse.json(
+      { error: error.message || 'Internal server error' },
+      { status: statusCode }
+    )
+  }
+}
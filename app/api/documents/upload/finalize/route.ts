@@ -0,0 +1,117 @@
+import { createClient } from '@/lib/supabase/server'
+import { requireAuth } from '@/lib/auth/utils'
+import { NextRequest, NextResponse } from 'next/server'
+import { validateUpload, isOwnStoragePath, matchesFileSignature } from '@/lib/document-processing/upload'
+
+export const runtime = 'nodejs'
+export const maxDuration = 10
+
+/**
+ * Second phase of a direct upload: check the stored object's size, type and
+ * leading bytes, then create the documents row. Safe to retry: a path that
+ * already has a document returns that document.
+ *
+ * Body: `{ path, filename }` (path as issued by /api/documents/upload/sign)
+ */
+export async function POST(request: NextRequest) {
+  try {
+    const user = await requireAuth()
+    const supabase = await createClient()
+    const { path: filePath, filename } = await request.json()
+
+    if (!filePath || !filename || !isOwnStoragePath(user.id, filePath)) {
+      return NextResponse.json({ error: 'Invalid upload path' }, { status: 400 })
+    }
+
+    const { data: existing } = await supabase
+      .from('documents')
+      .select('*')
+      .eq('storage_path', filePath)
+      .eq('user_id', user.id)
+      .maybeSingle()
+
+    if (existing) {
+      return NextResponse.json({ success: true, document: existing })
+    }
+
+    const [folder, objectName] = filePath.split('/')
+    const { data: objects } = await supabase.storage
+      .from('documents')
+      .list(folder, { search: objectName, limit: 1 })
+    const object = objects?.find(entry => entry.name === objectName)
+
+    if (!object) {
+      return NextResponse.json({ error: 'Upload not found. Upload the file before finalizing.' }, { status: 404 })
+    }
+
+    const fileSize: number = object.metadata?.size ?? 0
+    const fileType: string = object.metadata?.mimetype ?? ''
+    let validationError = validateUpload({ type: fileType, size: fileSize })
+
+    if (!validationError) {
+      // The declared type is the client's claim; the first bytes are not
+      const { data: signed } = await supabase.storage.from('documents').createSignedUrl(filePath, 60)
+      const head = signed
+        ? await fetch(signed.signedUrl, { headers: { Range: 'bytes=0-7' } }).then(response => response.arrayBuffer())
+        : new ArrayBuffer(0)
+      if (!matchesFileSignature(fileType, new Uint8Array(head))) {
+        validationError = 'File content does not match its type. Only PDF and DOCX files are allowed.'
+      }
+    }
+
+    if (validationError) {
+      console.warn('[UPLOAD] Rejected direct upload:', filePath, validationError)
+      await supabase.storage.from('documents').remove([filePath])
+      return NextResponse.json({ error: validationError }, { status: 400 })
+    }
+
+    const documentData: any = {
+      user_id: user.id,
+      filename,
+      file_size: fileSize,
+      file_type: fileType,
+      storage_path: filePath,
+      status: 'uploading',
+    }
+
+    if (user.organization_id) {
+      documentData.organization_id = user.organization_id
+    }
+
+    const { data: document, error: dbError } = await supabase
+      .from('documents')
+      .insert(documentData)
+      .select()
+      .single()
+
+    if (dbError) {
+      console.error('[UPLOAD] Failed to finalize upload:', dbError.message)
+      return NextResponse.json(
+        { error: 'Failed to create document record', details: dbError.message },
+        { status: 500 }
+      )
+    }
+
+    console.log(`[UPLOAD] Direct upload finalized: ${document.id}`)
+
+    await supabase.from('audit_logs').insert({
+      user_id: user.id,
+      organization_id: user.organization_id,
+      action: 'document_upload',
+      resource_type: 'document',
+      resource_id: document.id,
+      details: {
+        filename,
+        file_size: fileSize,
+        file_type: fileType,
+        upload: 'direct',
+      },
+    })
+
+    return NextResponse.json({ success: true, document })
+  } catch (error: any) {
+    console.error('[UPLOAD] Finalize error:', error)
+    const statusCode = error.message === 'Unauthorized' ? 401 : 500
+    return NextResponse.json({ error: error.message || 'Internal server error' }, { status: statusCode })
+  }
+}
@@ -1,17 +1,17 @@
 import { createClient } from '@/lib/supabase/server'
 import { requireAuth } from '@/lib/auth/utils'
 import { NextRequest, NextResponse } from 'next/server'
-
-const MAX_FILE_SIZE = 50 * 1024 * 1024 // 50MB
-const ALLOWED_TYPES = [
-  'application/pdf',
-  'application/vnd.openxmlformats-officedocument.wordprocessingml.document', // .docx
-]
+import { validateUpload, buildStoragePath } from '@/lib/document-processing/upload'
 
 // Vercel route configuration - fast upload without text extraction
 export const runtime = 'nodejs'
 export const maxDuration = 10 // 10 seconds - works on Hobby plan (extraction moved to analyze endpoint)
 
+/**
+ * Single-request upload (multipart `file`), buffered in the function.
+ * The dashboard uploads straight to storage instead (upload/sign + upload/finalize);
+ * this route remains for scripts and small files.
+ */
 export async function POST(request: NextRequest) {
   console.log('[UPLOAD] Request received at', new Date().toISOString())
 
@@ -26,26 +26,14 @@ export async function POST(request: NextRequest) {
       return NextResponse.json({ error: 'No file provided' }, { status: 400 })
     }
 
-    // Validate file type
-    if (!ALLOWED_TYPES.includes(file.type)) {
-      return NextResponse.json(
-        { error: 'Invalid file type. Only PDF and DOCX files are allowed.' },
-        { status: 400 }
-      )
-    }
-
-    // Validate file size
-    if (file.size > MAX_FILE_SIZE) {
-      return NextResponse.json(
-        { error: `File size exceeds ${MAX_FILE_SIZE / 1024 / 1024}MB limit` },
-        { status: 400 }
-      )
+    // Validate file type and size
+    const validationError = validateUpload(file)
+    if (validationError) {
+      return NextResponse.json({ error: validationError }, { status: 400 })
     }
 
     // Generate unique file path
-    const fileExt = file.name.split('.').pop()
-    const fileName = `${Date.now()}-${Math.random().toString(36).substring(7)}.${fileExt}`
-    const filePath = `${user.id}/${fileName}`
+    const filePath = buildStoragePath(user.id, file.name)
 
     // Upload to Supabase Storage
     const fileBuffer = await file.arrayBuffer()
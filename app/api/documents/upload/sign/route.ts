@@ -0,0 +1,62 @@
+import { createClient } from '@/lib/supabase/server'
+import { requireAuth } from '@/lib/auth/utils'
+import { NextRequest, NextResponse } from 'next/server'
+import { validateUpload, buildStoragePath } from '@/lib/document-processing/upload'
+
+export const runtime = 'nodejs'
+export const maxDuration = 10
+
+// Supabase's resumable (TUS) endpoint only accepts 6MB chunks
+const RESUMABLE_CHUNK_SIZE = 6 * 1024 * 1024
+
+/**
+ * First phase of a direct upload: validate the declared file and issue a
+ * storage path with a signed upload URL. The browser sends the bytes straight
+ * to storage (signed PUT, or resumable chunks for files over one chunk), then
+ * calls /api/documents/upload/finalize. No file data passes through here.
+ *
+ * Body: `{ filename, file_size, file_type }`
+ */
+export async function POST(request: NextRequest) {
+  try {
+    const user = await requireAuth()
+    const supabase = await createClient()
+    const { filename, file_size: fileSize, file_type: fileType } = await request.json()
+
+    if (!filename || typeof fileSize !== 'number' || !fileType) {
+      return NextResponse.json({ error: 'filename, file_size and file_type are required' }, { status: 400 })
+    }
+
+    const validationError = validateUpload({ type: fileType, size: fileSize })
+    if (validationError) {
+      return NextResponse.json({ error: validationError }, { status: 400 })
+    }
+
+    const filePath = buildStoragePath(user.id, filename)
+    const { data, error } = await supabase.storage
+      .from('documents')
+      .createSignedUploadUrl(filePath)
+
+    if (error || !data) {
+      console.error('[UPLOAD] Failed to sign upload:', error)
+      return NextResponse.json({ error: 'Failed to prepare upload' }, { status: 500 })
+    }
+
+    console.log('[UPLOAD] Signed direct upload for user:', user.id, 'size:', fileSize)
+
+    return NextResponse.json({
+      path: data.path,
+      token: data.token,
+      signed_url: data.signedUrl,
+      resumable: {
+        endpoint: `${process.env.NEXT_PUBLIC_SUPABASE_URL}/storage/v1/upload/resumable`,
+        bucket: 'documents',
+        chunk_size: RESUMABLE_CHUNK_SIZE,
+      },
+    })
+  } catch (error: any) {
+    console.error('[UPLOAD] Sign error:', error)
+    const statusCode = error.message === 'Unauthorized' ? 401 : 500
+    return NextResponse.json({ error: error.message || 'Internal server error' }, { status: statusCode })
+  }
+}
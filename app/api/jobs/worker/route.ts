@@ -0,0 +1,40 @@
+import { NextRequest, NextResponse } from 'next/server'
+import { getDefaultQueue } from '@/lib/jobs/queue'
+import { createAnalysisWorkerPool } from '@/lib/analysis/pipeline'
+import { getAnalysisCacheStats, getProviderRouterStats } from '@/lib/ai/provider'
+import { getExtractionPoolStats } from '@/lib/document-processing/extractor'
+import { TIMEOUTS } from '@/lib/utils/timeout'
+
+// Vercel route configuration - invoked by cron to drain the analysis queue
+export const runtime = 'nodejs'
+export const maxDuration = 300
+
+/**
+ * Drain queued analysis jobs (retries, expired leases, backlog).
+ * Protected by CRON_SECRET; Vercel cron sends it as a Bearer token.
+ */
+export async function GET(request: NextRequest) {
+  const authHeader = request.headers.get('authorization')
+  if (!process.env.CRON_SECRET || authHeader !== `Bearer ${process.env.CRON_SECRET}`) {
+    return NextResponse.json({ error: 'Unauthorized' }, { status: 401 })
+  }
+
+  const startTime = Date.now()
+  const queue = getDefaultQueue()
+  const pool = createAnalysisWorkerPool(queue)
+
+  // Only lease jobs that can still finish inside this invocation
+  const deadline = startTime + maxDuration * 1000 - TIMEOUTS.AI_ANALYSIS_JOB - 10_000
+  const stats = await pool.drain({ deadline })
+
+  console.log('[WORKER-ROUTE] Drained queue in', Date.now() - startTime, 'ms:', stats)
+
+  return NextResponse.json({
+    ...stats,
+    queue_depth: await queue.depth(),
+    cache: getAnalysisCacheStats(),
+    providers: getProviderRouterStats(),
+    extraction_pool: getExtractionPoolStats(),
+    duration_ms: Date.now() - startTime,
+  })
+}
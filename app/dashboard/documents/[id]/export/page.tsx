@@ -58,12 +58,23 @@ export default async function ExportPage({
               <li>✓ Suggested revisions as track changes</li>
               <li>✓ Legal references included</li>
             </ul>
-            <Button className="w-full" disabled>
-              <Download className="mr-2 h-4 w-4" />
-              Download DOCX (Coming Soon)
-            </Button>
+            {document.status === 'analyzed' ? (
+              <a href={`/api/documents/${document.id}/export/docx`} download>
+                <Button className="w-full">
+                  <Download className="mr-2 h-4 w-4" />
+                  Download DOCX
+                </Button>
+              </a>
+            ) : (
+              <Button className="w-full" disabled>
+                <Download className="mr-2 h-4 w-4" />
+                Download DOCX
+              </Button>
+            )}
             <p className="text-xs text-gray-500">
-              Full implementation requires docx generation library
+              {document.status === 'analyzed'
+                ? 'Accept or reject each suggested revision in Word (Review → Track Changes)'
+                : 'Available once the analysis has completed'}
             </p>
           </CardContent>
         </Card>
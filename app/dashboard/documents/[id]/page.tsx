@@ -1,6 +1,7 @@
 import { getCurrentUser } from '@/lib/auth/utils'
 import { redirect } from 'next/navigation'
 import { createClient } from '@/lib/supabase/server'
+import { loadDocumentView } from '@/lib/documents/view'
 import { DocumentViewer } from '@/components/document/document-viewer'
 
 export default async function DocumentViewPage({
@@ -15,47 +16,23 @@ export default async function DocumentViewPage({
 
   const supabase = await createClient()
 
-  // Fetch document
-  const { data: document, error: docError } = await supabase
-    .from('documents')
-    .select('*')
-    .eq('id', documentId)
-    .eq('user_id', user.id)
-    .single()
+  // Document, latest analysis and the first clauses and comments in one call;
+  // the viewer fetches the rest by range as they scroll into view
+  const view = await loadDocumentView(supabase, documentId)
 
-  if (docError || !document) {
+  if (!view) {
     redirect('/dashboard/documents')
   }
 
-  // Fetch latest analysis
-  const { data: analysis } = await supabase
-    .from('analyses')
-    .select('*')
-    .eq('document_id', documentId)
-    .order('created_at', { ascending: false })
-    .limit(1)
-    .single()
-
-  // Fetch comments
-  const { data: comments } = await supabase
-    .from('comments')
-    .select('*')
-    .eq('document_id', documentId)
-    .order('created_at', { ascending: false })
-
-  // Fetch clauses
-  const { data: clauses } = await supabase
-    .from('document_clauses')
-    .select('*')
-    .eq('document_id', documentId)
-    .order('order_index', { ascending: true })
-
   return (
     <DocumentViewer
-      document={document}
-      analysis={analysis}
-      comments={comments || []}
-      clauses={clauses || []}
+      document={view.document}
+      analysis={view.analysis}
+      comments={view.comments}
+      commentCount={view.comment_count}
+      highRiskCount={view.high_risk_count}
+      clauses={view.clauses}
+      clauseCount={view.clause_count}
     />
   )
 }
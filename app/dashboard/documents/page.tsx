@@ -1,23 +1,26 @@
 import { getCurrentUser } from '@/lib/auth/utils'
 import { redirect } from 'next/navigation'
 import { createClient } from '@/lib/supabase/server'
+import { listDocuments } from '@/lib/documents/list'
 import { Card, CardContent } from '@/components/ui/card'
 import { Button } from '@/components/ui/button'
 import { Badge } from '@/components/ui/badge'
 import { FileText, Upload } from 'lucide-react'
 import Link from 'next/link'
 
-export default async function DocumentsPage() {
+export default async function DocumentsPage({
+  searchParams,
+}: {
+  searchParams: Promise<{ cursor?: string }>
+}) {
   const user = await getCurrentUser()
   if (!user) redirect('/login')
 
+  const { cursor } = await searchParams
+
   const supabase = await createClient()
 
-  const { data: documents } = await supabase
-    .from('documents')
-    .select('*')
-    .eq('user_id', user.id)
-    .order('created_at', { ascending: false })
+  const { documents, nextCursor } = await listDocuments(supabase, user.id, cursor)
 
   return (
     <div className="space-y-6">
@@ -34,7 +37,7 @@ export default async function DocumentsPage() {
         </Link>
       </div>
 
-      {documents && documents.length > 0 ? (
+      {documents.length > 0 ? (
         <div className="grid gap-4">
           {documents.map((doc) => (
             <Link key={doc.id} href={`/dashboard/documents/${doc.id}`}>
@@ -78,7 +81,30 @@ export default async function DocumentsPage() {
               </Card>
             </Link>
           ))}
+          {(cursor || nextCursor) && (
+            <div className="flex justify-center gap-2">
+              {cursor && (
+                <Link href="/dashboard/documents">
+                  <Button variant="outline">Newest</Button>
+                </Link>
+              )}
+              {nextCursor && (
+                <Link href={`/dashboard/documents?cursor=${nextCursor}`}>
+                  <Button variant="outline">Older documents</Button>
+                </Link>
+              )}
+            </div>
+          )}
         </div>
+      ) : cursor ? (
+        <Card>
+          <CardContent className="flex flex-col items-center justify-center py-16">
+            <p className="text-gray-500 mb-6">No older documents</p>
+            <Link href="/dashboard/documents">
+              <Button variant="outline">Back to newest</Button>
+            </Link>
+          </CardContent>
+        </Card>
       ) : (
         <Card>
           <CardContent className="flex flex-col items-center justify-center py-16">
@@ -7,6 +7,7 @@ import { Button } from '@/components/ui/button'
 import { Alert, AlertDescription } from '@/components/ui/alert'
 import { Progress } from '@/components/ui/progress'
 import { Upload, FileText, CheckCircle2, XCircle } from 'lucide-react'
+import { uploadDocumentDirect } from '@/lib/document-processing/direct-upload'
 
 export default function UploadPage() {
   const router = useRouter()
@@ -75,31 +76,14 @@ export default function UploadPage() {
     setProgress(0)
 
     try {
-      const formData = new FormData()
-      formData.append('file', selectedFile)
-
-      // Simulate progress for UX
-      const progressInterval = setInterval(() => {
-        setProgress(prev => Math.min(prev + 10, 90))
-      }, 200)
-
-      const response = await fetch('/api/documents/upload', {
-        method: 'POST',
-        body: formData,
+      // Straight to storage (chunked and resumable for large files); progress is real
+      const created = await uploadDocumentDirect(selectedFile, {
+        onProgress: (uploaded, total) => setProgress(Math.round((uploaded / total) * 100)),
       })
 
-      clearInterval(progressInterval)
-      setProgress(100)
-
-      const data = await response.json()
-
-      if (!response.ok) {
-        throw new Error(data.error || 'Upload failed')
-      }
-
       setSuccess(true)
       setTimeout(() => {
-        router.push(`/dashboard/documents/${data.document.id}`)
+        router.push(`/dashboard/documents/${created.id}`)
       }, 1500)
 
     } catch (err: any) {
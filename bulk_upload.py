@@ -0,0 +1,190 @@
+"""
+Bulk-load a contract portfolio (e.g. a due-diligence data room) through the
+batch API and follow the analyses until they finish.
+
+Usage:
+    python bulk_upload.py ./data-room --email me@firm.ro
+    python bulk_upload.py contracts.zip --name "Data room Q3" --no-analyze
+
+Files are sent in chunks (--chunk-size per request) into one batch, then
+GET /api/documents/batch/<id> is polled until every analysis is done.
+The password is read from BULK_UPLOAD_PASSWORD or prompted for.
+"""
+import argparse
+import getpass
+import mimetypes
+import os
+import sys
+import time
+from pathlib import Path
+
+import requests
+
+DEFAULT_URL = "https://contract-review-ai.vercel.app"
+EXTENSIONS = {".pdf", ".docx", ".zip"}
+MIME_TYPES = {
+    ".pdf": "application/pdf",
+    ".docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    ".zip": "application/zip",
+}
+
+
+def collect_files(paths):
+    """Expand directories (recursively) into the uploadable files they contain"""
+    files = []
+    for raw in paths:
+        path = Path(raw)
+        if path.is_dir():
+            files.extend(sorted(p for p in path.rglob("*") if p.is_file() and p.suffix.lower() in EXTENSIONS))
+        elif path.is_file():
+            files.append(path)
+        else:
+            print(f"   ⚠️ Skipping {raw}: not found")
+    return files
+
+
+def chunked(items, size, max_bytes):
+    """Split files into request-sized chunks (by count and total size)"""
+    chunk, chunk_bytes = [], 0
+    for item in items:
+        item_bytes = item.stat().st_size
+        if chunk and (len(chunk) >= size or chunk_bytes + item_bytes > max_bytes):
+            yield chunk
+            chunk, chunk_bytes = [], 0
+        chunk.append(item)
+        chunk_bytes += item_bytes
+    if chunk:
+        yield chunk
+
+
+def login(session, base_url, email, password):
+    response = session.post(
+        f"{base_url}/api/auth/login",
+        json={"email": email, "password": password},
+        allow_redirects=False,
+    )
+    if response.status_code >= 400:
+        raise SystemExit(f"❌ Login failed ({response.status_code}): {response.text[:200]}")
+    if not session.cookies:
+        raise SystemExit("❌ Login returned no session cookies")
+
+
+def upload_chunk(session, base_url, chunk, batch_id, name, analyze):
+    handles = [open(path, "rb") for path in chunk]
+    try:
+        files = [
+            ("files", (path.name, handle, MIME_TYPES.get(path.suffix.lower()) or mimetypes.guess_type(path.name)[0]))
+            for path, handle in zip(chunk, handles)
+        ]
+        data = {"analyze": "true" if analyze else "false"}
+        if batch_id:
+            data["batch_id"] = batch_id
+        elif name:
+            data["name"] = name
+
+        response = session.post(f"{base_url}/api/documents/batch", files=files, data=data, timeout=300)
+    finally:
+        for handle in handles:
+            handle.close()
+
+    body = response.json() if response.headers.get("content-type", "").startswith("application/json") else {}
+    if response.status_code not in (200, 202):
+        raise RuntimeError(f"Batch upload failed ({response.status_code}): {body.get('error') or response.text[:200]}")
+    return body
+
+
+def poll(session, base_url, batch_id, interval):
+    """Print batch progress until no analysis is pending or running"""
+    last_line = None
+    while True:
+        response = session.get(f"{base_url}/api/documents/batch/{batch_id}", timeout=60)
+        response.raise_for_status()
+        status = response.json()
+
+        progress, jobs = status["progress"], status["jobs"]
+        line = (f"   {status['status']:<10} {progress['finished']}/{progress['queued']} analyzed "
+                f"({progress['percent']}%) | running {jobs['in_progress']}, pending {jobs['pending']}, "
+                f"failed {jobs['failed']} | issues {status['issues_found']} ({status['high_risk_count']} high risk)")
+        if line != last_line:
+            print(line)
+            last_line = line
+
+        if status["status"] != "processing":
+            return status
+        time.sleep(interval)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk upload contracts and queue their analyses")
+    parser.add_argument("paths", nargs="+", help="PDF/DOCX/ZIP files or directories")
+    parser.add_argument("--url", default=os.environ.get("APP_URL", DEFAULT_URL))
+    parser.add_argument("--email", default=os.environ.get("BULK_UPLOAD_EMAIL"))
+    parser.add_argument("--name", help="Batch name")
+    parser.add_argument("--batch-id", help="Add to an existing batch")
+    parser.add_argument("--chunk-size", type=int, default=20, help="Files per request")
+    parser.add_argument("--chunk-mb", type=float, default=4.0, help="Max MB per request (platform body limit)")
+    parser.add_argument("--no-analyze", action="store_true", help="Upload only")
+    parser.add_argument("--no-wait", action="store_true", help="Don't poll for analysis progress")
+    parser.add_argument("--interval", type=float, default=5.0, help="Polling interval in seconds")
+    args = parser.parse_args()
+
+    files = collect_files(args.paths)
+    if not files:
+        raise SystemExit("❌ No PDF, DOCX or ZIP files found")
+
+    email = args.email or input("Email: ").strip()
+    password = os.environ.get("BULK_UPLOAD_PASSWORD") or getpass.getpass("Password: ")
+
+    print("\n📦 BULK UPLOAD")
+    print("=" * 60)
+    print(f"URL:   {args.url}")
+    print(f"Files: {len(files)} ({sum(f.stat().st_size for f in files) / 1024 / 1024:.1f} MB)")
+
+    session = requests.Session()
+    login(session, args.url, email, password)
+    print("✓ Logged in")
+
+    batch_id = args.batch_id
+    uploaded, rejected = 0, []
+    started = time.time()
+    chunks = list(chunked(files, args.chunk_size, int(args.chunk_mb * 1024 * 1024)))
+
+    for index, chunk in enumerate(chunks, 1):
+        try:
+            body = upload_chunk(session, args.url, chunk, batch_id, args.name, not args.no_analyze)
+        except (requests.RequestException, RuntimeError) as error:
+            print(f"   ❌ Chunk {index}/{len(chunks)}: {error}")
+            rejected.extend({"name": path.name, "error": str(error)} for path in chunk)
+            continue
+
+        batch_id = body["batch_id"]
+        uploaded += len(body["documents"])
+        rejected.extend(body.get("rejected", []))
+        print(f"   ✓ Chunk {index}/{len(chunks)}: {len(body['documents'])} documents, "
+              f"{len(body.get('rejected', []))} rejected")
+
+    print(f"\nUploaded {uploaded} documents in {time.time() - started:.1f}s (batch {batch_id})")
+    for item in rejected:
+        print(f"   ✗ {item['name']}: {item['error']}")
+
+    if not batch_id:
+        sys.exit(1)
+    if args.no_analyze or args.no_wait:
+        return
+
+    print("\n⏳ Waiting for analyses...")
+    status = poll(session, args.url, batch_id, args.interval)
+
+    print("\n" + "=" * 60)
+    print(f"{'✅' if status['status'] == 'completed' else '⚠️'} Batch {status['status']} "
+          f"in {time.time() - started:.1f}s")
+    print("=" * 60)
+    for document in status["documents"]:
+        if document["job_status"] == "failed":
+            print(f"   ✗ {document['filename']}: analysis failed")
+
+    sys.exit(0 if status["status"] == "completed" else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,10 @@
 'use client'
 
-import { useState } from 'react'
+import { useCallback, useState } from 'react'
 import { useRouter } from 'next/navigation'
 import { Card, CardContent, CardHeader, CardTitle } from '@/components/ui/card'
 import { Button } from '@/components/ui/button'
 import { Badge } from '@/components/ui/badge'
-import { ScrollArea } from '@/components/ui/scroll-area'
 import { Separator } from '@/components/ui/separator'
 import { Alert, AlertDescription } from '@/components/ui/alert'
 import { 
@@ -17,34 +16,110 @@ import {
   Play,
   Loader2
 } from 'lucide-react'
-import type { Document, Analysis, Comment, DocumentClause } from '@/lib/types/database'
+import { VirtualList, useRangeLoader } from './virtual-list'
+import { INITIAL_CLAUSES, INITIAL_COMMENTS, type DocumentView, type ViewerClause, type ViewerComment } from '@/lib/documents/view'
 
 interface DocumentViewerProps {
-  document: Document
-  analysis: Analysis | null
-  comments: Comment[]
-  clauses: DocumentClause[]
+  document: DocumentView['document']
+  analysis: DocumentView['analysis']
+  /** First comments (newest first); the rest are fetched as they scroll into view */
+  comments: ViewerComment[]
+  commentCount: number
+  highRiskCount: number
+  /** First clauses in document order; likewise fetched by range after that */
+  clauses: ViewerClause[]
+  clauseCount: number
 }
 
-export function DocumentViewer({ document, analysis, comments, clauses }: DocumentViewerProps) {
+interface AnalysisProgress {
+  status: string
+  stage?: 'extracting' | 'analyzing' | 'storing'
+  chunks_done?: number
+  chunks_total?: number
+  issues_streamed?: number
+}
+
+export function DocumentViewer({
+  document,
+  analysis,
+  comments,
+  commentCount,
+  highRiskCount,
+  clauses,
+  clauseCount,
+}: DocumentViewerProps) {
   const router = useRouter()
   const [analyzing, setAnalyzing] = useState(false)
   const [error, setError] = useState<string | null>(null)
   const [selectedCommentId, setSelectedCommentId] = useState<string | null>(null)
+  const [liveComments, setLiveComments] = useState<ViewerComment[]>([])
+  const [progress, setProgress] = useState<AnalysisProgress | null>(null)
+
+  const clauseRows = useRangeLoader(`/api/documents/${document.id}/clauses`, 'clauses', clauseCount, clauses, INITIAL_CLAUSES)
+  const commentRows = useRangeLoader(`/api/documents/${document.id}/comments`, 'comments', commentCount, comments, INITIAL_COMMENTS)
+
+  // While a job runs, show its issues as they are stored
+  const showLive = analyzing && liveComments.length > 0
+  const visibleComments = showLive ? liveComments : commentRows.items
+  const visibleCommentCount = showLive ? liveComments.length : commentCount
+  const ensureCommentRange = useCallback((start: number, end: number) => {
+    if (!showLive) commentRows.ensureRange(start, end)
+  }, [showLive, commentRows.ensureRange])
+
+  /**
+   * Follow a job over server-sent events until it completes or fails
+   */
+  const followJob = (jobId: string) => new Promise<void>((resolve, reject) => {
+    const events = new EventSource(`/api/documents/${document.id}/analyze/events?job=${jobId}`)
+
+    events.addEventListener('issue', (event) => {
+      const comment: ViewerComment = JSON.parse((event as MessageEvent).data)
+      setLiveComments(prev => prev.some(c => c.id === comment.id) ? prev : [...prev, comment])
+    })
+    events.addEventListener('progress', (event) => {
+      setProgress(JSON.parse((event as MessageEvent).data))
+    })
+    events.addEventListener('done', () => {
+      events.close()
+      resolve()
+    })
+    events.addEventListener('failed', (event) => {
+      events.close()
+      reject(new Error(JSON.parse((event as MessageEvent).data).error || 'Analysis failed'))
+    })
+    // Network drops reconnect on their own; an error response (401, 404)
+    // closes the source without a done or failed event
+    events.addEventListener('error', () => {
+      if (events.readyState !== EventSource.CLOSED) return
+      events.close()
+      reject(new Error('Lost connection to the analysis. Reload the page to see its status.'))
+    })
+  })
 
-  const handleAnalyze = async () => {
+  const getProgressLabel = (current: AnalysisProgress) => {
+    if (current.status === 'pending') return 'Waiting for a worker...'
+    if (current.stage === 'extracting') return 'Extracting text...'
+    if (current.stage === 'storing') return 'Saving results...'
+    const sections = current.chunks_total ? ` (${current.chunks_done || 0}/${current.chunks_total} sections)` : ''
+    return `Analyzing${sections} - ${current.issues_streamed || 0} issues found so far`
+  }
+
+  const handleAnalyze = async (mode?: 'incremental') => {
     setAnalyzing(true)
     setError(null)
+    setLiveComments([])
+    setProgress(null)
     try {
       console.log('[UI] Starting analysis for document:', document.id)
       const startTime = Date.now()
 
       const response = await fetch(`/api/documents/${document.id}/analyze`, {
         method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify(mode ? { mode } : {}),
       })
 
-      const duration = Date.now() - startTime
-      console.log('[UI] Analysis response received in', duration, 'ms')
+      console.log('[UI] Analysis response received in', Date.now() - startTime, 'ms')
 
       if (!response.ok) {
         const errorData = await response.json()
@@ -61,7 +136,12 @@ export function DocumentViewer({ document, analysis, comments, clauses }: Docume
       }
 
       const result = await response.json()
-      console.log('[UI] Analysis successful:', result)
+      console.log('[UI] Analysis queued:', result)
+
+      // Issues and progress arrive while the worker runs
+      await followJob(result.job_id)
+
+      console.log('[UI] Analysis completed in', Date.now() - startTime, 'ms')
 
       // Refresh page to show results
       router.refresh()
@@ -73,6 +153,7 @@ export function DocumentViewer({ document, analysis, comments, clauses }: Docume
       alert(`Analysis failed:\n\n${error.message}`)
     } finally {
       setAnalyzing(false)
+      setProgress(null)
     }
   }
 
@@ -93,6 +174,66 @@ export function DocumentViewer({ document, analysis, comments, clauses }: Docume
     return variants[level as keyof typeof variants] || variants.low
   }
 
+  const renderComment = (comment: ViewerComment) => {
+    const badge = getRiskBadge(comment.risk_level || 'low')
+    return (
+      <div
+        className={`p-4 border rounded-lg cursor-pointer transition-colors ${
+          selectedCommentId === comment.id
+            ? 'border-blue-500 bg-blue-50'
+            : 'border-gray-200 hover:border-gray-300'
+        }`}
+        onClick={() => setSelectedCommentId(comment.id)}
+      >
+        <div className="flex items-start justify-between mb-2">
+          <h4 className="font-semibold text-gray-900">{comment.title}</h4>
+          <Badge variant={badge.variant as any}>{badge.label}</Badge>
+        </div>
+
+        <p className="text-sm text-gray-700 mb-3">{comment.content}</p>
+
+        {comment.suggested_revision && (
+          <div className="bg-green-50 border border-green-200 rounded p-3 mb-3">
+            <div className="text-xs font-semibold text-green-800 mb-1">
+              Suggested Revision:
+            </div>
+            <p className="text-sm text-green-900">{comment.suggested_revision}</p>
+          </div>
+        )}
+
+        {comment.legal_references && comment.legal_references.length > 0 && (
+          <div className="space-y-1">
+            <div className="text-xs font-semibold text-gray-600">Legal References:</div>
+            {comment.legal_references.map((ref: any, idx: number) => (
+              <div key={idx} className="text-xs text-blue-600">
+                {ref.law} - {ref.article}
+              </div>
+            ))}
+          </div>
+        )}
+
+        {comment.confidence_score && (
+          <div className="mt-2 text-xs text-gray-500">
+            Confidence: {(comment.confidence_score * 100).toFixed(0)}%
+          </div>
+        )}
+
+        {comment.is_ai_generated && (
+          <div className="mt-2 flex gap-2">
+            <Button size="sm" variant="outline" className="text-xs">
+              <CheckCircle2 className="mr-1 h-3 w-3" />
+              Accept
+            </Button>
+            <Button size="sm" variant="outline" className="text-xs">
+              <XCircle className="mr-1 h-3 w-3" />
+              Reject
+            </Button>
+          </div>
+        )}
+      </div>
+    )
+  }
+
   return (
     <div className="h-[calc(100vh-8rem)] flex flex-col gap-4">
       {/* Error Alert */}
@@ -105,6 +246,14 @@ export function DocumentViewer({ document, analysis, comments, clauses }: Docume
         </Alert>
       )}
 
+      {/* Live progress */}
+      {analyzing && progress && (
+        <Alert>
+          <Loader2 className="h-4 w-4 animate-spin" />
+          <AlertDescription>{getProgressLabel(progress)}</AlertDescription>
+        </Alert>
+      )}
+
       {/* Header */}
       <div className="flex justify-between items-start">
         <div>
@@ -127,7 +276,7 @@ export function DocumentViewer({ document, analysis, comments, clauses }: Docume
                 <Download className="mr-2 h-4 w-4" />
                 Export
               </Button>
-              <Button variant="outline" onClick={handleAnalyze} disabled={analyzing}>
+              <Button variant="outline" onClick={() => handleAnalyze('incremental')} disabled={analyzing}>
                 {analyzing ? (
                   <Loader2 className="mr-2 h-4 w-4 animate-spin" />
                 ) : (
@@ -137,7 +286,7 @@ export function DocumentViewer({ document, analysis, comments, clauses }: Docume
               </Button>
             </>
           ) : (
-            <Button onClick={handleAnalyze} disabled={analyzing || document.status === 'processing'}>
+            <Button onClick={() => handleAnalyze()} disabled={analyzing || document.status === 'processing'}>
               {analyzing || document.status === 'processing' ? (
                 <>
                   <Loader2 className="mr-2 h-4 w-4 animate-spin" />
@@ -184,7 +333,7 @@ export function DocumentViewer({ document, analysis, comments, clauses }: Docume
               <CardTitle className="text-sm font-medium text-gray-600">Issues Found</CardTitle>
             </CardHeader>
             <CardContent>
-              <div className="text-3xl font-bold">{comments.length}</div>
+              <div className="text-3xl font-bold">{commentCount}</div>
             </CardContent>
           </Card>
 
@@ -194,7 +343,7 @@ export function DocumentViewer({ document, analysis, comments, clauses }: Docume
             </CardHeader>
             <CardContent>
               <div className="text-3xl font-bold text-red-600">
-                {comments.filter(c => c.risk_level === 'high' || c.risk_level === 'critical').length}
+                {highRiskCount}
               </div>
             </CardContent>
           </Card>
@@ -212,40 +361,51 @@ export function DocumentViewer({ document, analysis, comments, clauses }: Docume
             </CardTitle>
           </CardHeader>
           <CardContent className="flex-1 min-h-0">
-            <ScrollArea className="h-full">
-              {clauses.length > 0 ? (
-                <div className="space-y-4 pr-4">
-                  {clauses.map((clause) => (
-                    <div key={clause.id} className="border-l-2 border-gray-200 pl-4">
-                      {clause.clause_number && (
-                        <div className="font-semibold text-blue-600 mb-1">
-                          {clause.clause_number}
-                        </div>
-                      )}
-                      {clause.heading && (
-                        <div className="font-semibold text-gray-900 mb-2">
-                          {clause.heading}
-                        </div>
-                      )}
-                      <p className="text-sm text-gray-700 whitespace-pre-wrap">
-                        {clause.content}
-                      </p>
-                    </div>
-                  ))}
-                </div>
-              ) : (
-                <div className="text-center text-gray-500 py-8">
-                  {document.status === 'processing' ? (
-                    <>
-                      <Loader2 className="h-8 w-8 animate-spin mx-auto mb-2" />
-                      <p>Processing document...</p>
-                    </>
-                  ) : (
-                    <p>Click &quot;Start Analysis&quot; to process this document</p>
-                  )}
-                </div>
-              )}
-            </ScrollArea>
+            {clauseCount > 0 ? (
+              <VirtualList
+                className="h-full"
+                rowClassName="pb-4 pr-4"
+                count={clauseCount}
+                items={clauseRows.items}
+                estimateHeight={120}
+                getKey={(clause) => clause.id}
+                onRangeChange={clauseRows.ensureRange}
+                renderPlaceholder={() => (
+                  <div className="border-l-2 border-gray-200 pl-4 space-y-2 animate-pulse">
+                    <div className="h-4 w-1/3 rounded bg-gray-100" />
+                    <div className="h-16 rounded bg-gray-100" />
+                  </div>
+                )}
+                renderItem={(clause) => (
+                  <div className="border-l-2 border-gray-200 pl-4">
+                    {clause.clause_number && (
+                      <div className="font-semibold text-blue-600 mb-1">
+                        {clause.clause_number}
+                      </div>
+                    )}
+                    {clause.heading && (
+                      <div className="font-semibold text-gray-900 mb-2">
+                        {clause.heading}
+                      </div>
+                    )}
+                    <p className="text-sm text-gray-700 whitespace-pre-wrap">
+                      {clause.content}
+                    </p>
+                  </div>
+                )}
+              />
+            ) : (
+              <div className="text-center text-gray-500 py-8">
+                {document.status === 'processing' ? (
+                  <>
+                    <Loader2 className="h-8 w-8 animate-spin mx-auto mb-2" />
+                    <p>Processing document...</p>
+                  </>
+                ) : (
+                  <p>Click &quot;Start Analysis&quot; to process this document</p>
+                )}
+              </div>
+            )}
           </CardContent>
         </Card>
 
@@ -258,86 +418,39 @@ export function DocumentViewer({ document, analysis, comments, clauses }: Docume
             </CardTitle>
           </CardHeader>
           <CardContent className="flex-1 min-h-0">
-            <ScrollArea className="h-full">
-              {comments.length > 0 ? (
-                <div className="space-y-4 pr-4">
-                  {comments.map((comment) => {
-                    const badge = getRiskBadge(comment.risk_level || 'low')
-                    return (
-                      <div
-                        key={comment.id}
-                        className={`p-4 border rounded-lg cursor-pointer transition-colors ${
-                          selectedCommentId === comment.id
-                            ? 'border-blue-500 bg-blue-50'
-                            : 'border-gray-200 hover:border-gray-300'
-                        }`}
-                        onClick={() => setSelectedCommentId(comment.id)}
-                      >
-                        <div className="flex items-start justify-between mb-2">
-                          <h4 className="font-semibold text-gray-900">{comment.title}</h4>
-                          <Badge variant={badge.variant as any}>{badge.label}</Badge>
-                        </div>
-
-                        <p className="text-sm text-gray-700 mb-3">{comment.content}</p>
-
-                        {comment.suggested_revision && (
-                          <div className="bg-green-50 border border-green-200 rounded p-3 mb-3">
-                            <div className="text-xs font-semibold text-green-800 mb-1">
-                              Suggested Revision:
-                            </div>
-                            <p className="text-sm text-green-900">{comment.suggested_revision}</p>
-                          </div>
-                        )}
-
-                        {comment.legal_references && comment.legal_references.length > 0 && (
-                          <div className="space-y-1">
-                            <div className="text-xs font-semibold text-gray-600">Legal References:</div>
-                            {comment.legal_references.map((ref: any, idx: number) => (
-                              <div key={idx} className="text-xs text-blue-600">
-                                {ref.law} - {ref.article}
-                              </div>
-                            ))}
-                          </div>
-                        )}
-
-                        {comment.confidence_score && (
-                          <div className="mt-2 text-xs text-gray-500">
-                            Confidence: {(comment.confidence_score * 100).toFixed(0)}%
-                          </div>
-                        )}
-
-                        {comment.is_ai_generated && (
-                          <div className="mt-2 flex gap-2">
-                            <Button size="sm" variant="outline" className="text-xs">
-                              <CheckCircle2 className="mr-1 h-3 w-3" />
-                              Accept
-                            </Button>
-                            <Button size="sm" variant="outline" className="text-xs">
-                              <XCircle className="mr-1 h-3 w-3" />
-                              Reject
-                            </Button>
-                          </div>
-                        )}
-                      </div>
-                    )
-                  })}
-                </div>
-              ) : (
-                <div className="text-center text-gray-500 py-8">
-                  {document.status === 'analyzed' ? (
-                    <>
-                      <CheckCircle2 className="h-8 w-8 mx-auto mb-2 text-green-500" />
-                      <p>No issues found! Contract looks good.</p>
-                    </>
-                  ) : (
-                    <>
-                      <AlertTriangle className="h-8 w-8 mx-auto mb-2" />
-                      <p>Analysis comments will appear here</p>
-                    </>
-                  )}
-                </div>
-              )}
-            </ScrollArea>
+            {visibleCommentCount > 0 ? (
+              <VirtualList
+                key={showLive ? 'live' : 'stored'}
+                className="h-full"
+                rowClassName="pb-4 pr-4"
+                count={visibleCommentCount}
+                items={visibleComments}
+                estimateHeight={220}
+                getKey={(comment) => comment.id}
+                onRangeChange={ensureCommentRange}
+                renderPlaceholder={() => (
+                  <div className="p-4 border border-gray-200 rounded-lg space-y-2 animate-pulse">
+                    <div className="h-4 w-1/2 rounded bg-gray-100" />
+                    <div className="h-12 rounded bg-gray-100" />
+                  </div>
+                )}
+                renderItem={renderComment}
+              />
+            ) : (
+              <div className="text-center text-gray-500 py-8">
+                {document.status === 'analyzed' ? (
+                  <>
+                    <CheckCircle2 className="h-8 w-8 mx-auto mb-2 text-green-500" />
+                    <p>No issues found! Contract looks good.</p>
+                  </>
+                ) : (
+                  <>
+                    <AlertTriangle className="h-8 w-8 mx-auto mb-2" />
+                    <p>Analysis comments will appear here</p>
+                  </>
+                )}
+              </div>
+            )}
           </CardContent>
         </Card>
       </div>
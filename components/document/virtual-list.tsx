@@ -0,0 +1,202 @@
+'use client'
+
+import { useCallback, useEffect, useMemo, useRef, useState, type ReactNode } from 'react'
+
+interface VirtualListProps<T> {
+  /** Total number of rows, loaded or not */
+  count: number
+  /** Loaded rows by index; rows not loaded yet render `renderPlaceholder` */
+  items: (T | undefined)[]
+  /** Height assumed for rows that have not been rendered yet */
+  estimateHeight: number
+  getKey: (item: T) => string
+  renderItem: (item: T, index: number) => ReactNode
+  renderPlaceholder?: (index: number) => ReactNode
+  /** Called with the rendered index range [start, end) when it changes */
+  onRangeChange?: (start: number, end: number) => void
+  /** Pixels rendered above and below the viewport */
+  overscan?: number
+  className?: string
+  rowClassName?: string
+}
+
+/**
+ * Largest index whose offset is <= y
+ */
+function findIndex(offsets: Float64Array, y: number): number {
+  let low = 0
+  let high = offsets.length - 1
+  while (low < high) {
+    const mid = (low + high + 1) >> 1
+    if (offsets[mid] <= y) low = mid
+    else high = mid - 1
+  }
+  return low
+}
+
+/**
+ * Scrollable list that only mounts the rows in (and near) the viewport.
+ * Rows may have any height: each rendered row is measured and unmeasured rows
+ * count as `estimateHeight`, so the scrollbar settles as the user scrolls.
+ */
+export function VirtualList<T>({
+  count,
+  items,
+  estimateHeight,
+  getKey,
+  renderItem,
+  renderPlaceholder,
+  onRangeChange,
+  overscan = 600,
+  className,
+  rowClassName,
+}: VirtualListProps<T>) {
+  const containerRef = useRef<HTMLDivElement>(null)
+  const heights = useRef(new Map<number, number>())
+  const offsetsRef = useRef<Float64Array>(new Float64Array(1))
+  const [, setMeasured] = useState(0)
+  const [viewport, setViewport] = useState({ top: 0, height: 800 })
+
+  // Recomputed every render: a few thousand additions, cheaper than tracking
+  // which offsets a new measurement invalidates (setMeasured re-renders)
+  const offsets = new Float64Array(count + 1)
+  for (let i = 0; i < count; i++) {
+    offsets[i + 1] = offsets[i] + (heights.current.get(i) ?? estimateHeight)
+  }
+
+  useEffect(() => {
+    offsetsRef.current = offsets
+  })
+
+  const start = Math.min(count, findIndex(offsets, viewport.top - overscan))
+  const end = Math.min(count, findIndex(offsets, viewport.top + viewport.height + overscan) + 1)
+
+  useEffect(() => {
+    onRangeChange?.(start, end)
+  }, [start, end, onRangeChange])
+
+  // Track scroll position and size, at most once per frame
+  useEffect(() => {
+    const container = containerRef.current
+    if (!container) return
+    let frame = 0
+    const update = () => {
+      frame = 0
+      setViewport({ top: container.scrollTop, height: container.clientHeight })
+    }
+    const onScroll = () => {
+      if (!frame) frame = requestAnimationFrame(update)
+    }
+    update()
+    container.addEventListener('scroll', onScroll, { passive: true })
+    const observer = new ResizeObserver(update)
+    observer.observe(container)
+    return () => {
+      container.removeEventListener('scroll', onScroll)
+      observer.disconnect()
+      cancelAnimationFrame(frame)
+    }
+  }, [])
+
+  const rowObserver = useMemo(() => {
+    if (typeof ResizeObserver === 'undefined') return null
+    return new ResizeObserver(entries => {
+      const container = containerRef.current
+      let changed = false
+      for (const entry of entries) {
+        const row = entry.target as HTMLElement
+        const index = Number(row.dataset.index)
+        const height = row.offsetHeight
+        const previous = heights.current.get(index) ?? estimateHeight
+        if (height === previous && heights.current.has(index)) continue
+        heights.current.set(index, height)
+        changed = true
+        // A row above the viewport changing size would shift the visible
+        // content; scroll by the same amount so it stays put
+        if (container && offsetsRef.current[index] < container.scrollTop) {
+          container.scrollTop += height - previous
+        }
+      }
+      if (changed) setMeasured(value => value + 1)
+    })
+  }, [estimateHeight])
+
+  useEffect(() => () => rowObserver?.disconnect(), [rowObserver])
+
+  const measure = useCallback((row: HTMLDivElement | null) => {
+    if (!row || !rowObserver) return
+    rowObserver.observe(row)
+    return () => rowObserver.unobserve(row)
+  }, [rowObserver])
+
+  const rows: ReactNode[] = []
+  for (let index = start; index < end; index++) {
+    const item = items[index]
+    rows.push(
+      <div key={item ? getKey(item) : `placeholder-${index}`} data-index={index} ref={measure} className={rowClassName}>
+        {item ? renderItem(item, index) : renderPlaceholder?.(index)}
+      </div>
+    )
+  }
+
+  return (
+    <div ref={containerRef} className={`overflow-y-auto ${className || ''}`}>
+      <div className="relative" style={{ height: offsets[count] }}>
+        <div className="absolute inset-x-0 top-0" style={{ transform: `translateY(${offsets[start]}px)` }}>
+          {rows}
+        </div>
+      </div>
+    </div>
+  )
+}
+
+/**
+ * Rows of a list that is loaded by range: starts with the rows the server
+ * rendered and fetches `pageSize`-aligned pages from `url?offset=&limit=`
+ * (responding `{ [field]: T[] }`) when `ensureRange` asks for missing rows.
+ */
+export function useRangeLoader<T>(url: string, field: string, total: number, initial: T[], pageSize: number) {
+  const [items, setItems] = useState<(T | undefined)[]>(initial)
+  const itemsRef = useRef(items)
+  const requested = useRef(new Set<number>())
+
+  // A refresh from the server replaces everything loaded so far
+  useEffect(() => {
+    setItems(initial)
+    requested.current.clear()
+  }, [initial])
+
+  useEffect(() => {
+    itemsRef.current = items
+  }, [items])
+
+  const ensureRange = useCallback((start: number, end: number) => {
+    for (let page = Math.floor(start / pageSize); page * pageSize < Math.min(end, total); page++) {
+      const offset = page * pageSize
+      const last = Math.min(offset + pageSize, total)
+      let loaded = true
+      for (let i = offset; i < last && loaded; i++) loaded = itemsRef.current[i] !== undefined
+      if (loaded || requested.current.has(page)) continue
+
+      requested.current.add(page)
+      fetch(`${url}?offset=${offset}&limit=${pageSize}`)
+        .then(response => response.ok ? response.json() : Promise.reject(new Error(`HTTP ${response.status}`)))
+        .then(data => {
+          setItems(prev => {
+            const next = prev.slice()
+            ;(data[field] as T[]).forEach((item, i) => {
+              next[offset + i] = item
+            })
+            return next
+          })
+        })
+        .catch(error => {
+          // Retried the next time the range is needed
+          console.error('[UI] Failed to load rows:', url, offset, error)
+          requested.current.delete(page)
+        })
+    }
+  }, [url, field, total, pageSize])
+
+  return { items, ensureRange }
+}
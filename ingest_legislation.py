@@ -0,0 +1,539 @@
+"""
+Ingest Romanian/EU legislation dumps into legislative_docs (one row per
+article) and embeddings (one row per paragraph chunk).
+
+Usage:
+    python ingest_legislation.py dumps/codul-civil.txt --law-name "Codul Civil" \\
+        --law-number "Law 287/2009" --jurisdiction romania --effective-date 2011-10-01
+    python ingest_legislation.py --manifest dumps/manifest.json --embedder openai
+    python ingest_legislation.py dumps/gdpr.html --law-name GDPR --law-number "Regulation 2016/679" \\
+        --jurisdiction eu --dry-run
+
+Dumps are plain text or HTML (legislatie.just.ro, EUR-Lex) and are read as a
+stream, one batch of articles at a time. A manifest is a JSON list of objects
+with the same fields as the flags: path, law_name, law_number, jurisdiction,
+effective_date, source_url.
+
+Each batch is written in one transaction: articles are COPYed into a staging
+table and upserted on (law_number, article_number), their chunks replace the
+previous embeddings of the same embedder. Progress is checkpointed per file
+in --state after every batch, so an interrupted run resumes where it stopped
+(re-running a batch is harmless, writes are upserts).
+
+Connects with DATABASE_URL (Supabase: Settings > Database > Connection string).
+"""
+import argparse
+import hashlib
+import json
+import math
+import os
+import re
+import sys
+import time
+import unicodedata
+from array import array
+from html.parser import HTMLParser
+from pathlib import Path
+
+import psycopg
+import requests
+
+EMBEDDING_DIMENSIONS = 1536
+OPENAI_MODEL = "text-embedding-3-small"
+OPENAI_BATCH = 100
+
+# "Art. 1270", "Articolul 1.270", "Art. 5^1 - Titlu", "Article 6"
+ARTICLE_RE = re.compile(
+    r"^(?:Art\.|Articolul|Article)\s*(\d+(?:\.\d{3})*(?:\^\d+)?)\s*\.?\s*(?:[-–—:]\s*(.*))?$",
+    re.IGNORECASE,
+)
+# Structure above articles: kept as the article's path in metadata
+DIVISION_RE = re.compile(
+    r"^(?:CARTEA|TITLUL|CAPITOLUL|SEC[TȚ]IUNEA|BOOK|TITLE|CHAPTER|SECTION)\s+[\wIVXLC]+\b",
+    re.IGNORECASE,
+)
+DIVISION_LEVELS = {
+    "cartea": 0, "book": 0,
+    "titlul": 1, "title": 1,
+    "capitolul": 2, "chapter": 2,
+    "sectiunea": 3, "secțiunea": 3, "section": 3,
+}
+# "(1) ...", "1. ...", "a) ..." start a new paragraph
+PARAGRAPH_RE = re.compile(r"^(?:\(\d+\)|\d+\.\s|[a-z]\)\s)")
+BLOCK_TAGS = {"p", "div", "br", "li", "tr", "h1", "h2", "h3", "h4", "h5", "h6", "table", "section", "article"}
+
+
+# ---------------------------------------------------------------------------
+# Reading and parsing
+# ---------------------------------------------------------------------------
+
+class _TextExtractor(HTMLParser):
+    """Collect text from HTML, breaking lines at block elements"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+        self.skip = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in ("script", "style"):
+            self.skip += 1
+        elif tag in BLOCK_TAGS:
+            self.parts.append("\n")
+
+    def handle_endtag(self, tag):
+        if tag in ("script", "style"):
+            self.skip = max(0, self.skip - 1)
+        elif tag in BLOCK_TAGS:
+            self.parts.append("\n")
+
+    def handle_data(self, data):
+        if not self.skip:
+            self.parts.append(data)
+
+
+def iter_lines(path):
+    """Stripped, non-empty lines of a text or HTML dump, read incrementally"""
+    if path.suffix.lower() in (".html", ".htm"):
+        parser = _TextExtractor()
+        pending = ""
+        with open(path, encoding="utf-8", errors="replace") as handle:
+            for block in iter(lambda: handle.read(1 << 16), ""):
+                parser.feed(block)
+                pending += "".join(parser.parts)
+                parser.parts.clear()
+                *complete, pending = pending.split("\n")
+                yield from (line.strip() for line in complete if line.strip())
+        parser.close()
+        pending += "".join(parser.parts)
+        yield from (line.strip() for line in pending.split("\n") if line.strip())
+    else:
+        with open(path, encoding="utf-8", errors="replace") as handle:
+            for line in handle:
+                if line.strip():
+                    yield " ".join(line.split())
+
+
+def normalize_article_number(number):
+    # Romanian dumps write thousands with a dot: Art. 1.270 is article 1270
+    return "Art. " + re.sub(r"(\d)\.(?=\d{3})", r"\1", number)
+
+
+def parse_articles(lines):
+    """
+    Group lines into articles: {article_number, title, paragraphs, path}.
+    Text before the first article (preamble, tables of contents) is skipped.
+    """
+    divisions = {}
+    article = None
+
+    for line in lines:
+        division = DIVISION_RE.match(line)
+        if division and len(line) < 200 and not line.endswith((".", ";", ",")):
+            keyword = line.split()[0].lower()
+            level = DIVISION_LEVELS.get(keyword, 3)
+            divisions = {key: value for key, value in divisions.items() if key < level}
+            divisions[level] = line
+            continue
+
+        heading = ARTICLE_RE.match(line)
+        if heading:
+            if article:
+                yield article
+            article = {
+                "article_number": normalize_article_number(heading.group(1)),
+                "title": (heading.group(2) or "").strip(),
+                "paragraphs": [],
+                "path": [divisions[key] for key in sorted(divisions)],
+            }
+            continue
+
+        if article is None:
+            continue
+        # A short line right after the heading, before any paragraph, is the title
+        if (not article["title"] and not article["paragraphs"] and len(line) < 150
+                and not PARAGRAPH_RE.match(line) and not line.endswith((".", ";"))):
+            article["title"] = line
+        elif article["paragraphs"] and not PARAGRAPH_RE.match(line) and not article["paragraphs"][-1].endswith((".", ";", ":")):
+            # Hard-wrapped line: continue the paragraph
+            article["paragraphs"][-1] += " " + line
+        else:
+            article["paragraphs"].append(line)
+
+    if article:
+        yield article
+
+
+def chunk_paragraphs(paragraphs, max_chars):
+    """Consecutive paragraphs packed into chunks of at most max_chars (long ones split on sentences)"""
+    pieces = []
+    for paragraph in paragraphs:
+        if len(paragraph) <= max_chars:
+            pieces.append(paragraph)
+            continue
+        sentence_chunk = ""
+        for sentence in re.split(r"(?<=[.;])\s+", paragraph):
+            if sentence_chunk and len(sentence_chunk) + len(sentence) + 1 > max_chars:
+                pieces.append(sentence_chunk)
+                sentence_chunk = ""
+            sentence_chunk = f"{sentence_chunk} {sentence}".strip()
+        if sentence_chunk:
+            pieces.append(sentence_chunk)
+
+    chunks, current = [], ""
+    for piece in pieces:
+        if current and len(current) + len(piece) + 1 > max_chars:
+            chunks.append(current)
+            current = ""
+        current = f"{current}\n{piece}".strip()
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+# ---------------------------------------------------------------------------
+# Embeddings
+# ---------------------------------------------------------------------------
+
+STOPWORDS = {
+    "si", "sau", "de", "la", "in", "cu", "pe", "din", "pentru", "prin", "care", "ce", "este", "sunt", "fi",
+    "a", "al", "ale", "ai", "un", "o", "unei", "unui", "se", "nu", "sa", "ca", "are", "fie", "catre", "acest",
+    "aceasta", "acestor", "lor", "sale", "daca", "dupa", "mai", "fara",
+    "the", "and", "or", "of", "to", "on", "for", "by", "with", "is", "be", "an", "as", "at",
+    "that", "this", "which", "shall", "any", "such", "its", "from", "not", "may", "it",
+}
+PREFIX_LENGTH = 6
+
+
+def _fnv1a(text):
+    value = 0x811C9DC5
+    for char in text:
+        value = ((value ^ ord(char)) * 0x01000193) & 0xFFFFFFFF
+    return value
+
+
+def _normalize_words(text):
+    folded = "".join(
+        char for char in unicodedata.normalize("NFD", text.lower())
+        if not 0x300 <= ord(char) <= 0x36F
+    )
+    return re.sub(r"[^a-z0-9]+", " ", folded).strip()
+
+
+def local_embedding(text):
+    """
+    Same vectors as LocalEmbedder ('local-hash-v1') in lib/rag/embedder.ts,
+    including float32 rounding, so rows written here match app queries.
+    """
+    counts = {}
+    previous = None
+    for word in _normalize_words(text).split(" "):
+        if len(word) < 2 or word in STOPWORDS:
+            continue
+        prefix = word[:PREFIX_LENGTH]
+        counts[f"w:{word}"] = counts.get(f"w:{word}", 0) + 1
+        if len(word) > PREFIX_LENGTH:
+            counts[f"p:{prefix}"] = counts.get(f"p:{prefix}", 0) + 0.5
+        if previous:
+            feature = f"b:{previous} {prefix}"
+            counts[feature] = counts.get(feature, 0) + 0.5
+        previous = prefix
+
+    vector = array("f", bytes(4 * EMBEDDING_DIMENSIONS))
+    for feature, count in counts.items():
+        value = _fnv1a(feature)
+        sign = -1 if value & 0x80000000 else 1
+        vector[(value & 0x7FFFFFFF) % EMBEDDING_DIMENSIONS] += sign * math.log1p(count)
+
+    norm = math.sqrt(sum(x * x for x in vector)) or 1
+    for i in range(EMBEDDING_DIMENSIONS):
+        vector[i] /= norm
+    return vector
+
+
+class Embedder:
+    """Batch embedder: local (offline, matches the app's default) or openai"""
+
+    def __init__(self, kind):
+        self.kind = kind
+        self.model = {"local": "local-hash-v1", "openai": OPENAI_MODEL}.get(kind)
+        if kind == "openai":
+            self.session = requests.Session()
+            self.session.headers["Authorization"] = f"Bearer {os.environ['OPENAI_API_KEY']}"
+
+    def embed(self, texts):
+        if self.kind == "local":
+            return [local_embedding(text) for text in texts]
+
+        vectors = []
+        for start in range(0, len(texts), OPENAI_BATCH):
+            batch = [text[:8000] for text in texts[start:start + OPENAI_BATCH]]
+            for attempt in range(5):
+                response = self.session.post(
+                    "https://api.openai.com/v1/embeddings",
+                    json={"model": OPENAI_MODEL, "input": batch, "dimensions": EMBEDDING_DIMENSIONS},
+                    timeout=120,
+                )
+                if response.status_code not in (429, 500, 502, 503) or attempt == 4:
+                    break
+                time.sleep(float(response.headers.get("retry-after", 2 ** attempt)))
+            response.raise_for_status()
+            vectors.extend(item["embedding"] for item in sorted(response.json()["data"], key=lambda d: d["index"]))
+        return vectors
+
+
+def vector_literal(vector):
+    return "[" + ",".join(f"{x:.7g}" for x in vector) + "]"
+
+
+# ---------------------------------------------------------------------------
+# Writing
+# ---------------------------------------------------------------------------
+
+ARTICLE_COLUMNS = (
+    "law_name", "law_number", "article_number", "jurisdiction", "title",
+    "content", "full_text", "effective_date", "source_url", "metadata",
+)
+
+
+def write_batch(conn, law, articles, chunks, embedder):
+    """
+    Upsert a batch of articles and replace their chunk embeddings, in one transaction
+    @returns seconds spent embedding
+    """
+    embed_seconds = 0.0
+    with conn.transaction(), conn.cursor() as cur:
+        cur.execute(
+            f"CREATE TEMP TABLE ingest_articles ({', '.join(f'{c} TEXT' for c in ARTICLE_COLUMNS)}) ON COMMIT DROP"
+        )
+        with cur.copy(f"COPY ingest_articles ({', '.join(ARTICLE_COLUMNS)}) FROM STDIN") as copy:
+            for article in articles:
+                copy.write_row([
+                    law["law_name"], law["law_number"], article["article_number"], law["jurisdiction"],
+                    article["title"] or article["article_number"], article["content"], article["full_text"],
+                    law.get("effective_date"), law.get("source_url"), json.dumps(article["metadata"]),
+                ])
+
+        cur.execute("""
+            INSERT INTO public.legislative_docs
+              (law_name, law_number, article_number, jurisdiction, title, content, full_text,
+               effective_date, is_active, source_url, metadata)
+            SELECT law_name, law_number, article_number, jurisdiction, title, content, full_text,
+              effective_date::date, TRUE, source_url, metadata::jsonb
+            FROM ingest_articles
+            ON CONFLICT (law_number, article_number) DO UPDATE SET
+              law_name = EXCLUDED.law_name,
+              jurisdiction = EXCLUDED.jurisdiction,
+              title = EXCLUDED.title,
+              content = EXCLUDED.content,
+              full_text = EXCLUDED.full_text,
+              effective_date = EXCLUDED.effective_date,
+              is_active = TRUE,
+              source_url = EXCLUDED.source_url,
+              metadata = EXCLUDED.metadata
+            RETURNING id, article_number
+        """)
+        ids = {article_number: doc_id for doc_id, article_number in cur.fetchall()}
+
+        if embedder.kind == "none" or not chunks:
+            return embed_seconds
+
+        started = time.perf_counter()
+        vectors = embedder.embed([chunk["text"] for chunk in chunks])
+        embed_seconds = time.perf_counter() - started
+
+        cur.execute(
+            "DELETE FROM public.embeddings WHERE legislative_doc_id = ANY(%s) AND metadata->>'model' = %s",
+            (list(ids.values()), embedder.model),
+        )
+        metadata = json.dumps({"model": embedder.model})
+        with cur.copy(
+            "COPY public.embeddings (legislative_doc_id, content, embedding, chunk_index, token_count, metadata) FROM STDIN"
+        ) as copy:
+            for chunk, vector in zip(chunks, vectors):
+                copy.write_row([
+                    ids[chunk["article_number"]], chunk["text"], vector_literal(vector),
+                    chunk["chunk_index"], len(chunk["text"]) // 4, metadata,
+                ])
+    return embed_seconds
+
+
+# ---------------------------------------------------------------------------
+# Driver
+# ---------------------------------------------------------------------------
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as handle:
+        for block in iter(lambda: handle.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def load_state(path):
+    try:
+        return json.loads(Path(path).read_text())
+    except FileNotFoundError:
+        return {}
+
+
+def save_state(path, state):
+    temporary = f"{path}.tmp"
+    Path(temporary).write_text(json.dumps(state, indent=2))
+    os.replace(temporary, path)
+
+
+def prepare(law, article, chunk_chars):
+    """Article row and its chunks (each chunk is prefixed with the citation for embedding context)"""
+    citation = f"{law['law_name']} {article['article_number']}"
+    content = "\n".join(article["paragraphs"])
+    row = {
+        "article_number": article["article_number"],
+        "title": article["title"],
+        "content": content,
+        "full_text": f"{article['article_number']} {article['title']}\n{content}".strip(),
+        "metadata": {"path": article["path"], "paragraphs": len(article["paragraphs"])},
+    }
+    chunks = [
+        {
+            "article_number": article["article_number"],
+            "chunk_index": index,
+            "text": f"{citation} - {article['title']}\n{text}" if article["title"] else f"{citation}\n{text}",
+        }
+        for index, text in enumerate(chunk_paragraphs(article["paragraphs"], chunk_chars) or [article["title"]])
+    ]
+    return row, chunks
+
+
+def ingest_file(conn, law, embedder, args, state, totals):
+    path = Path(law["path"])
+    key = str(path.resolve())
+    digest = file_digest(path)
+    entry = state.get(key)
+    if not entry or entry.get("sha256") != digest:
+        entry = {"sha256": digest, "articles": 0, "done": False}
+    if entry["done"] and not args.force:
+        print(f"   ⏭️  {path.name}: already ingested ({entry['articles']} articles)")
+        return
+    skip = 0 if args.force else entry["articles"]
+    if skip:
+        print(f"   ↪️  {path.name}: resuming after {skip} articles")
+
+    print(f"\n📖 {path.name} → {law['law_name']} ({law['law_number']})")
+    done = 0
+    batch, batch_chunks = {}, []
+
+    def flush():
+        nonlocal batch, batch_chunks
+        if not batch:
+            return
+        started = time.perf_counter()
+        articles = list(batch.values())
+        embed_seconds = 0.0 if args.dry_run else write_batch(conn, law, articles, batch_chunks, embedder)
+        elapsed = time.perf_counter() - started
+
+        entry["articles"] = done
+        state[key] = entry
+        if not args.dry_run:
+            save_state(args.state, state)
+        totals["rows"] += len(articles)
+        totals["chunks"] += len(batch_chunks)
+        totals["embed_seconds"] += embed_seconds
+        totals["write_seconds"] += elapsed - embed_seconds
+        print(f"   ✓ {done:>6} articles | batch: {len(articles)} rows, {len(batch_chunks)} chunks in {elapsed:.2f}s "
+              f"({len(articles) / max(elapsed, 1e-9):,.0f} rows/s, {len(batch_chunks) / max(elapsed, 1e-9):,.0f} chunks/s)")
+        batch, batch_chunks = {}, []
+
+    for article in parse_articles(iter_lines(path)):
+        done += 1
+        if done <= skip:
+            continue
+        row, chunks = prepare(law, article, args.chunk_chars)
+        # The same article twice in a batch would hit ON CONFLICT twice; the later text wins
+        if row["article_number"] in batch:
+            batch_chunks = [c for c in batch_chunks if c["article_number"] != row["article_number"]]
+        batch[row["article_number"]] = row
+        batch_chunks.extend(chunks)
+        if len(batch) >= args.batch_size:
+            flush()
+    flush()
+
+    entry["articles"] = done
+    entry["done"] = True
+    state[key] = entry
+    if not args.dry_run:
+        save_state(args.state, state)
+    if done == 0:
+        print("   ⚠️ No articles found - check the dump format")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingest legislation dumps into legislative_docs and embeddings")
+    parser.add_argument("paths", nargs="*", help="Text or HTML dumps of one law")
+    parser.add_argument("--manifest", help="JSON list of {path, law_name, law_number, jurisdiction, ...}")
+    parser.add_argument("--law-name")
+    parser.add_argument("--law-number", help="Upsert key together with the article number")
+    parser.add_argument("--jurisdiction", choices=["romania", "eu"])
+    parser.add_argument("--effective-date")
+    parser.add_argument("--source-url")
+    parser.add_argument("--embedder", choices=["local", "openai", "none"], default=os.environ.get("RAG_EMBEDDER", "local"))
+    parser.add_argument("--batch-size", type=int, default=200, help="Articles per transaction")
+    parser.add_argument("--chunk-chars", type=int, default=1500, help="Max characters per embedded chunk")
+    parser.add_argument("--state", default=".ingest-state.json", help="Checkpoint file for resuming")
+    parser.add_argument("--force", action="store_true", help="Ignore checkpoints and re-ingest everything")
+    parser.add_argument("--dry-run", action="store_true", help="Parse and chunk only, no database")
+    args = parser.parse_args()
+
+    laws = json.loads(Path(args.manifest).read_text()) if args.manifest else []
+    for path in args.paths:
+        laws.append({
+            "path": path,
+            "law_name": args.law_name,
+            "law_number": args.law_number,
+            "jurisdiction": args.jurisdiction,
+            "effective_date": args.effective_date,
+            "source_url": args.source_url,
+        })
+    if not laws:
+        parser.error("give dump paths or --manifest")
+    for law in laws:
+        missing = [field for field in ("law_name", "law_number", "jurisdiction") if not law.get(field)]
+        if missing:
+            parser.error(f"{law['path']}: missing {', '.join(missing)}")
+        if not Path(law["path"]).is_file():
+            parser.error(f"{law['path']}: not found")
+
+    print("\n📚 LEGISLATION INGESTION")
+    print("=" * 60)
+    print(f"Laws:     {len(laws)}")
+    print(f"Embedder: {args.embedder}{' (dry run)' if args.dry_run else ''}")
+
+    embedder = Embedder(args.embedder)
+    conn = None
+    if not args.dry_run:
+        if not os.environ.get("DATABASE_URL"):
+            raise SystemExit("❌ DATABASE_URL is not set")
+        conn = psycopg.connect(os.environ["DATABASE_URL"])
+
+    state = load_state(args.state)
+    totals = {"rows": 0, "chunks": 0, "embed_seconds": 0.0, "write_seconds": 0.0}
+    started = time.perf_counter()
+    try:
+        for law in laws:
+            ingest_file(conn, law, embedder, args, state, totals)
+    except KeyboardInterrupt:
+        print("\n⏸️  Interrupted - run again to resume from the last completed batch")
+        sys.exit(130)
+    finally:
+        if conn:
+            conn.close()
+
+    elapsed = time.perf_counter() - started
+    print("\n" + "=" * 60)
+    print(f"✅ {totals['rows']} articles, {totals['chunks']} chunks in {elapsed:.1f}s")
+    print(f"   {totals['rows'] / max(elapsed, 1e-9):,.0f} rows/s, {totals['chunks'] / max(elapsed, 1e-9):,.0f} chunks/s "
+          f"(embedding {totals['embed_seconds']:.1f}s, database {totals['write_seconds']:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
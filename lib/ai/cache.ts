@@ -0,0 +1,208 @@
+import { createHash } from 'crypto'
+import type { SupabaseClient } from '@supabase/supabase-js'
+import type { IAIProvider, AIAnalysisRequest, AIAnalysisResponse } from './provider'
+import { AIProvider } from '@/lib/types/database'
+import { LRUCache } from '@/lib/utils/lru'
+import { PROMPT_VERSION } from './prompts'
+import { replayIssues } from './json-stream'
+
+/**
+ * Persistent cache tier (shared between instances)
+ */
+export interface AnalysisCacheStore {
+  get(key: string): Promise<AIAnalysisResponse | null>
+  set(key: string, response: AIAnalysisResponse, ttlMs: number): Promise<void>
+}
+
+export interface AnalysisCacheOptions {
+  /** Entries kept in the in-memory tier */
+  maxEntries?: number
+  ttlMs?: number
+  store?: AnalysisCacheStore
+}
+
+export interface AnalysisCacheStats {
+  memory_hits: number
+  persistent_hits: number
+  misses: number
+  memory_entries: number
+}
+
+const DEFAULT_TTL_MS = 30 * 24 * 60 * 60 * 1000 // 30 days
+
+/**
+ * Cache key for an analysis request: the same text, contract type, legal context,
+ * chunk position and pre-check notes analyzed with the same prompt version and model.
+ */
+export function analysisCacheKey(request: AIAnalysisRequest, model: string): string {
+  const hash = createHash('sha256')
+  hash.update(PROMPT_VERSION).update('\0')
+  hash.update(model).update('\0')
+  hash.update(request.contractType || '').update('\0')
+  hash.update(JSON.stringify(request.legalContext || [])).update('\0')
+  hash.update(JSON.stringify(request.chunk || null)).update('\0')
+  hash.update(JSON.stringify(request.preChecked || null)).update('\0')
+  hash.update(request.documentText)
+  return hash.digest('hex')
+}
+
+/**
+ * Caching decorator around an AI provider.
+ *
+ * Lookups go memory LRU -> persistent store -> provider. Concurrent misses for
+ * the same key share one provider call. Cached responses report zero tokens and
+ * cost, since nothing was paid for them; the original usage is kept in metadata.
+ * Keys name the inner provider's model, so when the inner provider is a
+ * ProviderRouter only answers from its primary route are stored.
+ */
+export class CachedProvider implements IAIProvider {
+  private memory: LRUCache<string, AIAnalysisResponse>
+  private inflight = new Map<string, Promise<AIAnalysisResponse>>()
+  private ttlMs: number
+  private store?: AnalysisCacheStore
+  private stats = { memory_hits: 0, persistent_hits: 0, misses: 0 }
+
+  constructor(private inner: IAIProvider, options: AnalysisCacheOptions = {}) {
+    this.ttlMs = options.ttlMs || DEFAULT_TTL_MS
+    this.memory = new LRUCache(options.maxEntries || 200, this.ttlMs)
+    this.store = options.store
+  }
+
+  async analyze(request: AIAnalysisRequest): Promise<AIAnalysisResponse> {
+    const key = analysisCacheKey(request, this.inner.getModelName())
+
+    const cached = this.memory.get(key)
+    if (cached) {
+      this.stats.memory_hits++
+      replayIssues(cached.analysis, request.onIssue)
+      return asCacheHit(cached, key, 'memory')
+    }
+
+    const pending = this.inflight.get(key)
+    if (pending) {
+      this.stats.memory_hits++
+      const shared = await pending
+      replayIssues(shared.analysis, request.onIssue)
+      return asCacheHit(shared, key, 'memory')
+    }
+
+    const lookup = this.lookup(key, request)
+    this.inflight.set(key, lookup)
+    try {
+      return await lookup
+    } finally {
+      this.inflight.delete(key)
+    }
+  }
+
+  getProviderName(): AIProvider {
+    return this.inner.getProviderName()
+  }
+
+  getModelName(): string {
+    return this.inner.getModelName()
+  }
+
+  estimateCost(inputTokens: number, outputTokens: number): number {
+    return this.inner.estimateCost(inputTokens, outputTokens)
+  }
+
+  getMaxPromptTokens(): number | undefined {
+    return this.inner.getMaxPromptTokens?.()
+  }
+
+  getStats(): AnalysisCacheStats {
+    return { ...this.stats, memory_entries: this.memory.size }
+  }
+
+  private async lookup(key: string, request: AIAnalysisRequest): Promise<AIAnalysisResponse> {
+    if (this.store) {
+      try {
+        const stored = await this.store.get(key)
+        if (stored) {
+          this.stats.persistent_hits++
+          this.memory.set(key, stored)
+          replayIssues(stored.analysis, request.onIssue)
+          return asCacheHit(stored, key, 'persistent')
+        }
+      } catch (error) {
+        console.warn('[CACHE] Persistent lookup failed:', error)
+      }
+    }
+
+    this.stats.misses++
+    const response = await this.inner.analyze(request)
+    // Used once, not reused: a response recovered from truncated output, or a
+    // failover answer from another provider than the one the key names
+    const answeredBy = response.metadata?.provider
+    if (response.metadata?.truncated || (answeredBy && answeredBy !== this.inner.getProviderName())) {
+      return { ...response, metadata: { ...response.metadata, cache: 'miss', cache_key: key } }
+    }
+    this.memory.set(key, response)
+
+    if (this.store) {
+      this.store.set(key, response, this.ttlMs).catch(error => {
+        console.warn('[CACHE] Persistent write failed:', error)
+      })
+    }
+
+    return { ...response, metadata: { ...response.metadata, cache: 'miss', cache_key: key } }
+  }
+}
+
+function asCacheHit(response: AIAnalysisResponse, key: string, tier: 'memory' | 'persistent'): AIAnalysisResponse {
+  return {
+    ...response,
+    tokens_used: 0,
+    cost_usd: 0,
+    metadata: {
+      ...response.metadata,
+      cache: tier,
+      cache_key: key,
+      cached_tokens_used: response.tokens_used,
+      cached_cost_usd: response.cost_usd,
+    },
+  }
+}
+
+/**
+ * Persistent tier backed by the `analysis_cache` table
+ */
+export class SupabaseAnalysisCacheStore implements AnalysisCacheStore {
+  constructor(private supabase: SupabaseClient, private provider: AIProvider, private model: string) {}
+
+  async get(key: string): Promise<AIAnalysisResponse | null> {
+    const { data } = await this.supabase
+      .from('analysis_cache')
+      .select('response, hit_count')
+      .eq('cache_key', key)
+      .gt('expires_at', new Date().toISOString())
+      .maybeSingle()
+
+    if (!data) return null
+
+    // Hit bookkeeping is best-effort and must not delay the analysis
+    void this.supabase
+      .from('analysis_cache')
+      .update({ hit_count: data.hit_count + 1, last_hit_at: new Date().toISOString() })
+      .eq('cache_key', key)
+      .then(() => undefined)
+
+    return data.response as AIAnalysisResponse
+  }
+
+  async set(key: string, response: AIAnalysisResponse, ttlMs: number): Promise<void> {
+    const { error } = await this.supabase.from('analysis_cache').upsert({
+      cache_key: key,
+      ai_provider: this.provider,
+      model_version: this.model,
+      prompt_version: PROMPT_VERSION,
+      response,
+      expires_at: new Date(Date.now() + ttlMs).toISOString(),
+    })
+
+    if (error) {
+      throw new Error(error.message)
+    }
+  }
+}
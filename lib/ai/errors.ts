@@ -0,0 +1,56 @@
+/**
+ * Provider call failure, carrying the HTTP details the router needs to decide
+ * between retrying, waiting and failing over
+ */
+export class ProviderError extends Error {
+  constructor(
+    message: string,
+    /** HTTP status from the API; undefined for network and parse errors */
+    readonly status?: number,
+    /** Server-requested delay (retry-after / retry-after-ms headers) */
+    readonly retryAfterMs?: number
+  ) {
+    super(message)
+    this.name = 'ProviderError'
+  }
+
+  /**
+   * Wrap an SDK error, keeping its status and retry-after
+   */
+  static from(message: string, error: any): ProviderError {
+    if (error instanceof ProviderError) {
+      return new ProviderError(message, error.status, error.retryAfterMs)
+    }
+    return new ProviderError(message, error?.status, parseRetryAfter(error?.headers))
+  }
+
+  /**
+   * Rate limits, overload, server errors and transport failures
+   */
+  get retryable(): boolean {
+    return this.status === undefined || RETRYABLE_STATUSES.has(this.status)
+  }
+}
+
+// 529: Anthropic "overloaded"
+const RETRYABLE_STATUSES = new Set([408, 409, 429, 500, 502, 503, 504, 529])
+
+/**
+ * Delay requested by the server, in ms. Accepts retry-after-ms, and
+ * retry-after as seconds or an HTTP date. Headers may be a Headers object
+ * (fetch-based SDKs) or a plain record.
+ */
+export function parseRetryAfter(headers: any): number | undefined {
+  const read = (name: string): string | null | undefined =>
+    typeof headers?.get === 'function' ? headers.get(name) : headers?.[name]
+
+  const ms = Number(read('retry-after-ms'))
+  if (read('retry-after-ms') && Number.isFinite(ms)) return Math.max(0, ms)
+
+  const value = read('retry-after')
+  if (!value) return undefined
+  const seconds = Number(value)
+  if (Number.isFinite(seconds)) return Math.max(0, seconds * 1000)
+  const date = Date.parse(value)
+  return Number.isNaN(date) ? undefined : Math.max(0, date - Date.now())
+}
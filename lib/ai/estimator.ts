@@ -0,0 +1,288 @@
+import type { SupabaseClient } from '@supabase/supabase-js'
+import type { AIProvider } from '@/lib/types/database'
+import type { AIAnalysisRequest, IAIProvider } from './provider'
+import { getAnalysisPrompt, MAX_PROMPT_CHARS } from './prompts'
+
+/** USD per million tokens */
+export interface ModelPricing {
+  input: number
+  output: number
+  cacheRead?: number
+  cacheWrite?: number
+}
+
+export interface TokenUsage {
+  /** Uncached prompt tokens */
+  input: number
+  output: number
+  cacheRead?: number
+  cacheWrite?: number
+}
+
+// Approximate list prices of the configured models
+export const MODEL_PRICING: Record<AIProvider, ModelPricing> = {
+  'claude-sonnet-4': { input: 3, output: 15, cacheRead: 0.3, cacheWrite: 3.75 },
+  'gpt-4': { input: 10, output: 30 },
+  local: { input: 0, output: 0 },
+  // Priced like the default provider so cost reporting can be tested offline
+  mock: { input: 3, output: 15 },
+}
+
+export function priceTokens(pricing: ModelPricing, usage: TokenUsage): number {
+  return (
+    usage.input * pricing.input
+    + usage.output * pricing.output
+    + (usage.cacheRead || 0) * (pricing.cacheRead ?? pricing.input)
+    + (usage.cacheWrite || 0) * (pricing.cacheWrite ?? pricing.input)
+  ) / 1_000_000
+}
+
+// Words, numbers, whitespace runs and single symbols, like a BPE pre-tokenizer
+const PIECE_RE = /([\p{L}\p{M}]+)|(\p{N}+)|(\s+)|[^\s\p{L}\p{M}\p{N}]/gu
+const NON_ASCII_RE = /[^\x00-\x7f]/g
+
+/**
+ * Approximate BPE token count, without shipping a tokenizer vocabulary.
+ * Short words are one token, long words one per ~5 letters, diacritics
+ * (ă, â, î, ș, ț) usually split a word and cost one more, digits go in
+ * groups of three, symbols are one each and a space before a word is free.
+ */
+export function countTokens(text: string): number {
+  let tokens = 0
+  for (const [piece, word, number, space] of text.matchAll(PIECE_RE)) {
+    if (word) {
+      tokens += Math.ceil(word.length / 5) + (word.match(NON_ASCII_RE)?.length || 0)
+    } else if (number) {
+      tokens += Math.ceil(number.length / 3)
+    } else if (space) {
+      // " word" is one token; indentation and line breaks are not
+      if (space.length > 1 || space.includes('\n')) tokens++
+    } else if (piece) {
+      tokens++
+    }
+  }
+  return tokens
+}
+
+/**
+ * Seconds per call as a linear function of its tokens. Prompt tokens are
+ * cheap (prefill), output tokens dominate (generation).
+ */
+export interface LatencyModel {
+  baseSeconds: number
+  secondsPerInputKToken: number
+  secondsPerOutputKToken: number
+  /** Completed analyses the model was fitted on; 0 for the defaults */
+  samples: number
+}
+
+// Used until enough analyses have been recorded for the provider and model
+const DEFAULT_LATENCY: Record<AIProvider, LatencyModel> = {
+  'claude-sonnet-4': { baseSeconds: 2, secondsPerInputKToken: 0.3, secondsPerOutputKToken: 20, samples: 0 },
+  'gpt-4': { baseSeconds: 1, secondsPerInputKToken: 0.2, secondsPerOutputKToken: 30, samples: 0 },
+  local: { baseSeconds: 0.5, secondsPerInputKToken: 2, secondsPerOutputKToken: 60, samples: 0 },
+  mock: { baseSeconds: 1, secondsPerInputKToken: 0, secondsPerOutputKToken: 0, samples: 0 },
+}
+
+export function getDefaultLatencyModel(provider: AIProvider): LatencyModel {
+  return DEFAULT_LATENCY[provider] || DEFAULT_LATENCY['claude-sonnet-4']
+}
+
+export function predictLatency(model: LatencyModel, inputTokens: number, outputTokens: number): number {
+  return model.baseSeconds
+    + (inputTokens / 1000) * model.secondsPerInputKToken
+    + (outputTokens / 1000) * model.secondsPerOutputKToken
+}
+
+// Fewer samples than this, or a fit with negative terms, keeps the defaults
+const MIN_LATENCY_SAMPLES = 10
+const LATENCY_HISTORY_ROWS = 500
+
+/**
+ * Least-squares fit of duration = base + a * input + b * output over recent
+ * single-call analyses of `provider`/`model`, timed from the provider call
+ * alone (metadata.provider_ms). Chunked runs overlap calls, analysis cache
+ * hits made none and failover answers came from another provider, so all
+ * three are skipped.
+ */
+export async function loadLatencyModel(
+  supabase: SupabaseClient,
+  provider: AIProvider,
+  model: string
+): Promise<LatencyModel> {
+  const fallback = getDefaultLatencyModel(provider)
+  const { data, error } = await supabase
+    .from('analyses')
+    .select('tokens_used, metadata')
+    .eq('status', 'completed')
+    .eq('ai_provider', provider)
+    .eq('model_version', model)
+    .gt('tokens_used', 0)
+    .order('completed_at', { ascending: false })
+    .limit(LATENCY_HISTORY_ROWS)
+
+  if (error) {
+    throw new Error(`Failed to load analysis history: ${error.message}`)
+  }
+
+  const samples = (data || [])
+    .filter(row => row.metadata?.mode === 'single'
+      && (!row.metadata.cache || row.metadata.cache === 'miss')
+      && (!row.metadata.provider || row.metadata.provider === provider)
+      && row.metadata.input_tokens > 0
+      && row.metadata.provider_ms > 0)
+    .map(row => ({
+      input: row.metadata.input_tokens / 1000,
+      output: Math.max(0, row.tokens_used - row.metadata.input_tokens) / 1000,
+      seconds: row.metadata.provider_ms / 1000,
+    }))
+
+  const fit = samples.length >= MIN_LATENCY_SAMPLES ? fitLinear(samples) : null
+  if (!fit || fit.some(coefficient => coefficient < 0)) {
+    return fallback
+  }
+  const [baseSeconds, secondsPerInputKToken, secondsPerOutputKToken] = fit
+  return { baseSeconds, secondsPerInputKToken, secondsPerOutputKToken, samples: samples.length }
+}
+
+/**
+ * Solve the 3x3 normal equations for seconds ~ 1 + input + output
+ */
+function fitLinear(samples: { input: number; output: number; seconds: number }[]): number[] | null {
+  const m = [[0, 0, 0, 0], [0, 0, 0, 0], [0, 0, 0, 0]]
+  for (const { input, output, seconds } of samples) {
+    const x = [1, input, output]
+    for (let i = 0; i < 3; i++) {
+      for (let j = 0; j < 3; j++) m[i][j] += x[i] * x[j]
+      m[i][3] += x[i] * seconds
+    }
+  }
+
+  // Gaussian elimination with partial pivoting
+  for (let col = 0; col < 3; col++) {
+    let pivot = col
+    for (let row = col + 1; row < 3; row++) {
+      if (Math.abs(m[row][col]) > Math.abs(m[pivot][col])) pivot = row
+    }
+    if (Math.abs(m[pivot][col]) < 1e-9) return null
+    ;[m[col], m[pivot]] = [m[pivot], m[col]]
+    for (let row = 0; row < 3; row++) {
+      if (row === col) continue
+      const factor = m[row][col] / m[col][col]
+      for (let k = col; k < 4; k++) m[row][k] -= factor * m[col][k]
+    }
+  }
+  return [0, 1, 2].map(i => m[i][3] / m[i][i])
+}
+
+const globalForEstimator = globalThis as unknown as {
+  latencyModels?: Map<string, { promise: Promise<LatencyModel>; loadedAt: number }>
+}
+
+const LATENCY_MODEL_TTL_MS = 30 * 60_000
+
+/**
+ * Latency model for the provider, refitted from history every 30 minutes.
+ * Falls back to the defaults when history cannot be read.
+ */
+export function getLatencyModel(supabase: SupabaseClient, provider: IAIProvider): Promise<LatencyModel> {
+  const name = provider.getProviderName()
+  const key = `${name}:${provider.getModelName()}`
+  const models = globalForEstimator.latencyModels ??= new Map()
+  const cached = models.get(key)
+  if (cached && Date.now() - cached.loadedAt < LATENCY_MODEL_TTL_MS) {
+    return cached.promise
+  }
+
+  const promise = loadLatencyModel(supabase, name, provider.getModelName()).catch(error => {
+    console.warn('[ESTIMATOR] Using default latency model:', error.message)
+    models.delete(key)
+    return getDefaultLatencyModel(name)
+  })
+  models.set(key, { promise, loadedAt: Date.now() })
+  return promise
+}
+
+export interface AnalysisEstimate {
+  mode: 'single' | 'map_reduce'
+  calls: number
+  input_tokens: number
+  output_tokens: number
+  cost_usd: number
+  latency_seconds: number
+}
+
+// Expected response size: a fixed part (scores, clause list) plus a share of
+// the contract, since issues and revisions grow with the text
+const OUTPUT_BASE_TOKENS = 700
+const OUTPUT_PER_CONTRACT_TOKEN = 0.2
+
+/**
+ * Expected output tokens for a contract (excerpt) of `contractTokens`
+ */
+export function estimateOutputTokens(contractTokens: number, maxOutputTokens = 4_000): number {
+  return Math.min(maxOutputTokens, Math.round(OUTPUT_BASE_TOKENS + contractTokens * OUTPUT_PER_CONTRACT_TOKEN))
+}
+
+/**
+ * Tokens, cost and latency of analyzing `requests` with `provider`, running
+ * `concurrency` calls at a time (the slowest call of each wave counts)
+ */
+export function estimateCalls(
+  provider: IAIProvider,
+  requests: AIAnalysisRequest[],
+  latency: LatencyModel,
+  concurrency = 1,
+  maxOutputTokens = 4_000
+): AnalysisEstimate {
+  const calls = requests.map(request => {
+    const input = countTokens(getAnalysisPrompt(request))
+    const output = estimateOutputTokens(countTokens(request.documentText), maxOutputTokens)
+    return { input, output, seconds: predictLatency(latency, input, output) }
+  })
+
+  let latencySeconds = 0
+  for (let i = 0; i < calls.length; i += concurrency) {
+    latencySeconds += Math.max(...calls.slice(i, i + concurrency).map(call => call.seconds))
+  }
+
+  const input = calls.reduce((sum, call) => sum + call.input, 0)
+  const output = calls.reduce((sum, call) => sum + call.output, 0)
+  return {
+    mode: requests.length > 1 ? 'map_reduce' : 'single',
+    calls: calls.length,
+    input_tokens: input,
+    output_tokens: output,
+    cost_usd: Math.round(provider.estimateCost(input, output) * 10_000) / 10_000,
+    latency_seconds: Math.round(latencySeconds * 10) / 10,
+  }
+}
+
+// Chunking must cut predicted latency by this share to be worth its extra cost
+const MIN_CHUNKING_GAIN = 0.3
+
+/**
+ * Pick single-shot or chunked analysis. Single-shot is used unless the
+ * document would be truncated, its response would hit the output limit, or
+ * chunking is predicted to be substantially faster.
+ */
+export function chooseAnalysisMode(
+  single: AnalysisEstimate,
+  chunked: AnalysisEstimate,
+  documentChars: number,
+  maxOutputTokens = 4_000
+): { mode: 'single' | 'map_reduce'; reason: string } {
+  if (chunked.calls <= 1) {
+    return { mode: 'single', reason: 'fits one chunk' }
+  }
+  if (documentChars > MAX_PROMPT_CHARS) {
+    return { mode: 'map_reduce', reason: 'longer than one prompt' }
+  }
+  if (single.output_tokens >= maxOutputTokens) {
+    return { mode: 'map_reduce', reason: 'response would reach the output limit' }
+  }
+  if (chunked.latency_seconds < single.latency_seconds * (1 - MIN_CHUNKING_GAIN)) {
+    return { mode: 'map_reduce', reason: 'faster in parallel' }
+  }
+  return { mode: 'single', reason: 'cheaper in one call' }
+}
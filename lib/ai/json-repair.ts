@@ -0,0 +1,342 @@
+import type {
+  AnalysisIssue,
+  AnalyzedClause,
+  ClauseComment,
+  ContractAnalysis,
+  LegalReference,
+} from './provider'
+
+export interface ParsedAnalysis {
+  analysis: ContractAnalysis
+  /** The response ended early; incomplete trailing values were dropped */
+  truncated: boolean
+  /** What had to be fixed, e.g. 'code fence', 'truncated', 'dropped 1 invalid issue' */
+  repairs: string[]
+}
+
+export interface RepairedJson {
+  json: string
+  truncated: boolean
+  repairs: string[]
+}
+
+/**
+ * Continuations requested when a response stops at max_tokens
+ * (ANALYSIS_CONTINUATIONS, 0 to only repair)
+ */
+export function getMaxContinuations(): number {
+  return parseInt(process.env.ANALYSIS_CONTINUATIONS || '1', 10)
+}
+
+/**
+ * Parse a model response into a ContractAnalysis, tolerating what models get
+ * wrong: markdown fences or prose around the JSON, trailing commas, raw line
+ * breaks inside strings, and output cut off mid-value (the complete issues and
+ * clauses are kept). The result is then checked against the schema.
+ */
+export function parseAnalysis(text: string): ParsedAnalysis {
+  let value: unknown
+  let truncated = false
+  const repairs: string[] = []
+
+  try {
+    value = JSON.parse(text)
+  } catch {
+    const repaired = repairJson(text)
+    if (!repaired) {
+      throw new Error('Response contains no JSON object')
+    }
+    try {
+      value = JSON.parse(repaired.json)
+    } catch (error: any) {
+      throw new Error(`Response is not valid JSON after repair: ${error.message}`)
+    }
+    truncated = repaired.truncated
+    repairs.push(...repaired.repairs)
+  }
+
+  const { analysis, problems } = validateAnalysis(value)
+  return { analysis, truncated, repairs: [...repairs, ...problems] }
+}
+
+/**
+ * Rewrite the first JSON object in `text` into valid JSON, or null if there is
+ * none. One pass: text around the object is skipped, trailing commas removed,
+ * control characters in strings escaped, and if the text ends inside the
+ * object it is cut back to the last complete top-level value or array element
+ * and the open arrays and objects are closed.
+ */
+export function repairJson(text: string): RepairedJson | null {
+  const start = text.indexOf('{')
+  if (start === -1) return null
+
+  const repairs = new Set<string>()
+  const before = text.slice(0, start)
+  if (before.includes('```')) repairs.add('code fence')
+  else if (before.trim()) repairs.add('leading text')
+
+  let out = ''
+  const stack: string[] = []
+  let inString = false
+  let escaped = false
+  let isKey = false
+  // In an object: expecting a key (after '{' or ','), otherwise a value
+  let expectKey = false
+  let inLiteral = false
+  // Longest prefix of `out` that is valid once the containers open there are closed
+  let safe = 0
+  let safeStack = ''
+  let end = -1
+
+  // Only outside nested objects: a half-written issue is dropped, not kept with defaults
+  const markSafe = () => {
+    if (stack.lastIndexOf('{') > 0) return
+    safe = out.length
+    safeStack = stack.join('')
+  }
+
+  for (let i = start; i < text.length; i++) {
+    if (inString) {
+      if (escaped) {
+        escaped = false
+        out += text[i]
+        continue
+      }
+      // Copy plain characters up to the next quote, backslash or control character at once
+      let j = i
+      while (j < text.length && isPlain(text.charCodeAt(j))) j++
+      if (j > i) {
+        out += text.slice(i, j)
+        i = j - 1
+        continue
+      }
+      const char = text[i]
+      if (char === '\\') {
+        escaped = true
+        out += char
+      } else if (char === '"') {
+        inString = false
+        out += char
+        if (!isKey) markSafe()
+      } else {
+        repairs.add('control characters')
+        out += char === '\n' ? '\\n' : char === '\r' ? '\\r' : char === '\t' ? '\\t'
+          : `\\u${char.charCodeAt(0).toString(16).padStart(4, '0')}`
+      }
+      continue
+    }
+
+    const char = text[i]
+    if (inLiteral && !isLiteral(text.charCodeAt(i))) {
+      inLiteral = false
+      markSafe()
+    }
+
+    switch (char) {
+      case '"':
+        inString = true
+        isKey = stack[stack.length - 1] === '{' && expectKey
+        out += char
+        break
+      case '{':
+      case '[':
+        stack.push(char)
+        expectKey = char === '{'
+        out += char
+        markSafe()
+        break
+      case '}':
+      case ']': {
+        const trimmed = trimTrailing(out)
+        if (out.slice(trimmed.length).includes(',')) repairs.add('trailing comma')
+        out = trimmed + char
+        stack.pop()
+        expectKey = false
+        if (stack.length === 0) {
+          end = i + 1
+        } else {
+          markSafe()
+        }
+        break
+      }
+      case ',':
+        expectKey = stack[stack.length - 1] === '{'
+        out += char
+        break
+      case ':':
+        expectKey = false
+        out += char
+        break
+      default:
+        if (isLiteral(text.charCodeAt(i))) inLiteral = true
+        out += char
+    }
+    if (end !== -1) break
+  }
+
+  let truncated = false
+  if (end === -1) {
+    truncated = true
+    repairs.add('truncated')
+    const closers = safeStack.split('').reverse().map(open => (open === '{' ? '}' : ']')).join('')
+    out = trimTrailing(out.slice(0, safe)) + closers
+  } else {
+    const after = text.slice(end)
+    if (after.includes('```')) repairs.add('code fence')
+    else if (after.trim()) repairs.add('trailing text')
+  }
+
+  return { json: out, truncated, repairs: [...repairs] }
+}
+
+// Characters copied verbatim inside a string: not '"', '\\' or a control character
+function isPlain(code: number): boolean {
+  return code !== 34 && code !== 92 && code >= 32
+}
+
+// Letters, digits and . + - of numbers, true, false and null
+function isLiteral(code: number): boolean {
+  return (code >= 48 && code <= 57) || (code >= 97 && code <= 122) || (code >= 65 && code <= 90)
+    || code === 46 || code === 43 || code === 45 || code === 95
+}
+
+/**
+ * `json` without trailing whitespace and commas
+ */
+function trimTrailing(json: string): string {
+  let end = json.length
+  while (end > 0 && (json[end - 1] === ',' || json[end - 1] <= ' ')) end--
+  return json.slice(0, end)
+}
+
+/**
+ * Whether `text` holds one complete JSON object, possibly after repairs
+ */
+export function isCompleteJson(text: string): boolean {
+  const repaired = repairJson(text)
+  if (!repaired || repaired.truncated) return false
+  try {
+    JSON.parse(repaired.json)
+    return true
+  } catch {
+    return false
+  }
+}
+
+const RISK_LEVELS = new Set(['low', 'medium', 'high', 'critical'])
+const COMMENT_TYPES = new Set(['info', 'warning', 'suggestion', 'revision'])
+
+/**
+ * Coerce a parsed response to ContractAnalysis. Scores are clamped to 0-1
+ * (percentages and numeric strings accepted), unknown risk levels become
+ * 'medium', and issues, clauses and references missing required text are
+ * dropped. Throws only if the value is not an object.
+ */
+export function validateAnalysis(value: unknown): { analysis: ContractAnalysis; problems: string[] } {
+  if (!isObject(value)) {
+    throw new Error('Response JSON is not an object')
+  }
+
+  const problems: string[] = []
+  const dropped = (count: number, what: string) => {
+    if (count > 0) problems.push(`dropped ${count} invalid ${what}${count === 1 ? '' : 's'}`)
+  }
+
+  const rawIssues = Array.isArray(value.issues) ? value.issues : []
+  const issues = rawIssues.map(toIssue).filter((issue): issue is AnalysisIssue => issue !== null)
+  dropped(rawIssues.length - issues.length, 'issue')
+
+  const rawClauses = Array.isArray(value.clauses) ? value.clauses : []
+  const clauses = rawClauses.map(toClause).filter((clause): clause is AnalyzedClause => clause !== null)
+  dropped(rawClauses.length - clauses.length, 'clause')
+
+  if (!Array.isArray(value.issues)) problems.push('missing issues')
+  if (typeof value.overall_risk_score === 'undefined') problems.push('missing overall_risk_score')
+
+  return {
+    analysis: {
+      contract_type: text(value.contract_type) || 'other',
+      overall_risk_score: score(value.overall_risk_score, 0.5),
+      compliance_score: score(value.compliance_score, 0.5),
+      issues,
+      clauses,
+    },
+    problems,
+  }
+}
+
+/**
+ * One issue as validateAnalysis keeps it, or null when it has no usable title
+ * or description. Also applied to issues streamed before the response is whole.
+ */
+export function toIssue(value: unknown): AnalysisIssue | null {
+  if (!isObject(value) || !text(value.title) || !text(value.description)) return null
+  const references = Array.isArray(value.legal_references)
+    ? value.legal_references.map(toReference).filter((ref): ref is LegalReference => ref !== null)
+    : []
+  return {
+    title: text(value.title)!,
+    description: text(value.description)!,
+    risk_level: riskLevel(value.risk_level) || 'medium',
+    category: text(value.category) || 'other',
+    legal_references: references,
+    suggested_revision: text(value.suggested_revision),
+    confidence: score(value.confidence, 0.5),
+  }
+}
+
+function toReference(value: unknown): LegalReference | null {
+  if (!isObject(value) || !text(value.law)) return null
+  return {
+    law: text(value.law)!,
+    article: text(value.article) || '',
+    ...(text(value.url) ? { url: text(value.url) } : {}),
+    relevance_score: score(value.relevance_score, 0.5),
+  }
+}
+
+function toClause(value: unknown): AnalyzedClause | null {
+  if (!isObject(value) || !text(value.content)) return null
+  const comments = Array.isArray(value.comments)
+    ? value.comments.map(toComment).filter((comment): comment is ClauseComment => comment !== null)
+    : []
+  return {
+    ...(text(value.clause_id) ? { clause_id: text(value.clause_id) } : {}),
+    clause_type: text(value.clause_type) || 'other',
+    content: text(value.content)!,
+    risk_level: riskLevel(value.risk_level),
+    comments,
+  }
+}
+
+function toComment(value: unknown): ClauseComment | null {
+  if (!isObject(value) || !text(value.content)) return null
+  const type = typeof value.type === 'string' ? value.type.toLowerCase() : ''
+  return {
+    type: (COMMENT_TYPES.has(type) ? type : 'info') as ClauseComment['type'],
+    title: text(value.title) || '',
+    content: text(value.content)!,
+    confidence: score(value.confidence, 0.5),
+  }
+}
+
+function isObject(value: unknown): value is Record<string, any> {
+  return typeof value === 'object' && value !== null && !Array.isArray(value)
+}
+
+function text(value: unknown): string | undefined {
+  return typeof value === 'string' && value.trim() ? value : undefined
+}
+
+function riskLevel(value: unknown): AnalysisIssue['risk_level'] | undefined {
+  const level = typeof value === 'string' ? value.trim().toLowerCase() : ''
+  return RISK_LEVELS.has(level) ? (level as AnalysisIssue['risk_level']) : undefined
+}
+
+function score(value: unknown, fallback: number): number {
+  const number = typeof value === 'string' ? parseFloat(value) : value
+  if (typeof number !== 'number' || !Number.isFinite(number)) return fallback
+  // Some models answer in percent
+  const fraction = number > 1 && number <= 100 ? number / 100 : number
+  return Math.min(1, Math.max(0, fraction))
+}
@@ -0,0 +1,105 @@
+import type { AnalysisIssue, ContractAnalysis } from './provider'
+import { toIssue } from './json-repair'
+
+/**
+ * Incremental scanner for a ContractAnalysis JSON document that is still being
+ * generated. Each object of the top-level `issues` array is handed to `onIssue`
+ * as soon as its closing brace arrives; everything else is skipped.
+ *
+ * The scanner only tracks nesting and string state, so it costs O(1) per
+ * character and never re-parses the accumulated text.
+ */
+export class IssueStreamParser {
+  private depth = 0
+  private inString = false
+  private escaped = false
+  private stringValue = ''
+  private lastString: string | null = null
+  private currentKey: string | null = null
+  private inIssues = false
+  private capture: string | null = null
+  private emitted: AnalysisIssue[] = []
+
+  constructor(private onIssue: (issue: AnalysisIssue) => void) {}
+
+  /** Issues emitted so far */
+  get issues(): readonly AnalysisIssue[] {
+    return this.emitted
+  }
+
+  push(delta: string): void {
+    for (let i = 0; i < delta.length; i++) {
+      const char = delta[i]
+      if (this.capture !== null) this.capture += char
+
+      if (this.inString) {
+        if (this.escaped) {
+          this.escaped = false
+        } else if (char === '\\') {
+          this.escaped = true
+        } else if (char === '"') {
+          this.inString = false
+          this.lastString = this.stringValue
+        } else if (this.depth === 1) {
+          this.stringValue += char
+        }
+        continue
+      }
+
+      switch (char) {
+        case '"':
+          this.inString = true
+          this.stringValue = ''
+          break
+        case ':':
+          if (this.depth === 1) this.currentKey = this.lastString
+          break
+        case '{':
+          if (this.inIssues && this.depth === 2) this.capture = '{'
+          this.depth++
+          break
+        case '[':
+          if (this.depth === 1 && this.currentKey === 'issues') this.inIssues = true
+          this.depth++
+          break
+        case '}':
+          this.depth--
+          if (this.capture !== null && this.depth === 2) {
+            this.emit(this.capture)
+            this.capture = null
+          }
+          break
+        case ']':
+          this.depth--
+          if (this.depth === 1) this.inIssues = false
+          break
+      }
+    }
+  }
+
+  private emit(json: string): void {
+    let value: unknown
+    try {
+      value = JSON.parse(json)
+    } catch {
+      return // The final parse of the whole response decides what is valid
+    }
+    // Normalized like the final parse, so streamed rows match the stored ones
+    const issue = toIssue(value)
+    if (!issue) return
+
+    this.emitted.push(issue)
+    this.onIssue(issue)
+  }
+}
+
+/**
+ * Report the issues of a finished analysis to a request's `onIssue` callback
+ * (providers that cannot stream, cache hits)
+ */
+export function replayIssues(analysis: ContractAnalysis, onIssue?: (issue: AnalysisIssue) => void): void {
+  if (!onIssue) return
+  for (const issue of analysis.issues || []) {
+    onIssue(issue)
+  }
+}
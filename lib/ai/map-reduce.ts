@@ -0,0 +1,311 @@
+import type {
+  IAIProvider,
+  AIAnalysisRequest,
+  AIAnalysisResponse,
+  AnalysisIssue,
+  ContractAnalysis,
+  LegalReference,
+} from './provider'
+import type { ClauseStructure } from '@/lib/document-processing/extractor'
+import { mapWithConcurrency } from '@/lib/utils/concurrency'
+import { normalizeWords } from '@/lib/utils/text'
+import { getAnalysisPrompt, MAX_PROMPT_CHARS } from './prompts'
+import { chooseAnalysisMode, countTokens, estimateCalls, getDefaultLatencyModel } from './estimator'
+import type { LatencyModel } from './estimator'
+
+export type AnalysisMode = 'auto' | 'single' | 'map_reduce'
+
+export interface MapReduceOptions {
+  mode?: AnalysisMode
+  /** Target chunk size in characters */
+  chunkChars?: number
+  /** Chunks analyzed in parallel */
+  concurrency?: number
+  /** Clauses listed in the chunk outline (defaults to the analyzed clauses) */
+  outlineClauses?: ClauseStructure[]
+  /** Legal context for one chunk (defaults to the request's legalContext) */
+  legalContextFor?: (chunk: DocumentChunk) => string[]
+  /** Fitted call latency for the provider, used by auto mode (defaults per provider) */
+  latency?: LatencyModel
+  /** Called after each chunk finishes */
+  onChunkComplete?: (done: number, total: number) => void
+}
+
+export interface DocumentChunk {
+  text: string
+  start_char: number
+  end_char: number
+}
+
+const MAX_OUTLINE_CHARS = 4_000
+
+const RISK_RANK: Record<AnalysisIssue['risk_level'], number> = {
+  low: 0,
+  medium: 1,
+  high: 2,
+  critical: 3,
+}
+
+/**
+ * Analyze a document, splitting it into clause-aligned chunks when it is too
+ * long for one call or the estimator predicts chunking to be much faster.
+ *
+ * Chunks are analyzed concurrently (map) and merged into one ContractAnalysis
+ * (reduce), so latency tracks the slowest chunk instead of the whole document.
+ */
+export async function analyzeDocument(
+  provider: IAIProvider,
+  request: AIAnalysisRequest,
+  clauses: ClauseStructure[],
+  options: MapReduceOptions = {}
+): Promise<AIAnalysisResponse> {
+  const mode = options.mode || (process.env.ANALYSIS_MODE as AnalysisMode) || 'auto'
+  const outline = buildOutline(options.outlineClauses || clauses)
+  // A provider with a small context (local) bounds the chunks of every call
+  const contextChars = maxDocumentChars(provider, request, outline)
+  const chunkChars = Math.min(
+    options.chunkChars || parseInt(process.env.ANALYSIS_CHUNK_CHARS || '15000', 10),
+    MAX_PROMPT_CHARS,
+    contextChars
+  )
+  const concurrency = options.concurrency || parseInt(process.env.ANALYSIS_CHUNK_CONCURRENCY || '4', 10)
+
+  const chunks = mode === 'single' ? [] : chunkByClauses(request.documentText, clauses, chunkChars)
+  const chunkRequests: AIAnalysisRequest[] = chunks.map((chunk, index) => ({
+    ...request,
+    documentText: chunk.text,
+    legalContext: options.legalContextFor ? options.legalContextFor(chunk) : request.legalContext,
+    chunk: { index, total: chunks.length, outline },
+  }))
+
+  // Auto mode compares predicted cost and latency of both strategies;
+  // with nothing to chunk (empty text) only the single call is possible
+  let useChunks = mode === 'map_reduce' && chunks.length > 0
+  let estimate: Record<string, any> | undefined
+  if (mode === 'auto') {
+    const latency = options.latency || getDefaultLatencyModel(provider.getProviderName())
+    const single = estimateCalls(provider, [request], latency)
+    const chunked = chunks.length > 1 ? estimateCalls(provider, chunkRequests, latency, concurrency) : single
+    const choice = chunks.length > 1 && request.documentText.length > contextChars
+      ? { mode: 'map_reduce' as const, reason: 'longer than the provider context' }
+      : chooseAnalysisMode(single, chunked, request.documentText.length)
+    useChunks = choice.mode === 'map_reduce'
+    estimate = { ...(useChunks ? chunked : single), reason: choice.reason, latency_samples: latency.samples }
+    console.log('[MAP-REDUCE] Estimated', choice.mode, `(${choice.reason}):`, estimate.input_tokens, 'input tokens,',
+      `$${estimate.cost_usd},`, estimate.latency_seconds, 's')
+  }
+
+  if (!useChunks) {
+    const response = await provider.analyze(request)
+    return { ...response, metadata: { ...response.metadata, mode: 'single', estimate } }
+  }
+
+  console.log('[MAP-REDUCE] Analyzing', chunks.length, 'chunks with concurrency', concurrency)
+
+  const chunkDurations: number[] = []
+  let done = 0
+  const responses = await mapWithConcurrency(chunkRequests, concurrency, async (chunkRequest, index) => {
+    const start = Date.now()
+    const response = await provider.analyze(chunkRequest)
+    chunkDurations[index] = Date.now() - start
+    options.onChunkComplete?.(++done, chunks.length)
+    return response
+  })
+
+  return {
+    analysis: mergeAnalyses(responses.map(r => r.analysis), request.contractType),
+    tokens_used: responses.reduce((sum, r) => sum + r.tokens_used, 0),
+    cost_usd: responses.reduce((sum, r) => sum + r.cost_usd, 0),
+    model_version: responses[0].model_version,
+    metadata: {
+      mode: 'map_reduce',
+      chunks: chunks.length,
+      chunk_durations_ms: chunkDurations,
+      cache_hits: responses.filter(r => r.metadata?.cache && r.metadata.cache !== 'miss').length,
+      truncated_chunks: responses.filter(r => r.metadata?.truncated).length,
+      prompt_version: responses[0].metadata?.prompt_version,
+      ...sumUsage(responses),
+      estimate,
+    },
+  }
+}
+
+/**
+ * Characters of contract text that fit the provider's prompt limit next to the
+ * instructions, outline and legal context (Infinity without a limit). Per-chunk
+ * legal context varies, so a tenth of the room is kept free.
+ */
+function maxDocumentChars(provider: IAIProvider, request: AIAnalysisRequest, outline: string[]): number {
+  const limit = provider.getMaxPromptTokens?.()
+  if (!limit) return Infinity
+
+  const overhead = countTokens(getAnalysisPrompt({
+    ...request,
+    documentText: '',
+    chunk: { index: 0, total: 99, outline },
+  }))
+  const sample = request.documentText.slice(0, 20_000)
+  const charsPerToken = sample.length > 0 ? sample.length / Math.max(1, countTokens(sample)) : 3
+  return Math.max(1_000, Math.floor((limit - overhead) * 0.9 * charsPerToken))
+}
+
+const USAGE_FIELDS = ['input_tokens', 'output_tokens', 'prompt_cache_read_tokens', 'prompt_cache_write_tokens']
+
+/**
+ * Token counts reported by the providers, added up over the chunks that were
+ * actually sent (analysis cache hits keep the original call's usage)
+ */
+function sumUsage(responses: AIAnalysisResponse[]): Record<string, number> {
+  const sent = responses.filter(r => !r.metadata?.cache || r.metadata.cache === 'miss')
+  const totals: Record<string, number> = {}
+  for (const field of USAGE_FIELDS) {
+    if (sent.some(r => r.metadata?.[field] !== undefined)) {
+      totals[field] = sent.reduce((sum, r) => sum + (r.metadata?.[field] || 0), 0)
+    }
+  }
+  return totals
+}
+
+/**
+ * Group consecutive clauses into chunks of at most `maxChars`.
+ * Clauses longer than a chunk are split on paragraph/line/word boundaries.
+ */
+export function chunkByClauses(text: string, clauses: ClauseStructure[], maxChars: number): DocumentChunk[] {
+  const pieces: DocumentChunk[] = clauses.length > 0
+    ? clauses.flatMap(clause => splitLongText(clause.content, clause.start_char, maxChars))
+    : splitLongText(text, 0, maxChars)
+
+  const chunks: DocumentChunk[] = []
+  let current: DocumentChunk | null = null
+
+  for (const piece of pieces) {
+    if (current && current.text.length + piece.text.length + 2 <= maxChars) {
+      current.text += '\n\n' + piece.text
+      current.end_char = piece.end_char
+    } else {
+      current = { ...piece }
+      chunks.push(current)
+    }
+  }
+
+  return chunks
+}
+
+function splitLongText(text: string, offset: number, maxChars: number): DocumentChunk[] {
+  const pieces: DocumentChunk[] = []
+  let start = 0
+
+  while (text.length - start > maxChars) {
+    const window = text.slice(start, start + maxChars)
+    let cut = window.lastIndexOf('\n\n')
+    if (cut < maxChars / 2) cut = window.lastIndexOf('\n')
+    if (cut < maxChars / 2) cut = window.lastIndexOf(' ')
+    if (cut < maxChars / 2) cut = maxChars
+
+    pieces.push({ text: text.slice(start, start + cut), start_char: offset + start, end_char: offset + start + cut })
+    start += cut
+  }
+
+  if (start < text.length) {
+    pieces.push({ text: text.slice(start), start_char: offset + start, end_char: offset + text.length })
+  }
+  return pieces
+}
+
+export function buildOutline(clauses: ClauseStructure[]): string[] {
+  const outline: string[] = []
+  let size = 0
+
+  for (const clause of clauses) {
+    if (clause.clause_type === 'paragraph') continue
+    const entry = [clause.clause_number, clause.heading].filter(Boolean).join(' ').slice(0, 120)
+    if (!entry) continue
+    if (size + entry.length > MAX_OUTLINE_CHARS) break
+    outline.push(entry)
+    size += entry.length + 1
+  }
+  return outline
+}
+
+/**
+ * Merge per-chunk analyses into one, deduplicating issues.
+ *
+ * Overall risk is the worst chunk's risk and compliance the weakest chunk's
+ * score: one bad section makes the whole contract risky.
+ */
+export function mergeAnalyses(analyses: ContractAnalysis[], contractType?: string): ContractAnalysis {
+  const issues: AnalysisIssue[] = []
+
+  for (const analysis of analyses) {
+    for (const issue of analysis.issues || []) {
+      const duplicate = issues.find(existing => isSameIssue(existing, issue))
+      if (duplicate) {
+        mergeIssue(duplicate, issue)
+      } else {
+        issues.push({ ...issue, legal_references: [...(issue.legal_references || [])] })
+      }
+    }
+  }
+
+  issues.sort((a, b) => riskRank(b) - riskRank(a) || b.confidence - a.confidence)
+
+  return {
+    contract_type: contractType || mostCommon(analyses.map(a => a.contract_type)) || 'other',
+    overall_risk_score: Math.max(...analyses.map(a => a.overall_risk_score ?? 0)),
+    compliance_score: Math.min(...analyses.map(a => a.compliance_score ?? 1)),
+    issues,
+    clauses: analyses.flatMap(a => a.clauses || []),
+  }
+}
+
+/**
+ * Two issues are the same finding when the category matches and the titles mostly overlap
+ */
+export function isSameIssue(a: AnalysisIssue, b: AnalysisIssue): boolean {
+  if (normalizeWords(a.category) !== normalizeWords(b.category)) return false
+
+  const wordsA = new Set(normalizeWords(a.title).split(' '))
+  const wordsB = new Set(normalizeWords(b.title).split(' '))
+  let shared = 0
+  wordsA.forEach(word => {
+    if (wordsB.has(word)) shared++
+  })
+  const union = wordsA.size + wordsB.size - shared
+  return union > 0 && shared / union >= 0.6
+}
+
+function mergeIssue(target: AnalysisIssue, other: AnalysisIssue) {
+  if (riskRank(other) > riskRank(target)) {
+    target.risk_level = other.risk_level
+    target.description = other.description
+    target.suggested_revision = other.suggested_revision || target.suggested_revision
+  }
+  target.confidence = Math.max(target.confidence, other.confidence)
+
+  const refs = target.legal_references || (target.legal_references = [])
+  for (const ref of other.legal_references || []) {
+    if (!refs.some(existing => sameReference(existing, ref))) {
+      refs.push(ref)
+    }
+  }
+}
+
+function riskRank(issue: AnalysisIssue): number {
+  return RISK_RANK[issue.risk_level] ?? 0
+}
+
+function sameReference(a: LegalReference, b: LegalReference): boolean {
+  return normalizeWords(a.law) === normalizeWords(b.law) && normalizeWords(a.article) === normalizeWords(b.article)
+}
+
+function mostCommon(values: string[]): string | undefined {
+  const counts = new Map<string, number>()
+  let best: string | undefined
+  for (const value of values) {
+    if (!value) continue
+    const count = (counts.get(value) || 0) + 1
+    counts.set(value, count)
+    if (!best || count > counts.get(best)!) best = value
+  }
+  return best
+}
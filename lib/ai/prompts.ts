@@ -1,16 +1,26 @@
-import type { AIAnalysisRequest } from './provider'
+import type { AIAnalysisRequest, AnalysisChunkInfo, PreCheckSummary } from './provider'
 
-export function getAnalysisPrompt(request: AIAnalysisRequest): string {
-  const { documentText, contractType, legalContext } = request
+/** Bump whenever the prompt changes so cached analyses from older prompts are not reused */
+export const PROMPT_VERSION = 'analysis-v5'
 
-  return `You are an expert legal AI assistant specializing in Romanian and EU contract law. Analyze the following contract and provide a comprehensive risk assessment.
+/** Longest contract text sent in a single prompt; longer documents are analyzed in chunks */
+export const MAX_PROMPT_CHARS = 50_000
 
-CONTRACT TEXT:
-${documentText.substring(0, 50000)} ${documentText.length > 50000 ? '...(truncated)' : ''}
+// Generic pointers, used only when retrieval found no articles for the document
+const DEFAULT_LEGAL_FOCUS = `**Romanian Civil Code:**
+- Art. 1270 (Freedom of contract)
+- Art. 1271 (Binding force of contracts)
+- Art. 1350 (Unfair terms in B2C contracts)
+- Commercial law provisions
 
-${contractType ? `DETECTED CONTRACT TYPE: ${contractType}` : ''}
+**EU Regulations:**
+- GDPR Art. 6 (Lawfulness of processing)
+- GDPR Art. 17 (Right to erasure)
+- GDPR Art. 28 (Processor obligations)
+- GDPR Art. 32 (Security of processing)
+- Consumer protection directives`
 
-${legalContext && legalContext.length > 0 ? `RELEVANT LEGAL CONTEXT:\n${legalContext.join('\n\n')}` : ''}
+const ANALYSIS_INSTRUCTIONS = `You are an expert legal AI assistant specializing in Romanian and EU contract law. Analyze the contract at the end of this prompt and provide a comprehensive risk assessment.
 
 ANALYSIS REQUIREMENTS:
 
@@ -46,22 +56,7 @@ ANALYSIS REQUIREMENTS:
    - Payment terms
    - Non-compete / confidentiality
 
-FOCUS AREAS FOR ROMANIAN/EU LAW:
-
-**Romanian Civil Code:**
-- Art. 1270 (Freedom of contract)
-- Art. 1271 (Binding force of contracts)
-- Art. 1350 (Unfair terms in B2C contracts)
-- Commercial law provisions
-
-**EU Regulations:**
-- GDPR Art. 6 (Lawfulness of processing)
-- GDPR Art. 17 (Right to erasure)
-- GDPR Art. 28 (Processor obligations)
-- GDPR Art. 32 (Security of processing)
-- Consumer protection directives
-
-**Risk Indicators:**
+RISK INDICATORS:
 - Unlimited liability clauses
 - Missing or vague data protection provisions
 - One-sided termination rights
@@ -116,9 +111,76 @@ Return a JSON object with this exact structure:
       ]
     }
   ]
+}`
+
+/**
+ * Analysis prompt split for provider-side prompt caching. Providers send the
+ * parts in this order and mark the end of `instructions` and of each `context`
+ * block as cache breakpoints, so the longest unchanged prefix is reused:
+ * instructions across all calls, the outline across the chunks of a document,
+ * legal context across retries and re-analyses. The contract text comes last.
+ */
+export interface AnalysisPrompt {
+  /** Identical for every call: role, requirements and output schema */
+  instructions: string
+  /** Stable per document (chunk outline), then per chunk (legal context) */
+  context: string[]
+  /** Contract text and per-call details */
+  document: string
+}
+
+export function getAnalysisPromptParts(request: AIAnalysisRequest): AnalysisPrompt {
+  const { documentText, contractType, legalContext, chunk, preChecked } = request
+
+  const context: string[] = []
+  if (chunk) {
+    context.push(getChunkInstructions(chunk))
+  }
+  context.push(legalContext && legalContext.length > 0
+    ? `RELEVANT LEGAL CONTEXT:\n${legalContext.join('\n\n')}`
+    : `FOCUS AREAS FOR ROMANIAN/EU LAW:\n\n${DEFAULT_LEGAL_FOCUS}`)
+
+  const document = `${chunk ? `CONTRACT EXCERPT (part ${chunk.index + 1} of ${chunk.total}):` : 'CONTRACT TEXT:'}
+${documentText.substring(0, MAX_PROMPT_CHARS)} ${documentText.length > MAX_PROMPT_CHARS ? '...(truncated)' : ''}
+
+${contractType ? `DETECTED CONTRACT TYPE: ${contractType}\n\n` : ''}${preChecked ? getPreCheckNotes(preChecked) : ''}Analyze now and return only valid JSON.`
+
+  return { instructions: ANALYSIS_INSTRUCTIONS, context, document }
+}
+
+/**
+ * The whole prompt as one string, for providers without cache controls
+ */
+export function getAnalysisPrompt(request: AIAnalysisRequest): string {
+  const { instructions, context, document } = getAnalysisPromptParts(request)
+  return [instructions, ...context, document].join('\n\n')
+}
+
+/**
+ * Follow-up for a response cut off at the output limit, for providers that
+ * cannot continue a partial assistant turn directly
+ */
+export const CONTINUATION_PROMPT = 'Your JSON response was cut off. Continue it from exactly the last character, without repeating anything and without markdown.'
+
+function getChunkInstructions(chunk: AnalysisChunkInfo): string {
+  return `PARTIAL ANALYSIS:
+This excerpt is one part of a longer contract that is analyzed in parallel parts.
+- Report only issues found in this excerpt.
+- Before flagging a clause as missing, check the outline below: it lists every section of the full contract.
+- List clauses from this excerpt only.
+
+FULL CONTRACT OUTLINE:
+${chunk.outline.join('\n')}`
 }
 
-Analyze now and return only valid JSON.`
+function getPreCheckNotes(preChecked: PreCheckSummary): string {
+  const notes = [
+    preChecked.issues.length > 0 ? `- Already reported, do not repeat: ${preChecked.issues.join('; ')}` : '',
+    preChecked.omittedSections.length > 0
+      ? `- Standard sections checked separately and left out of the text (do not flag them as missing): ${preChecked.omittedSections.join('; ')}`
+      : '',
+  ].filter(Boolean)
+  return notes.length > 0 ? `AUTOMATED PRE-CHECK:\n${notes.join('\n')}\n\n` : ''
 }
 
 export function getLegalContextPrompt(topic: string): string {
@@ -6,12 +6,34 @@ export interface AIProviderConfig {
   model: string
   maxTokens?: number
   temperature?: number
+  /** Server address for self-hosted models (local: defaults to LOCAL_LLM_URL) */
+  baseURL?: string
 }
 
 export interface AIAnalysisRequest {
   documentText: string
   contractType?: string
   legalContext?: string[]
+  /** Set when documentText is one part of a longer contract (map-reduce mode) */
+  chunk?: AnalysisChunkInfo
+  /** Called with each issue as soon as it is complete, before the whole response arrives */
+  onIssue?: (issue: AnalysisIssue) => void
+  /** Findings of the rule pre-pass, so the model neither repeats them nor asks for omitted clauses */
+  preChecked?: PreCheckSummary
+}
+
+export interface PreCheckSummary {
+  /** Titles of issues already reported */
+  issues: string[]
+  /** Sections left out of the text because the rules cover them */
+  omittedSections: string[]
+}
+
+export interface AnalysisChunkInfo {
+  index: number
+  total: number
+  /** Section headings of the whole contract, so a chunk can tell what exists elsewhere */
+  outline: string[]
 }
 
 export interface AIAnalysisResponse {
@@ -19,6 +41,8 @@ export interface AIAnalysisResponse {
   tokens_used: number
   cost_usd: number
   model_version: string
+  /** Run details stored in analyses.metadata */
+  metadata?: Record<string, any>
 }
 
 export interface ContractAnalysis {
@@ -67,7 +91,14 @@ export interface LegalReference {
 export interface IAIProvider {
   analyze(request: AIAnalysisRequest): Promise<AIAnalysisResponse>
   getProviderName(): AIProvider
-  estimateCost(tokenCount: number): number
+  getModelName(): string
+  /** Price of a call with the given usage, in USD */
+  estimateCost(inputTokens: number, outputTokens: number): number
+  /**
+   * Prompt tokens (instructions included) one call can take, for providers
+   * whose context is smaller than a full prompt; chunks are sized to fit
+   */
+  getMaxPromptTokens?(): number | undefined
 }
 
 /**
@@ -79,6 +110,8 @@ export function createAIProvider(config: AIProviderConfig): IAIProvider {
       return new ClaudeProvider(config)
     case 'gpt-4':
       return new OpenAIProvider(config)
+    case 'local':
+      return new LocalProvider(config)
     case 'mock':
       return new MockProvider(config)
     default:
@@ -86,19 +119,123 @@ export function createAIProvider(config: AIProviderConfig): IAIProvider {
   }
 }
 
+const globalForProvider = globalThis as unknown as {
+  analysisProvider?: IAIProvider
+  providerRouter?: ProviderRouter
+}
+
+// Conservative defaults (entry API tiers); override per provider with
+// AI_RPM_<PROVIDER>, AI_TPM_<PROVIDER>, AI_CONCURRENCY_<PROVIDER>
+const DEFAULT_LIMITS: Record<AIProvider, ProviderLimits> = {
+  'claude-sonnet-4': { requestsPerMinute: 50, tokensPerMinute: 80_000, maxConcurrent: 4 },
+  'gpt-4': { requestsPerMinute: 500, tokensPerMinute: 300_000, maxConcurrent: 4 },
+  // One call per llama-server slot; match the server's --parallel
+  local: { maxConcurrent: 4 },
+  mock: {},
+}
+
 /**
  * Get AI provider from environment
+ * The instance is reused across requests so SDK clients, rate limits and the
+ * analysis cache survive. Calls go through a ProviderRouter: AI_PROVIDER first,
+ * then the configured AI_FALLBACK_PROVIDER.
  */
 export function getDefaultProvider(): IAIProvider {
-  const provider = (process.env.AI_PROVIDER || 'claude-sonnet-4') as AIProvider
-  const config: AIProviderConfig = {
-    provider,
-    apiKey: getAPIKey(provider),
-    model: getModelName(provider),
-    maxTokens: 4000,
-    temperature: 0.3,
+  if (globalForProvider.analysisProvider) {
+    return globalForProvider.analysisProvider
+  }
+
+  const provider = getPrimaryProvider()
+  const router = new ProviderRouter(getProviderChain(provider).map(createRoute), {
+    maxRetries: parseInt(process.env.AI_MAX_RETRIES || '3', 10),
+  })
+  globalForProvider.providerRouter = router
+  let instance: IAIProvider = router
+
+  if (process.env.ANALYSIS_CACHE !== 'off') {
+    const store = process.env.SUPABASE_SERVICE_ROLE_KEY
+      ? new SupabaseAnalysisCacheStore(createServiceClient(), provider, router.getModelName())
+      : undefined
+    instance = new CachedProvider(instance, {
+      maxEntries: parseInt(process.env.ANALYSIS_CACHE_MAX_ENTRIES || '200', 10),
+      ttlMs: parseInt(process.env.ANALYSIS_CACHE_TTL_HOURS || '720', 10) * 60 * 60 * 1000,
+      store,
+    })
+  }
+
+  globalForProvider.analysisProvider = instance
+  return instance
+}
+
+/**
+ * The provider analyses run with first (AI_PROVIDER)
+ */
+export function getPrimaryProvider(): AIProvider {
+  return (process.env.AI_PROVIDER || 'claude-sonnet-4') as AIProvider
+}
+
+/**
+ * Hit/miss counters of the default provider's analysis cache
+ */
+export function getAnalysisCacheStats(): AnalysisCacheStats | null {
+  const instance = globalForProvider.analysisProvider
+  return instance instanceof CachedProvider ? instance.getStats() : null
+}
+
+/**
+ * Queue depth, in-flight calls, retries and remaining rate-limit budget per provider
+ */
+export function getProviderRouterStats(): ProviderRouteStats[] | null {
+  return globalForProvider.providerRouter?.getStats() || null
+}
+
+/**
+ * The primary provider followed by the fallbacks that have credentials
+ */
+function getProviderChain(primary: AIProvider): AIProvider[] {
+  // local is opt-in: its context bounds the chunk size of every analysis
+  const fallbacks = (process.env.AI_FALLBACK_PROVIDER ?? 'claude-sonnet-4,gpt-4')
+    .split(',')
+    .map(name => name.trim() as AIProvider)
+    .filter(name => name && name !== primary && isConfigured(name))
+  return [primary, ...new Set(fallbacks)]
+}
+
+function isConfigured(provider: AIProvider): boolean {
+  switch (provider) {
+    case 'claude-sonnet-4':
+      return !!process.env.ANTHROPIC_API_KEY
+    case 'gpt-4':
+      return !!process.env.OPENAI_API_KEY
+    case 'local':
+      return !!process.env.LOCAL_LLM_URL
+    default:
+      return false
+  }
+}
+
+function createRoute(provider: AIProvider): ProviderRoute {
+  const envKey = provider.toUpperCase().replace(/[^A-Z0-9]/g, '_')
+  const limit = (name: string, fallback?: number) =>
+    process.env[`${name}_${envKey}`] ? parseInt(process.env[`${name}_${envKey}`]!, 10) : fallback
+  const defaults = DEFAULT_LIMITS[provider] || {}
+  const maxTokens = 4000
+
+  return {
+    provider: createAIProvider({
+      provider,
+      apiKey: getAPIKey(provider),
+      model: getModelName(provider),
+      maxTokens,
+      temperature: 0.3,
+    }),
+    limits: {
+      requestsPerMinute: limit('AI_RPM', defaults.requestsPerMinute),
+      tokensPerMinute: limit('AI_TPM', defaults.tokensPerMinute),
+      maxConcurrent: limit('AI_CONCURRENCY', defaults.maxConcurrent),
+    },
+    maxOutputTokens: maxTokens,
   }
-  return createAIProvider(config)
 }
 
 function getAPIKey(provider: AIProvider): string {
@@ -107,23 +244,37 @@ function getAPIKey(provider: AIProvider): string {
       return process.env.ANTHROPIC_API_KEY || 'mock-key'
     case 'gpt-4':
       return process.env.OPENAI_API_KEY || 'mock-key'
+    case 'local':
+      return process.env.LOCAL_LLM_API_KEY || ''
     default:
       return 'mock-key'
   }
 }
 
-function getModelName(provider: AIProvider): string {
+/**
+ * Model a provider is configured with; also what queued jobs record as their
+ * model_version
+ */
+export function getModelName(provider: AIProvider): string {
   switch (provider) {
     case 'claude-sonnet-4':
       return 'claude-sonnet-4-20250514'
     case 'gpt-4':
       return 'gpt-4-turbo'
+    case 'local':
+      return process.env.LOCAL_LLM_MODEL || 'local-gguf'
     default:
-      return 'mock-model'
+      return 'mock-v1'
   }
 }
 
 // Provider implementations
 import { ClaudeProvider } from './providers/claude'
 import { OpenAIProvider } from './providers/openai'
+import { LocalProvider } from './providers/local'
 import { MockProvider } from './providers/mock'
+import { CachedProvider, SupabaseAnalysisCacheStore } from './cache'
+import type { AnalysisCacheStats } from './cache'
+import { ProviderRouter } from './router'
+import type { ProviderLimits, ProviderRoute, ProviderRouteStats } from './router'
+import { createServiceClient } from '@/lib/supabase/server'
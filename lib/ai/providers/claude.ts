@@ -4,10 +4,14 @@ import type {
   IAIProvider,
   AIAnalysisRequest,
   AIAnalysisResponse,
-  ContractAnalysis,
 } from '../provider'
 import { AIProvider } from '@/lib/types/database'
-import { getAnalysisPrompt } from '../prompts'
+import { getAnalysisPromptParts, PROMPT_VERSION } from '../prompts'
+import type { AnalysisPrompt } from '../prompts'
+import { IssueStreamParser } from '../json-stream'
+import { getMaxContinuations, parseAnalysis } from '../json-repair'
+import { ProviderError } from '../errors'
+import { MODEL_PRICING, priceTokens } from '../estimator'
 
 export class ClaudeProvider implements IAIProvider {
   private client: Anthropic
@@ -17,60 +21,139 @@ export class ClaudeProvider implements IAIProvider {
     this.config = config
     this.client = new Anthropic({
       apiKey: config.apiKey,
+      // Retries, rate limits and fallback are handled by the ProviderRouter
+      maxRetries: 0,
     })
   }
 
   async analyze(request: AIAnalysisRequest): Promise<AIAnalysisResponse> {
-    const prompt = getAnalysisPrompt(request)
+    const prompt = getAnalysisPromptParts(request)
+    const start = Date.now()
 
     try {
-      const response = await this.client.messages.create({
-        model: this.config.model,
-        max_tokens: this.config.maxTokens || 4000,
-        temperature: this.config.temperature || 0.3,
-        messages: [
-          {
-            role: 'user',
-            content: prompt,
-          },
-        ],
-      })
+      const parser = request.onIssue ? new IssueStreamParser(request.onIssue) : null
+      const first = await this.complete(prompt, parser, start)
+      let text = first.text
+      const firstTokenMs = first.firstTokenMs
+      let stopReason = first.stopReason
+      const usages = [first.usage]
+
+      // A response cut off at max_tokens is continued from where it stopped
+      // (the partial output is sent back as the start of the assistant turn),
+      // instead of paying for the whole analysis again
+      let continuations = 0
+      while (stopReason === 'max_tokens' && continuations < getMaxContinuations()) {
+        continuations++
+        text = text.trimEnd()
+        const next = await this.complete(prompt, parser, start, text)
+        text += next.text
+        stopReason = next.stopReason
+        usages.push(next.usage)
+      }
 
-      const content = response.content[0]
-      if (content.type !== 'text') {
-        throw new Error('Unexpected response type from Claude')
+      const parsed = parseAnalysis(text)
+      if (parsed.repairs.length > 0) {
+        console.warn('[CLAUDE] Repaired response:', parsed.repairs.join(', '))
       }
 
-      // Parse JSON response
-      const analysis: ContractAnalysis = JSON.parse(content.text)
+      // input_tokens counts only the uncached part of the prompt
+      const total = (field: keyof Anthropic.Usage) =>
+        usages.reduce((sum, usage) => sum + ((usage[field] as number | null) || 0), 0)
+      const cacheReadTokens = total('cache_read_input_tokens')
+      const cacheWriteTokens = total('cache_creation_input_tokens')
+      const inputTokens = total('input_tokens') + cacheReadTokens + cacheWriteTokens
+      const outputTokens = total('output_tokens')
 
-      // Calculate cost (approximate for Claude Sonnet 4)
-      const inputTokens = response.usage.input_tokens
-      const outputTokens = response.usage.output_tokens
-      const cost_usd = this.estimateCost(inputTokens + outputTokens)
+      const cost_usd = priceTokens(MODEL_PRICING['claude-sonnet-4'], {
+        input: total('input_tokens'),
+        output: outputTokens,
+        cacheRead: cacheReadTokens,
+        cacheWrite: cacheWriteTokens,
+      })
 
       return {
-        analysis,
+        analysis: parsed.analysis,
         tokens_used: inputTokens + outputTokens,
         cost_usd,
         model_version: this.config.model,
+        metadata: {
+          prompt_version: PROMPT_VERSION,
+          first_token_ms: firstTokenMs,
+          input_tokens: inputTokens,
+          output_tokens: outputTokens,
+          prompt_cache_read_tokens: cacheReadTokens,
+          prompt_cache_write_tokens: cacheWriteTokens,
+          ...(continuations ? { continuations } : {}),
+          ...(parsed.truncated ? { truncated: true } : {}),
+          ...(parsed.repairs.length ? { json_repairs: parsed.repairs } : {}),
+        },
       }
     } catch (error: any) {
       console.error('Claude API error:', error)
-      throw new Error(`Claude analysis failed: ${error.message}`)
+      throw ProviderError.from(`Claude analysis failed: ${error.message}`, error)
+    }
+  }
+
+  /**
+   * One streamed call. With `prefill`, the model continues that partial
+   * response and only the continuation is returned.
+   */
+  private async complete(
+    prompt: AnalysisPrompt,
+    parser: IssueStreamParser | null,
+    start: number,
+    prefill?: string
+  ): Promise<{ text: string; usage: Anthropic.Usage; stopReason: string | null; firstTokenMs: number | null }> {
+    // Streamed so issues can be stored while the rest of the response is generated.
+    // Instructions and context blocks end in cache breakpoints so the stable
+    // prefix is read from the prompt cache; only the contract text is new input.
+    const stream = this.client.messages.stream({
+      model: this.config.model,
+      max_tokens: this.config.maxTokens || 4000,
+      temperature: this.config.temperature || 0.3,
+      system: [
+        { type: 'text', text: prompt.instructions, cache_control: { type: 'ephemeral' } },
+      ],
+      messages: [
+        {
+          role: 'user',
+          content: [
+            ...prompt.context.map(text => ({
+              type: 'text' as const,
+              text,
+              cache_control: { type: 'ephemeral' as const },
+            })),
+            { type: 'text', text: prompt.document },
+          ],
+        },
+        ...(prefill ? [{ role: 'assistant' as const, content: prefill }] : []),
+      ],
+    })
+
+    let firstTokenMs: number | null = null
+    stream.on('text', delta => {
+      firstTokenMs ??= Date.now() - start
+      parser?.push(delta)
+    })
+
+    const response = await stream.finalMessage()
+
+    const content = response.content[0]
+    if (content?.type !== 'text') {
+      throw new Error('Unexpected response type from Claude')
     }
+    return { text: content.text, usage: response.usage, stopReason: response.stop_reason, firstTokenMs }
   }
 
   getProviderName(): AIProvider {
     return 'claude-sonnet-4'
   }
 
-  estimateCost(tokenCount: number): number {
-    // Claude Sonnet 4 pricing (approximate)
-    // Input: $3/MTok, Output: $15/MTok
-    // Assuming 50/50 split for estimation
-    const inputCost = (tokenCount * 0.5 * 3) / 1_000_000
-    const outputCost = (tokenCount * 0.5 * 15) / 1_000_000
-    return inputCost + outputCost
+  getModelName(): string {
+    return this.config.model
+  }
+
+  estimateCost(inputTokens: number, outputTokens: number): number {
+    return priceTokens(MODEL_PRICING['claude-sonnet-4'], { input: inputTokens, output: outputTokens })
   }
 }
@@ -0,0 +1,243 @@
+import type {
+  AIProviderConfig,
+  IAIProvider,
+  AIAnalysisRequest,
+  AIAnalysisResponse,
+} from '../provider'
+import { AIProvider } from '@/lib/types/database'
+import { getAnalysisPromptParts, PROMPT_VERSION } from '../prompts'
+import { IssueStreamParser } from '../json-stream'
+import { parseAnalysis } from '../json-repair'
+import { ProviderError, parseRetryAfter } from '../errors'
+import { countTokens, MODEL_PRICING, priceTokens } from '../estimator'
+
+const RISK_LEVEL = { type: 'string', enum: ['low', 'medium', 'high', 'critical'] }
+const SCORE = { type: 'number', minimum: 0, maximum: 1 }
+
+/**
+ * ContractAnalysis as a JSON schema. llama.cpp compiles it into a sampling
+ * grammar, so even a small quantized model can only emit well-formed JSON in
+ * this shape (properties in this order, `issues` before `clauses`).
+ */
+export const ANALYSIS_SCHEMA = {
+  type: 'object',
+  properties: {
+    contract_type: { type: 'string' },
+    overall_risk_score: SCORE,
+    compliance_score: SCORE,
+    issues: {
+      type: 'array',
+      items: {
+        type: 'object',
+        properties: {
+          title: { type: 'string' },
+          description: { type: 'string' },
+          risk_level: RISK_LEVEL,
+          category: { type: 'string' },
+          legal_references: {
+            type: 'array',
+            items: {
+              type: 'object',
+              properties: {
+                law: { type: 'string' },
+                article: { type: 'string' },
+                relevance_score: SCORE,
+              },
+              required: ['law', 'article', 'relevance_score'],
+            },
+          },
+          suggested_revision: { type: 'string' },
+          confidence: SCORE,
+        },
+        required: ['title', 'description', 'risk_level', 'category', 'legal_references', 'suggested_revision', 'confidence'],
+      },
+    },
+    clauses: {
+      type: 'array',
+      items: {
+        type: 'object',
+        properties: {
+          clause_type: { type: 'string' },
+          content: { type: 'string', maxLength: 200 },
+          risk_level: RISK_LEVEL,
+          comments: {
+            type: 'array',
+            items: {
+              type: 'object',
+              properties: {
+                type: { type: 'string', enum: ['info', 'warning', 'suggestion', 'revision'] },
+                title: { type: 'string' },
+                content: { type: 'string' },
+                confidence: SCORE,
+              },
+              required: ['type', 'title', 'content', 'confidence'],
+            },
+          },
+        },
+        required: ['clause_type', 'content', 'risk_level', 'comments'],
+      },
+    },
+  },
+  required: ['contract_type', 'overall_risk_score', 'compliance_score', 'issues', 'clauses'],
+}
+
+/**
+ * Model served by a local llama.cpp server (llama-server), through its
+ * OpenAI-compatible chat endpoint. The server keeps the model loaded between
+ * requests, batches concurrent requests across its --parallel slots and,
+ * with cache_prompt, reuses the KV cache of the shared instruction prefix, so
+ * only the contract text is evaluated per call. Nothing leaves the machine.
+ */
+export class LocalProvider implements IAIProvider {
+  private config: AIProviderConfig
+  private baseURL: string
+  /** Tokens available per server slot (llama-server -c divided by --parallel) */
+  private contextTokens: number
+
+  constructor(config: AIProviderConfig) {
+    this.config = config
+    this.baseURL = (config.baseURL || process.env.LOCAL_LLM_URL || 'http://127.0.0.1:8080').replace(/\/+$/, '')
+    this.contextTokens = parseInt(process.env.LOCAL_LLM_CONTEXT || '8192', 10)
+  }
+
+  async analyze(request: AIAnalysisRequest): Promise<AIAnalysisResponse> {
+    const prompt = getAnalysisPromptParts(request)
+    const user = [...prompt.context, prompt.document].join('\n\n')
+    const maxTokens = this.config.maxTokens || 4000
+    const start = Date.now()
+
+    // A prompt the slot cannot hold fails here, not after a round trip,
+    // and is not retried: the router moves on to the next provider
+    const promptTokens = countTokens(prompt.instructions) + countTokens(user)
+    if (promptTokens + maxTokens > this.contextTokens) {
+      throw new ProviderError(
+        `Local analysis failed: about ${promptTokens} prompt tokens plus ${maxTokens} output tokens exceed the ${this.contextTokens} token context`,
+        413
+      )
+    }
+
+    try {
+      const response = await fetch(`${this.baseURL}/v1/chat/completions`, {
+        method: 'POST',
+        headers: {
+          'content-type': 'application/json',
+          ...(this.config.apiKey ? { authorization: `Bearer ${this.config.apiKey}` } : {}),
+        },
+        body: JSON.stringify({
+          model: this.config.model,
+          messages: [
+            { role: 'system', content: prompt.instructions },
+            { role: 'user', content: user },
+          ],
+          max_tokens: maxTokens,
+          temperature: this.config.temperature ?? 0.3,
+          response_format: {
+            type: 'json_schema',
+            json_schema: { name: 'contract_analysis', schema: ANALYSIS_SCHEMA },
+          },
+          cache_prompt: true,
+          stream: true,
+          stream_options: { include_usage: true },
+        }),
+      })
+
+      if (!response.ok || !response.body) {
+        const detail = await response.text().catch(() => '')
+        throw new ProviderError(
+          `HTTP ${response.status}: ${detail.slice(0, 200)}`,
+          response.status,
+          parseRetryAfter(response.headers)
+        )
+      }
+
+      // Streamed so issues can be stored while the rest of the response is generated
+      const parser = request.onIssue ? new IssueStreamParser(request.onIssue) : null
+      let content = ''
+      let firstTokenMs: number | null = null
+      let usage: any
+      let timings: any
+      for await (const part of readEvents(response.body)) {
+        const delta = part.choices?.[0]?.delta?.content
+        if (delta) {
+          firstTokenMs ??= Date.now() - start
+          content += delta
+          parser?.push(delta)
+        }
+        if (part.usage) usage = part.usage
+        if (part.timings) timings = part.timings
+      }
+
+      if (!content) {
+        throw new Error('Empty response from local model')
+      }
+
+      // The grammar keeps the JSON well-formed, but it can still stop at max_tokens;
+      // a continuation would restart the grammar, so the complete part is kept
+      const parsed = parseAnalysis(content)
+      if (parsed.repairs.length > 0) {
+        console.warn('[LOCAL] Repaired response:', parsed.repairs.join(', '))
+      }
+
+      const inputTokens = usage?.prompt_tokens || 0
+      const outputTokens = usage?.completion_tokens || 0
+
+      return {
+        analysis: parsed.analysis,
+        tokens_used: inputTokens + outputTokens,
+        cost_usd: this.estimateCost(inputTokens, outputTokens),
+        model_version: this.config.model,
+        metadata: {
+          prompt_version: PROMPT_VERSION,
+          first_token_ms: firstTokenMs,
+          input_tokens: inputTokens,
+          output_tokens: outputTokens,
+          // llama-server reports prompt tokens served from the slot's KV cache
+          prompt_cache_read_tokens: timings?.cache_n ?? usage?.prompt_tokens_details?.cached_tokens ?? 0,
+          prompt_cache_write_tokens: 0,
+          ...(timings?.predicted_per_second ? { tokens_per_second: Math.round(timings.predicted_per_second * 10) / 10 } : {}),
+          ...(parsed.truncated ? { truncated: true } : {}),
+          ...(parsed.repairs.length ? { json_repairs: parsed.repairs } : {}),
+        },
+      }
+    } catch (error: any) {
+      console.error('Local LLM error:', error)
+      throw ProviderError.from(`Local analysis failed: ${error.message}`, error)
+    }
+  }
+
+  getProviderName(): AIProvider {
+    return 'local'
+  }
+
+  getMaxPromptTokens(): number {
+    return this.contextTokens - (this.config.maxTokens || 4000)
+  }
+
+  getModelName(): string {
+    return this.config.model
+  }
+
+  estimateCost(inputTokens: number, outputTokens: number): number {
+    return priceTokens(MODEL_PRICING.local, { input: inputTokens, output: outputTokens })
+  }
+}
+
+/**
+ * JSON payloads of a server-sent event stream, up to `data: [DONE]`
+ */
+async function* readEvents(body: ReadableStream<Uint8Array>): AsyncGenerator<any> {
+  const decoder = new TextDecoder()
+  let buffer = ''
+  for await (const bytes of body as unknown as AsyncIterable<Uint8Array>) {
+    buffer += decoder.decode(bytes, { stream: true })
+    let newline: number
+    while ((newline = buffer.indexOf('\n')) !== -1) {
+      const line = buffer.slice(0, newline).trim()
+      buffer = buffer.slice(newline + 1)
+      if (!line.startsWith('data:')) continue
+      const data = line.slice(5).trim()
+      if (data === '[DONE]') return
+      yield JSON.parse(data)
+    }
+  }
+}
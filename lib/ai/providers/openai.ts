@@ -4,10 +4,14 @@ import type {
   IAIProvider,
   AIAnalysisRequest,
   AIAnalysisResponse,
-  ContractAnalysis,
 } from '../provider'
 import { AIProvider } from '@/lib/types/database'
-import { getAnalysisPrompt } from '../prompts'
+import { CONTINUATION_PROMPT, getAnalysisPromptParts, PROMPT_VERSION } from '../prompts'
+import { IssueStreamParser } from '../json-stream'
+import { getMaxContinuations, isCompleteJson, parseAnalysis } from '../json-repair'
+import { ProviderError } from '../errors'
+import { isSameIssue } from '../map-reduce'
+import { MODEL_PRICING, priceTokens } from '../estimator'
 
 export class OpenAIProvider implements IAIProvider {
   private client: OpenAI
@@ -17,62 +21,140 @@ export class OpenAIProvider implements IAIProvider {
     this.config = config
     this.client = new OpenAI({
       apiKey: config.apiKey,
+      // Retries, rate limits and fallback are handled by the ProviderRouter
+      maxRetries: 0,
     })
   }
 
   async analyze(request: AIAnalysisRequest): Promise<AIAnalysisResponse> {
-    const prompt = getAnalysisPrompt(request)
+    const prompt = getAnalysisPromptParts(request)
+    const start = Date.now()
+    const messages: OpenAI.ChatCompletionMessageParam[] = [
+      {
+        role: 'system',
+        content: prompt.instructions,
+      },
+      {
+        role: 'user',
+        content: [...prompt.context, prompt.document].join('\n\n'),
+      },
+    ]
 
     try {
-      const response = await this.client.chat.completions.create({
-        model: this.config.model,
-        messages: [
-          {
-            role: 'system',
-            content: 'You are an expert legal AI assistant specializing in Romanian and EU contract law. Analyze contracts and provide detailed risk assessment and compliance checking.',
-          },
-          {
-            role: 'user',
-            content: prompt,
-          },
-        ],
-        max_tokens: this.config.maxTokens,
-        temperature: this.config.temperature,
-        response_format: { type: 'json_object' },
-      })
+      const parser = request.onIssue ? new IssueStreamParser(request.onIssue) : null
+      const first = await this.complete(messages, parser, start, true)
+      let text = first.text
+      let finishReason = first.finishReason
+      const usages = [first.usage]
 
-      const content = response.choices[0].message.content
-      if (!content) {
-        throw new Error('Empty response from OpenAI')
+      // A response cut off at max_tokens is continued rather than re-run.
+      // JSON mode is off for the continuation, which is a fragment, not an object.
+      let continuations = 0
+      while (finishReason === 'length' && continuations < getMaxContinuations()) {
+        continuations++
+        const next = await this.complete([
+          ...messages,
+          { role: 'assistant', content: text },
+          { role: 'user', content: CONTINUATION_PROMPT },
+        ], null, start, false)
+        usages.push(next.usage)
+        finishReason = next.finishReason
+        // Kept only if it completes the JSON; otherwise the partial response is repaired
+        if (!isCompleteJson(text + next.text)) break
+        text += next.text
       }
 
-      const analysis: ContractAnalysis = JSON.parse(content)
+      const parsed = parseAnalysis(text)
+      if (parsed.repairs.length > 0) {
+        console.warn('[OPENAI] Repaired response:', parsed.repairs.join(', '))
+      }
+      // Issues from the continuation were not streamed. Matched by content:
+      // the final parse may drop or reorder what the stream already sent
+      if (parser && request.onIssue) {
+        parsed.analysis.issues
+          .filter(issue => !parser.issues.some(streamed => isSameIssue(streamed, issue)))
+          .forEach(request.onIssue)
+      }
 
-      const tokens_used = response.usage?.total_tokens || 0
-      const cost_usd = this.estimateCost(tokens_used)
+      const inputTokens = usages.reduce((sum, usage) => sum + (usage?.prompt_tokens || 0), 0)
+      const outputTokens = usages.reduce((sum, usage) => sum + (usage?.completion_tokens || 0), 0)
 
       return {
-        analysis,
-        tokens_used,
-        cost_usd,
+        analysis: parsed.analysis,
+        tokens_used: inputTokens + outputTokens,
+        cost_usd: this.estimateCost(inputTokens, outputTokens),
         model_version: this.config.model,
+        metadata: {
+          prompt_version: PROMPT_VERSION,
+          first_token_ms: first.firstTokenMs,
+          input_tokens: inputTokens,
+          output_tokens: outputTokens,
+          prompt_cache_read_tokens: usages.reduce(
+            (sum, usage) => sum + (usage?.prompt_tokens_details?.cached_tokens || 0), 0),
+          prompt_cache_write_tokens: 0,
+          ...(continuations ? { continuations } : {}),
+          ...(parsed.truncated ? { truncated: true } : {}),
+          ...(parsed.repairs.length ? { json_repairs: parsed.repairs } : {}),
+        },
       }
     } catch (error: any) {
       console.error('OpenAI API error:', error)
-      throw new Error(`OpenAI analysis failed: ${error.message}`)
+      throw ProviderError.from(`OpenAI analysis failed: ${error.message}`, error)
+    }
+  }
+
+  /**
+   * One streamed call; returns the generated text and why generation stopped
+   */
+  private async complete(
+    messages: OpenAI.ChatCompletionMessageParam[],
+    parser: IssueStreamParser | null,
+    start: number,
+    jsonMode: boolean
+  ): Promise<{ text: string; usage?: OpenAI.CompletionUsage; finishReason: string | null; firstTokenMs: number | null }> {
+    // OpenAI caches long prompt prefixes automatically; keeping the stable
+    // parts first lets the contract text be the only uncached input
+    const stream = await this.client.chat.completions.create({
+      model: this.config.model,
+      messages,
+      max_tokens: this.config.maxTokens,
+      temperature: this.config.temperature,
+      ...(jsonMode ? { response_format: { type: 'json_object' as const } } : {}),
+      stream: true,
+      stream_options: { include_usage: true },
+    })
+
+    // Streamed so issues can be stored while the rest of the response is generated
+    let text = ''
+    let firstTokenMs: number | null = null
+    let finishReason: string | null = null
+    let usage: OpenAI.CompletionUsage | undefined
+    for await (const part of stream) {
+      const delta = part.choices[0]?.delta?.content
+      if (delta) {
+        firstTokenMs ??= Date.now() - start
+        text += delta
+        parser?.push(delta)
+      }
+      if (part.choices[0]?.finish_reason) finishReason = part.choices[0].finish_reason
+      if (part.usage) usage = part.usage
+    }
+
+    if (!text) {
+      throw new Error('Empty response from OpenAI')
     }
+    return { text, usage, finishReason, firstTokenMs }
   }
 
   getProviderName(): AIProvider {
     return 'gpt-4'
   }
 
-  estimateCost(tokenCount: number): number {
-    // GPT-4 Turbo pricing (approximate)
-    // Input: $10/MTok, Output: $30/MTok
-    // Assuming 50/50 split
-    const inputCost = (tokenCount * 0.5 * 10) / 1_000_000
-    const outputCost = (tokenCount * 0.5 * 30) / 1_000_000
-    return inputCost + outputCost
+  getModelName(): string {
+    return this.config.model
+  }
+
+  estimateCost(inputTokens: number, outputTokens: number): number {
+    return priceTokens(MODEL_PRICING['gpt-4'], { input: inputTokens, output: outputTokens })
   }
 }
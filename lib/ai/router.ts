@@ -0,0 +1,301 @@
+import type { IAIProvider, AIAnalysisRequest, AIAnalysisResponse } from './provider'
+import { AIProvider } from '@/lib/types/database'
+import { TokenBucket } from '@/lib/utils/token-bucket'
+import { ProviderError } from './errors'
+import { getAnalysisPrompt } from './prompts'
+import { countTokens } from './estimator'
+
+export interface ProviderLimits {
+  requestsPerMinute?: number
+  /** Input + output tokens per minute */
+  tokensPerMinute?: number
+  /** Calls in flight at once */
+  maxConcurrent?: number
+}
+
+export interface ProviderRoute {
+  provider: IAIProvider
+  limits?: ProviderLimits
+  /** Output tokens reserved per call (the provider's max_tokens) */
+  maxOutputTokens?: number
+}
+
+export interface ProviderRouterOptions {
+  /** Retries per provider before failing over to the next one */
+  maxRetries?: number
+  /** Backoff base; attempt n waits up to baseDelayMs * 2^n */
+  baseDelayMs?: number
+  /** Longest wait before a retry; a longer retry-after fails over instead */
+  maxDelayMs?: number
+}
+
+export interface ProviderRouteStats {
+  provider: AIProvider
+  model: string
+  /** Calls waiting for a concurrency slot or rate-limit budget */
+  queue_depth: number
+  in_flight: number
+  requests: number
+  retries: number
+  rate_limited: number
+  /** Calls that gave up on this provider and moved to the next */
+  failovers: number
+  available_requests: number | null
+  available_tokens: number | null
+}
+
+interface Waiter {
+  tokens: number
+  resolve: (lease: LimiterLease) => void
+}
+
+export interface LimiterLease {
+  /** Free the concurrency slot and settle the token reservation with actual usage */
+  release(actualTokens?: number): void
+}
+
+/**
+ * Admission control for one provider: a concurrency cap plus request and
+ * token buckets. Callers wait in FIFO order, so a large request at the head
+ * is not starved by small ones behind it.
+ */
+export class ProviderLimiter {
+  private waiters: Waiter[] = []
+  private active = 0
+  private pausedUntil = 0
+  private timer: ReturnType<typeof setTimeout> | null = null
+  readonly requests: TokenBucket | null
+  readonly tokens: TokenBucket | null
+  private maxConcurrent: number
+
+  constructor(limits: ProviderLimits = {}) {
+    this.requests = limits.requestsPerMinute ? new TokenBucket(limits.requestsPerMinute) : null
+    this.tokens = limits.tokensPerMinute ? new TokenBucket(limits.tokensPerMinute) : null
+    this.maxConcurrent = limits.maxConcurrent || Infinity
+  }
+
+  get queueDepth(): number {
+    return this.waiters.length
+  }
+
+  get inFlight(): number {
+    return this.active
+  }
+
+  acquire(tokens: number): Promise<LimiterLease> {
+    return new Promise(resolve => {
+      this.waiters.push({ tokens, resolve })
+      this.pump()
+    })
+  }
+
+  /**
+   * Hold all calls until `ms` from now (the server said to back off)
+   */
+  pause(ms: number) {
+    this.pausedUntil = Math.max(this.pausedUntil, Date.now() + ms)
+    this.pump()
+  }
+
+  private pump() {
+    if (this.timer) {
+      clearTimeout(this.timer)
+      this.timer = null
+    }
+
+    while (this.waiters.length > 0 && this.active < this.maxConcurrent) {
+      const now = Date.now()
+      const head = this.waiters[0]
+      const wait = Math.max(
+        this.pausedUntil - now,
+        this.requests?.waitTime(1, now) || 0,
+        this.tokens?.waitTime(head.tokens, now) || 0
+      )
+      if (wait > 0) {
+        this.timer = setTimeout(() => this.pump(), wait)
+        return
+      }
+
+      this.waiters.shift()
+      this.requests?.take(1, now)
+      this.tokens?.take(head.tokens, now)
+      this.active++
+
+      let released = false
+      head.resolve({
+        release: (actualTokens = head.tokens) => {
+          if (released) return
+          released = true
+          this.active--
+          this.tokens?.adjust(head.tokens - actualTokens)
+          this.pump()
+        },
+      })
+    }
+  }
+}
+
+interface RouteState {
+  route: ProviderRoute
+  limiter: ProviderLimiter
+  stats: { requests: number; retries: number; rate_limited: number; failovers: number }
+}
+
+/**
+ * Provider decorator that spreads calls over a fallback chain.
+ *
+ * Each provider has its own limiter. Retryable failures (429, 5xx, overload,
+ * network) are retried with jittered exponential backoff, or after the
+ * server's retry-after, and a 429 holds the whole provider for that long.
+ * When a provider's retries run out, or it fails permanently (bad request,
+ * auth), the call moves to the next provider in the chain.
+ */
+export class ProviderRouter implements IAIProvider {
+  private routes: RouteState[]
+  private maxRetries: number
+  private baseDelayMs: number
+  private maxDelayMs: number
+
+  constructor(routes: ProviderRoute[], options: ProviderRouterOptions = {}) {
+    if (routes.length === 0) {
+      throw new Error('ProviderRouter needs at least one provider')
+    }
+    this.routes = routes.map(route => ({
+      route,
+      limiter: new ProviderLimiter(route.limits),
+      stats: { requests: 0, retries: 0, rate_limited: 0, failovers: 0 },
+    }))
+    this.maxRetries = options.maxRetries ?? 3
+    this.baseDelayMs = options.baseDelayMs ?? 1_000
+    this.maxDelayMs = options.maxDelayMs ?? 30_000
+  }
+
+  async analyze(request: AIAnalysisRequest): Promise<AIAnalysisResponse> {
+    const failures: string[] = []
+    let lastError: ProviderError | undefined
+
+    for (let i = 0; i < this.routes.length; i++) {
+      const state = this.routes[i]
+      const name = state.route.provider.getProviderName()
+      try {
+        const { response, attempts } = await this.callWithRetries(state, request)
+        return {
+          ...response,
+          metadata: {
+            ...response.metadata,
+            provider: name,
+            attempts,
+            ...(i > 0 ? { failed_over_from: failures } : {}),
+          },
+        }
+      } catch (error: any) {
+        lastError = error instanceof ProviderError ? error : ProviderError.from(error.message, error)
+        failures.push(`${name}: ${lastError.message}`)
+        if (i < this.routes.length - 1) {
+          state.stats.failovers++
+          console.warn('[ROUTER]', name, 'failed, failing over to', this.routes[i + 1].route.provider.getProviderName(), '-', lastError.message)
+        }
+      }
+    }
+
+    throw new ProviderError(
+      this.routes.length > 1 ? `All providers failed: ${failures.join('; ')}` : lastError!.message,
+      lastError?.status,
+      lastError?.retryAfterMs
+    )
+  }
+
+  getProviderName(): AIProvider {
+    return this.routes[0].route.provider.getProviderName()
+  }
+
+  getModelName(): string {
+    return this.routes[0].route.provider.getModelName()
+  }
+
+  estimateCost(inputTokens: number, outputTokens: number): number {
+    return this.routes[0].route.provider.estimateCost(inputTokens, outputTokens)
+  }
+
+  /** The smallest limit of the chain, so a failover can take the same chunks */
+  getMaxPromptTokens(): number | undefined {
+    const limits = this.routes
+      .map(state => state.route.provider.getMaxPromptTokens?.())
+      .filter((limit): limit is number => limit !== undefined)
+    return limits.length > 0 ? Math.min(...limits) : undefined
+  }
+
+  /**
+   * Calls waiting across all providers
+   */
+  get queueDepth(): number {
+    return this.routes.reduce((sum, state) => sum + state.limiter.queueDepth, 0)
+  }
+
+  getStats(): ProviderRouteStats[] {
+    return this.routes.map(({ route, limiter, stats }) => ({
+      provider: route.provider.getProviderName(),
+      model: route.provider.getModelName(),
+      queue_depth: limiter.queueDepth,
+      in_flight: limiter.inFlight,
+      ...stats,
+      available_requests: limiter.requests ? limiter.requests.available : null,
+      available_tokens: limiter.tokens ? limiter.tokens.available : null,
+    }))
+  }
+
+  private async callWithRetries(
+    state: RouteState,
+    request: AIAnalysisRequest
+  ): Promise<{ response: AIAnalysisResponse; attempts: number }> {
+    const estimated = estimateRequestTokens(request, state.route.maxOutputTokens)
+
+    for (let attempt = 0; ; attempt++) {
+      const lease = await state.limiter.acquire(estimated)
+      state.stats.requests++
+      try {
+        const response = await state.route.provider.analyze(request)
+        lease.release(response.tokens_used || estimated)
+        return { response, attempts: attempt + 1 }
+      } catch (error: any) {
+        // Usage of a failed call is unknown: keep the reservation
+        lease.release()
+        const failure = error instanceof ProviderError ? error : ProviderError.from(error.message, error)
+
+        if (failure.status === 429) {
+          state.stats.rate_limited++
+          if (failure.retryAfterMs) state.limiter.pause(failure.retryAfterMs)
+        }
+        const tooLong = failure.retryAfterMs !== undefined && failure.retryAfterMs > this.maxDelayMs
+        if (!failure.retryable || attempt >= this.maxRetries || tooLong) {
+          throw failure
+        }
+
+        const delay = this.backoff(attempt, failure.retryAfterMs)
+        state.stats.retries++
+        console.warn('[ROUTER]', state.route.provider.getProviderName(), `attempt ${attempt + 1} failed`,
+          failure.status ? `(${failure.status})` : '', '- retrying in', delay, 'ms')
+        await new Promise(resolve => setTimeout(resolve, delay))
+      }
+    }
+  }
+
+  /**
+   * The server's retry-after plus a little jitter, or exponential backoff
+   * with equal jitter (half fixed, half random) so retries spread out
+   */
+  private backoff(attempt: number, retryAfterMs?: number): number {
+    if (retryAfterMs !== undefined) {
+      return Math.round(retryAfterMs + Math.random() * 250)
+    }
+    const ceiling = Math.min(this.maxDelayMs, this.baseDelayMs * 2 ** attempt)
+    return Math.round(ceiling / 2 + Math.random() * (ceiling / 2))
+  }
+}
+
+/**
+ * Token budget reserved for a call: the counted prompt plus the full output allowance
+ */
+export function estimateRequestTokens(request: AIAnalysisRequest, maxOutputTokens = 4_000): number {
+  return countTokens(getAnalysisPrompt(request)) + maxOutputTokens
+}
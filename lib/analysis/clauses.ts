@@ -0,0 +1,115 @@
+import { createHash } from 'crypto'
+import type { AnalysisIssue } from '@/lib/ai/provider'
+import type { ClauseStructure } from '@/lib/document-processing/extractor'
+import { normalizeWords } from '@/lib/utils/text'
+
+/** Minimum share of an issue's words found in a clause to attach the issue to it */
+const ATTRIBUTION_THRESHOLD = 0.3
+
+/** Words that appear in nearly every clause and say nothing about which one an issue concerns */
+const STOPWORDS = new Set([
+  'this', 'that', 'with', 'from', 'shall', 'which', 'should', 'will', 'have', 'been', 'such', 'into',
+  'contract', 'agreement', 'party', 'parties', 'clause', 'section', 'article', 'provision',
+  'contractul', 'contractului', 'partea', 'partile', 'partilor', 'clauza', 'pentru', 'care', 'este',
+])
+
+/**
+ * Content hash of a clause, insensitive to whitespace and line wrapping
+ */
+export function hashClauseContent(content: string): string {
+  const normalized = content.replace(/\s+/g, ' ').trim()
+  return createHash('sha256').update(normalized).digest('hex').slice(0, 32)
+}
+
+export interface StoredClauseRef {
+  id: string
+  content_hash: string | null
+}
+
+export interface ClauseDiff {
+  /** New clause index -> id of the identical stored clause */
+  unchanged: Map<number, string>
+  /** Indexes of new clauses that are changed or added */
+  changed: number[]
+  /** Stored clause ids with no counterpart in the new version */
+  removed: string[]
+}
+
+/**
+ * Match the clauses of a new version against the stored ones by content hash.
+ * Repeated boilerplate is matched one-to-one, in document order.
+ */
+export function diffClauses(newHashes: string[], stored: StoredClauseRef[]): ClauseDiff {
+  const available = new Map<string, string[]>()
+  for (const clause of stored) {
+    if (!clause.content_hash) continue
+    const ids = available.get(clause.content_hash) || []
+    ids.push(clause.id)
+    available.set(clause.content_hash, ids)
+  }
+
+  const unchanged = new Map<number, string>()
+  const changed: number[] = []
+  newHashes.forEach((hash, index) => {
+    const id = available.get(hash)?.shift()
+    if (id) {
+      unchanged.set(index, id)
+    } else {
+      changed.push(index)
+    }
+  })
+
+  const kept = new Set(unchanged.values())
+  const removed = stored.filter(clause => !kept.has(clause.id)).map(clause => clause.id)
+
+  return { unchanged, changed, removed }
+}
+
+/**
+ * Attach each issue to the clause it talks about, by word overlap.
+ * Returns one clause id per issue, or null for document-level issues
+ * (missing clauses, overall balance, ...).
+ */
+export function attributeIssuesToClauses(
+  issues: AnalysisIssue[],
+  clauses: Array<Pick<ClauseStructure, 'content'> & { id: string }>
+): Array<string | null> {
+  return issues.map(createClauseAttributor(clauses))
+}
+
+/**
+ * Same attribution one issue at a time, for issues that arrive while
+ * streaming. The clause word sets are built once, up front.
+ */
+export function createClauseAttributor(
+  clauses: Array<Pick<ClauseStructure, 'content'> & { id: string }>
+): (issue: AnalysisIssue) => string | null {
+  const clauseWords = clauses.map(clause => new Set(significantWords(clause.content)))
+
+  return issue => {
+    const words = Array.from(new Set(significantWords(
+      [issue.title, issue.description, issue.suggested_revision].filter(Boolean).join(' ')
+    )))
+    if (words.length === 0) return null
+
+    let bestIndex = -1
+    let bestScore = 0
+    clauseWords.forEach((set, index) => {
+      let hits = 0
+      for (const word of words) {
+        if (set.has(word)) hits++
+      }
+      const score = hits / words.length
+      if (score > bestScore) {
+        bestScore = score
+        bestIndex = index
+      }
+    })
+
+    return bestScore >= ATTRIBUTION_THRESHOLD ? clauses[bestIndex].id : null
+  }
+}
+
+function significantWords(text: string): string[] {
+  return normalizeWords(text).split(' ').filter(word => word.length >= 4 && !STOPWORDS.has(word))
+}
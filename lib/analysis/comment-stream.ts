@@ -0,0 +1,160 @@
+import { randomUUID } from 'crypto'
+import type { SupabaseClient } from '@supabase/supabase-js'
+import type { AnalysisIssue } from '@/lib/ai/provider'
+import { isSameIssue } from '@/lib/ai/map-reduce'
+import { createClauseAttributor } from './clauses'
+
+/**
+ * Live state of a running analysis, stored in analyses.progress and pushed to
+ * the viewer by the events route
+ */
+export interface AnalysisProgress {
+  stage: 'extracting' | 'analyzing' | 'storing'
+  chunks_done?: number
+  chunks_total?: number
+  issues_streamed?: number
+  /** Time from the start of the provider call to the first stored comment */
+  first_issue_ms?: number
+}
+
+/**
+ * Comment writes that bring the stored rows in line with the final issues
+ */
+export interface CommentChanges {
+  /** Full rows, keyed by id: updates of streamed rows and new inserts */
+  upserts: Record<string, any>[]
+  deletedIds: string[]
+}
+
+/**
+ * Write the progress of an analysis (best-effort)
+ */
+export async function reportProgress(
+  supabase: SupabaseClient,
+  analysisId: string,
+  progress: AnalysisProgress
+): Promise<void> {
+  const { error } = await supabase.from('analyses').update({ progress }).eq('id', analysisId)
+  if (error) {
+    console.warn('[PIPELINE] Failed to report progress:', error.message)
+  }
+}
+
+/**
+ * Stores AI comments while the provider is still streaming, then reconciles
+ * them with the final issue list once the analysis completes.
+ *
+ * Writes are serialized in arrival order. Issues repeated by another chunk are
+ * skipped while streaming; the final merged list decides which rows survive
+ * and with what content, so the end state matches a non-streamed run.
+ */
+export class CommentStream {
+  private rows: Array<{ id: string; issue: AnalysisIssue }> = []
+  private chain: Promise<void> = Promise.resolve()
+  private startedAt = Date.now()
+  private progress: AnalysisProgress = { stage: 'analyzing', issues_streamed: 0 }
+  private attribute: (issue: AnalysisIssue) => string | null
+
+  constructor(
+    private supabase: SupabaseClient,
+    private analysisId: string,
+    private documentId: string,
+    /** Clauses new issues may be attributed to */
+    clauses: Array<{ id: string; content: string }>
+  ) {
+    this.attribute = createClauseAttributor(clauses)
+  }
+
+  get firstIssueMs(): number | undefined {
+    return this.progress.first_issue_ms
+  }
+
+  push(issue: AnalysisIssue): void {
+    this.enqueue(async () => {
+      if (this.rows.some(row => isSameIssue(row.issue, issue))) return
+
+      const id = randomUUID()
+      const { error } = await this.supabase.from('comments').insert(this.toRow(id, issue))
+      if (error) {
+        // Not fatal: reconcile() inserts whatever is missing
+        console.warn('[PIPELINE] Failed to store streamed comment:', error.message)
+        return
+      }
+
+      this.rows.push({ id, issue })
+      if (this.progress.first_issue_ms === undefined) {
+        this.progress.first_issue_ms = Date.now() - this.startedAt
+        console.log('[PIPELINE] First issue stored after', this.progress.first_issue_ms, 'ms')
+      }
+      this.progress.issues_streamed = this.rows.length
+      await reportProgress(this.supabase, this.analysisId, this.progress)
+    })
+  }
+
+  setProgress(update: Partial<AnalysisProgress>): void {
+    this.enqueue(async () => {
+      Object.assign(this.progress, update)
+      await reportProgress(this.supabase, this.analysisId, this.progress)
+    })
+  }
+
+  /**
+   * Work out how the stored comments must change to match the final issue
+   * list: streamed rows are updated in place, merged-away rows deleted and
+   * missing issues inserted. The writes themselves are left to the caller,
+   * which applies them in the same transaction as the rest of the results.
+   */
+  async reconcile(issues: AnalysisIssue[]): Promise<CommentChanges> {
+    await this.chain
+
+    const unmatched = [...this.rows]
+    const upserts: Record<string, any>[] = []
+    let updated = 0
+
+    for (const issue of issues) {
+      const index = unmatched.findIndex(row => isSameIssue(row.issue, issue))
+      if (index === -1) {
+        upserts.push(this.toRow(randomUUID(), issue))
+        continue
+      }
+      const [row] = unmatched.splice(index, 1)
+      if (JSON.stringify(row.issue) !== JSON.stringify(issue)) {
+        upserts.push(this.toRow(row.id, issue))
+        updated++
+      }
+    }
+
+    console.log('[PIPELINE] Comments reconciled:', {
+      streamed: this.rows.length,
+      updated,
+      removed: unmatched.length,
+      inserted: upserts.length - updated,
+    })
+
+    return { upserts, deletedIds: unmatched.map(row => row.id) }
+  }
+
+  private enqueue(task: () => Promise<void>): void {
+    this.chain = this.chain.then(task).catch(error => {
+      console.warn('[PIPELINE] Comment stream error:', error)
+    })
+  }
+
+  private toRow(id: string, issue: AnalysisIssue): Record<string, any> {
+    return {
+      id,
+      document_id: this.documentId,
+      clause_id: this.attribute(issue),
+      analysis_id: this.analysisId,
+      comment_type: issue.risk_level === 'critical' || issue.risk_level === 'high' ? 'warning' : 'suggestion',
+      risk_level: issue.risk_level,
+      title: issue.title,
+      content: issue.description,
+      suggested_revision: issue.suggested_revision,
+      is_ai_generated: true,
+      confidence_score: issue.confidence,
+      legal_references: issue.legal_references || [],
+      status: 'open',
+    }
+  }
+}
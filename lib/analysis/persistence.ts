@@ -0,0 +1,97 @@
+import type { SupabaseClient } from '@supabase/supabase-js'
+import type { CommentChanges } from './comment-stream'
+
+/**
+ * What happens to the document's remaining AI comments when clauses are synced
+ * - replace: delete them (full analysis)
+ * - carry: move them all to the new analysis
+ * - carry_clause: move clause-linked ones, delete document-level ones
+ */
+export type CommentPolicy = 'replace' | 'carry' | 'carry_clause'
+
+export interface RiskCounts {
+  issues_found: number
+  high_risk_count: number
+  medium_risk_count: number
+  low_risk_count: number
+}
+
+export interface AnalysisResults {
+  analysisId: string
+  documentId: string
+  userId?: string
+  comments: CommentChanges
+  /** Clauses whose comments are now stored: their content hash marks them done */
+  clauseHashes: Array<{ id: string; content_hash: string }>
+  analysis: {
+    duration_seconds: number
+    tokens_used: number
+    cost_usd: number
+    metadata: Record<string, any>
+  }
+  document: {
+    page_count?: number
+    word_count?: number
+    has_scanned_pages?: boolean
+    metadata?: Record<string, any>
+    overall_risk_score: number
+    compliance_score: number
+    contract_type: string
+  }
+  auditDetails: Record<string, any>
+}
+
+/**
+ * Replace a document's clauses with `rows` in one transaction
+ * (`sync_document_clauses`): unchanged rows keep their id and comments, the
+ * rest are deleted, and the remaining AI comments follow `policy`.
+ * @returns Number of AI comments carried forward to the analysis
+ */
+export async function syncDocumentClauses(
+  supabase: SupabaseClient,
+  documentId: string,
+  analysisId: string,
+  rows: Record<string, any>[],
+  policy: CommentPolicy
+): Promise<number> {
+  const { data, error } = await supabase.rpc('sync_document_clauses', {
+    p_document_id: documentId,
+    p_analysis_id: analysisId,
+    p_clauses: rows,
+    p_comment_policy: policy,
+  })
+
+  if (error) {
+    throw new Error('Failed to store clauses: ' + error.message)
+  }
+  return (data as number | null) || 0
+}
+
+/**
+ * Write everything an analysis produced in one transaction
+ * (`store_analysis_results`): comments, clause hashes, analysis summary,
+ * document scores and the audit entry. Either all of it lands or none, so a
+ * retried job never sees half-written results.
+ * @returns Risk counts computed in SQL from the analysis' comments
+ */
+export async function storeAnalysisResults(
+  supabase: SupabaseClient,
+  results: AnalysisResults
+): Promise<RiskCounts> {
+  const { data, error } = await supabase.rpc('store_analysis_results', {
+    p_analysis_id: results.analysisId,
+    p_document_id: results.documentId,
+    p_user_id: results.userId ?? null,
+    p_comments: results.comments.upserts,
+    p_deleted_comment_ids: results.comments.deletedIds,
+    p_clause_hashes: results.clauseHashes,
+    p_analysis: results.analysis,
+    p_document: results.document,
+    p_audit_details: results.auditDetails,
+  })
+
+  if (error) {
+    throw new Error('Failed to store analysis results: ' + error.message)
+  }
+  return data as RiskCounts
+}
@@ -0,0 +1,527 @@
+import { randomUUID } from 'crypto'
+import type { SupabaseClient } from '@supabase/supabase-js'
+import { createServiceClient } from '@/lib/supabase/server'
+import { getDefaultProvider } from '@/lib/ai/provider'
+import type { AIAnalysisResponse, AnalysisIssue } from '@/lib/ai/provider'
+import { analyzeDocument, isSameIssue } from '@/lib/ai/map-reduce'
+import type { DocumentChunk } from '@/lib/ai/map-reduce'
+import { getLatencyModel } from '@/lib/ai/estimator'
+import { getDefaultEmbedder } from '@/lib/rag/embedder'
+import { getLegalIndex } from '@/lib/rag/legal-index'
+import { retrieveLegalMatches, selectLegalContext } from '@/lib/rag/retrieval'
+import {
+  extractTextFromPDF,
+  extractTextFromDOCX,
+  parseDocumentStructure,
+  assignPageNumbers,
+} from '@/lib/document-processing/extractor'
+import type { ClauseStructure, ProcessedDocument } from '@/lib/document-processing/extractor'
+import { withTimeout, TIMEOUTS } from '@/lib/utils/timeout'
+import { getDefaultQueue, PermanentJobError } from '@/lib/jobs/queue'
+import type { AnalysisJob, IJobQueue } from '@/lib/jobs/queue'
+import { WorkerPool } from '@/lib/jobs/worker'
+import type { JobContext, WorkerPoolOptions } from '@/lib/jobs/worker'
+import type { Document } from '@/lib/types/database'
+import { diffClauses, hashClauseContent } from './clauses'
+import { CommentStream, reportProgress } from './comment-stream'
+import type { CommentChanges } from './comment-stream'
+import { storeAnalysisResults, syncDocumentClauses } from './persistence'
+import { evaluateRules, ruleOnlyAnalysis } from './rules'
+
+/**
+ * full: analyze the whole document.
+ * incremental: diff clauses against the stored ones and analyze only what changed.
+ */
+export type AnalysisJobMode = 'full' | 'incremental'
+
+type StoredClause = ClauseStructure & { id: string; content_hash: string; parent_clause_id: string | null }
+
+interface AnalysisOutcome {
+  response: AIAnalysisResponse
+  /** New issues (final, merged list) */
+  issues: AnalysisIssue[]
+  /** Stream that stored the new issues as they arrived; null when nothing was analyzed */
+  comments: CommentStream | null
+  /**
+   * Clauses stored without a content hash until their comments are stored,
+   * so a retry after a partial write analyzes them again
+   */
+  pendingClauses: StoredClause[]
+}
+
+/**
+ * Run one analysis job end to end: download, extract, parse, analyze, store.
+ *
+ * Writes are scoped to the job's analysis id and the document's clauses are
+ * replaced rather than appended, so a retried attempt never duplicates rows.
+ * Clauses are synced in one transaction before the provider runs and the
+ * results in another once it is done (see ./persistence).
+ */
+export async function runAnalysisJob(
+  supabase: SupabaseClient,
+  job: AnalysisJob,
+  context?: JobContext
+): Promise<void> {
+  const startTime = Date.now()
+  const documentId = job.document_id
+
+  const { data: document, error: docError } = await supabase
+    .from('documents')
+    .select('*')
+    .eq('id', documentId)
+    .single()
+
+  if (docError || !document) {
+    throw new PermanentJobError('Document not found')
+  }
+
+  console.log('[PIPELINE] Job', job.id, 'document:', {
+    filename: document.filename,
+    fileType: document.file_type,
+    mode: job.payload?.mode || 'full',
+  })
+
+  await reportProgress(supabase, job.id, { stage: 'extracting' })
+  const processedDoc = await extractDocument(supabase, document)
+  const clauses = parseDocumentStructure(processedDoc.text)
+  if (processedDoc.pages) {
+    assignPageNumbers(clauses, processedDoc.pages)
+  }
+  console.log('[PIPELINE] Parsed', clauses.length, 'clauses')
+
+  const mode: AnalysisJobMode = job.payload?.mode === 'incremental' ? 'incremental' : 'full'
+  const outcome = mode === 'incremental'
+    ? await runIncrementalAnalysis(supabase, job, document, processedDoc.text, clauses)
+    : await runFullAnalysis(supabase, job, document, processedDoc.text, clauses)
+
+  if (context?.signal.aborted) {
+    throw new Error('Lease lost before results were stored')
+  }
+
+  const { response } = outcome
+  outcome.comments?.setProgress({ stage: 'storing' })
+  const comments: CommentChanges = outcome.comments
+    ? await outcome.comments.reconcile(outcome.issues)
+    : { upserts: [], deletedIds: [] }
+
+  const counts = await storeAnalysisResults(supabase, {
+    analysisId: job.id,
+    documentId,
+    userId: job.requested_by,
+    comments,
+    clauseHashes: outcome.pendingClauses.map(clause => ({ id: clause.id, content_hash: clause.content_hash })),
+    analysis: {
+      duration_seconds: Math.round((Date.now() - startTime) / 1000),
+      tokens_used: response.tokens_used,
+      cost_usd: response.cost_usd,
+      metadata: {
+        ...job.metadata,
+        ...response.metadata,
+        first_issue_ms: outcome.comments?.firstIssueMs,
+      },
+    },
+    document: {
+      page_count: processedDoc.pageCount,
+      word_count: processedDoc.wordCount,
+      has_scanned_pages: processedDoc.hasScannedPages,
+      metadata: processedDoc.pages
+        ? {
+            ...document.metadata,
+            page_offsets: processedDoc.pages.map(page => page.start_char),
+            scanned_pages: processedDoc.pages.filter(page => page.is_scanned).map(page => page.page_number),
+          }
+        : document.metadata,
+      overall_risk_score: response.analysis.overall_risk_score,
+      compliance_score: response.analysis.compliance_score,
+      contract_type: response.analysis.contract_type,
+    },
+    auditDetails: {
+      analysis_id: job.id,
+      mode,
+      attempt: job.attempts,
+      tokens_used: response.tokens_used,
+    },
+  })
+  console.log('[PIPELINE] Results stored:', counts)
+
+  console.log('[PIPELINE] ✅ Job', job.id, 'completed in', Date.now() - startTime, 'ms')
+}
+
+/**
+ * Download the document's current file and extract its text
+ */
+async function extractDocument(supabase: SupabaseClient, document: Document): Promise<ProcessedDocument> {
+  const downloadStart = Date.now()
+  const { data: fileData, error: downloadError } = await withTimeout(
+    supabase.storage.from('documents').download(document.storage_path),
+    TIMEOUTS.FILE_DOWNLOAD,
+    'Document download timed out'
+  )
+
+  if (downloadError || !fileData) {
+    throw new Error('Failed to download document from storage: ' + downloadError?.message)
+  }
+  console.log('[PIPELINE] File downloaded in', Date.now() - downloadStart, 'ms, size:', fileData.size)
+
+  const buffer = Buffer.from(await fileData.arrayBuffer())
+  const extractStart = Date.now()
+  let processedDoc: ProcessedDocument
+
+  if (document.file_type === 'application/pdf') {
+    processedDoc = await extractTextFromPDF(buffer)
+  } else if (document.file_type.includes('wordprocessingml')) {
+    processedDoc = await extractTextFromDOCX(buffer)
+  } else {
+    throw new PermanentJobError(`Unsupported file type: ${document.file_type}. Please upload PDF or DOCX files.`)
+  }
+
+  console.log('[PIPELINE] Text extracted in', Date.now() - extractStart, 'ms,', processedDoc.text.length, 'chars')
+  return processedDoc
+}
+
+/**
+ * Analyze the whole document and replace all stored clauses and AI comments
+ */
+async function runFullAnalysis(
+  supabase: SupabaseClient,
+  job: AnalysisJob,
+  document: Document,
+  text: string,
+  clauses: ClauseStructure[]
+): Promise<AnalysisOutcome> {
+  const storedClauses = withClauseIds(
+    clauses,
+    clauses.map(() => randomUUID()),
+    clauses.map(clause => hashClauseContent(clause.content))
+  )
+
+  // Previous clauses and all AI comments are dropped in the same transaction
+  await syncDocumentClauses(
+    supabase,
+    document.id,
+    job.id,
+    storedClauses.map(clause => clauseRow(document.id, clause, false)),
+    'replace'
+  )
+
+  const comments = new CommentStream(supabase, job.id, document.id, storedClauses)
+  const response = await runProvider(
+    supabase,
+    { documentText: text, contractType: document.contract_type || undefined },
+    clauses,
+    comments
+  )
+
+  return {
+    response,
+    issues: response.analysis.issues,
+    comments,
+    pendingClauses: storedClauses,
+  }
+}
+
+/**
+ * Re-analyze only clauses whose content changed since the stored version.
+ *
+ * Unchanged clause rows are kept (so their comments survive) and their AI
+ * comments are moved to this analysis. Document-level AI comments are always
+ * re-derived: the changed-clause prompt carries the full outline, so "missing
+ * clause" findings stay accurate.
+ */
+async function runIncrementalAnalysis(
+  supabase: SupabaseClient,
+  job: AnalysisJob,
+  document: Document,
+  text: string,
+  clauses: ClauseStructure[]
+): Promise<AnalysisOutcome> {
+  const { data: previous } = await supabase
+    .from('document_clauses')
+    .select('id, content_hash')
+    .eq('document_id', document.id)
+
+  if (!previous || previous.length === 0) {
+    console.log('[PIPELINE] No stored clauses, falling back to full analysis')
+    return runFullAnalysis(supabase, job, document, text, clauses)
+  }
+
+  const hashes = clauses.map(clause => hashClauseContent(clause.content))
+  const diff = diffClauses(hashes, previous)
+  console.log('[PIPELINE] Clause diff:', {
+    total: clauses.length,
+    unchanged: diff.unchanged.size,
+    changed: diff.changed.length,
+    removed: diff.removed.length,
+  })
+
+  const storedClauses = withClauseIds(
+    clauses,
+    clauses.map((_, index) => diff.unchanged.get(index) || randomUUID()),
+    hashes
+  )
+
+  // Removed and changed clauses take their comments with them (ON DELETE CASCADE);
+  // the surviving AI comments move to this analysis. Document-level ones are
+  // only kept when nothing changed.
+  const pendingClauses = diff.changed.map(index => storedClauses[index])
+  const nothingChanged = diff.changed.length === 0 && diff.removed.length === 0
+  const carried = await syncDocumentClauses(
+    supabase,
+    document.id,
+    job.id,
+    storedClauses.map((clause, index) => clauseRow(document.id, clause, diff.unchanged.has(index))),
+    nothingChanged ? 'carry' : 'carry_clause'
+  )
+
+  const metadata = {
+    mode: 'incremental',
+    clauses_total: clauses.length,
+    clauses_changed: diff.changed.length,
+    clauses_removed: diff.removed.length,
+    comments_carried: carried,
+  }
+
+  if (nothingChanged) {
+    return {
+      response: {
+        analysis: {
+          contract_type: document.contract_type || 'other',
+          overall_risk_score: document.overall_risk_score ?? 0,
+          compliance_score: document.compliance_score ?? 1,
+          issues: [],
+          clauses: [],
+        },
+        tokens_used: 0,
+        cost_usd: 0,
+        model_version: job.model_version,
+        metadata,
+      },
+      issues: [],
+      comments: null,
+      pendingClauses,
+    }
+  }
+
+  const changedClauses = pendingClauses
+  const changedText = changedClauses.map(clause => clause.content).join('\n\n')
+  const comments = new CommentStream(supabase, job.id, document.id, changedClauses)
+  const response = await runProvider(
+    supabase,
+    { documentText: changedText, contractType: document.contract_type || undefined },
+    changedClauses,
+    comments,
+    clauses
+  )
+
+  // Scores: previous ones for the unchanged share of the text, new ones for the rest
+  const changedShare = text.length > 0 ? Math.min(1, changedText.length / text.length) : 1
+  const blend = (previousScore: number | undefined, newScore: number) =>
+    previousScore == null
+      ? newScore
+      : previousScore * (1 - changedShare) + newScore * changedShare
+
+  return {
+    response: {
+      ...response,
+      analysis: {
+        ...response.analysis,
+        overall_risk_score: blend(document.overall_risk_score, response.analysis.overall_risk_score),
+        compliance_score: blend(document.compliance_score, response.analysis.compliance_score),
+      },
+      metadata: { ...response.metadata, ...metadata },
+    },
+    issues: response.analysis.issues,
+    comments,
+    pendingClauses,
+  }
+}
+
+/**
+ * Attach row ids, content hashes and parent ids (resolved from parent_index)
+ */
+function withClauseIds(clauses: ClauseStructure[], ids: string[], hashes: string[]): StoredClause[] {
+  return clauses.map((clause, index) => ({
+    ...clause,
+    id: ids[index],
+    content_hash: hashes[index],
+    parent_clause_id: clause.parent_index !== undefined ? ids[clause.parent_index] : null,
+  }))
+}
+
+/**
+ * document_clauses row for a clause
+ * @param hashed - Store the content hash (false while the clause's comments are pending)
+ */
+function clauseRow(documentId: string, clause: StoredClause, hashed: boolean): Record<string, any> {
+  const { parent_index: _parentIndex, ...row } = clause
+  return { document_id: documentId, ...row, content_hash: hashed ? clause.content_hash : null }
+}
+
+/**
+ * Run the rule pre-pass, then the provider, storing issues through `comments`
+ * as they stream in. Rule findings are stored first and listed in the prompt,
+ * and a document the rules cover completely never reaches the provider. Only
+ * with ANALYSIS_RULES=on are covered sections of other documents left out of
+ * the text; by default the model still sees them, since the parties section
+ * states who is a consumer and what role each party plays.
+ */
+async function runProvider(
+  supabase: SupabaseClient,
+  request: { documentText: string; contractType?: string },
+  clauses: ClauseStructure[],
+  comments: CommentStream,
+  outlineClauses?: ClauseStructure[]
+): Promise<AIAnalysisResponse> {
+  const provider = getDefaultProvider()
+  const rulesMode = process.env.ANALYSIS_RULES || 'hint'
+  const rules = rulesMode === 'off' ? null : evaluateRules(clauses, outlineClauses)
+  let uncovered = clauses
+  if (rules) {
+    rules.issues.forEach(issue => comments.push(issue))
+    const covered = new Set(rules.covered)
+    uncovered = clauses.filter(clause => !covered.has(clause.order_index))
+    console.log('[PIPELINE] Rules raised', rules.issues.length, 'issues and cover',
+      clauses.length - uncovered.length, 'clauses in', rules.elapsed_ms, 'ms')
+  }
+  const analyzed = rulesMode === 'on' ? uncovered : clauses
+  const rulesMetadata = rules && {
+    contract_type: rules.contract_type,
+    issues: rules.rules,
+    clauses_covered: clauses.length - uncovered.length,
+    clauses_omitted: clauses.length - analyzed.length,
+    elapsed_ms: rules.elapsed_ms,
+  }
+
+  if (rules && clauses.length > 0 && uncovered.length === 0) {
+    console.log('[PIPELINE] Rules cover every clause, skipping the provider')
+    return {
+      analysis: ruleOnlyAnalysis(rules),
+      tokens_used: 0,
+      cost_usd: 0,
+      model_version: provider.getModelName(),
+      metadata: { mode: 'rules', rules: rulesMetadata },
+    }
+  }
+
+  const shrunk = analyzed.length < clauses.length
+  const omittedSections = clauses
+    .filter(clause => clause.clause_type === 'heading' && !analyzed.includes(clause))
+    .map(clause => clause.heading || clause.content)
+  const preChecked = rules && (rules.issues.length > 0 || omittedSections.length > 0)
+    ? { issues: rules.issues.map(issue => issue.title), omittedSections }
+    : undefined
+
+  const legal = await retrieveLegalContext(supabase, analyzed)
+  const latency = await getLatencyModel(supabase, provider)
+  const aiStart = Date.now()
+  comments.setProgress({ stage: 'analyzing' })
+
+  const response = await withTimeout(
+    analyzeDocument(
+      provider,
+      {
+        ...request,
+        documentText: shrunk ? analyzed.map(clause => clause.content).join('\n\n') : request.documentText,
+        contractType: request.contractType || rules?.contract_type,
+        legalContext: legal?.legalContext,
+        preChecked,
+        onIssue: issue => comments.push(issue),
+      },
+      analyzed,
+      {
+        // Changed clauses are analyzed as excerpts of the whole contract
+        mode: outlineClauses ? 'map_reduce' : undefined,
+        outlineClauses: outlineClauses || (shrunk ? clauses : undefined),
+        legalContextFor: legal?.legalContextFor,
+        latency,
+        onChunkComplete: (done, total) => comments.setProgress({ chunks_done: done, chunks_total: total }),
+      }
+    ),
+    TIMEOUTS.AI_ANALYSIS_JOB,
+    'AI analysis timed out. The document may be too long or complex.'
+  )
+
+  const providerMs = Date.now() - aiStart
+  console.log('[PIPELINE] AI analysis completed in', providerMs, 'ms,', response.analysis.issues.length, 'issues')
+  return {
+    ...response,
+    analysis: rules
+      ? { ...response.analysis, issues: mergeRuleIssues(rules.issues, response.analysis.issues) }
+      : response.analysis,
+    metadata: {
+      ...response.metadata,
+      // Provider time only, without download, extraction, retrieval or storing
+      provider_ms: providerMs,
+      ...(legal ? { rag: legal.metadata } : {}),
+      ...(rules ? { rules: rulesMetadata } : {}),
+    },
+  }
+}
+
+/**
+ * Rule issues first, then the model's issues that do not repeat them
+ */
+function mergeRuleIssues(ruleIssues: AnalysisIssue[], issues: AnalysisIssue[]): AnalysisIssue[] {
+  return [...ruleIssues, ...issues.filter(issue => !ruleIssues.some(rule => isSameIssue(rule, issue)))]
+}
+
+/**
+ * Look up the legislative articles relevant to the analyzed clauses.
+ * Best effort: with retrieval off or failing, the prompt falls back to its
+ * generic list of laws.
+ */
+async function retrieveLegalContext(supabase: SupabaseClient, clauses: ClauseStructure[]): Promise<{
+  legalContext: string[]
+  legalContextFor: (chunk: DocumentChunk) => string[]
+  metadata: Record<string, any>
+} | null> {
+  const maxArticles = parseInt(process.env.RAG_MAX_ARTICLES || '8', 10)
+  try {
+    const embedder = getDefaultEmbedder()
+    const index = await getLegalIndex(supabase, embedder)
+    if (!index) return null
+
+    const { byClause, elapsed_ms } = await retrieveLegalMatches(index, embedder, clauses, {
+      topK: parseInt(process.env.RAG_TOP_K || '3', 10),
+    })
+    const legalContext = selectLegalContext(byClause, maxArticles)
+    console.log('[PIPELINE] Retrieved', legalContext.length, 'legal articles in', elapsed_ms, 'ms')
+
+    return {
+      legalContext,
+      // Each chunk gets the articles matched by its own clauses
+      legalContextFor: chunk => selectLegalContext(
+        byClause.filter((_, i) => clauses[i].start_char < chunk.end_char && clauses[i].end_char > chunk.start_char),
+        maxArticles
+      ),
+      metadata: { backend: index.backend, articles: legalContext.length, retrieval_ms: elapsed_ms },
+    }
+  } catch (error: any) {
+    console.warn('[PIPELINE] Legal retrieval failed, using the generic prompt:', error.message)
+    return null
+  }
+}
+
+/**
+ * Build a worker pool that runs analysis jobs with the service-role client
+ */
+export function createAnalysisWorkerPool(
+  queue: IJobQueue = getDefaultQueue(),
+  options: WorkerPoolOptions = {}
+): WorkerPool {
+  const supabase = createServiceClient()
+
+  return new WorkerPool(queue, (job, context) => runAnalysisJob(supabase, job, context), {
+    concurrency: parseInt(process.env.ANALYSIS_WORKER_CONCURRENCY || '2', 10),
+    ...options,
+    onJobFailed: async (job, error, willRetry) => {
+      if (willRetry) return
+      // Final attempt failed - surface it on the document
+      await supabase
+        .from('documents')
+        .update({ status: 'failed' })
+        .eq('id', job.document_id)
+      await options.onJobFailed?.(job, error, willRetry)
+    },
+  })
+}
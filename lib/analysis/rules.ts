@@ -0,0 +1,400 @@
+import type { AnalysisIssue, ContractAnalysis } from '@/lib/ai/provider'
+import type { ClauseStructure } from '@/lib/document-processing/extractor'
+import { AhoCorasick } from '@/lib/utils/aho-corasick'
+import { normalizeWords } from '@/lib/utils/text'
+
+/**
+ * Deterministic pre-pass run before the LLM.
+ *
+ * All keyword sets (Romanian and English, written with diacritics and folded
+ * at compile time) go into one Aho-Corasick automaton, so each clause is
+ * scanned once however many rules there are. Keywords match whole words; a
+ * trailing `*` matches any word starting with the keyword.
+ */
+
+type IssueTemplate = Omit<AnalysisIssue, 'confidence'>
+
+/** Issue raised when none of `present` occurs (and, if given, one of `onlyIf` does) */
+interface MissingClauseRule {
+  id: string
+  present: string[]
+  onlyIf?: string[]
+  issue: IssueTemplate
+  confidence: number
+}
+
+/** Issue raised for clauses containing one of `keywords` */
+interface ClauseFlagRule {
+  id: string
+  keywords: string[]
+  issue: IssueTemplate
+  confidence: number
+}
+
+// Specific types; the first with enough evidence wins over the generic ones
+const CONTRACT_TYPES: Array<{ type: string; keywords: string[] }> = [
+  { type: 'employment', keywords: ['contract individual de muncă', 'angajator', 'salariat', 'angajare', 'employment', 'employee', 'employer'] },
+  { type: 'nda', keywords: ['acord de confidențialitate', 'nda', 'non-disclosure', 'nondisclosure', 'confidentiality agreement'] },
+  { type: 'license', keywords: ['contract de licență', 'licențiat', 'licențiator', 'license agreement', 'licensee', 'licensor'] },
+  { type: 'software_development', keywords: ['dezvoltare software', 'software development', 'cod sursă', 'source code'] },
+  { type: 'lease', keywords: ['închiriere', 'locațiune', 'chirie', 'locator', 'locatar', 'lease', 'landlord', 'tenant'] },
+  { type: 'purchase_agreement', keywords: ['vânzare-cumpărare', 'vânzător', 'cumpărător', 'purchase agreement', 'seller', 'buyer'] },
+  { type: 'partnership', keywords: ['parteneriat', 'asociere', 'partnership'] },
+  { type: 'loan', keywords: ['împrumut', 'împrumutat', 'împrumutător', 'loan', 'borrower', 'lender'] },
+]
+
+const GENERIC_TYPES: Array<{ type: string; keywords: string[] }> = [
+  { type: 'b2c', keywords: ['consumator', 'consumer'] },
+  { type: 'b2b_services', keywords: ['prestări servicii', 'prestator', 'beneficiar', 'servicii', 'mentenanță', 'services', 'service provider'] },
+]
+
+// A keyword in a heading or the title clause counts this much more than one in a body
+const HEADING_WEIGHT = 3
+const MIN_TYPE_SCORE = 3
+
+const PERSONAL_DATA = [
+  'date cu caracter personal', 'date personale', 'datele personale', 'datelor personale', 'prelucrarea datelor',
+  'protecția datelor', 'gdpr', '2016/679',
+  'personal data', 'data protection',
+]
+
+const MISSING_CLAUSE_RULES: MissingClauseRule[] = [
+  {
+    id: 'missing_force_majeure',
+    present: ['forță majoră', 'forța majoră', 'caz fortuit', 'force majeure', 'act of god'],
+    issue: {
+      title: 'Missing force majeure clause',
+      description: 'The contract does not address force majeure. Without it, a party prevented from performing by an unforeseeable external event must rely on the general rules of the Civil Code, and notification duties and termination rights remain unclear.',
+      risk_level: 'medium',
+      category: 'force_majeure',
+      legal_references: [{ law: 'Codul Civil', article: 'Art. 1351', relevance_score: 0.9 }],
+      suggested_revision: 'Add a force majeure clause: definition per Art. 1351 Civil Code, notification within 5 days with supporting evidence, suspension of obligations and a right to terminate if the event lasts more than 30 days.',
+    },
+    confidence: 0.85,
+  },
+  {
+    id: 'missing_governing_law',
+    present: [
+      'legea aplicabilă', 'legislația aplicabilă', 'legea română', 'legislația română', 'legii române', 'legislației române',
+      'governing law', 'governed by', 'applicable law',
+    ],
+    issue: {
+      title: 'Missing governing law clause',
+      description: 'The contract does not state which law governs it. For cross-border relationships this leaves the applicable law to the Rome I Regulation defaults and invites disputes.',
+      risk_level: 'medium',
+      category: 'governing_law',
+      legal_references: [{ law: 'Regulamentul (CE) nr. 593/2008 (Roma I)', article: 'Art. 3', relevance_score: 0.8 }],
+      suggested_revision: 'Add: "Prezentul contract este guvernat de legea română."',
+    },
+    confidence: 0.8,
+  },
+  {
+    id: 'missing_dispute_resolution',
+    present: [
+      'instanța competentă', 'instanțele competente', 'instanțelor competente', 'jurisdicți*', 'arbitraj*', 'litigii*', 'soluționarea',
+      'jurisdiction', 'arbitration', 'dispute resolution', 'competent courts',
+    ],
+    issue: {
+      title: 'Missing dispute resolution clause',
+      description: 'The contract does not say how disputes are resolved or which courts have jurisdiction.',
+      risk_level: 'low',
+      category: 'dispute_resolution',
+      legal_references: [{ law: 'Codul de Procedură Civilă', article: 'Art. 126', relevance_score: 0.7 }],
+      suggested_revision: 'Add a clause providing for amicable settlement within 30 days, then the competent courts at the registered office of the beneficiary.',
+    },
+    confidence: 0.75,
+  },
+  {
+    id: 'missing_termination',
+    present: ['încetare*', 'încetează', 'reziliere', 'reziliat*', 'denunțare*', 'denunța', 'termination', 'terminate*'],
+    issue: {
+      title: 'Missing termination clause',
+      description: 'The contract has no provisions on how or when it ends, so neither party has a clear exit or notice period.',
+      risk_level: 'medium',
+      category: 'termination',
+      legal_references: [{ law: 'Codul Civil', article: 'Art. 1276', relevance_score: 0.8 }],
+      suggested_revision: 'Add termination by agreement, unilateral termination with 30 days notice, and termination for breach after a 15-day cure period (pact comisoriu).',
+    },
+    confidence: 0.8,
+  },
+  {
+    id: 'missing_gdpr_processor_terms',
+    onlyIf: PERSONAL_DATA,
+    present: [
+      'persoana împuternicită', 'persoană împuternicită', 'persoanei împuternicite', 'împuternicit de operator',
+      'art. 28', 'articolul 28', 'instrucțiuni documentate', 'processor', 'article 28', 'documented instructions',
+    ],
+    issue: {
+      title: 'Missing GDPR Art. 28 processor terms',
+      description: 'Personal data is processed under the contract, but there are no data processing terms: processing only on documented instructions, confidentiality, security measures, sub-processors, assistance, deletion and audits.',
+      risk_level: 'high',
+      category: 'data_protection',
+      legal_references: [{ law: 'GDPR (Regulamentul UE 2016/679)', article: 'Art. 28', relevance_score: 0.95 }],
+      suggested_revision: 'Add a data processing agreement (annex) covering the subject matter and duration of processing, categories of data and data subjects, and the processor obligations of Art. 28(3) GDPR.',
+    },
+    confidence: 0.8,
+  },
+]
+
+const CLAUSE_FLAG_RULES: ClauseFlagRule[] = [
+  {
+    id: 'unlimited_liability',
+    keywords: [
+      'răspundere nelimitată', 'răspunderea nelimitată', 'răspunde nelimitat', 'în mod nelimitat', 'fără nicio limită',
+      'fără limită', 'unlimited liability', 'without limitation of liability', 'liable without limit',
+    ],
+    issue: {
+      title: 'Unlimited liability',
+      description: 'Liability is expressly unlimited, exposing the party to damages far above the contract value.',
+      risk_level: 'high',
+      category: 'liability',
+      legal_references: [{ law: 'Codul Civil', article: 'Art. 1355', relevance_score: 0.85 }],
+      suggested_revision: 'Cap total liability at the fees paid in the previous 12 months, except for intent and gross negligence (Art. 1355 Civil Code).',
+    },
+    confidence: 0.85,
+  },
+  {
+    id: 'unilateral_rights',
+    keywords: [
+      'fără preaviz', 'fără notificare prealabilă', 'la discreția exclusivă', 'discreția sa exclusivă',
+      'without notice', 'without prior notice', 'sole discretion',
+    ],
+    issue: {
+      title: 'One-sided termination or modification right',
+      description: 'A party may act without notice or at its sole discretion, which can upset the balance of the contract.',
+      risk_level: 'medium',
+      category: 'termination',
+      legal_references: [{ law: 'Codul Civil', article: 'Art. 1277', relevance_score: 0.6 }],
+      suggested_revision: 'Require reasonable prior written notice (e.g. 30 days) and make the right mutual.',
+    },
+    confidence: 0.6,
+  },
+  {
+    id: 'automatic_renewal',
+    keywords: [
+      'prelungire automată', 'se prelungește automat', 'prelungește automat', 'se reînnoiește automat', 'tacita reconducțiune',
+      'automatically renew*', 'auto-renew*',
+    ],
+    issue: {
+      title: 'Automatic renewal',
+      description: 'The contract renews automatically; without a diarized opt-out window the parties may be bound for another term.',
+      risk_level: 'low',
+      category: 'term',
+      legal_references: [{ law: 'Codul Civil', article: 'Art. 1810', relevance_score: 0.5 }],
+      suggested_revision: 'Allow either party to prevent renewal by written notice at least 30 days before the end of the term.',
+    },
+    confidence: 0.7,
+  },
+  {
+    id: 'non_compete',
+    keywords: ['neconcurență', 'non-concurență', 'non-compete', 'noncompete', 'not compete'],
+    issue: {
+      title: 'Non-compete restriction',
+      description: 'The contract restricts competition; check that scope, territory and duration are limited and, where required, compensated.',
+      risk_level: 'medium',
+      category: 'non_compete',
+      legal_references: [{ law: 'Legea nr. 21/1996 a concurenței', article: 'Art. 5', relevance_score: 0.6 }],
+      suggested_revision: 'Limit the restriction to the services actually provided, the relevant territory and at most 12 months after termination.',
+    },
+    confidence: 0.55,
+  },
+]
+
+// Sections with nothing for the LLM to assess: clauses under one of these
+// section headings, without flagged wording, are left out of the prompt.
+// Sections with legal substance (final provisions, governing law, ...) are
+// not listed even when the rules check their presence.
+const BOILERPLATE_HEADINGS = [
+  'părțile contractante', 'părțile contractului', 'preambul', 'notificări', 'comunicări', 'corespondență',
+  'semnături', 'semnăturile părților', 'exemplare', 'parties', 'recitals', 'notices', 'signatures', 'counterparts',
+]
+
+const RISK_WEIGHT: Record<AnalysisIssue['risk_level'], number> = {
+  low: 0.05,
+  medium: 0.15,
+  high: 0.3,
+  critical: 0.5,
+}
+
+type PatternOwner =
+  | { kind: 'type'; index: number; generic: boolean }
+  | { kind: 'present' | 'only_if'; index: number }
+  | { kind: 'flag'; index: number }
+  | { kind: 'boilerplate' }
+
+interface CompiledRules {
+  matcher: AhoCorasick
+  owners: PatternOwner[][]
+}
+
+let compiled: CompiledRules | null = null
+
+function compileRules(): CompiledRules {
+  const patterns = new Map<string, PatternOwner[]>()
+  const add = (keyword: string, owner: PatternOwner) => {
+    const prefix = keyword.endsWith('*')
+    const pattern = ` ${normalizeWords(prefix ? keyword.slice(0, -1) : keyword)}${prefix ? '' : ' '}`
+    const owners = patterns.get(pattern) || []
+    owners.push(owner)
+    patterns.set(pattern, owners)
+  }
+
+  CONTRACT_TYPES.forEach(({ keywords }, index) => keywords.forEach(k => add(k, { kind: 'type', index, generic: false })))
+  GENERIC_TYPES.forEach(({ keywords }, index) => keywords.forEach(k => add(k, { kind: 'type', index, generic: true })))
+  MISSING_CLAUSE_RULES.forEach((rule, index) => {
+    rule.present.forEach(k => add(k, { kind: 'present', index }))
+    rule.onlyIf?.forEach(k => add(k, { kind: 'only_if', index }))
+  })
+  CLAUSE_FLAG_RULES.forEach((rule, index) => rule.keywords.forEach(k => add(k, { kind: 'flag', index })))
+  BOILERPLATE_HEADINGS.forEach(k => add(k, { kind: 'boilerplate' }))
+
+  return { matcher: new AhoCorasick(Array.from(patterns.keys())), owners: Array.from(patterns.values()) }
+}
+
+export interface RuleFindings {
+  contract_type: string
+  issues: AnalysisIssue[]
+  /** order_index of analyzed clauses the rules cover completely (standard boilerplate) */
+  covered: number[]
+  /** Ids of the rules that raised issues */
+  rules: string[]
+  elapsed_ms: number
+}
+
+/**
+ * Run all rules in one pass over the clauses.
+ * @param clauses - Clauses being analyzed (flags and coverage)
+ * @param documentClauses - All clauses of the contract (type and missing clauses); defaults to `clauses`
+ */
+export function evaluateRules(
+  clauses: ClauseStructure[],
+  documentClauses: ClauseStructure[] = clauses
+): RuleFindings {
+  const start = Date.now()
+  const { matcher, owners } = compiled ??= compileRules()
+  const analyzed = new Set(clauses.map(clause => clause.order_index))
+
+  const typeScores = new Map<string, number>()
+  const present = new Set<number>()
+  const onlyIf = new Set<number>()
+  const flagged = new Map<number, ClauseStructure[]>()
+  const boilerplateSections = new Set<number>()
+  const covered: number[] = []
+
+  for (const clause of documentClauses) {
+    const isAnalyzed = analyzed.has(clause.order_index)
+    // Article headings are their first sentence; only section headings name a topic
+    const isSection = clause.clause_type === 'heading'
+    const headingHits = isSection && clause.heading
+      ? matcher.matches(` ${normalizeWords(clause.heading)} `)
+      : new Set<number>()
+    const bodyHits = matcher.matches(` ${normalizeWords(clause.content)} `)
+    const weight = clause.order_index === 0 ? HEADING_WEIGHT : 1
+    let boilerplate = clause.parent_index !== undefined && boilerplateSections.has(clause.parent_index)
+    let clauseFlagged = false
+
+    const record = (pattern: number, inHeading: boolean) => {
+      for (const owner of owners[pattern]) {
+        switch (owner.kind) {
+          case 'type': {
+            const key = `${owner.generic ? 'g' : 's'}${owner.index}`
+            typeScores.set(key, (typeScores.get(key) || 0) + (inHeading ? HEADING_WEIGHT : weight))
+            break
+          }
+          case 'present':
+            present.add(owner.index)
+            break
+          case 'only_if':
+            onlyIf.add(owner.index)
+            break
+          case 'flag':
+            if (isAnalyzed) {
+              clauseFlagged = true
+              const hits = flagged.get(owner.index) || []
+              if (hits[hits.length - 1] !== clause) hits.push(clause)
+              flagged.set(owner.index, hits)
+            }
+            break
+          case 'boilerplate':
+            if (inHeading) boilerplate = true
+            break
+        }
+      }
+    }
+    headingHits.forEach(pattern => record(pattern, true))
+    bodyHits.forEach(pattern => record(pattern, false))
+
+    if (boilerplate && isSection) boilerplateSections.add(clause.order_index)
+    if (isAnalyzed && boilerplate && !clauseFlagged) covered.push(clause.order_index)
+  }
+
+  const issues: AnalysisIssue[] = []
+  const raised: string[] = []
+  MISSING_CLAUSE_RULES.forEach((rule, index) => {
+    if (present.has(index) || (rule.onlyIf && !onlyIf.has(index))) return
+    issues.push({ ...rule.issue, confidence: rule.confidence })
+    raised.push(rule.id)
+  })
+  CLAUSE_FLAG_RULES.forEach((rule, index) => {
+    const hits = flagged.get(index)
+    if (!hits) return
+    // Quoting the clause lets the issue be attributed to it
+    const quotes = hits.slice(0, 3).map(clause =>
+      `${clause.clause_number ? `Clause ${clause.clause_number}` : 'Clause'}: "${clause.content.slice(0, 200).trim()}"`)
+    issues.push({ ...rule.issue, description: `${rule.issue.description} ${quotes.join(' ')}`, confidence: rule.confidence })
+    raised.push(rule.id)
+  })
+
+  return {
+    contract_type: pickContractType(typeScores),
+    issues,
+    covered,
+    rules: raised,
+    elapsed_ms: Date.now() - start,
+  }
+}
+
+/**
+ * Best-scoring specific type, else the best generic one (first listed wins ties)
+ */
+function pickContractType(scores: Map<string, number>): string {
+  const best = (types: Array<{ type: string }>, prefix: string, minScore: number): string | null => {
+    let type: string | null = null
+    let top = minScore - 1
+    for (let index = 0; index < types.length; index++) {
+      const score = scores.get(`${prefix}${index}`) || 0
+      if (score > top) {
+        top = score
+        type = types[index].type
+      }
+    }
+    return type
+  }
+  return best(CONTRACT_TYPES, 's', MIN_TYPE_SCORE) || best(GENERIC_TYPES, 'g', 1) || 'other'
+}
+
+/**
+ * Contract type from the text alone (no clause structure)
+ */
+export function classifyContract(text: string): string {
+  return evaluateRules([], [{ clause_type: 'document', content: text, start_char: 0, end_char: text.length, order_index: 0 }])
+    .contract_type
+}
+
+/**
+ * Analysis built from rule findings only, for documents the rules cover
+ * completely. Each issue raises risk (and, with a legal basis, lowers
+ * compliance) by its weight, compounding: 1 - (1 - w1)(1 - w2)...
+ */
+export function ruleOnlyAnalysis(findings: RuleFindings): ContractAnalysis {
+  const compound = (issues: AnalysisIssue[]) =>
+    1 - issues.reduce((product, issue) => product * (1 - RISK_WEIGHT[issue.risk_level] * issue.confidence), 1)
+
+  return {
+    contract_type: findings.contract_type,
+    overall_risk_score: Math.round(compound(findings.issues) * 100) / 100,
+    compliance_score: Math.round((1 - compound(findings.issues.filter(i => i.legal_references?.length))) * 100) / 100,
+    issues: findings.issues,
+    clauses: [],
+  }
+}
@@ -0,0 +1,210 @@
+/**
+ * Local verification of Supabase Auth access tokens.
+ *
+ * Tokens are checked with WebCrypto against the project's signing keys
+ * (GET /auth/v1/.well-known/jwks.json), which are fetched once and cached per
+ * instance, so a request costs a signature check instead of a round trip to
+ * Supabase Auth. Runs in both the Node.js and Edge runtimes (middleware).
+ * Projects still on the legacy shared secret can set SUPABASE_JWT_SECRET.
+ */
+
+export interface AccessTokenClaims {
+  sub: string
+  email?: string
+  role?: string
+  exp: number
+  session_id?: string
+}
+
+/**
+ * The token could not be checked locally (signing keys unreachable, unknown
+ * algorithm); callers fall back to asking Supabase Auth
+ */
+export class TokenVerificationUnavailableError extends Error {
+  constructor(message: string) {
+    super(message)
+    this.name = 'TokenVerificationUnavailableError'
+  }
+}
+
+interface SigningKey {
+  key: CryptoKey
+  /** Tokens naming another algorithm for this key are rejected */
+  alg: string
+}
+
+interface JwksCache {
+  keys: Map<string, SigningKey>
+  loadedAt: number
+  loading?: Promise<void>
+}
+
+const globalForJwt = globalThis as unknown as {
+  authJwks?: JwksCache
+  authHmacKey?: Promise<CryptoKey>
+}
+
+const JWKS_TTL_MS = 10 * 60_000
+// A token signed with an unknown key refetches the keys at most this often
+const JWKS_MIN_REFRESH_MS = 30_000
+
+const ALGORITHMS: Record<string, { import: EcKeyImportParams | RsaHashedImportParams; verify: EcdsaParams | AlgorithmIdentifier }> = {
+  ES256: {
+    import: { name: 'ECDSA', namedCurve: 'P-256' },
+    verify: { name: 'ECDSA', hash: 'SHA-256' },
+  },
+  RS256: {
+    import: { name: 'RSASSA-PKCS1-v1_5', hash: 'SHA-256' },
+    verify: { name: 'RSASSA-PKCS1-v1_5' },
+  },
+}
+
+/**
+ * Claims of a valid, unexpired access token for this project, or null if the
+ * token is malformed, expired, or its signature does not match. Throws
+ * TokenVerificationUnavailableError when it cannot be decided locally.
+ */
+export async function verifyAccessToken(token: string): Promise<AccessTokenClaims | null> {
+  const parts = token.split('.')
+  if (parts.length !== 3) return null
+
+  // The token comes from a cookie: anything malformed is invalid, not an error
+  let header: { alg?: string; kid?: string }
+  let claims: Record<string, any>
+  let signature: Uint8Array<ArrayBuffer>
+  try {
+    header = JSON.parse(decodeText(parts[0]))
+    claims = JSON.parse(decodeText(parts[1]))
+    signature = base64UrlDecode(parts[2])
+  } catch {
+    return null
+  }
+
+  const data = new TextEncoder().encode(`${parts[0]}.${parts[1]}`)
+
+  let valid: boolean
+  if (header.alg === 'HS256') {
+    if (!process.env.SUPABASE_JWT_SECRET) {
+      throw new TokenVerificationUnavailableError('HS256 token and SUPABASE_JWT_SECRET is not set')
+    }
+    valid = await verifySignature('HMAC', await getHmacKey(), signature, data)
+  } else {
+    const algorithm = header.alg ? ALGORITHMS[header.alg] : undefined
+    if (!algorithm || !header.kid) {
+      throw new TokenVerificationUnavailableError(`Unsupported token algorithm ${header.alg}`)
+    }
+    const signingKey = await getSigningKey(header.kid)
+    if (!signingKey || signingKey.alg !== header.alg) return null
+    valid = await verifySignature(algorithm.verify, signingKey.key, signature, data)
+  }
+
+  return valid && isCurrent(claims) ? (claims as AccessTokenClaims) : null
+}
+
+/**
+ * A signature WebCrypto refuses to check (wrong length or encoding for the
+ * key) is as invalid as one that does not match
+ */
+async function verifySignature(
+  algorithm: EcdsaParams | AlgorithmIdentifier,
+  key: CryptoKey,
+  signature: Uint8Array<ArrayBuffer>,
+  data: Uint8Array<ArrayBuffer>
+): Promise<boolean> {
+  try {
+    return await crypto.subtle.verify(algorithm, key, signature, data)
+  } catch {
+    return false
+  }
+}
+
+/**
+ * Expiry, audience and issuer checks
+ */
+function isCurrent(claims: Record<string, any>): boolean {
+  const now = Math.floor(Date.now() / 1000)
+  if (typeof claims.sub !== 'string' || !claims.sub) return false
+  if (typeof claims.exp !== 'number' || claims.exp <= now) return false
+  if (typeof claims.nbf === 'number' && claims.nbf > now + 30) return false
+
+  const audience = Array.isArray(claims.aud) ? claims.aud : [claims.aud]
+  if (!audience.includes('authenticated')) return false
+
+  const url = process.env.NEXT_PUBLIC_SUPABASE_URL
+  return !url || claims.iss === `${url.replace(/\/+$/, '')}/auth/v1`
+}
+
+/**
+ * Public key for `kid`, refetching the key set when it is stale or the key is
+ * new (rotation). Null if the project does not publish that key.
+ */
+async function getSigningKey(kid: string): Promise<SigningKey | null> {
+  const cache = globalForJwt.authJwks ??= { keys: new Map(), loadedAt: 0 }
+  const age = Date.now() - cache.loadedAt
+  if (age > JWKS_TTL_MS || (!cache.keys.has(kid) && age > JWKS_MIN_REFRESH_MS)) {
+    cache.loading ??= loadSigningKeys(cache).finally(() => {
+      cache.loading = undefined
+    })
+    await cache.loading
+  }
+  return cache.keys.get(kid) || null
+}
+
+async function loadSigningKeys(cache: JwksCache): Promise<void> {
+  const url = process.env.NEXT_PUBLIC_SUPABASE_URL
+  if (!url) {
+    throw new TokenVerificationUnavailableError('NEXT_PUBLIC_SUPABASE_URL is not set')
+  }
+
+  let jwks: { keys?: (JsonWebKey & { kid?: string; alg?: string })[] }
+  try {
+    const response = await fetch(`${url.replace(/\/+$/, '')}/auth/v1/.well-known/jwks.json`, { cache: 'no-store' })
+    if (!response.ok) throw new Error(`HTTP ${response.status}`)
+    jwks = await response.json()
+  } catch (error: any) {
+    // Keep serving the keys we have until the next refresh; without any,
+    // callers fall back to Supabase Auth
+    if (cache.keys.size > 0) {
+      cache.loadedAt = Date.now()
+      return
+    }
+    throw new TokenVerificationUnavailableError(`Could not load signing keys: ${error.message}`)
+  }
+
+  const keys = new Map<string, SigningKey>()
+  for (const jwk of jwks.keys || []) {
+    const alg = jwk.alg || (jwk.kty === 'EC' ? 'ES256' : jwk.kty === 'RSA' ? 'RS256' : '')
+    const algorithm = ALGORITHMS[alg]
+    if (!jwk.kid || !algorithm) continue
+    try {
+      keys.set(jwk.kid, { key: await crypto.subtle.importKey('jwk', jwk, algorithm.import, false, ['verify']), alg })
+    } catch (error) {
+      console.warn('[AUTH] Skipping signing key', jwk.kid, error)
+    }
+  }
+  cache.keys = keys
+  cache.loadedAt = Date.now()
+}
+
+function getHmacKey(): Promise<CryptoKey> {
+  return globalForJwt.authHmacKey ??= crypto.subtle.importKey(
+    'raw',
+    new TextEncoder().encode(process.env.SUPABASE_JWT_SECRET!),
+    { name: 'HMAC', hash: 'SHA-256' },
+    false,
+    ['verify']
+  )
+}
+
+// atob rather than Buffer, which the Edge runtime does not have
+function base64UrlDecode(value: string): Uint8Array<ArrayBuffer> {
+  const base64 = value.replace(/-/g, '+').replace(/_/g, '/').padEnd(Math.ceil(value.length / 4) * 4, '=')
+  const binary = atob(base64)
+  const bytes = new Uint8Array(binary.length)
+  for (let i = 0; i < binary.length; i++) bytes[i] = binary.charCodeAt(i)
+  return bytes
+}
+
+function decodeText(value: string): string {
+  return new TextDecoder().decode(base64UrlDecode(value))
+}
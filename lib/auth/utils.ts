@@ -1,39 +1,90 @@
+import { cache } from 'react'
 import { createClient } from '@/lib/supabase/server'
 import type { User, UserRole } from '@/lib/types/database'
+import { LRUCache } from '@/lib/utils/lru'
+import { TokenVerificationUnavailableError, verifyAccessToken } from './jwt'
 
-export async function getCurrentUser(): Promise<User | null> {
+export interface AuthIdentity {
+  id: string
+  email?: string
+}
+
+const globalForAuth = globalThis as unknown as {
+  userProfiles?: LRUCache<string, User>
+}
+
+function getProfileCache(): LRUCache<string, User> {
+  return globalForAuth.userProfiles ??= new LRUCache(
+    parseInt(process.env.AUTH_PROFILE_CACHE_MAX_ENTRIES || '1000', 10),
+    parseInt(process.env.AUTH_PROFILE_TTL_SECONDS || '60', 10) * 1000
+  )
+}
+
+/**
+ * Who is making the request. The session's access token is read from the
+ * cookies and verified locally (lib/auth/jwt.ts), so no call to Supabase Auth
+ * is made unless the token cannot be checked locally. React cache() memoizes
+ * it per render in server components; route handlers run it on every call.
+ */
+export const getAuthIdentity = cache(async (): Promise<AuthIdentity | null> => {
   const supabase = await createClient()
-  
-  const { data: { user: authUser } } = await supabase.auth.getUser()
-  
-  if (!authUser) return null
+  // Reads the cookies; only refreshes (one call) when the access token expired
+  const { data: { session } } = await supabase.auth.getSession()
+  if (!session?.access_token) return null
+
+  try {
+    const claims = await verifyAccessToken(session.access_token)
+    return claims ? { id: claims.sub, email: claims.email } : null
+  } catch (error) {
+    if (!(error instanceof TokenVerificationUnavailableError)) throw error
+    console.warn('[AUTH] Verifying with Supabase Auth:', error.message)
+    const { data: { user } } = await supabase.auth.getUser()
+    return user ? { id: user.id, email: user.email } : null
+  }
+})
 
+/**
+ * The signed-in user's profile row, cached across requests for
+ * AUTH_PROFILE_TTL_SECONDS: profiles change only in the database (role
+ * updates by an admin), so such changes apply within that time. Memoized per
+ * render in server components like getAuthIdentity.
+ */
+export const getCurrentUser = cache(async (): Promise<User | null> => {
+  const identity = await getAuthIdentity()
+  if (!identity) return null
+
+  const profiles = getProfileCache()
+  const cached = profiles.get(identity.id)
+  if (cached) return cached
+
+  const supabase = await createClient()
   const { data: user } = await supabase
     .from('users')
     .select('*')
-    .eq('id', authUser.id)
+    .eq('id', identity.id)
     .single()
 
+  if (user) profiles.set(identity.id, user)
   return user
-}
+})
 
 export async function requireAuth(): Promise<User> {
   const user = await getCurrentUser()
-  
+
   if (!user) {
     throw new Error('Unauthorized')
   }
-  
+
   return user
 }
 
 export async function requireRole(allowedRoles: UserRole[]): Promise<User> {
   const user = await requireAuth()
-  
+
   if (!allowedRoles.includes(user.role)) {
     throw new Error('Forbidden: Insufficient permissions')
   }
-  
+
   return user
 }
 
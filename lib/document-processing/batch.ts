@@ -0,0 +1,159 @@
+import { readZipEntries } from '@/lib/utils/zip'
+import { validateUpload, contentTypeForFilename, MAX_FILE_SIZE } from './upload'
+import type { AnalysisStatus, DocumentStatus } from '@/lib/types/database'
+
+/**
+ * Batch uploads: many files (or ZIP archives of them) in one request
+ */
+
+export const MAX_BATCH_FILES = 500
+const ZIP_TYPES = ['application/zip', 'application/x-zip-compressed']
+
+export interface BatchFile {
+  name: string
+  type: string
+  size: number
+  data: ArrayBuffer | Buffer
+}
+
+export interface RejectedFile {
+  name: string
+  error: string
+}
+
+/**
+ * Expand ZIP archives and validate every file.
+ * Invalid files are reported instead of failing the whole batch.
+ */
+export async function expandBatchFiles(files: File[]): Promise<{ files: BatchFile[]; rejected: RejectedFile[] }> {
+  const accepted: BatchFile[] = []
+  const rejected: RejectedFile[] = []
+
+  const accept = (file: BatchFile) => {
+    const error = accepted.length >= MAX_BATCH_FILES
+      ? `Batch limit of ${MAX_BATCH_FILES} files reached`
+      : validateUpload(file)
+    if (error) {
+      rejected.push({ name: file.name, error })
+    } else {
+      accepted.push(file)
+    }
+  }
+
+  for (const file of files) {
+    if (!ZIP_TYPES.includes(file.type) && !file.name.toLowerCase().endsWith('.zip')) {
+      const type = file.type && file.type !== 'application/octet-stream'
+        ? file.type
+        : contentTypeForFilename(file.name)
+      accept({ name: file.name, type, size: file.size, data: await file.arrayBuffer() })
+      continue
+    }
+
+    let entries
+    try {
+      entries = readZipEntries(Buffer.from(await file.arrayBuffer()), MAX_FILE_SIZE)
+    } catch (error: any) {
+      rejected.push({ name: file.name, error: error.message })
+      continue
+    }
+
+    for (const entry of entries) {
+      const name = entry.name.split('/').pop() || entry.name
+      // Finder metadata and hidden files are not contracts
+      if (entry.name.startsWith('__MACOSX/') || name.startsWith('.')) continue
+
+      const type = contentTypeForFilename(name)
+      const error = validateUpload({ type, size: entry.size })
+      if (error) {
+        rejected.push({ name: `${file.name}/${entry.name}`, error })
+        continue
+      }
+      try {
+        accept({ name, type, size: entry.size, data: entry.read() })
+      } catch (readError: any) {
+        rejected.push({ name: `${file.name}/${entry.name}`, error: readError.message })
+      }
+    }
+  }
+
+  return { files: accepted, rejected }
+}
+
+export type BatchStatus = 'uploaded' | 'processing' | 'completed' | 'partial' | 'failed'
+
+export interface BatchAnalysisRow {
+  id: string
+  status: AnalysisStatus
+  issues_found: number | null
+  high_risk_count: number | null
+  started_at: string
+}
+
+export interface BatchDocumentRow {
+  id: string
+  filename: string
+  status: DocumentStatus
+  overall_risk_score?: number | null
+  analyses?: BatchAnalysisRow[] | null
+}
+
+/**
+ * Aggregate status of a batch from its documents and their latest analyses.
+ * processing: some analysis is still pending or running.
+ * completed / failed / partial: every queued analysis finished (all, none or
+ * some of them successfully). uploaded: nothing was queued.
+ */
+export function summarizeBatch(documents: BatchDocumentRow[]) {
+  const jobs: Record<AnalysisStatus | 'none', number> = { pending: 0, in_progress: 0, completed: 0, failed: 0, none: 0 }
+  let issuesFound = 0
+  let highRiskCount = 0
+
+  const rows = documents.map(document => {
+    const latest = (document.analyses || []).reduce<BatchAnalysisRow | null>(
+      (newest, analysis) => (!newest || analysis.started_at > newest.started_at ? analysis : newest),
+      null
+    )
+    jobs[latest?.status || 'none']++
+    if (latest?.status === 'completed') {
+      issuesFound += latest.issues_found || 0
+      highRiskCount += latest.high_risk_count || 0
+    }
+    return {
+      id: document.id,
+      filename: document.filename,
+      status: document.status,
+      job_id: latest?.id ?? null,
+      job_status: latest?.status ?? null,
+      issues_found: latest?.issues_found ?? null,
+      high_risk_count: latest?.high_risk_count ?? null,
+      overall_risk_score: document.overall_risk_score ?? null,
+    }
+  })
+
+  const queued = documents.length - jobs.none
+  const finished = jobs.completed + jobs.failed
+  let status: BatchStatus
+  if (jobs.pending + jobs.in_progress > 0) {
+    status = 'processing'
+  } else if (queued === 0) {
+    status = 'uploaded'
+  } else if (jobs.failed === 0) {
+    status = 'completed'
+  } else {
+    status = jobs.completed > 0 ? 'partial' : 'failed'
+  }
+
+  return {
+    status,
+    progress: {
+      total: documents.length,
+      queued,
+      finished,
+      percent: queued > 0 ? Math.round((finished / queued) * 100) : 0,
+    },
+    jobs,
+    issues_found: issuesFound,
+    high_risk_count: highRiskCount,
+    documents: rows,
+  }
+}
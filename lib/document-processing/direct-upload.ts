@@ -0,0 +1,223 @@
+import { createClient } from '@/lib/supabase/client'
+
+/**
+ * Browser side of direct uploads: the file goes straight to Supabase Storage,
+ * the API only signs the upload and finalizes the document record.
+ *
+ * Files up to one chunk use the signed upload URL. Larger files use the
+ * resumable (TUS) endpoint in fixed-size chunks; a failed chunk is retried
+ * from the offset the server reports, and an interrupted upload of the same
+ * file resumes where it stopped (the upload URL is kept in localStorage).
+ */
+
+export interface UploadTicket {
+  path: string
+  token: string
+  signed_url: string
+  resumable: { endpoint: string; bucket: string; chunk_size: number }
+}
+
+export interface DirectUploadOptions {
+  /** Bytes confirmed by storage so far */
+  onProgress?: (uploaded: number, total: number) => void
+  signal?: AbortSignal
+  /** Attempts per chunk before giving up */
+  maxRetries?: number
+}
+
+const RESUME_KEY_PREFIX = 'direct-upload:'
+
+/**
+ * Upload a file directly to storage and create its document record
+ * @returns The created document
+ */
+export async function uploadDocumentDirect(file: File, options: DirectUploadOptions = {}): Promise<any> {
+  const resumeKey = `${RESUME_KEY_PREFIX}${file.name}:${file.size}:${file.lastModified}`
+  const saved = readResumeState(resumeKey)
+  const ticket = saved?.ticket || await postJson<UploadTicket>('/api/documents/upload/sign', {
+    filename: file.name,
+    file_size: file.size,
+    file_type: file.type,
+  })
+
+  if (file.size <= ticket.resumable.chunk_size) {
+    await withRetries(options, async () => {
+      const { error } = await createClient().storage
+        .from(ticket.resumable.bucket)
+        .uploadToSignedUrl(ticket.path, ticket.token, file, { contentType: file.type })
+      if (error) throw error
+    })
+    options.onProgress?.(file.size, file.size)
+  } else {
+    await uploadResumable(file, ticket, resumeKey, saved?.uploadUrl, options)
+  }
+
+  const { document } = await postJson<{ document: any }>('/api/documents/upload/finalize', {
+    path: ticket.path,
+    filename: file.name,
+  })
+  clearResumeState(resumeKey)
+  return document
+}
+
+async function uploadResumable(
+  file: File,
+  ticket: UploadTicket,
+  resumeKey: string,
+  savedUploadUrl: string | undefined,
+  options: DirectUploadOptions
+): Promise<void> {
+  const { data } = await createClient().auth.getSession()
+  if (!data.session) {
+    throw new Error('Session expired. Please sign in again.')
+  }
+  const headers = {
+    Authorization: `Bearer ${data.session.access_token}`,
+    apikey: process.env.NEXT_PUBLIC_SUPABASE_ANON_KEY!,
+    'Tus-Resumable': '1.0.0',
+  }
+
+  let offset = savedUploadUrl ? await fetchOffset(savedUploadUrl, headers, options.signal) : null
+  let uploadUrl = savedUploadUrl
+  if (!uploadUrl || offset === null) {
+    uploadUrl = await createUpload(file, ticket, headers, options.signal)
+    offset = 0
+    writeResumeState(resumeKey, { ticket, uploadUrl })
+  }
+  const url = uploadUrl
+  options.onProgress?.(offset, file.size)
+
+  while (offset < file.size) {
+    const start = offset
+    const end = Math.min(start + ticket.resumable.chunk_size, file.size)
+    offset = await withRetries(options, async attempt => {
+      // After a failure, ask the server how much of the chunk it actually stored
+      const from = attempt > 0 ? (await fetchOffset(url, headers, options.signal)) ?? start : start
+      if (from >= end) return from
+
+      const body = file.slice(from, end)
+      const response = await fetch(url, {
+        method: 'PATCH',
+        headers: {
+          ...headers,
+          'Upload-Offset': String(from),
+          'Content-Type': 'application/offset+octet-stream',
+        },
+        body,
+        signal: options.signal,
+      })
+      if (!response.ok) {
+        throw new Error(`Chunk upload failed (${response.status})`)
+      }
+      return parseInt(response.headers.get('Upload-Offset') || String(end), 10)
+    })
+    options.onProgress?.(offset, file.size)
+  }
+}
+
+async function createUpload(
+  file: File,
+  ticket: UploadTicket,
+  headers: Record<string, string>,
+  signal?: AbortSignal
+): Promise<string> {
+  const metadata = {
+    bucketName: ticket.resumable.bucket,
+    objectName: ticket.path,
+    contentType: file.type,
+    cacheControl: '3600',
+  }
+  const response = await fetch(ticket.resumable.endpoint, {
+    method: 'POST',
+    headers: {
+      ...headers,
+      'Upload-Length': String(file.size),
+      'Upload-Metadata': Object.entries(metadata)
+        .map(([key, value]) => `${key} ${toBase64(value)}`)
+        .join(','),
+      'x-upsert': 'false',
+    },
+    signal,
+  })
+  const location = response.headers.get('Location')
+  if (!response.ok || !location) {
+    throw new Error(`Failed to start upload (${response.status})`)
+  }
+  return new URL(location, ticket.resumable.endpoint).toString()
+}
+
+/**
+ * Bytes the server holds for an upload, or null if the upload is gone
+ */
+async function fetchOffset(
+  uploadUrl: string,
+  headers: Record<string, string>,
+  signal?: AbortSignal
+): Promise<number | null> {
+  const response = await fetch(uploadUrl, { method: 'HEAD', headers, signal })
+  const offset = response.headers.get('Upload-Offset')
+  return response.ok && offset !== null ? parseInt(offset, 10) : null
+}
+
+/**
+ * Retry with exponential backoff (500ms, 1s, 2s, ...); aborts are not retried
+ */
+async function withRetries<T>(options: DirectUploadOptions, fn: (attempt: number) => Promise<T>): Promise<T> {
+  const maxRetries = options.maxRetries ?? 5
+  for (let attempt = 0; ; attempt++) {
+    try {
+      return await fn(attempt)
+    } catch (error: any) {
+      if (options.signal?.aborted || attempt >= maxRetries) throw error
+      console.warn('[UPLOAD] Retrying after error:', error.message)
+      await new Promise(resolve => setTimeout(resolve, 500 * 2 ** attempt))
+    }
+  }
+}
+
+function toBase64(value: string): string {
+  return btoa(String.fromCharCode(...new TextEncoder().encode(value)))
+}
+
+async function postJson<T>(url: string, body: unknown): Promise<T> {
+  const response = await fetch(url, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify(body),
+  })
+  const data = await response.json()
+  if (!response.ok) {
+    throw new Error(data.error || 'Upload failed')
+  }
+  return data
+}
+
+interface ResumeState {
+  ticket: UploadTicket
+  uploadUrl?: string
+}
+
+function readResumeState(key: string): ResumeState | null {
+  try {
+    const raw = localStorage.getItem(key)
+    return raw ? JSON.parse(raw) : null
+  } catch {
+    return null
+  }
+}
+
+function writeResumeState(key: string, state: ResumeState) {
+  try {
+    localStorage.setItem(key, JSON.stringify(state))
+  } catch {
+    // Private mode / quota: the upload still works, it just can't resume after a reload
+  }
+}
+
+function clearResumeState(key: string) {
+  try {
+    localStorage.removeItem(key)
+  } catch {
+    // See writeResumeState
+  }
+}
@@ -0,0 +1,43 @@
+/**
+ * Worker thread for ThreadPool (lib/utils/thread-pool.ts): runs pdfjs-dist and
+ * mammoth off the main event loop.
+ *
+ * Plain CommonJS on purpose: worker threads load this file directly from disk,
+ * outside the Next.js bundle (see outputFileTracingIncludes in next.config.ts).
+ *
+ * Message in:  { kind: 'pdf' | 'docx', data: ArrayBuffer }
+ * Messages out:
+ *   PDF:  one { partial: PdfPageText } per page, then { result: { numpages, info } }
+ *   DOCX: { result: { value, messages } }
+ *   Either may end with { error } instead.
+ */
+const { parentPort } = require('worker_threads')
+const { openPdf } = require('./pdf-pages')
+
+async function extractPdf(data) {
+  const pdf = await openPdf(new Uint8Array(data))
+  try {
+    // Pages are sent as soon as they are read; nothing accumulates here
+    for await (const page of pdf.pages()) {
+      parentPort.postMessage({ partial: page })
+    }
+    return { numpages: pdf.numPages, info: pdf.info }
+  } finally {
+    await pdf.destroy()
+  }
+}
+
+async function extractDocx(data) {
+  const mammoth = require('mammoth')
+  const result = await mammoth.extractRawText({ buffer: Buffer.from(data) })
+  return { value: result.value, messages: (result.messages || []).map(message => ({ ...message })) }
+}
+
+parentPort.on('message', async ({ kind, data }) => {
+  try {
+    const result = kind === 'pdf' ? await extractPdf(data) : await extractDocx(data)
+    parentPort.postMessage({ result })
+  } catch (error) {
+    parentPort.postMessage({ error: error && error.message ? error.message : String(error) })
+  }
+})
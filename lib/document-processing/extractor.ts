@@ -1,6 +1,12 @@
-import * as pdfParse from 'pdf-parse'
 import mammoth from 'mammoth'
+import os from 'os'
+import path from 'path'
 import { withTimeout, TIMEOUTS, TimeoutError } from '@/lib/utils/timeout'
+import { ThreadPool, PoolOverloadedError } from '@/lib/utils/thread-pool'
+import type { ThreadPoolStats } from '@/lib/utils/thread-pool'
+import { countWords } from '@/lib/utils/text'
+import { classifyContract } from '@/lib/analysis/rules'
+import { openPdf } from './pdf-pages'
 
 // NOTE: tesseract.js import REMOVED - caused DOMMatrix error in Vercel (browser-only API)
 
@@ -9,9 +15,31 @@ export interface ProcessedDocument {
   pageCount?: number
   wordCount: number
   hasScannedPages: boolean
+  /** Per-page offsets into `text` (PDF only) */
+  pages?: PageInfo[]
   metadata?: Record<string, any>
 }
 
+export interface PageInfo {
+  page_number: number
+  start_char: number
+  end_char: number
+  word_count: number
+  is_scanned: boolean
+}
+
+export interface PdfPageText {
+  page_number: number
+  total_pages: number
+  text: string
+}
+
+/** Inserted between pages in the extracted text */
+const PAGE_SEPARATOR = '\n\n'
+
+/** Pages with fewer words than this are treated as images (scanned or blank) */
+const SCANNED_PAGE_MAX_WORDS = 20
+
 export interface ClauseStructure {
   clause_number?: string
   clause_type: string
@@ -21,49 +49,200 @@ export interface ClauseStructure {
   end_char: number
   page_number?: number
   order_index: number
+  /** order_index of the enclosing clause (stored as parent_clause_id) */
+  parent_index?: number
+}
+
+interface ExtractionTask {
+  kind: 'pdf' | 'docx'
+  data: ArrayBuffer
+}
+
+const globalForExtraction = globalThis as unknown as {
+  extractionPool?: ThreadPool<ExtractionTask, any>
 }
 
 /**
- * Extract text from PDF file with timeout protection
+ * Worker-thread pool for pdfjs/mammoth, shared by all requests on this instance.
+ * Returns null when EXTRACTION_POOL=off (extraction then runs on the event loop).
+ */
+function getExtractionPool(): ThreadPool<ExtractionTask, any> | null {
+  if (process.env.EXTRACTION_POOL === 'off') return null
+
+  if (!globalForExtraction.extractionPool) {
+    const defaultSize = Math.max(1, Math.min(4, os.cpus().length - 1))
+    globalForExtraction.extractionPool = new ThreadPool<ExtractionTask, any>(
+      path.join(process.cwd(), 'lib/document-processing/extraction-worker.js'),
+      {
+        size: parseInt(process.env.EXTRACTION_WORKERS || String(defaultSize), 10),
+        maxQueue: parseInt(process.env.EXTRACTION_QUEUE_MAX || '16', 10),
+        taskTimeoutMs: TIMEOUTS.TEXT_EXTRACTION,
+      }
+    )
+  }
+  return globalForExtraction.extractionPool
+}
+
+/**
+ * Counters of the extraction pool, or null if it is disabled or not started yet
+ */
+export function getExtractionPoolStats(): ThreadPoolStats | null {
+  return globalForExtraction.extractionPool?.getStats() || null
+}
+
+/**
+ * Run a parser in the extraction pool. On timeout the worker is terminated,
+ * so a pathological file stops consuming CPU instead of running on unobserved.
+ */
+async function runExtraction(
+  kind: ExtractionTask['kind'],
+  buffer: Buffer,
+  inline: () => Promise<any>,
+  timeoutMessage: string
+): Promise<any> {
+  const pool = getExtractionPool()
+  if (!pool) {
+    return withTimeout(inline(), TIMEOUTS.TEXT_EXTRACTION, timeoutMessage)
+  }
+
+  // Private copy of the bytes that can be moved to the worker without cloning
+  const data = new Uint8Array(buffer).buffer
+  try {
+    return await pool.run({ kind, data }, { transferList: [data] })
+  } catch (error) {
+    if (error instanceof TimeoutError) {
+      throw new TimeoutError(timeoutMessage)
+    }
+    throw error
+  }
+}
+
+/**
+ * Stream a PDF's text one page at a time.
+ *
+ * Pages are read in the extraction pool and handed over as they are produced,
+ * so neither thread holds more than the current page's text content. The
+ * generator's return value is the PDF's info dictionary.
+ */
+export async function* streamPdfPages(
+  buffer: Buffer
+): AsyncGenerator<PdfPageText, Record<string, any> | undefined> {
+  const pool = getExtractionPool()
+  const timeoutMessage = 'PDF text extraction timed out. The file may be too complex or corrupted.'
+
+  if (!pool) {
+    const deadline = Date.now() + TIMEOUTS.TEXT_EXTRACTION
+    const pdf = await openPdf(new Uint8Array(buffer))
+    try {
+      for await (const page of pdf.pages()) {
+        if (Date.now() > deadline) throw new TimeoutError(timeoutMessage)
+        yield page
+      }
+      return pdf.info
+    } finally {
+      await pdf.destroy()
+    }
+  }
+
+  const pending: PdfPageText[] = []
+  let wake: (() => void) | null = null
+  let done = false
+  let failure: Error | null = null
+  let info: Record<string, any> | undefined
+
+  const data = new Uint8Array(buffer).buffer
+  pool.run({ kind: 'pdf', data }, {
+    transferList: [data],
+    onPartial: (page: PdfPageText) => {
+      pending.push(page)
+      wake?.()
+    },
+  }).then(
+    result => { info = result?.info },
+    error => { failure = error instanceof TimeoutError ? new TimeoutError(timeoutMessage) : error }
+  ).finally(() => {
+    done = true
+    wake?.()
+  })
+
+  while (true) {
+    if (pending.length > 0) {
+      yield pending.shift()!
+    } else if (done) {
+      break
+    } else {
+      await new Promise<void>(resolve => { wake = resolve })
+      wake = null
+    }
+  }
+
+  if (failure) throw failure
+  return info
+}
+
+/**
+ * Extract text from PDF file with timeout protection.
+ * Pages are joined with a blank line; per-page offsets are kept in `pages`.
  */
 export async function extractTextFromPDF(buffer: Buffer): Promise<ProcessedDocument> {
   try {
     console.log('[EXTRACT-PDF] Starting extraction, buffer size:', buffer.length)
     const startTime = Date.now()
 
-    // Wrap PDF parsing in timeout
-    const data = await withTimeout(
-      (pdfParse as any).default(buffer),
-      TIMEOUTS.TEXT_EXTRACTION,
-      'PDF text extraction timed out. The file may be too complex or corrupted.'
-    ) as any // Type assertion for PDF parse result
+    const parts: string[] = []
+    const pages: PageInfo[] = []
+    let offset = 0
+    let wordCount = 0
+
+    // Parsed in a worker thread; it is terminated if parsing exceeds the timeout
+    const iterator = streamPdfPages(buffer)
+    let step = await iterator.next()
+    while (!step.done) {
+      const page = step.value
+      if (pages.length > 0) {
+        parts.push(PAGE_SEPARATOR)
+        offset += PAGE_SEPARATOR.length
+      }
+
+      const words = countWords(page.text)
+      pages.push({
+        page_number: page.page_number,
+        start_char: offset,
+        end_char: offset + page.text.length,
+        word_count: words,
+        // A page with (almost) no text layer is an image: scanned or blank
+        is_scanned: words < SCANNED_PAGE_MAX_WORDS,
+      })
+      parts.push(page.text)
+      offset += page.text.length
+      wordCount += words
+      step = await iterator.next()
+    }
 
     const duration = Date.now() - startTime
     console.log('[EXTRACT-PDF] Extraction completed in', duration, 'ms')
 
-    const text = data.text as string
-    const wordCount = text.split(/\s+/).filter((word: string) => word.length > 0).length
-
-    // Simple heuristic: if text is very sparse relative to page count, likely scanned
-    const avgWordsPerPage = wordCount / data.numpages
-    const hasScannedPages = avgWordsPerPage < 50 // Threshold: less than 50 words per page
+    const text = parts.join('')
+    const scannedPages = pages.filter(page => page.is_scanned).length
+    const hasScannedPages = scannedPages > 0
 
     console.log('[EXTRACT-PDF] Stats:', {
-      pages: data.numpages,
+      pages: pages.length,
       words: wordCount,
-      hasScanned: hasScannedPages
+      scannedPages,
     })
 
     return {
       text,
-      pageCount: data.numpages,
+      pageCount: pages.length,
       wordCount,
       hasScannedPages,
-      metadata: data.info,
+      pages,
+      metadata: step.value,
     }
   } catch (error) {
-    if (error instanceof TimeoutError) {
-      console.error('[EXTRACT-PDF] Timeout error:', error.message)
+    if (error instanceof TimeoutError || error instanceof PoolOverloadedError) {
+      console.error('[EXTRACT-PDF]', error.name + ':', error.message)
       throw error
     }
     console.error('[EXTRACT-PDF] Extraction error:', error)
@@ -80,11 +259,12 @@ export async function extractTextFromDOCX(buffer: Buffer): Promise<ProcessedDocu
     console.log('[EXTRACT-DOCX] Starting extraction, buffer size:', buffer.length)
     const startTime = Date.now()
 
-    // CRITICAL FIX: Wrap mammoth extraction in timeout
-    // This was hanging indefinitely on complex DOCX files
-    const result = await withTimeout(
-      mammoth.extractRawText({ buffer }),
-      TIMEOUTS.TEXT_EXTRACTION,
+    // CRITICAL FIX: mammoth.extractRawText was hanging indefinitely on complex DOCX files.
+    // It runs in a worker thread that is terminated when the timeout expires.
+    const result = await runExtraction(
+      'docx',
+      buffer,
+      () => mammoth.extractRawText({ buffer }),
       'DOCX text extraction timed out. The file may be too complex, corrupted, or contain unsupported features (macros, DRM, etc.)'
     ) as { value: string; messages: any[] } // Type assertion for mammoth result
 
@@ -92,7 +272,7 @@ export async function extractTextFromDOCX(buffer: Buffer): Promise<ProcessedDocu
     console.log('[EXTRACT-DOCX] Extraction completed in', duration, 'ms')
 
     const text = result.value
-    const wordCount = text.split(/\s+/).filter((word: string) => word.length > 0).length
+    const wordCount = countWords(text)
 
     console.log('[EXTRACT-DOCX] Stats:', {
       words: wordCount,
@@ -111,8 +291,8 @@ export async function extractTextFromDOCX(buffer: Buffer): Promise<ProcessedDocu
       hasScannedPages: false, // DOCX files are native text
     }
   } catch (error) {
-    if (error instanceof TimeoutError) {
-      console.error('[EXTRACT-DOCX] Timeout error:', error.message)
+    if (error instanceof TimeoutError || error instanceof PoolOverloadedError) {
+      console.error('[EXTRACT-DOCX]', error.name + ':', error.message)
       throw error
     }
     console.error('[EXTRACT-DOCX] Extraction error:', error)
@@ -141,112 +321,174 @@ export async function extractTextFromDOCX(buffer: Buffer): Promise<ProcessedDocu
 //   }
 // }
 
+/** Numbered clause at the start of a line: "1.", "1.1", "2.3.1.", "Art. 5", "Article 10", "Articolul 3" */
+const NUMBERED_PATTERN = /(\d+(?:\.\d+)+\.?|\d+\.)(?=\s|$)|Art(?:icle|icolul)?\.?\s*(\d+)/iy
+const HAS_UPPERCASE = /\p{Lu}/u
+const HAS_LOWERCASE = /\p{Ll}/u
+const MAX_HEADING_LENGTH = 100
+
+type LineKind = 'numbered' | 'article' | 'heading' | 'text'
+
+interface OpenClause {
+  kind: LineKind
+  start: number
+  end: number
+  number?: string
+  heading?: string
+  segments?: number[]
+  parent?: number
+}
+
 /**
  * Parse document structure into clauses
- * Detects headings, numbered sections, and paragraphs
+ * Detects headings, numbered sections (1 → 1.1 → 1.1.2), articles and paragraphs.
+ *
+ * Single pass over the text: lines are found with indexOf and classified once
+ * with precompiled sticky patterns. start_char/end_char are exact offsets into
+ * `text` (content === text.slice(start_char, end_char)) and parent_index links
+ * each clause to its enclosing clause:
+ * - "1.2.3" belongs to "1.2", which belongs to "1."
+ * - top-level numbers belong to the current article, articles to the current heading
+ * - paragraphs belong to the innermost open numbered clause, article or heading
  */
 export function parseDocumentStructure(text: string): ClauseStructure[] {
   const clauses: ClauseStructure[] = []
-  const lines = text.split('\n')
-  
-  let currentPosition = 0
-  let clauseIndex = 0
-
-  for (let i = 0; i < lines.length; i++) {
-    const line = lines[i].trim()
-    if (!line) {
-      currentPosition += lines[i].length + 1
-      continue
+
+  // Open containers, by order_index
+  let headingIndex: number | undefined
+  let articleIndex: number | undefined
+  let numbered: Array<{ segments: number[]; index: number }> = []
+
+  let current = null as OpenClause | null
+
+  const close = () => {
+    if (!current) return
+    const index = clauses.length
+    clauses.push({
+      clause_number: current.number,
+      clause_type: current.kind === 'numbered' || current.kind === 'article'
+        ? 'article'
+        : current.kind === 'heading' ? 'heading' : 'paragraph',
+      heading: current.heading,
+      content: text.slice(current.start, current.end),
+      start_char: current.start,
+      end_char: current.end,
+      order_index: index,
+      parent_index: current.parent,
+    })
+
+    if (current.kind === 'heading') {
+      headingIndex = index
+      articleIndex = undefined
+      numbered = []
+    } else if (current.kind === 'article') {
+      articleIndex = index
+      numbered = []
+    } else if (current.kind === 'numbered') {
+      numbered.push({ segments: current.segments!, index })
     }
+    current = null
+  }
 
-    // Detect numbered clauses (e.g., "1.", "1.1", "Art. 5", "Article 10")
-    const numberedMatch = line.match(/^(\d+\.(?:\d+\.)*|\bArt(?:icle)?\.?\s*\d+)/i)
-    
-    // Detect headings (all caps, or short lines with specific patterns)
-    const isHeading = line.length < 100 && (
-      line === line.toUpperCase() ||
-      /^[A-Z][A-Z\s]+$/.test(line)
-    )
+  const open = (kind: LineKind, start: number, end: number, match: RegExpExecArray | null) => {
+    const clause: OpenClause = { kind, start, end }
 
-    let clauseType = 'paragraph'
-    let clauseNumber = undefined
-    let heading = undefined
-
-    if (numberedMatch) {
-      clauseNumber = numberedMatch[1]
-      clauseType = 'article'
-      heading = line.replace(numberedMatch[0], '').trim()
-    } else if (isHeading) {
-      clauseType = 'heading'
-      heading = line
+    if (match) {
+      clause.number = match[1] || match[0].trim()
+      clause.heading = text.slice(start + match[0].length, end).trim()
+    } else if (kind === 'heading') {
+      clause.heading = text.slice(start, end)
     }
 
-    // Gather content for this clause (current line + following non-heading lines)
-    let content = line
-    let j = i + 1
-    while (j < lines.length && lines[j].trim() && !lines[j].match(/^(\d+\.|\bArt)/i)) {
-      content += '\n' + lines[j].trim()
-      j++
+    if (kind === 'numbered') {
+      const segments = match![1].split('.').filter(Boolean).map(Number)
+      // Innermost open numbered clause whose number is a prefix of this one
+      while (numbered.length > 0 && !isPrefix(numbered[numbered.length - 1].segments, segments)) {
+        numbered.pop()
+      }
+      clause.segments = segments
+      clause.parent = numbered.length > 0 ? numbered[numbered.length - 1].index : articleIndex ?? headingIndex
+    } else if (kind === 'article') {
+      clause.parent = headingIndex
+    } else if (kind === 'text') {
+      clause.parent = numbered.length > 0 ? numbered[numbered.length - 1].index : articleIndex ?? headingIndex
     }
 
-    const startChar = currentPosition
-    const endChar = startChar + content.length
+    current = clause
+  }
 
-    clauses.push({
-      clause_number: clauseNumber,
-      clause_type: clauseType,
-      heading: heading,
-      content: content,
-      start_char: startChar,
-      end_char: endChar,
-      order_index: clauseIndex++,
-    })
+  let position = 0
+  while (position <= text.length) {
+    let lineEnd = text.indexOf('\n', position)
+    if (lineEnd === -1) lineEnd = text.length
+
+    // Trimmed bounds of the line
+    let start = position
+    let end = lineEnd
+    while (start < end && text.charCodeAt(start) <= 32) start++
+    while (end > start && text.charCodeAt(end - 1) <= 32) end--
+
+    if (start === end) {
+      close() // A blank line ends the clause
+    } else {
+      NUMBERED_PATTERN.lastIndex = start
+      const match = NUMBERED_PATTERN.exec(text)
+      let kind: LineKind = 'text'
+      if (match) {
+        kind = match[1] ? 'numbered' : 'article'
+      } else if (end - start < MAX_HEADING_LENGTH) {
+        const line = text.slice(start, end)
+        if (HAS_UPPERCASE.test(line) && !HAS_LOWERCASE.test(line)) kind = 'heading'
+      }
+
+      if (current && kind === 'text') {
+        current.end = end // Continuation line
+      } else {
+        close()
+        open(kind, start, end, match)
+      }
+    }
 
-    currentPosition = endChar + 1
-    i = j - 1 // Move past processed lines
+    position = lineEnd + 1
   }
+  close()
 
   return clauses
 }
 
-/**
- * Detect contract type from content
- */
-export function detectContractType(text: string): string {
-  const lowerText = text.toLowerCase()
-
-  if (lowerText.includes('employment') || lowerText.includes('angajare')) {
-    return 'employment'
-  }
-  if (lowerText.includes('nda') || lowerText.includes('confidentiality') || lowerText.includes('confidențialitate')) {
-    return 'nda'
-  }
-  if (lowerText.includes('license') || lowerText.includes('licență')) {
-    return 'license'
-  }
-  if (lowerText.includes('software development') || lowerText.includes('dezvoltare software')) {
-    return 'software_development'
-  }
-  if (lowerText.includes('lease') || lowerText.includes('închiriere')) {
-    return 'lease'
-  }
-  if (lowerText.includes('purchase') || lowerText.includes('vânzare-cumpărare')) {
-    return 'purchase_agreement'
-  }
-  if (lowerText.includes('partnership') || lowerText.includes('parteneriat')) {
-    return 'partnership'
-  }
-  if (lowerText.includes('loan') || lowerText.includes('credit')) {
-    return 'loan'
+function isPrefix(prefix: number[], segments: number[]): boolean {
+  if (prefix.length >= segments.length) return false
+  for (let i = 0; i < prefix.length; i++) {
+    if (prefix[i] !== segments[i]) return false
   }
+  return true
+}
 
-  // Check for B2B vs B2C indicators
-  if (lowerText.includes('consumer') || lowerText.includes('consumator')) {
-    return 'b2c'
-  }
-  if (lowerText.includes('services') || lowerText.includes('servicii')) {
-    return 'b2b_services'
+/**
+ * Set each clause's page_number from the page its first character falls on
+ */
+export function assignPageNumbers(clauses: ClauseStructure[], pages: PageInfo[]): void {
+  if (pages.length === 0) return
+
+  for (const clause of clauses) {
+    // Last page starting at or before the clause (pages are sorted by offset)
+    let low = 0
+    let high = pages.length - 1
+    while (low < high) {
+      const mid = (low + high + 1) >> 1
+      if (pages[mid].start_char <= clause.start_char) {
+        low = mid
+      } else {
+        high = mid - 1
+      }
+    }
+    clause.page_number = pages[low].page_number
   }
+}
 
-  return 'other'
+/**
+ * Detect contract type from content (keyword rules in lib/analysis/rules)
+ */
+export function detectContractType(text: string): string {
+  return classifyContract(text)
 }
@@ -0,0 +1,63 @@
+/**
+ * Page-by-page PDF text extraction with pdfjs-dist.
+ *
+ * Plain CommonJS so it can be loaded both by the extraction worker thread and
+ * by the in-process fallback in extractor.ts. Only one page's text content is
+ * alive at a time: each page is cleaned up before the next one is loaded.
+ */
+
+/**
+ * @typedef {Object} PdfPageText
+ * @property {number} page_number - 1-based
+ * @property {number} total_pages
+ * @property {string} text
+ */
+
+/**
+ * Open a PDF for page iteration
+ * @param {Uint8Array} data - Taken over by pdfjs (the underlying buffer is detached)
+ * @returns {Promise<{ numPages: number, info: Record<string, any> | undefined, pages: () => AsyncGenerator<PdfPageText>, destroy: () => Promise<void> }>}
+ */
+async function openPdf(data) {
+  const pdfjs = await import('pdfjs-dist/legacy/build/pdf.mjs')
+  const doc = await pdfjs.getDocument({
+    data,
+    disableFontFace: true,
+    isEvalSupported: false,
+    useSystemFonts: false,
+    verbosity: 0,
+  }).promise
+  const metadata = await doc.getMetadata().catch(() => null)
+
+  return {
+    numPages: doc.numPages,
+    info: metadata ? metadata.info : undefined,
+    pages: async function* () {
+      for (let pageNumber = 1; pageNumber <= doc.numPages; pageNumber++) {
+        const page = await doc.getPage(pageNumber)
+        try {
+          const content = await page.getTextContent()
+          yield { page_number: pageNumber, total_pages: doc.numPages, text: pageText(content.items) }
+        } finally {
+          page.cleanup()
+        }
+      }
+    },
+    destroy: () => doc.destroy(),
+  }
+}
+
+/**
+ * Join text items, breaking lines where pdfjs reports an end of line
+ */
+function pageText(items) {
+  let text = ''
+  for (const item of items) {
+    if (typeof item.str !== 'string') continue // marked-content markers
+    text += item.str
+    if (item.hasEOL) text += '\n'
+  }
+  return text.trim()
+}
+
+module.exports = { openPdf }
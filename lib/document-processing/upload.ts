@@ -0,0 +1,68 @@
+/**
+ * Upload validation and storage layout shared by the upload routes
+ */
+
+export const MAX_FILE_SIZE = 50 * 1024 * 1024 // 50MB
+export const ALLOWED_TYPES = [
+  'application/pdf',
+  'application/vnd.openxmlformats-officedocument.wordprocessingml.document', // .docx
+]
+
+const EXTENSION_TYPES: Record<string, string> = {
+  pdf: 'application/pdf',
+  docx: 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+}
+
+/**
+ * MIME type from a filename, for files that arrive without a usable one
+ * (ZIP entries, `application/octet-stream` from scripts)
+ */
+export function contentTypeForFilename(filename: string): string {
+  const ext = filename.split('.').pop()?.toLowerCase() || ''
+  return EXTENSION_TYPES[ext] || 'application/octet-stream'
+}
+
+/**
+ * Validate an uploaded file's type and size
+ * @returns A user-facing error message, or null if the file is acceptable
+ */
+export function validateUpload(file: { type: string; size: number }): string | null {
+  if (!ALLOWED_TYPES.includes(file.type)) {
+    return 'Invalid file type. Only PDF and DOCX files are allowed.'
+  }
+  if (file.size > MAX_FILE_SIZE) {
+    return `File size exceeds ${MAX_FILE_SIZE / 1024 / 1024}MB limit`
+  }
+  return null
+}
+
+/**
+ * Unique storage path under the user's folder (required by the storage RLS policies)
+ */
+export function buildStoragePath(userId: string, filename: string): string {
+  const fileExt = filename.split('.').pop()
+  const fileName = `${Date.now()}-${Math.random().toString(36).substring(7)}.${fileExt}`
+  return `${userId}/${fileName}`
+}
+
+/**
+ * Check a file's first bytes against its declared type
+ * (PDF: `%PDF-`; DOCX is a ZIP container: `PK\x03\x04`)
+ */
+export function matchesFileSignature(type: string, head: Uint8Array): boolean {
+  const starts = (signature: number[]) => signature.every((byte, index) => head[index] === byte)
+  if (type === 'application/pdf') {
+    return starts([0x25, 0x50, 0x44, 0x46, 0x2d])
+  }
+  if (type.includes('wordprocessingml')) {
+    return starts([0x50, 0x4b, 0x03, 0x04])
+  }
+  return false
+}
+
+/**
+ * Storage path issued to this user by buildStoragePath (no traversal, own folder)
+ */
+export function isOwnStoragePath(userId: string, path: string): boolean {
+  return path.startsWith(`${userId}/`) && !path.includes('..') && path.split('/').length === 2
+}
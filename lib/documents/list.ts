@@ -0,0 +1,114 @@
+import type { SupabaseClient } from '@supabase/supabase-js'
+import type { Document, DocumentStats } from '@/lib/types/database'
+
+/**
+ * Document list queries for the dashboard.
+ *
+ * Pages are keyset-paginated on (created_at, id), newest first, which the
+ * idx_documents_user_created index serves directly: a page costs the same
+ * whether it is the first or the hundredth, unlike OFFSET. Only the columns
+ * the list renders are selected (no metadata JSONB).
+ */
+
+export const DOCUMENT_PAGE_SIZE = 50
+
+export const DOCUMENT_LIST_COLUMNS =
+  'id, filename, status, contract_type, word_count, overall_risk_score, compliance_score, created_at'
+
+export type DocumentListItem = Pick<
+  Document,
+  'id' | 'filename' | 'status' | 'contract_type' | 'word_count' | 'overall_risk_score' | 'compliance_score' | 'created_at'
+>
+
+export interface DocumentPage {
+  documents: DocumentListItem[]
+  /** Cursor for the next page, null on the last page */
+  nextCursor: string | null
+}
+
+export type DocumentCounts = Omit<DocumentStats, 'scope' | 'scope_id' | 'updated_at'>
+
+const UUID_PATTERN = /^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$/i
+
+const EMPTY_STATS: DocumentCounts = {
+  total_documents: 0,
+  analyzed_documents: 0,
+  processing_documents: 0,
+  high_risk_documents: 0,
+  high_risk_issues: 0,
+}
+
+/**
+ * Opaque cursor pointing after `document`
+ */
+export function encodeCursor(document: Pick<Document, 'created_at' | 'id'>): string {
+  return Buffer.from(`${document.created_at}|${document.id}`).toString('base64url')
+}
+
+/**
+ * Position encoded by `encodeCursor`, or null for a missing or tampered cursor
+ * (the list then starts from the first page)
+ */
+export function decodeCursor(cursor: string | undefined): { createdAt: string; id: string } | null {
+  if (!cursor) return null
+  const [createdAt, id] = Buffer.from(cursor, 'base64url').toString('utf8').split('|')
+  if (!id || !UUID_PATTERN.test(id) || isNaN(Date.parse(createdAt))) return null
+  return { createdAt, id }
+}
+
+/**
+ * One page of the user's documents, newest first
+ */
+export async function listDocuments(
+  supabase: SupabaseClient,
+  userId: string,
+  cursor?: string,
+  pageSize = DOCUMENT_PAGE_SIZE
+): Promise<DocumentPage> {
+  let query = supabase
+    .from('documents')
+    .select(DOCUMENT_LIST_COLUMNS)
+    .eq('user_id', userId)
+    .order('created_at', { ascending: false })
+    .order('id', { ascending: false })
+    // One extra row tells whether there is a next page without a count(*)
+    .limit(pageSize + 1)
+
+  const after = decodeCursor(cursor)
+  if (after) {
+    const createdAt = `"${after.createdAt}"`
+    query = query.or(`created_at.lt.${createdAt},and(created_at.eq.${createdAt},id.lt.${after.id})`)
+  }
+
+  const { data, error } = await query
+  if (error) throw new Error(`Failed to list documents: ${error.message}`)
+
+  const rows = (data || []) as DocumentListItem[]
+  const documents = rows.slice(0, pageSize)
+  return {
+    documents,
+    nextCursor: rows.length > pageSize ? encodeCursor(documents[documents.length - 1]) : null,
+  }
+}
+
+/**
+ * Dashboard counters for a user or organization, maintained by the
+ * update_document_stats trigger. All zeros before the first upload.
+ */
+export async function getDocumentStats(
+  supabase: SupabaseClient,
+  scope: DocumentStats['scope'],
+  scopeId: string
+): Promise<DocumentCounts> {
+  const { data, error } = await supabase
+    .from('document_stats')
+    .select('total_documents, analyzed_documents, processing_documents, high_risk_documents, high_risk_issues')
+    .eq('scope', scope)
+    .eq('scope_id', scopeId)
+    .maybeSingle()
+
+  if (error) {
+    console.error('[DOCUMENTS] Failed to load stats:', error.message)
+  }
+  return data || EMPTY_STATS
+}
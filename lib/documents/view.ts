@@ -0,0 +1,106 @@
+import type { SupabaseClient } from '@supabase/supabase-js'
+import type { Analysis, Comment, Document, DocumentClause } from '@/lib/types/database'
+
+/**
+ * Data for the document viewer.
+ *
+ * The page loads the document, its latest analysis and the first window of
+ * clauses and comments with one RPC (get_document_view). The viewer renders
+ * only what is on screen and fetches further windows through
+ * /api/documents/[id]/clauses and /api/documents/[id]/comments as the user
+ * scrolls, so an 800-clause contract is not shipped to the browser up front.
+ */
+
+export const INITIAL_CLAUSES = 100
+export const INITIAL_COMMENTS = 50
+export const MAX_RANGE = 200
+
+export const VIEWER_CLAUSE_COLUMNS = 'id, clause_number, heading, content, order_index'
+export const VIEWER_COMMENT_COLUMNS =
+  'id, clause_id, comment_type, risk_level, status, title, content, suggested_revision, is_ai_generated, confidence_score, legal_references, created_at'
+
+export type ViewerClause = Pick<DocumentClause, 'id' | 'clause_number' | 'heading' | 'content' | 'order_index'>
+
+export type ViewerComment = Pick<
+  Comment,
+  | 'id' | 'clause_id' | 'comment_type' | 'risk_level' | 'status' | 'title' | 'content'
+  | 'suggested_revision' | 'is_ai_generated' | 'confidence_score' | 'legal_references' | 'created_at'
+>
+
+export interface DocumentView {
+  document: Omit<Document, 'metadata'>
+  analysis: Omit<Analysis, 'payload' | 'progress' | 'metadata'> | null
+  clauses: ViewerClause[]
+  clause_count: number
+  comments: ViewerComment[]
+  comment_count: number
+  high_risk_count: number
+}
+
+/**
+ * The viewer's initial payload, or null if the user cannot open the document
+ */
+export async function loadDocumentView(supabase: SupabaseClient, documentId: string): Promise<DocumentView | null> {
+  const { data, error } = await supabase.rpc('get_document_view', {
+    p_document_id: documentId,
+    p_clause_limit: INITIAL_CLAUSES,
+    p_comment_limit: INITIAL_COMMENTS,
+  })
+
+  if (error) {
+    console.error('[VIEWER] Failed to load document:', error.message)
+    return null
+  }
+  return data as DocumentView | null
+}
+
+/**
+ * Clamp `?offset=&limit=` from a range request
+ */
+export function parseRange(params: URLSearchParams): { offset: number; limit: number } {
+  const offset = Math.max(0, parseInt(params.get('offset') || '0', 10) || 0)
+  const limit = Math.min(MAX_RANGE, Math.max(1, parseInt(params.get('limit') || '50', 10) || 50))
+  return { offset, limit }
+}
+
+/**
+ * Clauses [offset, offset + limit) in document order
+ */
+export async function listClauseRange(
+  supabase: SupabaseClient,
+  documentId: string,
+  offset: number,
+  limit: number
+): Promise<ViewerClause[]> {
+  const { data, error } = await supabase
+    .from('document_clauses')
+    .select(VIEWER_CLAUSE_COLUMNS)
+    .eq('document_id', documentId)
+    .order('order_index', { ascending: true })
+    .order('id', { ascending: true })
+    .range(offset, offset + limit - 1)
+
+  if (error) throw new Error(`Failed to load clauses: ${error.message}`)
+  return (data || []) as ViewerClause[]
+}
+
+/**
+ * Comments [offset, offset + limit), newest first (the viewer's order)
+ */
+export async function listCommentRange(
+  supabase: SupabaseClient,
+  documentId: string,
+  offset: number,
+  limit: number
+): Promise<ViewerComment[]> {
+  const { data, error } = await supabase
+    .from('comments')
+    .select(VIEWER_COMMENT_COLUMNS)
+    .eq('document_id', documentId)
+    .order('created_at', { ascending: false })
+    .order('id', { ascending: false })
+    .range(offset, offset + limit - 1)
+
+  if (error) throw new Error(`Failed to load comments: ${error.message}`)
+  return (data || []) as ViewerComment[]
+}
@@ -0,0 +1,541 @@
+import { crc32, readZipEntries, writeZip, type ZipEntry, type ZipWriteEntry } from '@/lib/utils/zip'
+import type { Comment, DocumentClause, RiskLevel } from '@/lib/types/database'
+
+/**
+ * DOCX export with the analysis as Word revisions and comments.
+ *
+ * The original DOCX is rewritten part by part: word/document.xml gets a margin
+ * comment on the paragraphs of each commented clause and, for comments with a
+ * suggested revision, the clause text as a tracked deletion (w:del) followed
+ * by the revision as a tracked insertion (w:ins), so the reviewer can accept
+ * or reject each change in Word. Parts that do not change (styles, images,
+ * headers) are copied into the new archive without recompressing them.
+ * PDF uploads have no DOCX to edit; their clauses become a plain document.
+ *
+ * The archive is produced as a stream of chunks (writeZip), paragraph by
+ * paragraph, so the output is never assembled in memory.
+ */
+
+export type ExportClause = Pick<DocumentClause, 'id' | 'content' | 'clause_type' | 'start_char' | 'end_char' | 'order_index'>
+
+export type ExportComment = Pick<
+  Comment,
+  'id' | 'clause_id' | 'title' | 'content' | 'suggested_revision' | 'risk_level' | 'legal_references'
+>
+
+export interface DocxExportOptions {
+  /** Shown as the author of the comments and revisions */
+  author?: string
+  /** Date of the comments and revisions (e.g. when the analysis completed) */
+  date?: Date
+}
+
+export interface DocxExport {
+  /** The DOCX file, chunk by chunk */
+  stream: AsyncGenerator<Buffer>
+  stats: DocxExportStats
+}
+
+export interface DocxExportStats {
+  paragraphs: number
+  /** Clauses whose text could not be found in the document */
+  unmatchedClauses: number
+  comments: number
+  revisions: number
+}
+
+interface Paragraph {
+  /** Position of `<w:p ...>` ... `</w:p>` in document.xml */
+  xmlStart: number
+  xmlEnd: number
+  /** Offset of the paragraph's text in the reconstructed plain text */
+  textStart: number
+}
+
+interface ParagraphEdits {
+  commentStarts: number[]
+  commentEnds: number[]
+  deleted: boolean
+  insertion?: string
+}
+
+const MAIN_NAMESPACE = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+const COMMENTS_TYPE = 'application/vnd.openxmlformats-officedocument.wordprocessingml.comments+xml'
+const COMMENTS_RELATIONSHIP = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships/comments'
+const XML_DECLARATION = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+
+// Matches mammoth.extractRawText, which produced the clause offsets
+const PARAGRAPH_SEPARATOR = '\n\n'
+// Deflated document parts larger than this are refused (zip bombs)
+const MAX_PART_SIZE = 200 * 1024 * 1024
+
+const RISK_LABELS: Record<RiskLevel, string> = {
+  critical: 'Critical',
+  high: 'High Risk',
+  medium: 'Medium Risk',
+  low: 'Low Risk',
+}
+
+/**
+ * The reviewed document as a stream of DOCX (ZIP) chunks. Clauses are matched
+ * to paragraphs up front, so `stats` is complete before the first chunk.
+ * @param original - The uploaded DOCX, or null to build one from the clauses (PDF uploads)
+ */
+export function exportDocx(
+  original: Buffer | null,
+  clauses: ExportClause[],
+  comments: ExportComment[],
+  options: DocxExportOptions = {}
+): DocxExport {
+  const entries = original ? readZipEntries(original, MAX_PART_SIZE) : skeletonEntries(clauses)
+  const byName = new Map(entries.map(entry => [entry.name, entry]))
+  const documentName = findMainDocument(byName)
+  const documentEntry = byName.get(documentName)
+  if (!documentEntry) {
+    throw new Error('Invalid DOCX: main document part not found')
+  }
+
+  const folder = documentName.slice(0, documentName.lastIndexOf('/') + 1)
+  const relsName = `${folder}_rels/${documentName.slice(folder.length)}.rels`
+  const commentsName = `${folder}comments.xml`
+  const existingComments = byName.get(commentsName)?.read().toString('utf8')
+
+  const xml = documentEntry.read().toString('utf8')
+  const paragraphs = scanParagraphs(xml)
+  const attrs = `w:author="${escapeXml(options.author || 'Contract Review AI')}" w:date="${(options.date || new Date()).toISOString().replace(/\.\d+Z$/, 'Z')}"`
+
+  // Annotation ids (comments, insertions, deletions) continue after the largest one in use
+  let nextId = Math.max(maxId(xml), existingComments ? maxId(existingComments) : -1) + 1
+  const edits = planEdits(paragraphs.list, paragraphs.text, clauses, comments, () => nextId++)
+
+  const entriesOut: ZipWriteEntry[] = []
+  for (const entry of entries) {
+    if (entry.name === documentName) {
+      entriesOut.push({ name: entry.name, data: writeDocument(xml, paragraphs.list, edits.byParagraph, attrs, () => nextId++) })
+    } else if (entry.name === commentsName) {
+      entriesOut.push({ name: entry.name, data: writeComments(existingComments!, edits.comments, attrs) })
+    } else if (edits.comments.length > 0 && entry.name === '[Content_Types].xml') {
+      entriesOut.push({ name: entry.name, data: addCommentsContentType(entry.read().toString('utf8'), commentsName) })
+    } else if (edits.comments.length > 0 && entry.name === relsName) {
+      entriesOut.push({ name: entry.name, data: addCommentsRelationship(entry.read().toString('utf8')) })
+    } else {
+      entriesOut.push({ name: entry.name, raw: entry.readRaw() })
+    }
+  }
+
+  if (edits.comments.length > 0 && !existingComments) {
+    entriesOut.push({ name: commentsName, data: writeComments(null, edits.comments, attrs) })
+    if (!byName.has(relsName)) {
+      entriesOut.push({ name: relsName, data: addCommentsRelationship(null) })
+    }
+  }
+
+  return {
+    stream: writeZip(entriesOut),
+    stats: {
+      paragraphs: paragraphs.list.length,
+      unmatchedClauses: edits.unmatched,
+      comments: edits.comments.length,
+      revisions: edits.revisions,
+    },
+  }
+}
+
+/**
+ * Top-level paragraphs of document.xml (table cells included; paragraphs
+ * nested in text boxes belong to their anchor paragraph) and the plain text
+ * they make up, laid out like mammoth's raw text
+ */
+export function scanParagraphs(xml: string): { list: Paragraph[]; text: string } {
+  const list: Paragraph[] = []
+  const text: string[] = []
+  let textLength = 0
+  const tags = /<(\/?)w:p(?=[\s>/])[^>]*?(\/?)>/g
+  let depth = 0
+  let start = 0
+  let match: RegExpExecArray | null
+
+  while ((match = tags.exec(xml))) {
+    if (match[2]) {
+      // <w:p/>: an empty paragraph
+      if (depth === 0) {
+        list.push({ xmlStart: match.index, xmlEnd: tags.lastIndex, textStart: textLength })
+        text.push(PARAGRAPH_SEPARATOR)
+        textLength += PARAGRAPH_SEPARATOR.length
+      }
+    } else if (!match[1]) {
+      if (depth++ === 0) start = match.index
+    } else if (--depth === 0) {
+      const paragraphText = paragraphPlainText(xml.slice(start, tags.lastIndex)) + PARAGRAPH_SEPARATOR
+      list.push({ xmlStart: start, xmlEnd: tags.lastIndex, textStart: textLength })
+      text.push(paragraphText)
+      textLength += paragraphText.length
+    }
+  }
+
+  return { list, text: text.join('') }
+}
+
+function paragraphPlainText(paragraph: string): string {
+  // Tab stops in the paragraph properties are not text
+  const body = paragraph.replace(/<w:pPr>[\s\S]*?<\/w:pPr>/, '')
+  let text = ''
+  const pieces = /<w:t(?:\s[^>]*)?>([^<]*)<\/w:t>|<w:(tab|br|cr)(?:\s[^>]*)?\/>/g
+  let match: RegExpExecArray | null
+  while ((match = pieces.exec(body))) {
+    text += match[1] !== undefined ? unescapeXml(match[1]) : match[2] === 'tab' ? '\t' : '\n'
+  }
+  return text
+}
+
+/**
+ * Locate each clause in the paragraphs and decide what every paragraph gets.
+ * Stored offsets are tried first; if the text there differs (a different
+ * extractor version, a PDF rebuilt from clauses) the clause is searched for
+ * with whitespace collapsed, moving forward through the document.
+ */
+function planEdits(
+  paragraphs: Paragraph[],
+  text: string,
+  clauses: ExportClause[],
+  comments: ExportComment[],
+  newId: () => number
+): {
+  byParagraph: Map<number, ParagraphEdits>
+  comments: Array<ExportComment & { commentId: number; revisionApplied: boolean }>
+  revisions: number
+  unmatched: number
+} {
+  // Only built once a clause is not where its offsets say
+  let normalized: { text: string; map: Int32Array } | undefined
+  const ranges = new Map<string, [number, number]>()
+  const owners = new Map<number, number>() // paragraph -> clauses touching it
+  let cursor = 0
+  let unmatched = 0
+
+  for (const clause of [...clauses].sort((a, b) => a.order_index - b.order_index)) {
+    let start = -1
+    let end = -1
+    if (text.slice(clause.start_char, clause.end_char) === clause.content) {
+      start = clause.start_char
+      end = clause.end_char
+    } else {
+      normalized ??= normalizeWithMap(text)
+      const needle = normalizeWithMap(clause.content).text
+      let found = needle ? normalized.text.indexOf(needle, cursor) : -1
+      if (found === -1 && needle) found = normalized.text.indexOf(needle)
+      if (found !== -1) {
+        cursor = found + needle.length
+        start = normalized.map[found]
+        end = normalized.map[found + needle.length - 1] + 1
+      }
+    }
+    if (start === -1) {
+      unmatched++
+      continue
+    }
+
+    const first = paragraphAt(paragraphs, start)
+    const last = paragraphAt(paragraphs, Math.max(start, end - 1))
+    ranges.set(clause.id, [first, last])
+    for (let i = first; i <= last; i++) owners.set(i, (owners.get(i) || 0) + 1)
+  }
+
+  const byParagraph = new Map<number, ParagraphEdits>()
+  const edit = (index: number) => {
+    let edits = byParagraph.get(index)
+    if (!edits) byParagraph.set(index, edits = { commentStarts: [], commentEnds: [], deleted: false })
+    return edits
+  }
+
+  const planned: Array<ExportComment & { commentId: number; revisionApplied: boolean }> = []
+  const revised = new Set<string>()
+  let revisions = 0
+
+  for (const comment of comments) {
+    // Comments without a clause (or whose clause was not found) go on the first paragraph
+    const [first, last] = (comment.clause_id && ranges.get(comment.clause_id)) || [0, 0]
+    if (paragraphs.length === 0) break
+
+    const commentId = newId()
+    edit(first).commentStarts.push(commentId)
+    edit(last).commentEnds.push(commentId)
+
+    // One tracked replacement per clause, and only when its paragraphs hold
+    // nothing else: replacing a shared paragraph would delete a neighbour
+    let revisionApplied = false
+    const revision = comment.suggested_revision?.trim()
+    if (revision && comment.clause_id && ranges.has(comment.clause_id) && !revised.has(comment.clause_id)) {
+      let exclusive = true
+      for (let i = first; i <= last && exclusive; i++) exclusive = owners.get(i) === 1
+      if (exclusive) {
+        for (let i = first; i <= last; i++) edit(i).deleted = true
+        edit(last).insertion = revision
+        revised.add(comment.clause_id)
+        revisionApplied = true
+        revisions++
+      }
+    }
+    planned.push({ ...comment, commentId, revisionApplied })
+  }
+
+  return { byParagraph, comments: planned, revisions, unmatched }
+}
+
+/**
+ * Rewrite document.xml paragraph by paragraph
+ */
+function* writeDocument(
+  xml: string,
+  paragraphs: Paragraph[],
+  edits: Map<number, ParagraphEdits>,
+  attrs: string,
+  newId: () => number
+): Generator<string> {
+  let position = 0
+  for (let i = 0; i < paragraphs.length; i++) {
+    const paragraphEdits = edits.get(i)
+    if (!paragraphEdits) continue
+    const { xmlStart, xmlEnd } = paragraphs[i]
+    yield xml.slice(position, xmlStart)
+    yield editParagraph(xml.slice(xmlStart, xmlEnd), paragraphEdits, attrs, newId)
+    position = xmlEnd
+  }
+  yield xml.slice(position)
+}
+
+function editParagraph(paragraph: string, edits: ParagraphEdits, attrs: string, newId: () => number): string {
+  // <w:p/> has no body to annotate; give it one
+  if (paragraph.endsWith('/>')) paragraph = `${paragraph.slice(0, -2)}></w:p>`
+
+  const open = paragraph.indexOf('>') + 1
+  const propertiesEnd = paragraph.indexOf('</w:pPr>')
+  const bodyStart = paragraph.startsWith('<w:pPr', open) && propertiesEnd !== -1 ? propertiesEnd + 8 : open
+  const bodyEnd = paragraph.lastIndexOf('</w:p>')
+  let body = paragraph.slice(bodyStart, bodyEnd)
+
+  if (edits.deleted) body = deleteRuns(body, attrs, newId)
+
+  let before = ''
+  for (const id of edits.commentStarts) before += `<w:commentRangeStart w:id="${id}"/>`
+
+  let after = ''
+  if (edits.insertion) {
+    after += `<w:ins w:id="${newId()}" ${attrs}><w:r>${textRuns(edits.insertion)}</w:r></w:ins>`
+  }
+  for (const id of edits.commentEnds) {
+    after += `<w:commentRangeEnd w:id="${id}"/><w:r><w:commentReference w:id="${id}"/></w:r>`
+  }
+
+  return paragraph.slice(0, bodyStart) + before + body + after + paragraph.slice(bodyEnd)
+}
+
+/**
+ * Mark every run of a paragraph body as a tracked deletion. Runs already
+ * inside a revision are left alone.
+ */
+function deleteRuns(body: string, attrs: string, newId: () => number): string {
+  const tags = /<(\/?)w:(r|ins|del|moveFrom|moveTo)(?=[\s>/])[^>]*?(\/?)>/g
+  let output = ''
+  let position = 0
+  let runDepth = 0
+  let revisionDepth = 0
+  let runStart = 0
+  let match: RegExpExecArray | null
+
+  while ((match = tags.exec(body))) {
+    const [, closing, name, selfClosing] = match
+    if (selfClosing) continue
+    if (name !== 'r') {
+      revisionDepth += closing ? -1 : 1
+      continue
+    }
+    if (!closing) {
+      if (runDepth++ === 0) runStart = match.index
+    } else if (--runDepth === 0 && revisionDepth === 0) {
+      const run = body.slice(runStart, tags.lastIndex)
+        .replace(/<(\/?)w:t(?=[\s>/])/g, '<$1w:delText')
+        .replace(/<(\/?)w:instrText(?=[\s>/])/g, '<$1w:delInstrText')
+      output += body.slice(position, runStart) + `<w:del w:id="${newId()}" ${attrs}>${run}</w:del>`
+      position = tags.lastIndex
+    }
+  }
+  return output + body.slice(position)
+}
+
+function* writeComments(
+  existing: string | null,
+  comments: Array<ExportComment & { commentId: number; revisionApplied: boolean }>,
+  attrs: string
+): Generator<string> {
+  const close = existing ? existing.lastIndexOf('</w:comments>') : -1
+  if (existing && close !== -1) {
+    yield existing.slice(0, close)
+  } else {
+    yield `${XML_DECLARATION}<w:comments xmlns:w="${MAIN_NAMESPACE}">`
+  }
+
+  for (const comment of comments) {
+    const label = RISK_LABELS[comment.risk_level || 'low'] || RISK_LABELS.low
+    let body = `<w:p><w:r><w:rPr><w:b/></w:rPr>${textRuns(`[${label}] ${comment.title}`)}</w:r></w:p>`
+    body += `<w:p><w:r>${textRuns(comment.content)}</w:r></w:p>`
+    // A revision that could not be tracked is still offered in the comment
+    if (comment.suggested_revision && !comment.revisionApplied) {
+      body += `<w:p><w:r><w:rPr><w:i/></w:rPr>${textRuns(`Suggested revision: ${comment.suggested_revision}`)}</w:r></w:p>`
+    }
+    for (const reference of comment.legal_references || []) {
+      body += `<w:p><w:r>${textRuns(`${reference.law} - ${reference.article}`)}</w:r></w:p>`
+    }
+    yield `<w:comment w:id="${comment.commentId}" ${attrs} w:initials="AI">${body}</w:comment>`
+  }
+
+  yield '</w:comments>'
+}
+
+function addCommentsContentType(types: string, commentsName: string): string {
+  if (types.includes(`PartName="/${commentsName}"`)) return types
+  const close = types.lastIndexOf('</Types>')
+  return `${types.slice(0, close)}<Override PartName="/${commentsName}" ContentType="${COMMENTS_TYPE}"/>${types.slice(close)}`
+}
+
+function addCommentsRelationship(rels: string | null): string {
+  if (rels?.includes(COMMENTS_RELATIONSHIP)) return rels
+  const base = rels || `${XML_DECLARATION}<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships"></Relationships>`
+  const close = base.lastIndexOf('</Relationships>')
+  let id = 1
+  while (base.includes(`Id="rId${id}"`)) id++
+  return `${base.slice(0, close)}<Relationship Id="rId${id}" Type="${COMMENTS_RELATIONSHIP}" Target="comments.xml"/>${base.slice(close)}`
+}
+
+/**
+ * Path of the main document part, from the package relationships
+ */
+function findMainDocument(entries: Map<string, ZipEntry>): string {
+  const rels = entries.get('_rels/.rels')?.read().toString('utf8') || ''
+  const relationship = rels.match(/<Relationship\b[^>]*Type="[^"]*\/officeDocument"[^>]*>/)?.[0]
+  const target = relationship?.match(/Target="\/?([^"]+)"/)?.[1]
+  return target || 'word/document.xml'
+}
+
+/**
+ * A minimal DOCX with one paragraph per clause, for documents uploaded as PDF
+ */
+function skeletonEntries(clauses: ExportClause[]): ZipEntry[] {
+  const paragraphs = [...clauses]
+    .sort((a, b) => a.order_index - b.order_index)
+    .map(clause => {
+      const properties = clause.clause_type === 'heading' ? '<w:rPr><w:b/></w:rPr>' : ''
+      return `<w:p><w:r>${properties}${textRuns(clause.content)}</w:r></w:p>`
+    })
+    .join('')
+
+  const parts: Record<string, string> = {
+    '[Content_Types].xml': `${XML_DECLARATION}<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">`
+      + '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+      + '<Default Extension="xml" ContentType="application/xml"/>'
+      + '<Override PartName="/word/document.xml" ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+      + '</Types>',
+    '_rels/.rels': `${XML_DECLARATION}<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">`
+      + '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="word/document.xml"/>'
+      + '</Relationships>',
+    'word/document.xml': `${XML_DECLARATION}<w:document xmlns:w="${MAIN_NAMESPACE}"><w:body>${paragraphs}`
+      + '<w:sectPr><w:pgSz w:w="11906" w:h="16838"/><w:pgMar w:top="1440" w:right="1440" w:bottom="1440" w:left="1440" w:header="708" w:footer="708" w:gutter="0"/></w:sectPr>'
+      + '</w:body></w:document>',
+  }
+
+  return Object.entries(parts).map(([name, content]) => {
+    const data = Buffer.from(content, 'utf8')
+    return {
+      name,
+      size: data.length,
+      read: () => data,
+      // Stored uncompressed; these parts are a few hundred bytes
+      readRaw: () => ({ method: 0, crc32: crc32(data), size: data.length, compressedSize: data.length, data }),
+    }
+  })
+}
+
+/**
+ * Run content for `text`: line breaks become <w:br/>, tabs <w:tab/>
+ */
+function textRuns(text: string): string {
+  return text
+    .split('\n')
+    .map(line => line
+      .split('\t')
+      .map(piece => piece ? `<w:t xml:space="preserve">${escapeXml(piece)}</w:t>` : '')
+      .join('<w:tab/>'))
+    .join('<w:br/>')
+}
+
+function paragraphAt(paragraphs: Paragraph[], offset: number): number {
+  let low = 0
+  let high = paragraphs.length - 1
+  while (low < high) {
+    const mid = (low + high + 1) >> 1
+    if (paragraphs[mid].textStart <= offset) low = mid
+    else high = mid - 1
+  }
+  return low
+}
+
+/**
+ * `text` with whitespace runs collapsed to one space, and for every
+ * character of the result its offset in `text`
+ */
+function normalizeWithMap(text: string): { text: string; map: Int32Array } {
+  const map = new Int32Array(text.length)
+  const pieces: string[] = []
+  let length = 0
+  let runStart = -1 // Start of the current run of kept characters
+  let space = true // Drops leading whitespace
+  for (let i = 0; i < text.length; i++) {
+    const code = text.charCodeAt(i)
+    if (code <= 32 || code === 0xa0) {
+      if (runStart !== -1) {
+        pieces.push(text.slice(runStart, i))
+        runStart = -1
+      }
+      if (space) continue
+      space = true
+      pieces.push(' ')
+    } else {
+      if (runStart === -1) runStart = i
+      space = false
+    }
+    map[length++] = i
+  }
+  if (runStart !== -1) pieces.push(text.slice(runStart))
+  if (space && length > 0) {
+    pieces.pop()
+    length--
+  }
+  return { text: pieces.join(''), map: map.subarray(0, length) }
+}
+
+function maxId(xml: string): number {
+  let max = -1
+  const ids = /\bw:id="(\d+)"/g
+  let match: RegExpExecArray | null
+  while ((match = ids.exec(xml))) max = Math.max(max, parseInt(match[1], 10))
+  return max
+}
+
+function escapeXml(text: string): string {
+  return text
+    .replace(/&/g, '&amp;')
+    .replace(/</g, '&lt;')
+    .replace(/>/g, '&gt;')
+    .replace(/"/g, '&quot;')
+    // Control characters are not allowed in XML 1.0
+    .replace(/[\u0000-\u0008\u000b\u000c\u000e-\u001f]/g, '')
+}
+
+function unescapeXml(text: string): string {
+  return text.replace(/&(#x[0-9a-f]+|#\d+|amp|lt|gt|quot|apos);/gi, (entity, name: string) => {
+    if (name[0] === '#') {
+      return String.fromCodePoint(name[1] === 'x' || name[1] === 'X' ? parseInt(name.slice(2), 16) : parseInt(name.slice(1), 10))
+    }
+    return { amp: '&', lt: '<', gt: '>', quot: '"', apos: "'" }[name.toLowerCase()] || entity
+  })
+}
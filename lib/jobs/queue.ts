@@ -0,0 +1,87 @@
+import type { AIProvider, Analysis, AnalysisStatus } from '@/lib/types/database'
+
+/**
+ * An analysis job is an `analyses` row that has not finished yet.
+ * The job id is the analysis id, so the UI can follow a job by polling
+ * the same record it will eventually display.
+ */
+export type AnalysisJob = Analysis
+
+export interface EnqueueJobInput {
+  document_id: string
+  requested_by: string
+  ai_provider: AIProvider
+  model_version: string
+  payload?: Record<string, any>
+  max_attempts?: number
+}
+
+export interface FailJobOptions {
+  /** Delay before the job becomes runnable again */
+  retryDelayMs?: number
+  /** Skip remaining attempts (bad input, unsupported file, ...) */
+  permanent?: boolean
+}
+
+/**
+ * Abstract Job Queue Interface
+ */
+export interface IJobQueue {
+  enqueue(input: EnqueueJobInput): Promise<AnalysisJob>
+  /** Enqueue several jobs at once (one insert for database-backed queues) */
+  enqueueMany(inputs: EnqueueJobInput[]): Promise<AnalysisJob[]>
+  /** Claim the next runnable job for `leaseMs`, or null if the queue is empty */
+  lease(workerId: string, leaseMs: number): Promise<AnalysisJob | null>
+  /** Renew a lease; returns false if the worker no longer owns the job, throws if the renewal failed */
+  extendLease(jobId: string, workerId: string, leaseMs: number): Promise<boolean>
+  complete(jobId: string, workerId: string): Promise<void>
+  /** Record a failed attempt; returns the resulting status (`pending` when retried) */
+  fail(jobId: string, workerId: string, error: string, options?: FailJobOptions): Promise<AnalysisStatus>
+  get(jobId: string): Promise<AnalysisJob | null>
+  /** Number of jobs waiting to be leased */
+  depth(): Promise<number>
+}
+
+/**
+ * Thrown by job handlers for failures that retrying cannot fix
+ */
+export class PermanentJobError extends Error {
+  constructor(message: string) {
+    super(message)
+    this.name = 'PermanentJobError'
+  }
+}
+
+export type JobQueueKind = 'supabase' | 'memory'
+
+/**
+ * Factory to create job queues
+ */
+export function createJobQueue(kind: JobQueueKind): IJobQueue {
+  switch (kind) {
+    case 'supabase':
+      return new SupabaseJobQueue(createServiceClient())
+    case 'memory':
+      return new InMemoryJobQueue()
+    default:
+      throw new Error(`Unsupported job queue: ${kind}`)
+  }
+}
+
+const globalForQueue = globalThis as unknown as { analysisJobQueue?: IJobQueue }
+
+/**
+ * Get the process-wide job queue from environment
+ */
+export function getDefaultQueue(): IJobQueue {
+  if (!globalForQueue.analysisJobQueue) {
+    const kind = (process.env.JOB_QUEUE || 'supabase') as JobQueueKind
+    globalForQueue.analysisJobQueue = createJobQueue(kind)
+  }
+  return globalForQueue.analysisJobQueue
+}
+
+// Queue implementations
+import { createServiceClient } from '@/lib/supabase/server'
+import { SupabaseJobQueue } from './queues/supabase'
+import { InMemoryJobQueue } from './queues/memory'
@@ -0,0 +1,125 @@
+import { randomUUID } from 'crypto'
+import type { AnalysisJob, EnqueueJobInput, FailJobOptions, IJobQueue } from '../queue'
+import type { AnalysisStatus } from '@/lib/types/database'
+
+/**
+ * In-process queue for tests and benchmarks.
+ * Jobs live only in memory and are not written to the `analyses` table, so the
+ * analyze status route and the pipeline's progress writes find no row: never
+ * deploy with JOB_QUEUE=memory.
+ */
+export class InMemoryJobQueue implements IJobQueue {
+  private jobs = new Map<string, AnalysisJob>()
+
+  async enqueue(input: EnqueueJobInput): Promise<AnalysisJob> {
+    const now = new Date().toISOString()
+    const job: AnalysisJob = {
+      id: randomUUID(),
+      document_id: input.document_id,
+      ai_provider: input.ai_provider,
+      model_version: input.model_version,
+      status: 'pending',
+      started_at: now,
+      issues_found: 0,
+      high_risk_count: 0,
+      medium_risk_count: 0,
+      low_risk_count: 0,
+      requested_by: input.requested_by,
+      attempts: 0,
+      max_attempts: input.max_attempts ?? 3,
+      run_after: now,
+      payload: input.payload || {},
+      progress: {},
+      metadata: {},
+    }
+    this.jobs.set(job.id, job)
+    return { ...job }
+  }
+
+  async enqueueMany(inputs: EnqueueJobInput[]): Promise<AnalysisJob[]> {
+    return Promise.all(inputs.map(input => this.enqueue(input)))
+  }
+
+  async lease(workerId: string, leaseMs: number): Promise<AnalysisJob | null> {
+    const now = Date.now()
+
+    let next: AnalysisJob | null = null
+    for (const job of this.jobs.values()) {
+      const expired = job.status === 'in_progress' && Date.parse(job.lease_expires_at!) < now
+      if (expired && job.attempts >= job.max_attempts) {
+        this.finish(job, 'failed', job.error_message || 'Worker lease expired')
+        continue
+      }
+
+      const runnable = (job.status === 'pending' && Date.parse(job.run_after) <= now) || expired
+      if (runnable && (!next || job.run_after < next.run_after)) {
+        next = job
+      }
+    }
+
+    if (!next) return null
+
+    next.status = 'in_progress'
+    next.attempts += 1
+    next.leased_by = workerId
+    next.lease_expires_at = new Date(now + leaseMs).toISOString()
+    next.started_at = new Date(now).toISOString()
+    return { ...next }
+  }
+
+  async extendLease(jobId: string, workerId: string, leaseMs: number): Promise<boolean> {
+    const job = this.owned(jobId, workerId)
+    if (!job) return false
+    job.lease_expires_at = new Date(Date.now() + leaseMs).toISOString()
+    return true
+  }
+
+  async complete(jobId: string, workerId: string): Promise<void> {
+    const job = this.owned(jobId, workerId)
+    if (job) this.finish(job, 'completed')
+  }
+
+  async fail(jobId: string, workerId: string, error: string, options: FailJobOptions = {}): Promise<AnalysisStatus> {
+    const job = this.owned(jobId, workerId)
+    if (!job) return this.jobs.get(jobId)?.status || 'failed'
+
+    if (options.permanent || job.attempts >= job.max_attempts) {
+      this.finish(job, 'failed', error)
+      return 'failed'
+    }
+
+    job.status = 'pending'
+    job.error_message = error
+    job.leased_by = undefined
+    job.lease_expires_at = undefined
+    job.run_after = new Date(Date.now() + (options.retryDelayMs || 0)).toISOString()
+    return 'pending'
+  }
+
+  async get(jobId: string): Promise<AnalysisJob | null> {
+    const job = this.jobs.get(jobId)
+    return job ? { ...job } : null
+  }
+
+  async depth(): Promise<number> {
+    let count = 0
+    for (const job of this.jobs.values()) {
+      if (job.status === 'pending') count++
+    }
+    return count
+  }
+
+  private owned(jobId: string, workerId: string): AnalysisJob | null {
+    const job = this.jobs.get(jobId)
+    if (!job || job.status !== 'in_progress' || job.leased_by !== workerId) return null
+    return job
+  }
+
+  private finish(job: AnalysisJob, status: AnalysisStatus, error?: string) {
+    job.status = status
+    job.completed_at = new Date().toISOString()
+    job.leased_by = undefined
+    job.lease_expires_at = undefined
+    if (error) job.error_message = error
+  }
+}
@@ -0,0 +1,140 @@
+import type { SupabaseClient } from '@supabase/supabase-js'
+import type { AnalysisJob, EnqueueJobInput, FailJobOptions, IJobQueue } from '../queue'
+import type { AnalysisStatus } from '@/lib/types/database'
+
+/**
+ * Postgres-backed queue on top of the `analyses` table.
+ * Leasing goes through the `lease_analysis_job` function (FOR UPDATE SKIP LOCKED),
+ * every other transition is a conditional update on `leased_by`, so a worker
+ * that lost its lease can never overwrite the state written by its successor.
+ */
+export class SupabaseJobQueue implements IJobQueue {
+  constructor(private supabase: SupabaseClient) {}
+
+  async enqueue(input: EnqueueJobInput): Promise<AnalysisJob> {
+    const [job] = await this.enqueueMany([input])
+    return job
+  }
+
+  async enqueueMany(inputs: EnqueueJobInput[]): Promise<AnalysisJob[]> {
+    if (inputs.length === 0) return []
+
+    const { data, error } = await this.supabase
+      .from('analyses')
+      .insert(inputs.map(input => ({
+        document_id: input.document_id,
+        ai_provider: input.ai_provider,
+        model_version: input.model_version,
+        requested_by: input.requested_by,
+        max_attempts: input.max_attempts ?? 3,
+        payload: input.payload || {},
+        status: 'pending',
+      })))
+      .select()
+
+    if (error) {
+      throw new Error('Failed to enqueue analysis job: ' + error.message)
+    }
+    return data
+  }
+
+  async lease(workerId: string, leaseMs: number): Promise<AnalysisJob | null> {
+    const { data, error } = await this.supabase.rpc('lease_analysis_job', {
+      p_worker_id: workerId,
+      p_lease_seconds: Math.ceil(leaseMs / 1000),
+    })
+
+    if (error) {
+      throw new Error('Failed to lease analysis job: ' + error.message)
+    }
+    return (data as AnalysisJob[] | null)?.[0] || null
+  }
+
+  async extendLease(jobId: string, workerId: string, leaseMs: number): Promise<boolean> {
+    const { data, error } = await this.supabase
+      .from('analyses')
+      .update({ lease_expires_at: new Date(Date.now() + leaseMs).toISOString() })
+      .eq('id', jobId)
+      .eq('leased_by', workerId)
+      .eq('status', 'in_progress')
+      .select('id')
+
+    if (error) {
+      // Not a lost lease: the caller retries before the lease runs out
+      throw new Error('Failed to extend lease: ' + error.message)
+    }
+    return (data?.length || 0) > 0
+  }
+
+  async complete(jobId: string, workerId: string): Promise<void> {
+    const { error } = await this.supabase
+      .from('analyses')
+      .update({
+        status: 'completed',
+        completed_at: new Date().toISOString(),
+        leased_by: null,
+        lease_expires_at: null,
+        error_message: null,
+      })
+      .eq('id', jobId)
+      .eq('leased_by', workerId)
+
+    if (error) {
+      throw new Error('Failed to complete analysis job: ' + error.message)
+    }
+  }
+
+  async fail(jobId: string, workerId: string, message: string, options: FailJobOptions = {}): Promise<AnalysisStatus> {
+    const job = await this.get(jobId)
+    if (!job || job.leased_by !== workerId) {
+      return job?.status || 'failed'
+    }
+
+    const retry = !options.permanent && job.attempts < job.max_attempts
+    const update = retry
+      ? {
+          status: 'pending' as const,
+          run_after: new Date(Date.now() + (options.retryDelayMs || 0)).toISOString(),
+          leased_by: null,
+          lease_expires_at: null,
+          error_message: message,
+        }
+      : {
+          status: 'failed' as const,
+          completed_at: new Date().toISOString(),
+          leased_by: null,
+          lease_expires_at: null,
+          error_message: message,
+        }
+
+    const { error } = await this.supabase
+      .from('analyses')
+      .update(update)
+      .eq('id', jobId)
+      .eq('leased_by', workerId)
+
+    if (error) {
+      throw new Error('Failed to record analysis job failure: ' + error.message)
+    }
+    return update.status
+  }
+
+  async get(jobId: string): Promise<AnalysisJob | null> {
+    const { data } = await this.supabase
+      .from('analyses')
+      .select('*')
+      .eq('id', jobId)
+      .maybeSingle()
+
+    return data
+  }
+
+  async depth(): Promise<number> {
+    const { count } = await this.supabase
+      .from('analyses')
+      .select('id', { count: 'exact', head: true })
+      .eq('status', 'pending')
+
+    return count || 0
+  }
+}
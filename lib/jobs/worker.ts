@@ -0,0 +1,190 @@
+import { randomUUID } from 'crypto'
+import { PermanentJobError } from './queue'
+import type { AnalysisJob, IJobQueue } from './queue'
+import { TIMEOUTS } from '@/lib/utils/timeout'
+
+export interface JobContext {
+  workerId: string
+  /** Aborted when the worker loses its lease; handlers should stop writing */
+  signal: AbortSignal
+}
+
+export type JobHandler = (job: AnalysisJob, context: JobContext) => Promise<void>
+
+export interface WorkerPoolOptions {
+  /** Jobs processed in parallel by this pool */
+  concurrency?: number
+  leaseMs?: number
+  /** Idle poll interval for long-running pools (`start`) */
+  pollIntervalMs?: number
+  /** First retry delay; doubles with every attempt */
+  retryBaseDelayMs?: number
+  retryMaxDelayMs?: number
+  workerId?: string
+  /** Called after every failed attempt (`willRetry` is false on the final one) */
+  onJobFailed?: (job: AnalysisJob, error: Error, willRetry: boolean) => Promise<void> | void
+}
+
+export interface DrainOptions {
+  /** Stop leasing new jobs after this timestamp (ms since epoch) */
+  deadline?: number
+  /** Stop after this many jobs in total */
+  maxJobs?: number
+}
+
+export interface DrainStats {
+  processed: number
+  succeeded: number
+  retried: number
+  failed: number
+}
+
+/**
+ * Pool of job slots that drain an IJobQueue.
+ *
+ * Each slot leases one job at a time and renews the lease while the handler
+ * runs. `drain` suits serverless invocations (cron, `after()`), `start`/`stop`
+ * suit a long-lived worker process.
+ */
+export class WorkerPool {
+  readonly workerId: string
+  private concurrency: number
+  private leaseMs: number
+  private pollIntervalMs: number
+  private retryBaseDelayMs: number
+  private retryMaxDelayMs: number
+  private onJobFailed?: WorkerPoolOptions['onJobFailed']
+  private running = false
+  private loops: Promise<void>[] = []
+  private active = 0
+
+  constructor(
+    private queue: IJobQueue,
+    private handler: JobHandler,
+    options: WorkerPoolOptions = {}
+  ) {
+    this.workerId = options.workerId || `worker-${randomUUID().slice(0, 8)}`
+    this.concurrency = Math.max(1, options.concurrency || 1)
+    this.leaseMs = options.leaseMs || TIMEOUTS.JOB_LEASE
+    this.pollIntervalMs = options.pollIntervalMs || 2_000
+    this.retryBaseDelayMs = options.retryBaseDelayMs || 5_000
+    this.retryMaxDelayMs = options.retryMaxDelayMs || 300_000
+    this.onJobFailed = options.onJobFailed
+  }
+
+  /**
+   * Process jobs until the queue is empty, the deadline passes or maxJobs is reached
+   */
+  async drain(options: DrainOptions = {}): Promise<DrainStats> {
+    const stats: DrainStats = { processed: 0, succeeded: 0, retried: 0, failed: 0 }
+    const deadline = options.deadline ?? Infinity
+    const maxJobs = options.maxJobs ?? Infinity
+    let claimed = 0
+
+    const slot = async () => {
+      while (Date.now() < deadline && claimed < maxJobs) {
+        claimed++
+        const job = await this.queue.lease(this.workerId, this.leaseMs)
+        if (!job) {
+          claimed--
+          return
+        }
+        const outcome = await this.process(job)
+        stats.processed++
+        stats[outcome]++
+      }
+    }
+
+    await Promise.all(Array.from({ length: this.concurrency }, slot))
+    return stats
+  }
+
+  /**
+   * Poll the queue continuously until `stop` is called
+   */
+  start(): void {
+    if (this.running) return
+    this.running = true
+
+    const loop = async () => {
+      while (this.running) {
+        try {
+          const job = await this.queue.lease(this.workerId, this.leaseMs)
+          if (job) {
+            await this.process(job)
+            continue
+          }
+        } catch (error) {
+          console.error('[WORKER] Lease error:', error)
+        }
+        await sleep(this.pollIntervalMs)
+      }
+    }
+
+    this.loops = Array.from({ length: this.concurrency }, loop)
+  }
+
+  async stop(): Promise<void> {
+    this.running = false
+    await Promise.all(this.loops)
+    this.loops = []
+  }
+
+  /** Jobs currently being handled by this pool */
+  get activeJobs(): number {
+    return this.active
+  }
+
+  private async process(job: AnalysisJob): Promise<'succeeded' | 'retried' | 'failed'> {
+    const controller = new AbortController()
+    // Renewed every third of the lease, so one failed renewal still leaves
+    // two more tries before the lease runs out
+    const heartbeat = setInterval(async () => {
+      try {
+        const owned = await this.queue.extendLease(job.id, this.workerId, this.leaseMs)
+        if (!owned) {
+          console.warn('[WORKER] Lost lease on job', job.id)
+          controller.abort()
+        }
+      } catch (error) {
+        console.warn('[WORKER] Lease renewal failed, retrying on the next beat:', error)
+      }
+    }, Math.floor(this.leaseMs / 3))
+
+    this.active++
+    try {
+      console.log('[WORKER]', this.workerId, 'running job', job.id, `(attempt ${job.attempts}/${job.max_attempts})`)
+      await this.handler(job, { workerId: this.workerId, signal: controller.signal })
+      await this.queue.complete(job.id, this.workerId)
+      return 'succeeded'
+    } catch (err: any) {
+      const error = err instanceof Error ? err : new Error(String(err))
+      const status = await this.queue.fail(job.id, this.workerId, error.message, {
+        permanent: error instanceof PermanentJobError,
+        retryDelayMs: this.retryDelay(job.attempts),
+      })
+      const willRetry = status === 'pending'
+      console.error('[WORKER] Job', job.id, willRetry ? 'failed, will retry:' : 'failed permanently:', error.message)
+
+      try {
+        await this.onJobFailed?.(job, error, willRetry)
+      } catch (hookError) {
+        console.error('[WORKER] onJobFailed hook error:', hookError)
+      }
+      return willRetry ? 'retried' : 'failed'
+    } finally {
+      clearInterval(heartbeat)
+      this.active--
+    }
+  }
+
+  /** Exponential backoff with equal jitter */
+  private retryDelay(attempt: number): number {
+    const ceiling = Math.min(this.retryMaxDelayMs, this.retryBaseDelayMs * 2 ** Math.max(0, attempt - 1))
+    return Math.floor(ceiling / 2 + Math.random() * (ceiling / 2))
+  }
+}
+
+function sleep(ms: number) {
+  return new Promise(resolve => setTimeout(resolve, ms))
+}
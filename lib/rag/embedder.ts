@@ -0,0 +1,137 @@
+import OpenAI from 'openai'
+import { normalizeWords } from '@/lib/utils/text'
+
+/** Size of embeddings.embedding (vector(1536)); every embedder produces this many dimensions */
+export const EMBEDDING_DIMENSIONS = 1536
+
+/**
+ * Abstract Embedder Interface
+ */
+export interface IEmbedder {
+  /** Identifies the vector space; indexes built with another model are not reused */
+  readonly model: string
+  readonly dimensions: number
+  embed(texts: string[]): Promise<Float32Array[]>
+}
+
+// Function words carry no topic; Romanian and English since contracts mix both
+const STOPWORDS = new Set([
+  'si', 'sau', 'de', 'la', 'in', 'cu', 'pe', 'din', 'pentru', 'prin', 'care', 'ce', 'este', 'sunt', 'fi',
+  'a', 'al', 'ale', 'ai', 'un', 'o', 'unei', 'unui', 'se', 'nu', 'sa', 'ca', 'are', 'fie', 'catre', 'acest',
+  'aceasta', 'acestor', 'lor', 'sale', 'daca', 'dupa', 'mai', 'fara',
+  'the', 'and', 'or', 'of', 'to', 'on', 'for', 'by', 'with', 'is', 'are', 'be', 'an', 'as', 'at',
+  'that', 'this', 'which', 'shall', 'any', 'such', 'its', 'from', 'not', 'may', 'it',
+])
+
+const PREFIX_LENGTH = 6
+
+/**
+ * Deterministic offline embedder: hashed bag of words, word prefixes (a crude
+ * stemmer for Romanian inflection: prelucrare/prelucrarea/prelucrarii share
+ * `preluc`) and prefix bigrams, signed-hashed into a fixed-size vector.
+ *
+ * Lexical rather than semantic, but needs no network or model, so tests and
+ * offline deployments get stable, reproducible retrieval.
+ */
+export class LocalEmbedder implements IEmbedder {
+  readonly model = 'local-hash-v1'
+  readonly dimensions = EMBEDDING_DIMENSIONS
+
+  async embed(texts: string[]): Promise<Float32Array[]> {
+    return texts.map(text => this.embedOne(text))
+  }
+
+  embedOne(text: string): Float32Array {
+    const counts = new Map<string, number>()
+    const add = (feature: string, weight: number) => counts.set(feature, (counts.get(feature) || 0) + weight)
+
+    let previous: string | null = null
+    for (const word of normalizeWords(text).split(' ')) {
+      if (word.length < 2 || STOPWORDS.has(word)) continue
+      const prefix = word.slice(0, PREFIX_LENGTH)
+      add(`w:${word}`, 1)
+      if (word.length > PREFIX_LENGTH) add(`p:${prefix}`, 0.5)
+      if (previous) add(`b:${previous} ${prefix}`, 0.5)
+      previous = prefix
+    }
+
+    const vector = new Float32Array(this.dimensions)
+    for (const [feature, count] of counts) {
+      const hash = fnv1a(feature)
+      const sign = hash & 0x80000000 ? -1 : 1
+      vector[(hash & 0x7fffffff) % this.dimensions] += sign * Math.log1p(count)
+    }
+
+    let norm = 0
+    for (let i = 0; i < vector.length; i++) norm += vector[i] * vector[i]
+    norm = Math.sqrt(norm) || 1
+    for (let i = 0; i < vector.length; i++) vector[i] /= norm
+    return vector
+  }
+}
+
+/**
+ * OpenAI embeddings (text-embedding-3-small, 1536 dimensions)
+ */
+export class OpenAIEmbedder implements IEmbedder {
+  readonly model = 'text-embedding-3-small'
+  readonly dimensions = EMBEDDING_DIMENSIONS
+  private client: OpenAI
+
+  constructor(apiKey: string) {
+    this.client = new OpenAI({ apiKey })
+  }
+
+  async embed(texts: string[]): Promise<Float32Array[]> {
+    const vectors: Float32Array[] = []
+    // The API accepts up to 2048 inputs per call; smaller batches keep requests well under the size limit
+    for (let start = 0; start < texts.length; start += 100) {
+      const response = await this.client.embeddings.create({
+        model: this.model,
+        input: texts.slice(start, start + 100).map(text => text.slice(0, 8000)),
+        dimensions: this.dimensions,
+      })
+      for (const item of response.data) {
+        vectors.push(Float32Array.from(item.embedding))
+      }
+    }
+    return vectors
+  }
+}
+
+export type EmbedderKind = 'local' | 'openai'
+
+/**
+ * Factory to create embedders
+ */
+export function createEmbedder(kind: EmbedderKind): IEmbedder {
+  switch (kind) {
+    case 'local':
+      return new LocalEmbedder()
+    case 'openai':
+      return new OpenAIEmbedder(process.env.OPENAI_API_KEY || 'mock-key')
+    default:
+      throw new Error(`Unsupported embedder: ${kind}`)
+  }
+}
+
+const globalForEmbedder = globalThis as unknown as { ragEmbedder?: IEmbedder }
+
+/**
+ * Get the process-wide embedder from environment
+ */
+export function getDefaultEmbedder(): IEmbedder {
+  if (!globalForEmbedder.ragEmbedder) {
+    globalForEmbedder.ragEmbedder = createEmbedder((process.env.RAG_EMBEDDER || 'local') as EmbedderKind)
+  }
+  return globalForEmbedder.ragEmbedder
+}
+
+function fnv1a(text: string): number {
+  let hash = 0x811c9dc5
+  for (let i = 0; i < text.length; i++) {
+    hash ^= text.charCodeAt(i)
+    hash = Math.imul(hash, 0x01000193)
+  }
+  return hash >>> 0
+}
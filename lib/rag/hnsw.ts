@@ -0,0 +1,439 @@
+/**
+ * Hierarchical Navigable Small World graph for approximate nearest-neighbour
+ * search (Malkov & Yashunin). Vectors are L2-normalized on insert and scored
+ * by inner product (cosine similarity).
+ *
+ * All vectors live in one contiguous Float32Array, so a serialized index can
+ * be loaded as a view over the file's bytes without copying or re-parsing.
+ */
+
+export interface HnswOptions {
+  dimensions: number
+  /** Links per node on upper layers (layer 0 keeps twice as many) */
+  m?: number
+  /** Candidate list size while inserting */
+  efConstruction?: number
+  /** Default candidate list size while searching */
+  efSearch?: number
+  /** Seed for level assignment, so builds are reproducible */
+  seed?: number
+}
+
+export interface HnswMatch {
+  id: number
+  /** Cosine similarity */
+  score: number
+}
+
+const MAGIC = 0x57534e48 // 'HNSW'
+const FORMAT_VERSION = 1
+const HEADER_BYTES = 40
+
+export class HnswIndex {
+  readonly dimensions: number
+  private m: number
+  private efConstruction: number
+  private efSearch: number
+  private levelMultiplier: number
+  private random: () => number
+
+  private vectors: Float32Array
+  private count = 0
+  /** links[node][level] = neighbour ids */
+  private links: number[][][] = []
+  private entryPoint = -1
+  private maxLevel = -1
+
+  // Visited marks stamped with a per-search generation, so nothing is cleared between searches
+  private visited = new Uint32Array(0)
+  private generation = 0
+
+  constructor(options: HnswOptions) {
+    this.dimensions = options.dimensions
+    this.m = options.m || 16
+    this.efConstruction = options.efConstruction || 100
+    this.efSearch = options.efSearch || 64
+    this.levelMultiplier = 1 / Math.log(this.m)
+    this.random = mulberry32(options.seed ?? 42)
+    this.vectors = new Float32Array(this.dimensions * 64)
+  }
+
+  get size(): number {
+    return this.count
+  }
+
+  /**
+   * Insert a vector
+   * @returns Its id (insertion order, starting at 0)
+   */
+  add(vector: ArrayLike<number>): number {
+    if (vector.length !== this.dimensions) {
+      throw new Error(`Expected ${this.dimensions} dimensions, got ${vector.length}`)
+    }
+
+    const id = this.count
+    this.ensureCapacity(id + 1)
+    const offset = id * this.dimensions
+    let norm = 0
+    for (let i = 0; i < this.dimensions; i++) norm += vector[i] * vector[i]
+    norm = Math.sqrt(norm) || 1
+    for (let i = 0; i < this.dimensions; i++) this.vectors[offset + i] = vector[i] / norm
+    this.count++
+
+    const level = Math.floor(-Math.log(1 - this.random()) * this.levelMultiplier)
+    this.links[id] = Array.from({ length: level + 1 }, () => [])
+
+    if (this.entryPoint === -1) {
+      this.entryPoint = id
+      this.maxLevel = level
+      return id
+    }
+
+    const query = this.probe(this.vectors.subarray(offset, offset + this.dimensions))
+    let entry = this.entryPoint
+    for (let layer = this.maxLevel; layer > level; layer--) {
+      entry = this.greedyClosest(query, entry, layer)
+    }
+
+    for (let layer = Math.min(level, this.maxLevel); layer >= 0; layer--) {
+      const candidates = this.searchLayer(query, [entry], this.efConstruction, layer)
+      const maxLinks = layer === 0 ? this.m * 2 : this.m
+      const selected = this.selectNeighbors(candidates, this.m)
+      this.links[id][layer] = selected.map(candidate => candidate.id)
+
+      for (const neighbor of selected) {
+        const neighborLinks = this.links[neighbor.id][layer]
+        neighborLinks.push(id)
+        if (neighborLinks.length > maxLinks) {
+          this.links[neighbor.id][layer] = this.pruneLinks(neighbor.id, neighborLinks, maxLinks)
+        }
+      }
+      entry = candidates[0].id
+    }
+
+    if (level > this.maxLevel) {
+      this.maxLevel = level
+      this.entryPoint = id
+    }
+    return id
+  }
+
+  /**
+   * The `k` most similar vectors, best first
+   * @param ef - Candidate list size (higher: better recall, slower)
+   */
+  search(query: ArrayLike<number>, k: number, ef = this.efSearch): HnswMatch[] {
+    if (this.entryPoint === -1) return []
+
+    const normalized = new Float32Array(this.dimensions)
+    let norm = 0
+    for (let i = 0; i < this.dimensions; i++) norm += query[i] * query[i]
+    norm = Math.sqrt(norm) || 1
+    for (let i = 0; i < this.dimensions; i++) normalized[i] = query[i] / norm
+
+    const probe = this.probe(normalized)
+    let entry = this.entryPoint
+    for (let layer = this.maxLevel; layer > 0; layer--) {
+      entry = this.greedyClosest(probe, entry, layer)
+    }
+
+    return this.searchLayer(probe, [entry], Math.max(ef, k), 0)
+      .slice(0, k)
+      .map(candidate => ({ id: candidate.id, score: 1 - candidate.distance }))
+  }
+
+  /**
+   * Binary layout: header, the vector matrix (float32), then the links
+   */
+  serialize(): Buffer {
+    let linkWords = 0
+    for (let id = 0; id < this.count; id++) {
+      linkWords += 1
+      for (const layer of this.links[id]) linkWords += 1 + layer.length
+    }
+
+    const matrixBytes = this.count * this.dimensions * 4
+    const buffer = Buffer.alloc(HEADER_BYTES + matrixBytes + linkWords * 4)
+    const header = [MAGIC, FORMAT_VERSION, this.dimensions, this.count, this.m, this.efConstruction, this.efSearch]
+    header.forEach((value, index) => buffer.writeUInt32LE(value, index * 4))
+    buffer.writeInt32LE(this.entryPoint, 28)
+    buffer.writeInt32LE(this.maxLevel, 32)
+
+    Buffer.from(this.vectors.buffer, this.vectors.byteOffset, matrixBytes).copy(buffer, HEADER_BYTES)
+
+    let offset = HEADER_BYTES + matrixBytes
+    for (let id = 0; id < this.count; id++) {
+      buffer.writeUInt32LE(this.links[id].length, offset)
+      offset += 4
+      for (const layer of this.links[id]) {
+        buffer.writeUInt32LE(layer.length, offset)
+        offset += 4
+        for (const neighbor of layer) {
+          buffer.writeUInt32LE(neighbor, offset)
+          offset += 4
+        }
+      }
+    }
+    return buffer
+  }
+
+  /**
+   * Load a serialized index. The vector matrix is a view over `buffer` when it
+   * is 4-byte aligned (as buffers from fs.readFile are), not a copy.
+   */
+  static deserialize(buffer: Buffer): HnswIndex {
+    if (buffer.length < HEADER_BYTES || buffer.readUInt32LE(0) !== MAGIC) {
+      throw new Error('Not an HNSW index file')
+    }
+    if (buffer.readUInt32LE(4) !== FORMAT_VERSION) {
+      throw new Error(`Unsupported HNSW index version ${buffer.readUInt32LE(4)}`)
+    }
+
+    const dimensions = buffer.readUInt32LE(8)
+    const count = buffer.readUInt32LE(12)
+    const index = new HnswIndex({
+      dimensions,
+      m: buffer.readUInt32LE(16),
+      efConstruction: buffer.readUInt32LE(20),
+      efSearch: buffer.readUInt32LE(24),
+    })
+    index.entryPoint = buffer.readInt32LE(28)
+    index.maxLevel = buffer.readInt32LE(32)
+    index.count = count
+
+    const matrixStart = buffer.byteOffset + HEADER_BYTES
+    const matrixLength = count * dimensions
+    index.vectors = matrixStart % 4 === 0
+      ? new Float32Array(buffer.buffer, matrixStart, matrixLength)
+      : new Float32Array(buffer.buffer.slice(matrixStart, matrixStart + matrixLength * 4))
+
+    let offset = HEADER_BYTES + matrixLength * 4
+    for (let id = 0; id < count; id++) {
+      const levels = buffer.readUInt32LE(offset)
+      offset += 4
+      const layers: number[][] = []
+      for (let level = 0; level < levels; level++) {
+        const length = buffer.readUInt32LE(offset)
+        offset += 4
+        const neighbors = new Array<number>(length)
+        for (let i = 0; i < length; i++) neighbors[i] = buffer.readUInt32LE(offset + i * 4)
+        offset += length * 4
+        layers.push(neighbors)
+      }
+      index.links.push(layers)
+    }
+    return index
+  }
+
+  /**
+   * Sparse vectors (hashed lexical embeddings have ~10% non-zero dimensions)
+   * are scored over their non-zero dimensions only
+   */
+  private probe(vector: Float32Array): Probe {
+    let nonZero = 0
+    for (let i = 0; i < vector.length; i++) if (vector[i] !== 0) nonZero++
+    if (nonZero * 3 > vector.length) return { vector, nonZero: null }
+
+    const indices = new Uint32Array(nonZero)
+    for (let i = 0, j = 0; i < vector.length; i++) if (vector[i] !== 0) indices[j++] = i
+    return { vector, nonZero: indices }
+  }
+
+  private distance(query: Probe, id: number): number {
+    const offset = id * this.dimensions
+    const { vector, nonZero } = query
+    let dot = 0
+    if (nonZero) {
+      for (let j = 0; j < nonZero.length; j++) dot += vector[nonZero[j]] * this.vectors[offset + nonZero[j]]
+    } else {
+      for (let i = 0; i < this.dimensions; i++) dot += vector[i] * this.vectors[offset + i]
+    }
+    return 1 - dot
+  }
+
+  private vectorOf(id: number): Float32Array {
+    return this.vectors.subarray(id * this.dimensions, (id + 1) * this.dimensions)
+  }
+
+  private greedyClosest(query: Probe, entry: number, layer: number): number {
+    let best = entry
+    let bestDistance = this.distance(query, entry)
+    let improved = true
+    while (improved) {
+      improved = false
+      for (const neighbor of this.links[best][layer] || []) {
+        const distance = this.distance(query, neighbor)
+        if (distance < bestDistance) {
+          best = neighbor
+          bestDistance = distance
+          improved = true
+        }
+      }
+    }
+    return best
+  }
+
+  /**
+   * Best-first search of one layer
+   * @returns Up to `ef` candidates, closest first
+   */
+  private searchLayer(query: Probe, entries: number[], ef: number, layer: number): Candidate[] {
+    if (this.visited.length < this.count) {
+      this.visited = new Uint32Array(Math.max(this.count, this.visited.length * 2))
+      this.generation = 0
+    }
+    const generation = ++this.generation
+
+    const candidates = new Heap((a, b) => a.distance < b.distance) // closest on top
+    const results = new Heap((a, b) => a.distance > b.distance) // farthest on top
+
+    for (const entry of entries) {
+      this.visited[entry] = generation
+      const candidate = { id: entry, distance: this.distance(query, entry) }
+      candidates.push(candidate)
+      results.push(candidate)
+    }
+
+    while (candidates.size > 0) {
+      const current = candidates.pop()!
+      if (current.distance > results.peek()!.distance && results.size >= ef) break
+
+      for (const neighbor of this.links[current.id][layer] || []) {
+        if (this.visited[neighbor] === generation) continue
+        this.visited[neighbor] = generation
+
+        const distance = this.distance(query, neighbor)
+        if (results.size < ef || distance < results.peek()!.distance) {
+          const candidate = { id: neighbor, distance }
+          candidates.push(candidate)
+          results.push(candidate)
+          if (results.size > ef) results.pop()
+        }
+      }
+    }
+
+    return results.toArray().sort((a, b) => a.distance - b.distance)
+  }
+
+  /**
+   * Neighbour selection heuristic: skip a candidate that is closer to an
+   * already selected neighbour than to the base node, so links spread out
+   * across clusters; fill up with the skipped ones if too few remain.
+   */
+  private selectNeighbors(candidates: Candidate[], m: number): Candidate[] {
+    const selected: Candidate[] = []
+    const skipped: Candidate[] = []
+
+    for (const candidate of candidates) {
+      if (selected.length >= m) break
+      const vector = this.probe(this.vectorOf(candidate.id))
+      const diverse = selected.every(chosen => this.distance(vector, chosen.id) > candidate.distance)
+      if (diverse) {
+        selected.push(candidate)
+      } else {
+        skipped.push(candidate)
+      }
+    }
+
+    for (const candidate of skipped) {
+      if (selected.length >= m) break
+      selected.push(candidate)
+    }
+    return selected
+  }
+
+  private pruneLinks(id: number, neighbors: number[], maxLinks: number): number[] {
+    const base = this.probe(this.vectorOf(id))
+    const candidates = neighbors
+      .map(neighbor => ({ id: neighbor, distance: this.distance(base, neighbor) }))
+      .sort((a, b) => a.distance - b.distance)
+    return this.selectNeighbors(candidates, maxLinks).map(candidate => candidate.id)
+  }
+
+  private ensureCapacity(count: number) {
+    const needed = count * this.dimensions
+    if (needed <= this.vectors.length) return
+    const grown = new Float32Array(Math.max(needed, this.vectors.length * 2))
+    grown.set(this.vectors.subarray(0, this.count * this.dimensions))
+    this.vectors = grown
+  }
+}
+
+interface Probe {
+  vector: Float32Array
+  /** Indices of the non-zero dimensions, or null for dense vectors */
+  nonZero: Uint32Array | null
+}
+
+interface Candidate {
+  id: number
+  distance: number
+}
+
+/**
+ * Binary heap; `before(a, b)` is true when a belongs above b
+ */
+class Heap {
+  private items: Candidate[] = []
+
+  constructor(private before: (a: Candidate, b: Candidate) => boolean) {}
+
+  get size(): number {
+    return this.items.length
+  }
+
+  peek(): Candidate | undefined {
+    return this.items[0]
+  }
+
+  push(item: Candidate) {
+    const items = this.items
+    items.push(item)
+    let index = items.length - 1
+    while (index > 0) {
+      const parent = (index - 1) >> 1
+      if (!this.before(items[index], items[parent])) break
+      ;[items[index], items[parent]] = [items[parent], items[index]]
+      index = parent
+    }
+  }
+
+  pop(): Candidate | undefined {
+    const items = this.items
+    const top = items[0]
+    const last = items.pop()
+    if (items.length > 0 && last) {
+      items[0] = last
+      let index = 0
+      for (;;) {
+        const left = index * 2 + 1
+        const right = left + 1
+        let best = index
+        if (left < items.length && this.before(items[left], items[best])) best = left
+        if (right < items.length && this.before(items[right], items[best])) best = right
+        if (best === index) break
+        ;[items[index], items[best]] = [items[best], items[index]]
+        index = best
+      }
+    }
+    return top
+  }
+
+  toArray(): Candidate[] {
+    return [...this.items]
+  }
+}
+
+/**
+ * Small seeded PRNG (mulberry32)
+ */
+function mulberry32(seed: number): () => number {
+  let state = seed >>> 0
+  return () => {
+    state = (state + 0x6d2b79f5) >>> 0
+    let t = state
+    t = Math.imul(t ^ (t >>> 15), t | 1)
+    t ^= t + Math.imul(t ^ (t >>> 7), t | 61)
+    return ((t ^ (t >>> 14)) >>> 0) / 4294967296
+  }
+}
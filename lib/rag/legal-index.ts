@@ -0,0 +1,204 @@
+import fs from 'fs'
+import type { SupabaseClient } from '@supabase/supabase-js'
+import { mapWithConcurrency } from '@/lib/utils/concurrency'
+import { HnswIndex } from './hnsw'
+import type { IEmbedder } from './embedder'
+
+/**
+ * Article search backends for retrieval over legislative_docs:
+ * - local: in-process HNSW index, built from the table or loaded from a file
+ * - pgvector: match_legal_articles() over the embeddings table
+ */
+
+export interface LegalArticle {
+  id: string
+  law_name: string
+  law_number: string | null
+  article_number: string | null
+  jurisdiction: string
+  title: string
+  content: string
+  source_url: string | null
+}
+
+export interface LegalMatch {
+  article: LegalArticle
+  /** Cosine similarity */
+  score: number
+}
+
+export interface ILegalIndex {
+  readonly backend: LegalIndexBackend
+  /** Number of indexed articles (-1 when unknown) */
+  readonly size: number
+  /** The `k` best articles for each query vector, best first */
+  search(queries: Float32Array[], k: number): Promise<LegalMatch[][]>
+}
+
+export type LegalIndexBackend = 'local' | 'pgvector'
+
+const ARTICLE_COLUMNS = 'id, law_name, law_number, article_number, jurisdiction, title, content, source_url'
+const PAGE_SIZE = 1000
+
+/**
+ * Text embedded for an article: citation and title carry most of the topic
+ */
+export function articleEmbeddingText(article: LegalArticle): string {
+  return [article.law_name, article.article_number, article.title, article.content]
+    .filter(Boolean)
+    .join('\n')
+}
+
+/**
+ * Active legislative articles, in id order
+ */
+export async function loadLegalArticles(supabase: SupabaseClient): Promise<LegalArticle[]> {
+  const articles: LegalArticle[] = []
+  for (let from = 0; ; from += PAGE_SIZE) {
+    const { data, error } = await supabase
+      .from('legislative_docs')
+      .select(ARTICLE_COLUMNS)
+      .eq('is_active', true)
+      .order('id')
+      .range(from, from + PAGE_SIZE - 1)
+
+    if (error) throw new Error(`Failed to load legislative docs: ${error.message}`)
+    articles.push(...(data as LegalArticle[]))
+    if (!data || data.length < PAGE_SIZE) return articles
+  }
+}
+
+/**
+ * HNSW index held in process memory. Searches are synchronous, no network
+ * round trip: about half a millisecond per clause for thousands of articles.
+ */
+export class LocalLegalIndex implements ILegalIndex {
+  readonly backend = 'local'
+
+  constructor(
+    private index: HnswIndex,
+    private articles: LegalArticle[],
+    /** Embedder model the vectors came from */
+    readonly model: string
+  ) {}
+
+  get size(): number {
+    return this.articles.length
+  }
+
+  static async build(articles: LegalArticle[], embedder: IEmbedder): Promise<LocalLegalIndex> {
+    // Prompts use the top few articles per clause; a short candidate list already finds them
+    const index = new HnswIndex({ dimensions: embedder.dimensions, efSearch: 32 })
+    const vectors = await embedder.embed(articles.map(articleEmbeddingText))
+    for (const vector of vectors) {
+      index.add(vector)
+    }
+    return new LocalLegalIndex(index, articles, embedder.model)
+  }
+
+  /**
+   * Load an index written by save(): the HNSW file at `path` and the articles
+   * in `path`.json. The vector matrix stays in the file's buffer (no copy).
+   */
+  static load(path: string): LocalLegalIndex {
+    const { model, articles } = JSON.parse(fs.readFileSync(`${path}.json`, 'utf8'))
+    const index = HnswIndex.deserialize(fs.readFileSync(path))
+    if (index.size !== articles.length) {
+      throw new Error(`Index ${path} has ${index.size} vectors for ${articles.length} articles`)
+    }
+    return new LocalLegalIndex(index, articles, model)
+  }
+
+  save(path: string) {
+    fs.writeFileSync(path, this.index.serialize())
+    fs.writeFileSync(`${path}.json`, JSON.stringify({ model: this.model, articles: this.articles }))
+  }
+
+  async search(queries: Float32Array[], k: number): Promise<LegalMatch[][]> {
+    return queries.map(query =>
+      this.index.search(query, k).map(match => ({ article: this.articles[match.id], score: match.score }))
+    )
+  }
+}
+
+/**
+ * pgvector search through the match_legal_articles() function (one RPC per query)
+ */
+export class PgvectorLegalIndex implements ILegalIndex {
+  readonly backend = 'pgvector'
+  readonly size = -1
+
+  constructor(private supabase: SupabaseClient, private model: string) {}
+
+  async search(queries: Float32Array[], k: number): Promise<LegalMatch[][]> {
+    return mapWithConcurrency(queries, 8, async query => {
+      const { data, error } = await this.supabase.rpc('match_legal_articles', {
+        p_query_embedding: Array.from(query),
+        p_match_count: k,
+        p_model: this.model,
+      })
+      if (error) throw new Error(`Legal article search failed: ${error.message}`)
+
+      return (data || []).map(({ similarity, ...article }: LegalArticle & { similarity: number }) => ({
+        article,
+        score: similarity,
+      }))
+    })
+  }
+}
+
+const globalForLegalIndex = globalThis as unknown as {
+  legalIndex?: { promise: Promise<ILegalIndex | null>; loadedAt: number }
+}
+
+/**
+ * Get the process-wide legal index from environment (RAG_BACKEND), or null
+ * when retrieval is off. The local index is loaded from RAG_INDEX_PATH when
+ * it matches the embedder, otherwise built from legislative_docs, and
+ * rebuilt after RAG_INDEX_TTL_MINUTES.
+ */
+export function getLegalIndex(supabase: SupabaseClient, embedder: IEmbedder): Promise<ILegalIndex | null> {
+  const ttlMs = parseInt(process.env.RAG_INDEX_TTL_MINUTES || '60', 10) * 60_000
+  const cached = globalForLegalIndex.legalIndex
+  if (cached && Date.now() - cached.loadedAt < ttlMs) {
+    return cached.promise
+  }
+
+  const promise = createLegalIndex(supabase, embedder)
+  globalForLegalIndex.legalIndex = { promise, loadedAt: Date.now() }
+  // A failed load is retried on the next call instead of being cached
+  promise.catch(() => {
+    if (globalForLegalIndex.legalIndex?.promise === promise) {
+      globalForLegalIndex.legalIndex = undefined
+    }
+  })
+  return promise
+}
+
+async function createLegalIndex(supabase: SupabaseClient, embedder: IEmbedder): Promise<ILegalIndex | null> {
+  const backend = process.env.RAG_BACKEND || 'local'
+  switch (backend) {
+    case 'off':
+      return null
+    case 'pgvector':
+      return new PgvectorLegalIndex(supabase, embedder.model)
+    case 'local': {
+      const start = Date.now()
+      const path = process.env.RAG_INDEX_PATH
+      if (path && fs.existsSync(path)) {
+        const index = LocalLegalIndex.load(path)
+        if (index.model === embedder.model) {
+          console.log('[RAG] Loaded', index.size, 'articles from', path, 'in', Date.now() - start, 'ms')
+          return index
+        }
+        console.warn('[RAG] Index', path, 'was built with', index.model, '- rebuilding for', embedder.model)
+      }
+
+      const index = await LocalLegalIndex.build(await loadLegalArticles(supabase), embedder)
+      console.log('[RAG] Indexed', index.size, 'articles in', Date.now() - start, 'ms')
+      return index
+    }
+    default:
+      throw new Error(`Unsupported RAG backend: ${backend}`)
+  }
+}
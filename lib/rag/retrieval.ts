@@ -0,0 +1,93 @@
+import type { ClauseStructure } from '@/lib/document-processing/extractor'
+import type { IEmbedder } from './embedder'
+import type { ILegalIndex, LegalArticle, LegalMatch } from './legal-index'
+
+/**
+ * Retrieval stage: embed the contract's clauses and look up the legislative
+ * articles closest to each, so the prompt carries only relevant law instead
+ * of a fixed list.
+ */
+
+export interface RetrievalOptions {
+  /** Articles looked up per clause */
+  topK?: number
+  /** Matches below this cosine similarity are dropped */
+  minScore?: number
+}
+
+export interface LegalRetrieval {
+  /** Matches for each clause, in clause order (empty for skipped clauses) */
+  byClause: LegalMatch[][]
+  /** Time spent embedding and searching */
+  elapsed_ms: number
+}
+
+// Headings and one-liners ("Art. 3 Durata") match everything a little and nothing well
+const MIN_CLAUSE_WORDS = 8
+// Embedding a clause's opening is enough to place its topic
+const MAX_CLAUSE_CHARS = 2_000
+
+/**
+ * Top-k articles for every substantive clause
+ */
+export async function retrieveLegalMatches(
+  index: ILegalIndex,
+  embedder: IEmbedder,
+  clauses: ClauseStructure[],
+  options: RetrievalOptions = {}
+): Promise<LegalRetrieval> {
+  const start = Date.now()
+  const topK = options.topK || 3
+  const minScore = options.minScore ?? 0.2
+
+  const queried = clauses
+    .map((clause, index) => ({ index, text: clause.content.slice(0, MAX_CLAUSE_CHARS) }))
+    .filter(({ text }) => text.split(/\s+/).length >= MIN_CLAUSE_WORDS)
+
+  const byClause: LegalMatch[][] = clauses.map(() => [])
+  if (queried.length > 0) {
+    const vectors = await embedder.embed(queried.map(({ text }) => text))
+    const results = await index.search(vectors, topK)
+    queried.forEach(({ index }, i) => {
+      byClause[index] = results[i].filter(match => match.score >= minScore)
+    })
+  }
+
+  return { byClause, elapsed_ms: Date.now() - start }
+}
+
+/**
+ * Prompt context from clause matches: each article once (at its best score),
+ * best first, at most `maxArticles`
+ */
+export function selectLegalContext(matches: LegalMatch[][], maxArticles = 8): string[] {
+  return selectArticles(matches, maxArticles).map(formatArticle)
+}
+
+/**
+ * Distinct articles across clause matches, best score first
+ */
+export function selectArticles(matches: LegalMatch[][], maxArticles = 8): LegalArticle[] {
+  const best = new Map<string, LegalMatch>()
+  for (const match of matches.flat()) {
+    const current = best.get(match.article.id)
+    if (!current || match.score > current.score) {
+      best.set(match.article.id, match)
+    }
+  }
+  return Array.from(best.values())
+    .sort((a, b) => b.score - a.score)
+    .slice(0, maxArticles)
+    .map(match => match.article)
+}
+
+/**
+ * "Codul Civil (Law 287/2009) Art. 1350 - Clauze abuzive ...: <content>"
+ */
+export function formatArticle(article: LegalArticle): string {
+  const citation = [
+    article.law_number ? `${article.law_name} (${article.law_number})` : article.law_name,
+    article.article_number,
+  ].filter(Boolean).join(' ')
+  return `${citation} - ${article.title}: ${article.content}`
+}
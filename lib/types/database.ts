@@ -59,6 +59,7 @@ export interface Document {
   id: string;
   user_id: string;
   organization_id?: string;
+  batch_id?: string;
   filename: string;
   file_size: number;
   file_type: string;
@@ -72,12 +73,34 @@ export interface Document {
   ocr_completed: boolean;
   overall_risk_score?: number;
   compliance_score?: number;
+  high_risk_issues: number;
   created_at: string;
   updated_at: string;
   analyzed_at?: string;
   metadata: Record<string, any>;
 }
 
+export interface DocumentStats {
+  scope: 'user' | 'organization';
+  scope_id: string;
+  total_documents: number;
+  analyzed_documents: number;
+  processing_documents: number;
+  high_risk_documents: number;
+  high_risk_issues: number;
+  updated_at: string;
+}
+
+export interface DocumentBatch {
+  id: string;
+  user_id: string;
+  organization_id?: string;
+  name?: string;
+  total_files: number;
+  created_at: string;
+  metadata: Record<string, any>;
+}
+
 export interface DocumentVersion {
   id: string;
   document_id: string;
@@ -99,6 +122,7 @@ export interface DocumentClause {
   start_char: number;
   end_char: number;
   page_number?: number;
+  content_hash?: string;
   parent_clause_id?: string;
   order_index: number;
   created_at: string;
@@ -120,6 +144,14 @@ export interface Analysis {
   high_risk_count: number;
   medium_risk_count: number;
   low_risk_count: number;
+  requested_by?: string;
+  attempts: number;
+  max_attempts: number;
+  run_after: string;
+  leased_by?: string;
+  lease_expires_at?: string;
+  payload: Record<string, any>;
+  progress: Record<string, any>;
   error_message?: string;
   metadata: Record<string, any>;
 }
@@ -0,0 +1,100 @@
+/**
+ * Aho-Corasick multi-pattern matcher over folded text (a-z, 0-9, space).
+ *
+ * Patterns are compiled into a complete DFA (a transition table with the
+ * failure links already resolved), so a search is one table lookup per
+ * character regardless of how many patterns there are. Input should be
+ * folded with normalizeWords; any other character is treated as a space.
+ *
+ * Surround a pattern with spaces to match whole words only (' nda '), or
+ * give it a leading space alone to match word prefixes (' confidential').
+ */
+
+const ALPHABET = 37 // a-z, 0-9, space
+const SPACE = 36
+
+function symbol(code: number): number {
+  if (code >= 97 && code <= 122) return code - 97
+  if (code >= 48 && code <= 57) return code - 48 + 26
+  return SPACE
+}
+
+export class AhoCorasick {
+  private delta: Int32Array
+  /** Pattern indexes recognized in each state, including via failure links */
+  private outputs: number[][]
+
+  constructor(readonly patterns: string[]) {
+    // Trie: -1 marks a missing edge until the failure links fill it in
+    const edges: number[] = new Array(ALPHABET).fill(-1)
+    const outputs: number[][] = [[]]
+    let states = 1
+
+    patterns.forEach((pattern, index) => {
+      let state = 0
+      for (let i = 0; i < pattern.length; i++) {
+        const edge = state * ALPHABET + symbol(pattern.charCodeAt(i))
+        if (edges[edge] === -1) {
+          edges[edge] = states++
+          edges.push(...new Array(ALPHABET).fill(-1))
+          outputs.push([])
+        }
+        state = edges[edge]
+      }
+      outputs[state].push(index)
+    })
+
+    // Breadth-first: a state's failure target is always resolved before it
+    const fail = new Int32Array(states)
+    const queue: number[] = []
+    for (let s = 0; s < ALPHABET; s++) {
+      const next = edges[s]
+      if (next === -1) {
+        edges[s] = 0
+      } else {
+        fail[next] = 0
+        queue.push(next)
+      }
+    }
+    for (let head = 0; head < queue.length; head++) {
+      const state = queue[head]
+      outputs[state].push(...outputs[fail[state]])
+      for (let s = 0; s < ALPHABET; s++) {
+        const edge = state * ALPHABET + s
+        const next = edges[edge]
+        if (next === -1) {
+          edges[edge] = edges[fail[state] * ALPHABET + s]
+        } else {
+          fail[next] = edges[fail[state] * ALPHABET + s]
+          queue.push(next)
+        }
+      }
+    }
+
+    this.delta = Int32Array.from(edges)
+    this.outputs = outputs
+  }
+
+  /**
+   * Call `onMatch` with the pattern index and end offset (exclusive) of every
+   * occurrence, in order of end offset
+   */
+  search(text: string, onMatch: (pattern: number, end: number) => void): void {
+    const { delta, outputs } = this
+    let state = 0
+    for (let i = 0; i < text.length; i++) {
+      state = delta[state * ALPHABET + symbol(text.charCodeAt(i))]
+      const found = outputs[state]
+      for (let k = 0; k < found.length; k++) onMatch(found[k], i + 1)
+    }
+  }
+
+  /**
+   * Distinct pattern indexes occurring in `text`
+   */
+  matches(text: string): Set<number> {
+    const found = new Set<number>()
+    this.search(text, pattern => found.add(pattern))
+    return found
+  }
+}
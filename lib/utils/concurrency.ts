@@ -0,0 +1,30 @@
+/**
+ * Concurrency helpers for fan-out work (LLM calls, uploads, DB batches)
+ */
+
+/**
+ * Map over items with at most `limit` promises in flight.
+ * Results keep the input order; the first rejection rejects the whole call.
+ * @param items - Inputs to process
+ * @param limit - Maximum number of concurrent calls
+ * @param fn - Async mapper, receives the item and its index
+ */
+export async function mapWithConcurrency<T, R>(
+  items: T[],
+  limit: number,
+  fn: (item: T, index: number) => Promise<R>
+): Promise<R[]> {
+  const results = new Array<R>(items.length)
+  let next = 0
+
+  const worker = async () => {
+    while (next < items.length) {
+      const index = next++
+      results[index] = await fn(items[index], index)
+    }
+  }
+
+  const workers = Array.from({ length: Math.max(1, Math.min(limit, items.length)) }, worker)
+  await Promise.all(workers)
+  return results
+}
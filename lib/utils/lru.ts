@@ -0,0 +1,56 @@
+/**
+ * Small in-memory LRU cache with per-entry TTL.
+ * Relies on Map insertion order: the first key is always the least recently used.
+ */
+
+interface LRUEntry<V> {
+  value: V
+  expiresAt: number
+}
+
+export class LRUCache<K, V> {
+  private entries = new Map<K, LRUEntry<V>>()
+
+  /**
+   * @param maxEntries - Entries kept before the least recently used one is evicted
+   * @param ttlMs - Default time to live for new entries
+   */
+  constructor(private maxEntries: number, private ttlMs: number) {}
+
+  get(key: K): V | undefined {
+    const entry = this.entries.get(key)
+    if (!entry) return undefined
+
+    if (entry.expiresAt <= Date.now()) {
+      this.entries.delete(key)
+      return undefined
+    }
+
+    // Move to the most recently used position
+    this.entries.delete(key)
+    this.entries.set(key, entry)
+    return entry.value
+  }
+
+  set(key: K, value: V, ttlMs: number = this.ttlMs): void {
+    this.entries.delete(key)
+    this.entries.set(key, { value, expiresAt: Date.now() + ttlMs })
+
+    while (this.entries.size > this.maxEntries) {
+      const oldest = this.entries.keys().next().value as K
+      this.entries.delete(oldest)
+    }
+  }
+
+  delete(key: K): boolean {
+    return this.entries.delete(key)
+  }
+
+  clear(): void {
+    this.entries.clear()
+  }
+
+  get size(): number {
+    return this.entries.size
+  }
+}
@@ -0,0 +1,46 @@
+/**
+ * Text normalization helpers shared by matching code (dedup, diffing, rules)
+ */
+
+/**
+ * Lowercase and strip diacritics (ă â î ș ț → a a i s t)
+ */
+export function foldDiacritics(text: string): string {
+  return text
+    .toLowerCase()
+    .normalize('NFD')
+    .replace(/[\u0300-\u036f]/g, '')
+}
+
+/**
+ * Fold diacritics and reduce to space-separated alphanumeric words
+ */
+export function normalizeWords(text: string | undefined): string {
+  return foldDiacritics(text || '')
+    .replace(/[^a-z0-9]+/g, ' ')
+    .trim()
+}
+
+/**
+ * Number of whitespace-separated words (same result as
+ * `text.split(/\s+/).filter(Boolean).length`, without allocating the array)
+ */
+export function countWords(text: string): number {
+  let count = 0
+  let inWord = false
+  for (let i = 0; i < text.length; i++) {
+    if (isWhitespace(text.charCodeAt(i))) {
+      inWord = false
+    } else if (!inWord) {
+      inWord = true
+      count++
+    }
+  }
+  return count
+}
+
+function isWhitespace(code: number): boolean {
+  return (code >= 9 && code <= 13) || code === 32 || code === 160 || code === 0x1680 ||
+    (code >= 0x2000 && code <= 0x200a) || code === 0x2028 || code === 0x2029 ||
+    code === 0x202f || code === 0x205f || code === 0x3000 || code === 0xfeff
+}
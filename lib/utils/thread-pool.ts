@@ -0,0 +1,207 @@
+import { Worker } from 'worker_threads'
+import type { Transferable } from 'worker_threads'
+import { TimeoutError } from './timeout'
+
+/**
+ * Thrown when a task is submitted while the pool's queue is full.
+ * Callers should back off and retry later rather than wait.
+ */
+export class PoolOverloadedError extends Error {
+  constructor(message: string) {
+    super(message)
+    this.name = 'PoolOverloadedError'
+  }
+}
+
+export interface ThreadPoolOptions {
+  /** Maximum number of worker threads */
+  size?: number
+  /** Tasks allowed to wait for a free worker before submissions are rejected */
+  maxQueue?: number
+  /** Default per-task timeout; the worker is terminated when it expires */
+  taskTimeoutMs?: number
+}
+
+export interface RunOptions {
+  timeoutMs?: number
+  /** Buffers moved (not copied) to the worker */
+  transferList?: Transferable[]
+  /** Receives `{ partial }` messages the worker sends before its result */
+  onPartial?: (partial: any) => void
+}
+
+export interface ThreadPoolStats {
+  workers: number
+  busy: number
+  queued: number
+  completed: number
+  failed: number
+  killed: number
+}
+
+interface Task {
+  payload: unknown
+  options: RunOptions
+  resolve: (value: any) => void
+  reject: (error: Error) => void
+}
+
+interface PoolWorker {
+  worker: Worker
+  task: Task | null
+  timer: NodeJS.Timeout | null
+}
+
+/**
+ * Fixed-size pool of worker threads running one script, one task per worker.
+ *
+ * The script receives the task payload as a message and must reply with
+ * `{ result }` or `{ error }`, optionally preceded by `{ partial }` messages
+ * (streamed results). A task that exceeds its timeout has its worker
+ * terminated (which actually stops the CPU work) and replaced on demand.
+ */
+export class ThreadPool<TPayload = unknown, TResult = unknown> {
+  private workers: PoolWorker[] = []
+  private queue: Task[] = []
+  private size: number
+  private maxQueue: number
+  private taskTimeoutMs: number
+  private counters = { completed: 0, failed: 0, killed: 0 }
+
+  constructor(private script: string, options: ThreadPoolOptions = {}) {
+    this.size = Math.max(1, options.size || 2)
+    this.maxQueue = options.maxQueue ?? 16
+    this.taskTimeoutMs = options.taskTimeoutMs || 30_000
+  }
+
+  run(payload: TPayload, options: RunOptions = {}): Promise<TResult> {
+    return new Promise<TResult>((resolve, reject) => {
+      const task: Task = { payload, options, resolve, reject }
+      const idle = this.workers.find(entry => !entry.task)
+      if (idle) {
+        this.start(idle, task)
+      } else if (this.workers.length < this.size) {
+        this.start(this.spawn(), task)
+      } else if (this.queue.length < this.maxQueue) {
+        this.queue.push(task)
+      } else {
+        reject(new PoolOverloadedError(
+          `Thread pool is saturated (${this.workers.length} busy, ${this.queue.length} queued)`
+        ))
+      }
+    })
+  }
+
+  getStats(): ThreadPoolStats {
+    return {
+      workers: this.workers.length,
+      busy: this.workers.filter(entry => entry.task).length,
+      queued: this.queue.length,
+      ...this.counters,
+    }
+  }
+
+  /**
+   * Reject queued tasks and terminate all workers
+   */
+  async destroy(): Promise<void> {
+    for (const task of this.queue.splice(0)) {
+      task.reject(new Error('Thread pool destroyed'))
+    }
+    await Promise.all(this.workers.splice(0).map(entry => {
+      if (entry.timer) clearTimeout(entry.timer)
+      entry.task?.reject(new Error('Thread pool destroyed'))
+      return entry.worker.terminate()
+    }))
+  }
+
+  private spawn(): PoolWorker {
+    const entry: PoolWorker = { worker: new Worker(this.script), task: null, timer: null }
+
+    entry.worker.on('message', (message: { partial?: unknown; result?: TResult; error?: string }) => {
+      if ('partial' in message) {
+        entry.task?.options.onPartial?.(message.partial)
+        return
+      }
+
+      const task = this.finish(entry)
+      if (!task) return
+      if (message.error !== undefined) {
+        this.counters.failed++
+        task.reject(new Error(message.error))
+      } else {
+        this.counters.completed++
+        task.resolve(message.result)
+      }
+      this.next(entry)
+    })
+
+    entry.worker.on('error', error => {
+      this.remove(entry)
+      const task = this.finish(entry)
+      if (task) {
+        this.counters.failed++
+        task.reject(error)
+      }
+      this.drainQueue()
+    })
+
+    entry.worker.on('exit', code => {
+      if (!this.workers.includes(entry)) return
+      this.remove(entry)
+      const task = this.finish(entry)
+      if (task) {
+        this.counters.failed++
+        task.reject(new Error(`Worker exited with code ${code}`))
+      }
+      this.drainQueue()
+    })
+
+    this.workers.push(entry)
+    return entry
+  }
+
+  private start(entry: PoolWorker, task: Task) {
+    entry.task = task
+    entry.worker.ref()
+    entry.timer = setTimeout(() => this.kill(entry), task.options.timeoutMs || this.taskTimeoutMs)
+    entry.worker.postMessage(task.payload, task.options.transferList)
+  }
+
+  private kill(entry: PoolWorker) {
+    const task = this.finish(entry)
+    this.remove(entry)
+    this.counters.killed++
+    void entry.worker.terminate()
+    task?.reject(new TimeoutError(`Task exceeded ${task.options.timeoutMs || this.taskTimeoutMs}ms; worker terminated`))
+    this.drainQueue()
+  }
+
+  private finish(entry: PoolWorker): Task | null {
+    const task = entry.task
+    if (entry.timer) clearTimeout(entry.timer)
+    entry.task = null
+    entry.timer = null
+    return task
+  }
+
+  private remove(entry: PoolWorker) {
+    this.workers = this.workers.filter(other => other !== entry)
+  }
+
+  private next(entry: PoolWorker) {
+    const task = this.queue.shift()
+    if (task) {
+      this.start(entry, task)
+    } else {
+      // Idle workers must not keep the process alive
+      entry.worker.unref()
+    }
+  }
+
+  private drainQueue() {
+    while (this.queue.length > 0 && this.workers.length < this.size) {
+      this.start(this.spawn(), this.queue.shift()!)
+    }
+  }
+}
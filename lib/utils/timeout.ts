@@ -53,6 +53,12 @@ export const TIMEOUTS = {
   /** AI analysis processing */
   AI_ANALYSIS: 45_000, // 45 seconds
 
+  /** AI analysis inside a background job (not bound by the request deadline) */
+  AI_ANALYSIS_JOB: 240_000, // 4 minutes
+
+  /** Lease held by an analysis worker, renewed while the job is running */
+  JOB_LEASE: 90_000, // 90 seconds
+
   /** Total API route timeout (must be under Vercel's limit) */
   API_ROUTE_TOTAL: 50_000, // 50 seconds (safe buffer under 60s limit)
 
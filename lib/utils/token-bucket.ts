@@ -0,0 +1,49 @@
+/**
+ * Token bucket: holds up to `capacity` tokens, refilled continuously at
+ * `capacity` per `intervalMs` (e.g. 50 requests per minute).
+ */
+export class TokenBucket {
+  private level: number
+  private updatedAt = Date.now()
+  private refillPerMs: number
+
+  constructor(readonly capacity: number, intervalMs = 60_000) {
+    this.level = capacity
+    this.refillPerMs = capacity / intervalMs
+  }
+
+  /**
+   * Milliseconds until `amount` tokens are available (0 when they are now).
+   * Amounts above capacity are clamped, so one oversized request still runs.
+   */
+  waitTime(amount: number, now = Date.now()): number {
+    this.refill(now)
+    const needed = Math.min(amount, this.capacity)
+    return this.level >= needed ? 0 : Math.ceil((needed - this.level) / this.refillPerMs)
+  }
+
+  take(amount: number, now = Date.now()) {
+    this.refill(now)
+    this.level -= Math.min(amount, this.capacity)
+  }
+
+  /**
+   * Correct an earlier take() once the real usage is known: positive returns
+   * tokens, negative charges extra (the level may go below zero)
+   */
+  adjust(amount: number) {
+    this.level = Math.min(this.capacity, this.level + amount)
+  }
+
+  get available(): number {
+    this.refill(Date.now())
+    return Math.max(0, Math.floor(this.level))
+  }
+
+  private refill(now: number) {
+    if (now > this.updatedAt) {
+      this.level = Math.min(this.capacity, this.level + (now - this.updatedAt) * this.refillPerMs)
+      this.updatedAt = now
+    }
+  }
+}
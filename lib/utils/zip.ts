@@ -0,0 +1,272 @@
+import { Readable } from 'stream'
+import { createDeflateRaw, inflateRawSync } from 'zlib'
+
+/**
+ * Minimal ZIP reader for uploaded archives and streaming writer for exports:
+ * stored and deflated entries, no encryption, no ZIP64 (archives over 4GB are
+ * far beyond the upload limit)
+ */
+
+export interface ZipEntry {
+  /** Path inside the archive, with `/` separators */
+  name: string
+  /** Uncompressed size from the central directory */
+  size: number
+  /** Decompress the entry (lazy, so rejected entries are never inflated) */
+  read(): Buffer
+  /** The entry as stored, for copying into another archive without recompressing */
+  readRaw(): RawZipEntry
+}
+
+export interface RawZipEntry {
+  method: number
+  crc32: number
+  size: number
+  compressedSize: number
+  data: Buffer
+}
+
+export interface ZipWriteEntry {
+  /** Path inside the archive, with `/` separators */
+  name: string
+  /** Content to deflate; iterables are consumed (and compressed) chunk by chunk */
+  data?: string | Buffer | Iterable<string | Buffer> | AsyncIterable<string | Buffer>
+  /** Entry copied verbatim from another archive (readRaw) */
+  raw?: RawZipEntry
+}
+
+const EOCD_SIGNATURE = 0x06054b50
+const CENTRAL_SIGNATURE = 0x02014b50
+const LOCAL_SIGNATURE = 0x04034b50
+const DESCRIPTOR_SIGNATURE = 0x08074b50
+
+// General purpose flags: sizes follow the data (bit 3), UTF-8 names (bit 11)
+const FLAG_DESCRIPTOR = 0x8
+const FLAG_UTF8 = 0x800
+const MAX_UINT32 = 0xffffffff
+// Deflate input is handed to zlib in blocks of about this size
+const DEFLATE_BLOCK = 64 * 1024
+
+/**
+ * List the file entries of a ZIP archive (directories are skipped)
+ * @param maxEntrySize - Refuse to inflate entries larger than this (zip bombs)
+ */
+export function readZipEntries(data: Buffer, maxEntrySize = Infinity): ZipEntry[] {
+  const eocd = findEndOfCentralDirectory(data)
+  const count = data.readUInt16LE(eocd + 10)
+  let offset = data.readUInt32LE(eocd + 16)
+  const entries: ZipEntry[] = []
+
+  for (let i = 0; i < count; i++) {
+    if (offset + 46 > data.length || data.readUInt32LE(offset) !== CENTRAL_SIGNATURE) {
+      throw new Error('Invalid ZIP archive: corrupt central directory')
+    }
+
+    const flags = data.readUInt16LE(offset + 8)
+    const method = data.readUInt16LE(offset + 10)
+    const crc32 = data.readUInt32LE(offset + 16)
+    const compressedSize = data.readUInt32LE(offset + 20)
+    const size = data.readUInt32LE(offset + 24)
+    const nameLength = data.readUInt16LE(offset + 28)
+    const extraLength = data.readUInt16LE(offset + 30)
+    const commentLength = data.readUInt16LE(offset + 32)
+    const localOffset = data.readUInt32LE(offset + 42)
+    // Bit 11: UTF-8 names; older tools write CP437, which is ASCII-compatible for most names
+    const name = data.toString(flags & 0x800 ? 'utf8' : 'latin1', offset + 46, offset + 46 + nameLength)
+    offset += 46 + nameLength + extraLength + commentLength
+
+    if (name.endsWith('/')) continue
+    if (flags & 0x1) {
+      throw new Error(`Encrypted ZIP entries are not supported: ${name}`)
+    }
+    if (method !== 0 && method !== 8) {
+      throw new Error(`Unsupported ZIP compression method ${method}: ${name}`)
+    }
+
+    const readStored = () => {
+      if (data.readUInt32LE(localOffset) !== LOCAL_SIGNATURE) {
+        throw new Error(`Invalid ZIP archive: missing local header for ${name}`)
+      }
+      // Local name/extra lengths may differ from the central directory's
+      const start = localOffset + 30 + data.readUInt16LE(localOffset + 26) + data.readUInt16LE(localOffset + 28)
+      return data.subarray(start, start + compressedSize)
+    }
+
+    entries.push({
+      name,
+      size,
+      read() {
+        if (size > maxEntrySize) {
+          throw new Error(`ZIP entry too large: ${name}`)
+        }
+        const raw = readStored()
+        const content = method === 0 ? Buffer.from(raw) : inflateRawSync(raw, { maxOutputLength: size || 1 })
+        if (content.length !== size) {
+          throw new Error(`Invalid ZIP archive: size mismatch for ${name}`)
+        }
+        return content
+      },
+      readRaw() {
+        return { method, crc32, size, compressedSize, data: readStored() }
+      },
+    })
+  }
+
+  return entries
+}
+
+/**
+ * Write a ZIP archive as a stream of chunks. Entries are deflated while they
+ * are produced (sizes and CRC go in a data descriptor after each entry), so
+ * neither the archive nor a whole entry has to be held in memory; only the
+ * central directory records are kept until the end.
+ */
+export async function* writeZip(
+  entries: Iterable<ZipWriteEntry> | AsyncIterable<ZipWriteEntry>,
+  level = 6
+): AsyncGenerator<Buffer> {
+  const [time, date] = dosDateTime(new Date())
+  const central: Buffer[] = []
+  let offset = 0
+
+  for await (const entry of entries) {
+    const name = Buffer.from(entry.name, 'utf8')
+    const raw = entry.raw
+    const flags = FLAG_UTF8 | (raw ? 0 : FLAG_DESCRIPTOR)
+    const method = raw ? raw.method : 8
+    const localOffset = offset
+
+    const local = Buffer.alloc(30)
+    local.writeUInt32LE(LOCAL_SIGNATURE, 0)
+    local.writeUInt16LE(20, 4)
+    local.writeUInt16LE(flags, 6)
+    local.writeUInt16LE(method, 8)
+    local.writeUInt16LE(time, 10)
+    local.writeUInt16LE(date, 12)
+    if (raw) {
+      local.writeUInt32LE(raw.crc32, 14)
+      local.writeUInt32LE(raw.compressedSize, 18)
+      local.writeUInt32LE(raw.size, 22)
+    }
+    local.writeUInt16LE(name.length, 26)
+    yield Buffer.concat([local, name])
+    offset += 30 + name.length
+
+    const state = { crc: 0, size: 0, compressedSize: 0 }
+    if (raw) {
+      yield raw.data
+      Object.assign(state, { crc: raw.crc32, size: raw.size, compressedSize: raw.compressedSize })
+    } else {
+      for await (const chunk of deflateStream(entry.data ?? '', level, state)) {
+        state.compressedSize += chunk.length
+        yield chunk
+      }
+      const descriptor = Buffer.alloc(16)
+      descriptor.writeUInt32LE(DESCRIPTOR_SIGNATURE, 0)
+      descriptor.writeUInt32LE(state.crc, 4)
+      descriptor.writeUInt32LE(state.compressedSize, 8)
+      descriptor.writeUInt32LE(state.size, 12)
+      yield descriptor
+      offset += 16
+    }
+    offset += state.compressedSize
+
+    if (offset > MAX_UINT32 || state.size > MAX_UINT32) {
+      throw new Error('ZIP archive too large (ZIP64 is not supported)')
+    }
+
+    const record = Buffer.alloc(46)
+    record.writeUInt32LE(CENTRAL_SIGNATURE, 0)
+    record.writeUInt16LE(20, 4)
+    record.writeUInt16LE(20, 6)
+    record.writeUInt16LE(flags, 8)
+    record.writeUInt16LE(method, 10)
+    record.writeUInt16LE(time, 12)
+    record.writeUInt16LE(date, 14)
+    record.writeUInt32LE(state.crc, 16)
+    record.writeUInt32LE(state.compressedSize, 20)
+    record.writeUInt32LE(state.size, 24)
+    record.writeUInt16LE(name.length, 28)
+    record.writeUInt32LE(localOffset, 42)
+    central.push(record, name)
+  }
+
+  const directory = Buffer.concat(central)
+  const eocd = Buffer.alloc(22)
+  eocd.writeUInt32LE(EOCD_SIGNATURE, 0)
+  eocd.writeUInt16LE(central.length / 2, 8)
+  eocd.writeUInt16LE(central.length / 2, 10)
+  eocd.writeUInt32LE(directory.length, 12)
+  eocd.writeUInt32LE(offset, 16)
+  yield directory
+  yield eocd
+}
+
+/**
+ * Deflate `data` chunk by chunk, updating the CRC and uncompressed size
+ */
+function deflateStream(
+  data: NonNullable<ZipWriteEntry['data']>,
+  level: number,
+  state: { crc: number; size: number }
+): AsyncIterable<Buffer> {
+  const source = typeof data === 'string' || Buffer.isBuffer(data) ? [data] : data
+
+  async function* blocks() {
+    let pending: Buffer[] = []
+    let pendingSize = 0
+    for await (const chunk of source) {
+      const buffer = typeof chunk === 'string' ? Buffer.from(chunk, 'utf8') : chunk
+      state.crc = crc32(buffer, state.crc)
+      state.size += buffer.length
+      pending.push(buffer)
+      pendingSize += buffer.length
+      if (pendingSize >= DEFLATE_BLOCK) {
+        yield Buffer.concat(pending)
+        pending = []
+        pendingSize = 0
+      }
+    }
+    if (pendingSize > 0) yield Buffer.concat(pending)
+  }
+
+  const input = Readable.from(blocks())
+  const deflate = createDeflateRaw({ level })
+  input.on('error', error => deflate.destroy(error))
+  return input.pipe(deflate)
+}
+
+let crcTable: Int32Array | undefined
+
+export function crc32(data: Buffer, previous = 0): number {
+  if (!crcTable) {
+    crcTable = new Int32Array(256)
+    for (let n = 0; n < 256; n++) {
+      let c = n
+      for (let k = 0; k < 8; k++) c = c & 1 ? 0xedb88320 ^ (c >>> 1) : c >>> 1
+      crcTable[n] = c
+    }
+  }
+  let crc = ~previous
+  for (let i = 0; i < data.length; i++) {
+    crc = crcTable[(crc ^ data[i]) & 0xff] ^ (crc >>> 8)
+  }
+  return ~crc >>> 0
+}
+
+function dosDateTime(value: Date): [number, number] {
+  const time = (value.getHours() << 11) | (value.getMinutes() << 5) | (value.getSeconds() >> 1)
+  const date = ((Math.max(1980, value.getFullYear()) - 1980) << 9) | ((value.getMonth() + 1) << 5) | value.getDate()
+  return [time, date]
+}
+
+function findEndOfCentralDirectory(data: Buffer): number {
+  // The record is 22 bytes plus a comment of up to 64KB, at the very end
+  const lowest = Math.max(0, data.length - 22 - 0xffff)
+  for (let offset = data.length - 22; offset >= lowest; offset--) {
+    if (data.readUInt32LE(offset) === EOCD_SIGNATURE) {
+      return offset
+    }
+  }
+  throw new Error('Invalid ZIP archive: end of central directory not found')
+}
@@ -0,0 +1,558 @@
+"""
+Open-loop load generator for the auth and document APIs.
+
+Usage:
+    python load_test.py --users-file users.csv --rates 5,10,20,40
+    python load_test.py --url https://staging.example.com --email me@firm.ro --virtual-users 2000 --rates 50,100,200 \\
+        --step-seconds 60 --mix login=1,middleware=4,dashboard=4,status=4,upload=1
+    python load_test.py --users-file users.csv --rates 2 --mix upload=1,analyze=1 --hgrm-dir hgrm/
+
+Requests arrive as a Poisson process at each rate in --rates (requests per
+second, one step of --step-seconds each) whether or not earlier ones have
+finished, so a slow server builds up requests in flight instead of slowing
+the generator down. Latency is measured from the scheduled arrival time, not
+from when the request could be sent, so queueing in the client counts too.
+
+Each arrival picks an operation from --mix and a virtual user. Virtual users
+log in once and reuse their session cookies (again after a 401):
+    login       POST /api/auth/login                 Supabase Auth sign-in
+    middleware  GET /login with the session           middleware auth only (static page)
+    dashboard   GET /dashboard/documents              middleware auth + document list queries
+    status      GET /api/documents/<id>/analyze       requireAuth + two small queries
+    upload      POST /api/documents/upload            storage upload + document row
+    analyze     POST /api/documents/<id>/analyze      queues a full analysis (spends AI
+                                                      tokens unless the server runs AI_PROVIDER=mock)
+status and analyze use the virtual user's latest upload (uploading first if
+there is none).
+
+All virtual users share one connection pool (--connections). Per step and
+operation it prints throughput, p50/p99/p99.9/max from an HDR histogram,
+errors and mean requests in flight, and names the first step where an
+operation's p99 doubled or its error rate grew by over 1% compared with the
+first step - where middleware auth or Supabase saturates.
+--hgrm-dir writes each histogram in HdrHistogram's percentile format (plot
+them with hdrhistogram.github.io/HdrHistogram/plotFiles.html), --json the
+whole summary.
+
+Credentials: --users-file is a CSV of email,password (one account per virtual
+user, cycled), or every virtual user signs in as --email with
+LOAD_TEST_PASSWORD (or a prompt). Supabase Auth rate-limits sign-ins, so use
+several accounts for login-heavy mixes.
+
+Requires aiohttp (pip install aiohttp).
+"""
+import argparse
+import asyncio
+import csv
+import getpass
+import json
+import math
+import os
+import random
+import time
+from collections import Counter
+from pathlib import Path
+
+import aiohttp
+
+# Never a deployment: loading one must be asked for with --url
+DEFAULT_URL = "http://localhost:3000"
+OPERATIONS = ["login", "middleware", "dashboard", "status", "upload", "analyze"]
+DEFAULT_MIX = "login=1,middleware=3,dashboard=3,status=3,upload=1"
+MIME_TYPES = {
+    ".pdf": "application/pdf",
+    ".docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+}
+
+
+class HdrHistogram:
+    """
+    Latency histogram with a fixed relative precision (HdrHistogram's layout):
+    values are counted in buckets whose width grows with the value, so every
+    recorded value is kept within 10^-significant_figures of its true value
+    and recording costs the same at any count.
+    """
+
+    def __init__(self, highest=3_600_000_000, significant_figures=3):
+        # Values are integer microseconds, 1 us to `highest`
+        largest_single_unit = 2 * 10 ** significant_figures
+        sub_bucket_count_magnitude = math.ceil(math.log2(largest_single_unit))
+        self.sub_bucket_half_count_magnitude = sub_bucket_count_magnitude - 1
+        self.sub_bucket_count = 1 << sub_bucket_count_magnitude
+        self.sub_bucket_half_count = self.sub_bucket_count // 2
+        self.sub_bucket_mask = self.sub_bucket_count - 1
+        self.highest = highest
+
+        self.bucket_count = 1
+        smallest_untrackable = self.sub_bucket_count
+        while smallest_untrackable <= highest:
+            smallest_untrackable <<= 1
+            self.bucket_count += 1
+        self.counts = [0] * ((self.bucket_count + 1) * self.sub_bucket_half_count)
+        self.total = 0
+        self.min = math.inf
+        self.max = 0
+        self.sum = 0
+        self.sum_squares = 0
+
+    def _index(self, value):
+        bucket = (value | self.sub_bucket_mask).bit_length() - (self.sub_bucket_half_count_magnitude + 1)
+        sub_bucket = value >> bucket
+        return ((bucket + 1) << self.sub_bucket_half_count_magnitude) + (sub_bucket - self.sub_bucket_half_count)
+
+    def _highest_equivalent(self, index):
+        bucket = (index >> self.sub_bucket_half_count_magnitude) - 1
+        sub_bucket = (index & (self.sub_bucket_half_count - 1)) + self.sub_bucket_half_count
+        if bucket < 0:
+            sub_bucket -= self.sub_bucket_half_count
+            bucket = 0
+        return ((sub_bucket + 1) << bucket) - 1
+
+    def record(self, value):
+        value = min(max(int(value), 1), self.highest)
+        self.counts[self._index(value)] += 1
+        self.total += 1
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        self.sum += value
+        self.sum_squares += value * value
+
+    def add(self, other):
+        for index, count in enumerate(other.counts):
+            self.counts[index] += count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self.sum += other.sum
+        self.sum_squares += other.sum_squares
+
+    def value_at(self, percentile):
+        """Highest value (equivalent within the precision) at or below which `percentile`% fall"""
+        if self.total == 0:
+            return 0
+        target = max(1, math.ceil(round(percentile / 100 * self.total, 6)))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= target:
+                return min(self._highest_equivalent(index), self.max)
+        return self.max
+
+    def mean(self):
+        return self.sum / self.total if self.total else 0
+
+    def stddev(self):
+        if not self.total:
+            return 0
+        return math.sqrt(max(0, self.sum_squares / self.total - self.mean() ** 2))
+
+    def percentile_distribution(self, scale=1000, ticks_per_half_distance=5):
+        """HdrHistogram's .hgrm text output; `scale` converts microseconds to milliseconds"""
+        lines = [f"{'Value':>12} {'Percentile':>14} {'TotalCount':>10} {'1/(1-Percentile)':>14}", ""]
+        percentile = 0.0
+        while self.total:
+            value = self.value_at(percentile)
+            count = self._count_at_or_below(value)
+            fraction = count / self.total
+            inverse = f"{1 / (1 - fraction):14.2f}" if fraction < 1 else ""
+            lines.append(f"{value / scale:12.3f} {fraction:2.12f} {count:10d} {inverse}".rstrip())
+            if fraction >= 1:
+                break
+            # Finer steps towards the tail: ticks_per_half_distance per halving of 100 - p
+            half_distance = 2 ** (int(math.log2(100 / (100 - percentile))) + 1)
+            percentile = max(percentile + 100 / (ticks_per_half_distance * half_distance), 100 * fraction)
+        lines.append(f"#[Mean    = {self.mean() / scale:12.3f}, StdDeviation   = {self.stddev() / scale:12.3f}]")
+        lines.append(f"#[Max     = {self.max / scale:12.3f}, Total count    = {self.total:12d}]")
+        lines.append(f"#[Buckets = {self.bucket_count:12d}, SubBuckets     = {self.sub_bucket_count:12d}]")
+        return "\n".join(lines) + "\n"
+
+    def _count_at_or_below(self, value):
+        limit = self._index(min(max(int(value), 1), self.highest))
+        return sum(self.counts[:limit + 1])
+
+
+class OperationStats:
+    """Latency histogram and outcome counts of one operation in one step"""
+
+    def __init__(self):
+        self.histogram = HdrHistogram()
+        self.ok = 0
+        self.errors = Counter()
+
+    def add(self, other):
+        self.histogram.add(other.histogram)
+        self.ok += other.ok
+        self.errors.update(other.errors)
+
+
+class RequestFailed(Exception):
+    """An operation's response was not a success; the message is its error category"""
+
+
+class VirtualUser:
+    """An account's session cookies and latest uploads"""
+
+    def __init__(self, email, password):
+        self.email = email
+        self.password = password
+        self.cookies = None
+        self.document_ids = []
+        # One sign-in and first upload per user, however many arrivals need them at once
+        self.setup_lock = asyncio.Lock()
+
+
+class LoadTest:
+    """Shared client, virtual user operations and the arrival loop"""
+
+    def __init__(self, args, users, samples):
+        self.url = args.url.rstrip("/")
+        self.timeout = aiohttp.ClientTimeout(total=args.timeout)
+        self.users = users
+        self.samples = samples
+        self.in_flight = 0
+        self.connections = args.connections
+        self.session = None
+        self.step = None
+
+    async def __aenter__(self):
+        # One pool for every virtual user; sessions are kept per user by hand,
+        # so the shared client must not store cookies itself
+        connector = aiohttp.TCPConnector(limit=self.connections, limit_per_host=0, ttl_dns_cache=300)
+        self.session = aiohttp.ClientSession(connector=connector, cookie_jar=aiohttp.DummyCookieJar())
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.session.close()
+
+    async def request(self, method, path, user=None, **kwargs):
+        headers = kwargs.pop("headers", {})
+        if user and user.cookies:
+            headers["Cookie"] = "; ".join(f"{name}={value}" for name, value in user.cookies.items())
+        async with self.session.request(
+            method, self.url + path, headers=headers, allow_redirects=False, timeout=self.timeout, **kwargs
+        ) as response:
+            body = await response.read()
+            data = None
+            if response.content_type == "application/json":
+                try:
+                    data = json.loads(body)
+                except ValueError:
+                    pass
+            return response, data
+
+    async def login(self, user):
+        response, data = await self.request(
+            "POST", "/api/auth/login", json={"email": user.email, "password": user.password}
+        )
+        if response.status >= 400 or not response.cookies:
+            raise RequestFailed(error_category(response.status, data))
+        # Empty values are deletions of stale cookie chunks
+        user.cookies = {name: morsel.value for name, morsel in response.cookies.items() if morsel.value}
+
+    async def authenticated(self, user, method, path, **kwargs):
+        """Request with the user's session, signing in again once after a 401"""
+        for attempt in range(2):
+            # Not under setup_lock: this may run inside prepare(), which holds it
+            if user.cookies is None:
+                await self.timed("login", self.login, user)
+            response, data = await self.request(method, path, user, **kwargs)
+            expired = response.status == 401 or (
+                response.status in (302, 303, 307) and response.headers.get("location", "").endswith("/login")
+            )
+            if expired and attempt == 0:
+                user.cookies = None
+                continue
+            return response, data
+
+    async def upload(self, user):
+        name, content_type, data = random.choice(self.samples)
+        form = aiohttp.FormData()
+        form.add_field("file", data, filename=name, content_type=content_type)
+        response, body = await self.authenticated(user, "POST", "/api/documents/upload", data=form)
+        check(response, body)
+        user.document_ids.append(body["document"]["id"])
+        del user.document_ids[:-5]
+
+    async def prepare(self, operation, user):
+        """
+        Sign in, and upload a first document for status/analyze, if the user has
+        not yet (recorded as login and upload requests). True if anything was done.
+        """
+        needs_session = operation != "login" and user.cookies is None
+        needs_document = operation in ("status", "analyze") and not user.document_ids
+        if not needs_session and not needs_document:
+            return False
+        async with user.setup_lock:
+            if operation != "login" and user.cookies is None:
+                await self.timed("login", self.login, user)
+            if needs_document and not user.document_ids and user.cookies is not None:
+                await self.timed("upload", self.upload, user)
+        return True
+
+    async def run(self, operation, user):
+        if operation == "login":
+            return await self.login(user)
+        if operation == "middleware":
+            return check(*await self.authenticated(user, "GET", "/login"))
+        if operation == "dashboard":
+            return check(*await self.authenticated(user, "GET", "/dashboard/documents"))
+        if operation == "upload":
+            return await self.upload(user)
+
+        if not user.document_ids:
+            raise RequestFailed("no document (sign-in or upload failed)")
+        document_id = user.document_ids[-1]
+        if operation == "status":
+            response, data = await self.authenticated(user, "GET", f"/api/documents/{document_id}/analyze")
+            # No job yet is a valid answer for a fresh upload
+            if response.status != 404 or (data or {}).get("error") != "No analysis job found":
+                check(response, data)
+        elif operation == "analyze":
+            check(*await self.authenticated(
+                user, "POST", f"/api/documents/{document_id}/analyze", json={"mode": "full"}
+            ))
+
+    async def timed(self, operation, action, user, start=None):
+        """Run `action` and record it under `operation` in the current step"""
+        stats = self.step["operations"].setdefault(operation, OperationStats())
+        start = start if start is not None else time.perf_counter()
+        try:
+            await action(user)
+            stats.ok += 1
+        except RequestFailed as error:
+            stats.errors[str(error)] += 1
+        except asyncio.TimeoutError:
+            stats.errors["timeout"] += 1
+        except aiohttp.ClientConnectorError:
+            stats.errors["connection refused/reset"] += 1
+        except aiohttp.ClientError as error:
+            stats.errors[type(error).__name__] += 1
+        finally:
+            stats.histogram.record((time.perf_counter() - start) * 1_000_000)
+
+    async def arrival(self, operation, user, scheduled):
+        self.in_flight += 1
+        try:
+            # Setup requests are timed on their own; this operation's clock
+            # starts when they are done
+            start = time.perf_counter() if await self.prepare(operation, user) else scheduled
+            await self.timed(operation, lambda u: self.run(operation, u), user, start)
+        finally:
+            self.in_flight -= 1
+
+    async def run_step(self, rate, seconds, mix, seed):
+        """Poisson arrivals at `rate` per second for `seconds`, then wait for the stragglers"""
+        rng = random.Random(seed)
+        operations, weights = zip(*mix.items())
+        self.step = {"rate": rate, "operations": {}, "in_flight_samples": [], "late": 0}
+        tasks = set()
+        start = time.perf_counter()
+        scheduled = start
+        while True:
+            scheduled += rng.expovariate(rate)
+            if scheduled - start >= seconds:
+                break
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            elif delay < -0.05:
+                # The generator itself fell behind; latencies still count from `scheduled`
+                self.step["late"] += 1
+            # Sampled at arrivals, which for Poisson arrivals is the time average
+            self.step["in_flight_samples"].append(self.in_flight)
+            operation = rng.choices(operations, weights)[0]
+            task = asyncio.create_task(self.arrival(operation, rng.choice(self.users), scheduled))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        if tasks:
+            await asyncio.wait(tasks)
+        self.step["elapsed"] = time.perf_counter() - start
+        return self.step
+
+
+def check(response, data):
+    if response.status >= 400:
+        raise RequestFailed(error_category(response.status, data))
+    if response.status in (302, 303, 307) and response.headers.get("location", "").endswith("/login"):
+        raise RequestFailed("redirected to /login")
+    return response, data
+
+
+def error_category(status, data):
+    message = (data or {}).get("error") if isinstance(data, dict) else None
+    return f"HTTP {status}" + (f": {str(message)[:60]}" if message else "")
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise SystemExit(f"❌ Unknown operation '{name}' (one of {', '.join(OPERATIONS)})")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def load_users(args):
+    if args.users_file:
+        with open(args.users_file, newline="") as handle:
+            accounts = [(row[0].strip(), row[1].strip()) for row in csv.reader(handle) if len(row) >= 2]
+        accounts = [account for account in accounts if account[0].lower() != "email"]
+        if not accounts:
+            raise SystemExit(f"❌ No email,password rows in {args.users_file}")
+    else:
+        email = args.email or input("Email: ").strip()
+        password = os.environ.get("LOAD_TEST_PASSWORD") or getpass.getpass("Password: ")
+        accounts = [(email, password)]
+    count = args.virtual_users or len(accounts)
+    return [VirtualUser(*accounts[i % len(accounts)]) for i in range(count)]
+
+
+def load_samples(paths):
+    root = Path(__file__).parent
+    files = [Path(p) for p in paths] or sorted(
+        p for p in root.iterdir() if (p.name.startswith("test-contract-") and p.suffix == ".pdf") or p.suffix == ".docx"
+    )
+    return [(f.name, MIME_TYPES[f.suffix.lower()], f.read_bytes()) for f in files if f.suffix.lower() in MIME_TYPES]
+
+
+def report(steps, connections):
+    """Print per-step results and find the step where the server saturates"""
+    # The first step is the reference: later steps are compared with its p99 and error rate
+    baseline = {}
+    saturated = None
+    for step in steps:
+        samples = step["in_flight_samples"]
+        in_flight = sum(samples) / len(samples) if samples else 0
+        late = f", generator fell behind {step['late']}x" if step["late"] else ""
+        print(f"\n{step['rate']:g} req/s offered - {in_flight:.1f} in flight on average{late}")
+        if in_flight > connections * 0.8:
+            print(f"   ⚠️ Near the client pool limit ({connections}): raise --connections")
+        print(f"   {'operation':<11} {'req/s':>7} {'p50':>8} {'p99':>8} {'p99.9':>8} {'max':>8}  errors")
+
+        for name in OPERATIONS:
+            stats = step["operations"].get(name)
+            if not stats or not stats.histogram.total:
+                continue
+            h = stats.histogram
+            total = h.total
+            error_count = sum(stats.errors.values())
+            ms = [h.value_at(p) / 1000 for p in (50, 99, 99.9)] + [h.max / 1000]
+            print(f"   {name:<11} {total / step['elapsed']:7.1f} "
+                  + " ".join(f"{value:8.0f}" for value in ms)
+                  + f"  {error_count / total:6.1%}")
+            for category, count in stats.errors.most_common(3):
+                print(f"   {'':<11} {count:7d} × {category}")
+
+            p99, error_rate = h.value_at(99), error_count / total
+            if name not in baseline:
+                baseline[name] = (p99, error_rate)
+                if error_rate > 0.01:
+                    print(f"   ⚠️ '{name}' fails from the start: check the URL and credentials")
+            elif saturated is None and baseline[name][1] <= 0.01 and (
+                p99 > 2 * baseline[name][0] or error_rate > baseline[name][1] + 0.01
+            ):
+                saturated = (step["rate"], name, in_flight)
+
+    print("")
+    if saturated:
+        rate, name, in_flight = saturated
+        print(f"📈 Saturation at {rate:g} req/s: '{name}' p99 doubled or errors grew by over 1% "
+              f"({in_flight:.1f} requests in flight)")
+    else:
+        print("✓ No step doubled p99 or added 1% errors; try higher --rates")
+
+
+def write_outputs(args, steps):
+    totals = {}
+    for step in steps:
+        for name, stats in step["operations"].items():
+            totals.setdefault(name, OperationStats()).add(stats)
+
+    if args.hgrm_dir:
+        directory = Path(args.hgrm_dir)
+        directory.mkdir(parents=True, exist_ok=True)
+        for step in steps:
+            for name, stats in step["operations"].items():
+                (directory / f"{name}-{step['rate']:g}rps.hgrm").write_text(stats.histogram.percentile_distribution())
+        for name, stats in totals.items():
+            (directory / f"{name}-all.hgrm").write_text(stats.histogram.percentile_distribution())
+        print(f"📊 Histograms written to {directory}/")
+
+    if args.json:
+        summary = {
+            "url": args.url,
+            "steps": [
+                {
+                    "rate": step["rate"],
+                    "elapsed_seconds": round(step["elapsed"], 2),
+                    "mean_in_flight": round(sum(step["in_flight_samples"]) / max(1, len(step["in_flight_samples"])), 2),
+                    "operations": {
+                        name: {
+                            "count": stats.histogram.total,
+                            "ok": stats.ok,
+                            "errors": dict(stats.errors),
+                            "ms": {
+                                **{f"p{p:g}": stats.histogram.value_at(p) / 1000 for p in (50, 90, 99, 99.9)},
+                                "max": stats.histogram.max / 1000,
+                                "mean": round(stats.histogram.mean() / 1000, 3),
+                            },
+                        }
+                        for name, stats in step["operations"].items()
+                    },
+                }
+                for step in steps
+            ],
+        }
+        Path(args.json).write_text(json.dumps(summary, indent=2))
+        print(f"📄 Summary written to {args.json}")
+
+
+async def run(args, users, samples, mix):
+    steps = []
+    async with LoadTest(args, users, samples) as test:
+        for index, rate in enumerate(args.rates):
+            print(f"⏱️  Step {index + 1}/{len(args.rates)}: {rate:g} req/s for {args.step_seconds:g}s...")
+            steps.append(await test.run_step(rate, args.step_seconds, mix, seed=args.seed + index))
+    return steps
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Open-loop load test of the auth and document APIs")
+    parser.add_argument("--url", default=DEFAULT_URL, help="App to load (default: local dev server)")
+    parser.add_argument("--email", default=os.environ.get("LOAD_TEST_EMAIL"))
+    parser.add_argument("--users-file", help="CSV of email,password")
+    parser.add_argument("--virtual-users", type=int, default=1000, help="Virtual users (accounts are cycled)")
+    parser.add_argument("--rates", default="5,10,20,40", help="Arrival rates in requests/second, one step each")
+    parser.add_argument("--step-seconds", type=float, default=30.0)
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="operation=weight,... (" + ", ".join(OPERATIONS) + ")")
+    parser.add_argument("--connections", type=int, default=200, help="Shared connection pool size")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Per-request timeout in seconds")
+    parser.add_argument("--hgrm-dir", help="Write HdrHistogram percentile files here")
+    parser.add_argument("--json", help="Write the summary as JSON")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("files", nargs="*", help="Contracts to upload (default: the samples in the repo)")
+    args = parser.parse_args()
+    args.rates = [float(rate) for rate in args.rates.split(",")]
+
+    mix = parse_mix(args.mix)
+    samples = load_samples(args.files)
+    if ("upload" in mix or "status" in mix or "analyze" in mix) and not samples:
+        raise SystemExit("❌ No PDF or DOCX samples to upload")
+    users = load_users(args)
+
+    print("\n🔥 LOAD TEST")
+    print("=" * 60)
+    print(f"URL:           {args.url}")
+    print(f"Virtual users: {len(users)} ({len({user.email for user in users})} accounts)")
+    print(f"Mix:           {', '.join(f'{name}={weight:g}' for name, weight in mix.items())}")
+    print(f"Steps:         {', '.join(f'{rate:g}' for rate in args.rates)} req/s x {args.step_seconds:g}s\n")
+
+    steps = asyncio.run(run(args, users, samples, mix))
+    report(steps, args.connections)
+    write_outputs(args, steps)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,6 @@
 import { createServerClient } from '@supabase/ssr'
 import { NextResponse, type NextRequest } from 'next/server'
+import { TokenVerificationUnavailableError, verifyAccessToken } from '@/lib/auth/jwt'
 
 // Middleware v2 - Updated with comprehensive logging
 export async function middleware(request: NextRequest) {
@@ -34,8 +35,19 @@ export async function middleware(request: NextRequest) {
     }
   )
 
-  // Refresh session if expired
-  const { data: { user }, error } = await supabase.auth.getUser()
+  // Refresh session if expired, then verify the access token locally
+  // (no Supabase Auth round trip unless the signing keys are unavailable)
+  const { data: { session }, error } = await supabase.auth.getSession()
+  let user: { id: string; email?: string } | null = null
+  if (session?.access_token) {
+    try {
+      const claims = await verifyAccessToken(session.access_token)
+      user = claims && { id: claims.sub, email: claims.email }
+    } catch (verifyError) {
+      if (!(verifyError instanceof TokenVerificationUnavailableError)) throw verifyError
+      user = (await supabase.auth.getUser()).data.user
+    }
+  }
 
   console.log(`[Middleware v2] ${pathname} - User:`, user ? `${user.email} (${user.id})` : 'null')
   if (error) {
@@ -1,7 +1,15 @@
 import type { NextConfig } from "next";
 
 const nextConfig: NextConfig = {
-  /* config options here */
+  // Loaded at runtime by the text-extraction worker threads, outside the bundle
+  serverExternalPackages: ["pdfjs-dist", "mammoth"],
+  outputFileTracingIncludes: {
+    "/api/**/*": [
+      "./lib/document-processing/extraction-worker.js",
+      "./lib/document-processing/pdf-pages.js",
+      "./node_modules/pdfjs-dist/legacy/build/*.mjs",
+    ],
+  },
 };
 
 export default nextConfig;
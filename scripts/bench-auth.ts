@@ -0,0 +1,134 @@
+/**
+ * Auth resolution benchmark
+ *
+ * Serves a JWKS and a fake Supabase Auth/REST API on localhost with a given
+ * network latency, signs ES256 access tokens, and compares per-request auth
+ * cost: the previous path (GET /auth/v1/user, then the users row over REST)
+ * against local verification with cached signing keys plus the profile LRU.
+ * Also checks that tampered, expired and foreign tokens are rejected.
+ *
+ * Usage: npm run bench:auth -- [--latency 40] [--requests 2000]
+ */
+import http from 'http'
+import type { AddressInfo } from 'net'
+import { verifyAccessToken } from '@/lib/auth/jwt'
+import { LRUCache } from '@/lib/utils/lru'
+
+const encoder = new TextEncoder()
+
+function base64Url(data: Uint8Array | string): string {
+  return Buffer.from(typeof data === 'string' ? encoder.encode(data) : data).toString('base64url')
+}
+
+async function sign(key: CryptoKey, kid: string, claims: Record<string, any>): Promise<string> {
+  const body = `${base64Url(JSON.stringify({ alg: 'ES256', kid, typ: 'JWT' }))}.${base64Url(JSON.stringify(claims))}`
+  const signature = await crypto.subtle.sign({ name: 'ECDSA', hash: 'SHA-256' }, key, encoder.encode(body))
+  return `${body}.${base64Url(new Uint8Array(signature))}`
+}
+
+function percentile(sorted: number[], p: number): number {
+  return sorted.length ? sorted[Math.min(sorted.length - 1, Math.floor((sorted.length * p) / 100))] : 0
+}
+
+function report(label: string, times: number[]) {
+  const sorted = [...times].sort((a, b) => a - b)
+  console.log(
+    `  ${label.padEnd(34)}`,
+    `p50 ${percentile(sorted, 50).toFixed(3).padStart(8)} ms`,
+    `p99 ${percentile(sorted, 99).toFixed(3).padStart(8)} ms`
+  )
+}
+
+async function main() {
+  const args = process.argv.slice(2)
+  const arg = (name: string) => {
+    const index = args.indexOf(name)
+    return index === -1 ? undefined : args[index + 1]
+  }
+  const latencyMs = parseInt(arg('--latency') || '40', 10)
+  const requests = parseInt(arg('--requests') || '2000', 10)
+
+  const { publicKey, privateKey } = await crypto.subtle.generateKey(
+    { name: 'ECDSA', namedCurve: 'P-256' }, true, ['sign', 'verify']
+  ) as CryptoKeyPair
+  const jwk = { ...(await crypto.subtle.exportKey('jwk', publicKey)), kid: 'bench-key', alg: 'ES256', use: 'sig' }
+  let jwksFetches = 0
+
+  const server = http.createServer((req, res) => {
+    setTimeout(() => {
+      res.writeHead(200, { 'content-type': 'application/json' })
+      if (req.url?.endsWith('/.well-known/jwks.json')) {
+        jwksFetches++
+        res.end(JSON.stringify({ keys: [jwk] }))
+      } else if (req.url?.startsWith('/auth/v1/user')) {
+        res.end(JSON.stringify({ id: 'user-1', email: 'avocat@example.ro' }))
+      } else {
+        res.end(JSON.stringify({ id: 'user-1', email: 'avocat@example.ro', role: 'legal_professional' }))
+      }
+    }, latencyMs)
+  })
+  await new Promise<void>(resolve => server.listen(0, '127.0.0.1', resolve))
+  const url = `http://127.0.0.1:${(server.address() as AddressInfo).port}`
+  process.env.NEXT_PUBLIC_SUPABASE_URL = url
+
+  const now = Math.floor(Date.now() / 1000)
+  const claims = { sub: 'user-1', email: 'avocat@example.ro', aud: 'authenticated', iss: `${url}/auth/v1`, exp: now + 3600 }
+  const tokens = await Promise.all(Array.from({ length: 50 }, (_, i) => sign(privateKey, 'bench-key', { ...claims, session_id: `s${i}` })))
+
+  try {
+    console.log(`Supabase latency ${latencyMs} ms per call\n`)
+
+    // Before: two round trips per request
+    const before: number[] = []
+    for (let i = 0; i < Math.min(requests, 50); i++) {
+      const start = performance.now()
+      await (await fetch(`${url}/auth/v1/user`)).json()
+      await (await fetch(`${url}/rest/v1/users?id=eq.user-1`)).json()
+      before.push(performance.now() - start)
+    }
+    report('getUser() + users query', before)
+
+    const coldStart = performance.now()
+    await verifyAccessToken(tokens[0])
+    report('first token (loads signing keys)', [performance.now() - coldStart])
+
+    // After: local signature check, profile from the LRU after the first request
+    const profiles = new LRUCache<string, object>(1000, 60_000)
+    const after: number[] = []
+    for (let i = 0; i < requests; i++) {
+      const start = performance.now()
+      const verified = await verifyAccessToken(tokens[i % tokens.length])
+      if (!verified) throw new Error('Valid token rejected')
+      if (!profiles.get(verified.sub)) {
+        profiles.set(verified.sub, await (await fetch(`${url}/rest/v1/users?id=eq.${verified.sub}`)).json())
+      }
+      after.push(performance.now() - start)
+    }
+    report('local verify + profile LRU', after)
+    report('  excluding the first request', after.slice(1))
+
+    const foreign = (await crypto.subtle.generateKey({ name: 'ECDSA', namedCurve: 'P-256' }, true, ['sign'])) as CryptoKeyPair
+    const [head, payload] = tokens[0].split('.')
+    const checks: [string, string][] = [
+      ['tampered payload', `${head}.${base64Url(JSON.stringify({ ...claims, sub: 'admin' }))}.${tokens[0].split('.')[2]}`],
+      ['expired', await sign(privateKey, 'bench-key', { ...claims, exp: now - 10 })],
+      ['other issuer', await sign(privateKey, 'bench-key', { ...claims, iss: 'https://other.supabase.co/auth/v1' })],
+      ['foreign key', await sign(foreign.privateKey, 'bench-key', claims)],
+      ['unknown kid', await sign(foreign.privateKey, 'rotated-key', claims)],
+      ['malformed', `${head}.${payload}`],
+    ]
+    console.log('')
+    for (const [name, token] of checks) {
+      const result = await verifyAccessToken(token)
+      console.log(`  ${name.padEnd(18)} ${result ? 'ACCEPTED (bug)' : 'rejected'}`)
+    }
+    console.log(`\n  signing key fetches: ${jwksFetches}`)
+  } finally {
+    server.close()
+  }
+}
+
+main().catch(error => {
+  console.error(error)
+  process.exit(1)
+})
@@ -0,0 +1,183 @@
+/**
+ * Clause parser micro-benchmark
+ *
+ * Extracts the sample contracts in the repo root (test-contract-*.pdf and the
+ * .docx drafts) once, then times parseDocumentStructure against the previous
+ * line-by-line implementation and reports throughput in MB/s of UTF-8 text.
+ *
+ * Usage: npm run bench:parser
+ */
+import fs from 'fs'
+import path from 'path'
+import {
+  extractTextFromPDF,
+  extractTextFromDOCX,
+  parseDocumentStructure,
+} from '@/lib/document-processing/extractor'
+import type { ClauseStructure } from '@/lib/document-processing/extractor'
+
+const ROOT = path.join(__dirname, '..')
+const MIN_DURATION_MS = 500
+const MIN_ITERATIONS = 20
+const LARGE_SAMPLE_BYTES = 5 * 1024 * 1024
+
+interface Sample {
+  name: string
+  text: string
+}
+
+interface Measurement {
+  mbPerSecond: number
+  clauses: number
+}
+
+// Extraction runs in-process here; the worker pool is not under test
+process.env.EXTRACTION_POOL = process.env.EXTRACTION_POOL || 'off'
+
+async function loadSamples(): Promise<Sample[]> {
+  const files = fs.readdirSync(ROOT)
+    .filter(name => /^test-contract-.*\.pdf$/.test(name) || name.endsWith('.docx'))
+    .sort()
+
+  const samples: Sample[] = []
+  for (const name of files) {
+    const buffer = fs.readFileSync(path.join(ROOT, name))
+    const processed = name.endsWith('.pdf')
+      ? await extractTextFromPDF(buffer)
+      : await extractTextFromDOCX(buffer)
+    samples.push({ name, text: processed.text })
+  }
+  return samples
+}
+
+function measure(parse: (text: string) => ClauseStructure[], text: string): Measurement {
+  const bytes = Buffer.byteLength(text)
+  let clauses = parse(text).length // warm-up
+
+  let iterations = 0
+  const start = process.hrtime.bigint()
+  let elapsedMs = 0
+  while (iterations < MIN_ITERATIONS || elapsedMs < MIN_DURATION_MS) {
+    clauses = parse(text).length
+    iterations++
+    elapsedMs = Number(process.hrtime.bigint() - start) / 1e6
+  }
+
+  return { mbPerSecond: (bytes * iterations) / (1024 * 1024) / (elapsedMs / 1000), clauses }
+}
+
+function maxDepth(clauses: ClauseStructure[]): number {
+  const depths: number[] = []
+  let max = 0
+  for (const clause of clauses) {
+    const depth = clause.parent_index !== undefined ? depths[clause.parent_index] + 1 : 1
+    depths.push(depth)
+    max = Math.max(max, depth)
+  }
+  return max
+}
+
+function report(sample: Sample) {
+  const current = measure(parseDocumentStructure, sample.text)
+  const legacy = measure(legacyParseDocumentStructure, sample.text)
+  const clauses = parseDocumentStructure(sample.text)
+
+  console.log(
+    sample.name.padEnd(40),
+    `${(Buffer.byteLength(sample.text) / 1024).toFixed(1).padStart(8)} KB`,
+    `${String(current.clauses).padStart(6)} clauses`,
+    `depth ${maxDepth(clauses)}`,
+    `${current.mbPerSecond.toFixed(1).padStart(8)} MB/s`,
+    `(previous: ${legacy.mbPerSecond.toFixed(1)} MB/s, ${(current.mbPerSecond / legacy.mbPerSecond).toFixed(1)}x)`
+  )
+}
+
+async function main() {
+  const samples = await loadSamples()
+  if (samples.length === 0) {
+    console.error('No sample contracts found in', ROOT)
+    process.exit(1)
+  }
+
+  console.log('Clause parser throughput\n')
+  for (const sample of samples) {
+    report(sample)
+  }
+
+  // All samples repeated up to a few MB, to check that throughput holds on long documents
+  const combined = samples.map(sample => sample.text).join('\n\n')
+  const repeats = Math.max(1, Math.ceil(LARGE_SAMPLE_BYTES / Buffer.byteLength(combined)))
+  report({ name: `all samples x${repeats}`, text: Array(repeats).fill(combined).join('\n\n') })
+}
+
+/**
+ * The previous implementation, kept verbatim for comparison
+ */
+function legacyParseDocumentStructure(text: string): ClauseStructure[] {
+  const clauses: ClauseStructure[] = []
+  const lines = text.split('\n')
+  
+  let currentPosition = 0
+  let clauseIndex = 0
+
+  for (let i = 0; i < lines.length; i++) {
+    const line = lines[i].trim()
+    if (!line) {
+      currentPosition += lines[i].length + 1
+      continue
+    }
+
+    // Detect numbered clauses (e.g., "1.", "1.1", "Art. 5", "Article 10")
+    const numberedMatch = line.match(/^(\d+\.(?:\d+\.)*|\bArt(?:icle)?\.?\s*\d+)/i)
+    
+    // Detect headings (all caps, or short lines with specific patterns)
+    const isHeading = line.length < 100 && (
+      line === line.toUpperCase() ||
+      /^[A-Z][A-Z\s]+$/.test(line)
+    )
+
+    let clauseType = 'paragraph'
+    let clauseNumber = undefined
+    let heading = undefined
+
+    if (numberedMatch) {
+      clauseNumber = numberedMatch[1]
+      clauseType = 'article'
+      heading = line.replace(numberedMatch[0], '').trim()
+    } else if (isHeading) {
+      clauseType = 'heading'
+      heading = line
+    }
+
+    // Gather content for this clause (current line + following non-heading lines)
+    let content = line
+    let j = i + 1
+    while (j < lines.length && lines[j].trim() && !lines[j].match(/^(\d+\.|\bArt)/i)) {
+      content += '\n' + lines[j].trim()
+      j++
+    }
+
+    const startChar = currentPosition
+    const endChar = startChar + content.length
+
+    clauses.push({
+      clause_number: clauseNumber,
+      clause_type: clauseType,
+      heading: heading,
+      content: content,
+      start_char: startChar,
+      end_char: endChar,
+      order_index: clauseIndex++,
+    })
+
+    currentPosition = endChar + 1
+    i = j - 1 // Move past processed lines
+  }
+
+  return clauses
+}
+
+main().catch(error => {
+  console.error(error)
+  process.exit(1)
+})
@@ -0,0 +1,164 @@
+/**
+ * DOCX export benchmark
+ *
+ * Builds a contract of the given length (about 12 paragraphs per page, a 2 MB
+ * image to exercise the raw copy of unchanged parts), parses its clauses the
+ * way the pipeline does, comments on a share of them (half with suggested
+ * revisions) and streams the export into a sink that discards the chunks.
+ * Reports the time to the first chunk and in total, throughput, peak heap
+ * growth against the archive size, and checks the result: the archive reads
+ * back, every comment is anchored and no clause went unmatched.
+ * A real file can be used instead with --docx (its own text gives the clauses).
+ *
+ * Usage: npm run bench:export -- [--pages 150] [--comment-share 0.3] [--docx contract.docx] [--out reviewed.docx]
+ */
+import fs from 'fs'
+import { randomBytes } from 'crypto'
+import { exportDocx, scanParagraphs, type ExportClause, type ExportComment } from '@/lib/export/docx'
+import { readZipEntries, writeZip } from '@/lib/utils/zip'
+import { parseDocumentStructure } from '@/lib/document-processing/extractor'
+
+const WORDS = 'prestatorul beneficiarul contractului obligatia raspunderea plata termen reziliere notificare daune prejudiciu clauza partile conform prevederilor legale aplicabile'.split(' ')
+
+// Deterministic so runs are comparable
+function random(seed: number): () => number {
+  return () => {
+    seed = (seed * 1664525 + 1013904223) % 4294967296
+    return seed / 4294967296
+  }
+}
+
+async function syntheticDocx(pages: number): Promise<Buffer> {
+  const rand = random(7)
+  const paragraphs: string[] = []
+  let article = 0
+  for (let i = 0; i < pages * 12; i++) {
+    if (i % 10 === 0) {
+      article++
+      paragraphs.push(`<w:p><w:pPr><w:pStyle w:val="Heading1"/><w:tabs><w:tab w:val="left" w:pos="720"/></w:tabs></w:pPr><w:r><w:rPr><w:b/></w:rPr><w:t>CAPITOLUL ${article}</w:t></w:r></w:p>`)
+      continue
+    }
+    const words = Array.from({ length: 30 + Math.floor(rand() * 30) }, () => WORDS[Math.floor(rand() * WORDS.length)])
+    const half = Math.floor(words.length / 2)
+    // Split over two runs with different formatting, as Word does
+    paragraphs.push(
+      `<w:p w:rsidR="00A1"><w:r><w:t xml:space="preserve">${article}.${i % 10}. ${words.slice(0, half).join(' ')} </w:t></w:r>`
+      + `<w:r><w:rPr><w:i/></w:rPr><w:t>${words.slice(half).join(' ')} &amp; altele.</w:t></w:r></w:p>`
+    )
+  }
+
+  const document = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    + '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"><w:body>'
+    + paragraphs.join('')
+    + '<w:sectPr/></w:body></w:document>'
+
+  const chunks: Buffer[] = []
+  for await (const chunk of writeZip([
+    {
+      name: '[Content_Types].xml',
+      data: '<?xml version="1.0" encoding="UTF-8"?><Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        + '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        + '<Default Extension="xml" ContentType="application/xml"/><Default Extension="png" ContentType="image/png"/>'
+        + '<Override PartName="/word/document.xml" ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/></Types>',
+    },
+    {
+      name: '_rels/.rels',
+      data: '<?xml version="1.0" encoding="UTF-8"?><Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        + '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="word/document.xml"/></Relationships>',
+    },
+    { name: 'word/document.xml', data: document },
+    { name: 'word/media/image1.png', data: randomBytes(2 * 1024 * 1024) },
+  ])) {
+    chunks.push(chunk)
+  }
+  return Buffer.concat(chunks)
+}
+
+function makeComments(clauses: ExportClause[], share: number): ExportComment[] {
+  const rand = random(11)
+  return clauses
+    .filter(clause => clause.clause_type !== 'heading' && rand() < share)
+    .map((clause, i) => ({
+      id: `comment-${i}`,
+      clause_id: clause.id,
+      title: `Clauză dezechilibrată (${i + 1})`,
+      content: 'Răspunderea prestatorului nu este plafonată; riscul este semnificativ.',
+      suggested_revision: i % 2 ? 'Răspunderea totală a Prestatorului este limitată la valoarea plătită în ultimele 12 luni.' : undefined,
+      risk_level: (['low', 'medium', 'high', 'critical'] as const)[i % 4],
+      legal_references: [{ law: 'Cod Civil', article: 'Art. 1350' }],
+    }))
+}
+
+async function main() {
+  const args = process.argv.slice(2)
+  const arg = (name: string) => {
+    const index = args.indexOf(name)
+    return index === -1 ? undefined : args[index + 1]
+  }
+  const pages = parseInt(arg('--pages') || '150', 10)
+  const share = parseFloat(arg('--comment-share') || '0.3')
+
+  const original = arg('--docx') ? fs.readFileSync(arg('--docx')!) : await syntheticDocx(pages)
+  const documentXml = readZipEntries(original).find(entry => entry.name === 'word/document.xml')!.read().toString('utf8')
+  // The paragraph layout of mammoth's raw text, which the stored offsets refer to
+  const text = scanParagraphs(documentXml).text
+  const clauses: ExportClause[] = parseDocumentStructure(text).map((clause, i) => ({ ...clause, id: `clause-${i}` }))
+  const comments = makeComments(clauses, share)
+
+  console.log(
+    `${arg('--docx') || `synthetic, ${pages} pages`}: ${(original.length / 1024).toFixed(0)} KB, `
+    + `document.xml ${(documentXml.length / 1024).toFixed(0)} KB, ${clauses.length} clauses, ${comments.length} comments\n`
+  )
+
+  let best = Infinity
+  for (let run = 0; run < 4; run++) {
+    global.gc?.()
+    const heapBefore = process.memoryUsage().heapUsed
+    let peakHeap = heapBefore
+    const start = performance.now()
+    const { stream, stats } = exportDocx(original, clauses, comments)
+    const planned = performance.now()
+    let firstChunk = 0
+    let bytes = 0
+    const output: Buffer[] = []
+    for await (const chunk of stream) {
+      if (!firstChunk) firstChunk = performance.now()
+      bytes += chunk.length
+      peakHeap = Math.max(peakHeap, process.memoryUsage().heapUsed)
+      if (run === 0) output.push(chunk)
+    }
+    const total = performance.now() - start
+    best = Math.min(best, total)
+
+    if (run === 0) {
+      const result = Buffer.concat(output)
+      const parts = readZipEntries(result)
+      const xml = parts.find(entry => entry.name === 'word/document.xml')!.read().toString('utf8')
+      const commentsXml = parts.find(entry => entry.name === 'word/comments.xml')?.read().toString('utf8') || ''
+      console.log('  stats:', stats)
+      console.log(
+        `  check: ${parts.length} parts, ${(xml.match(/<w:ins /g) || []).length} insertions, `
+        + `${(xml.match(/<w:commentReference /g) || []).length} comment anchors, `
+        + `${(commentsXml.match(/<w:comment /g) || []).length} comments`
+        + (stats.unmatchedClauses ? ` - ${stats.unmatchedClauses} UNMATCHED CLAUSES` : '')
+      )
+      if (arg('--out')) fs.writeFileSync(arg('--out')!, result)
+      console.log('')
+    }
+
+    console.log(
+      `  run ${run + 1}: plan ${(planned - start).toFixed(0).padStart(5)} ms`,
+      `first chunk ${(firstChunk - start).toFixed(0).padStart(5)} ms`,
+      `total ${total.toFixed(0).padStart(5)} ms`,
+      `output ${(bytes / 1024).toFixed(0)} KB`,
+      `peak heap +${((peakHeap - heapBefore) / (1024 * 1024)).toFixed(1)} MB`
+    )
+  }
+
+  console.log(`\n  ${((documentXml.length / (1024 * 1024)) / (best / 1000)).toFixed(1)} MB/s of document.xml (best run)`)
+}
+
+main().catch(error => {
+  console.error(error)
+  process.exit(1)
+})
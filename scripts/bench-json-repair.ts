@@ -0,0 +1,189 @@
+/**
+ * Analysis response parsing benchmark
+ *
+ * Builds a corpus of model responses with the failure modes seen in
+ * production: markdown fences, prose around the JSON, trailing commas, raw
+ * line breaks in strings and output cut off at random points (max_tokens).
+ * For each kind it reports how many responses a bare JSON.parse accepts vs
+ * parseAnalysis, how many of the complete issues were recovered, and the
+ * parse time. Real responses can be added with --dir (one .json/.txt per
+ * response, parsed as-is).
+ *
+ * Usage: npm run bench:json -- [--dir <responses>] [--cuts 200]
+ */
+import fs from 'fs'
+import path from 'path'
+import { parseAnalysis } from '@/lib/ai/json-repair'
+import { IssueStreamParser } from '@/lib/ai/json-stream'
+import type { AnalysisIssue, ContractAnalysis } from '@/lib/ai/provider'
+
+interface Sample {
+  kind: string
+  text: string
+  /** Issues a perfect parser could recover from the text */
+  issues: number
+}
+
+interface Result {
+  kind: string
+  samples: number
+  jsonParse: number
+  repaired: number
+  issues: number
+  recovered: number
+  times: number[]
+}
+
+const TOPICS = [
+  ['liability', 'Răspundere nelimitată', 'Art. 1350 Cod Civil'],
+  ['termination', 'Reziliere unilaterală fără preaviz', 'Art. 1552 Cod Civil'],
+  ['data_protection', 'Lipsesc clauzele GDPR de persoană împuternicită', 'Art. 28 GDPR'],
+  ['payment', 'Penalități de întârziere excesive', 'Art. 1541 Cod Civil'],
+  ['ip_rights', 'Transferul drepturilor de autor nu este delimitat', 'Art. 41 Legea 8/1996'],
+  ['dispute_resolution', 'Instanța competentă nu este stabilită', 'Art. 126 Cod Procedură Civilă'],
+]
+
+// Deterministic so runs are comparable
+function random(seed: number): () => number {
+  return () => {
+    seed = (seed * 1664525 + 1013904223) % 4294967296
+    return seed / 4294967296
+  }
+}
+
+function makeAnalysis(rand: () => number, issueCount: number): ContractAnalysis {
+  const issues: AnalysisIssue[] = Array.from({ length: issueCount }, (_, i) => {
+    const [category, title, article] = TOPICS[i % TOPICS.length]
+    return {
+      title: `${title} (${i + 1})`,
+      description: `Clauza ${i + 3}.${Math.floor(rand() * 9) + 1} prevede că „Prestatorul răspunde pentru orice prejudiciu", fără plafon. ${'Riscul este semnificativ pentru prestator. '.repeat(1 + Math.floor(rand() * 3))}`,
+      risk_level: (['low', 'medium', 'high', 'critical'] as const)[Math.floor(rand() * 4)],
+      category,
+      legal_references: [{ law: article.split(' ').slice(2).join(' ') || 'Cod Civil', article, relevance_score: 0.8 }],
+      suggested_revision: 'Răspunderea totală a Prestatorului este limitată la valoarea plătită în ultimele 12 luni, cu excepția dolului sau a culpei grave.',
+      confidence: Math.round(rand() * 100) / 100,
+    }
+  })
+  return {
+    contract_type: 'b2b_services',
+    overall_risk_score: 0.62,
+    compliance_score: 0.71,
+    issues,
+    clauses: issues.slice(0, 4).map(issue => ({
+      clause_type: issue.category,
+      content: issue.description.slice(0, 200),
+      risk_level: issue.risk_level,
+      comments: [{ type: 'warning' as const, title: issue.title, content: issue.suggested_revision!, confidence: issue.confidence }],
+    })),
+  }
+}
+
+/**
+ * Issues whose closing brace is within the first `length` characters
+ */
+function completeIssues(json: string, length: number): number {
+  const parser = new IssueStreamParser(() => {})
+  parser.push(json.slice(0, length))
+  return parser.issues.length
+}
+
+function buildCorpus(cuts: number): Sample[] {
+  const rand = random(42)
+  const samples: Sample[] = []
+  for (let doc = 0; doc < 20; doc++) {
+    const analysis = makeAnalysis(rand, 4 + (doc % 9))
+    const json = JSON.stringify(analysis, null, doc % 2 ? 2 : undefined)
+    const issues = analysis.issues.length
+
+    samples.push({ kind: 'clean', text: json, issues })
+    samples.push({ kind: 'code fence', text: '```json\n' + json + '\n```', issues })
+    samples.push({ kind: 'prose', text: `Iată analiza contractului:\n\n${json}\n\nSper că vă ajută.`, issues })
+    samples.push({ kind: 'trailing comma', text: json.replace(/("confidence":\s?[\d.]+)/g, '$1,'), issues })
+    samples.push({ kind: 'raw newline', text: json.replace(/\. (Riscul)/g, '.\n$1'), issues })
+
+    for (let i = 0; i < cuts / 20; i++) {
+      const length = Math.floor(json.length * (0.05 + rand() * 0.9))
+      samples.push({ kind: 'truncated', text: json.slice(0, length), issues: completeIssues(json, length) })
+    }
+  }
+  return samples
+}
+
+function loadDir(dir: string): Sample[] {
+  return fs.readdirSync(dir)
+    .filter(name => /\.(json|txt)$/.test(name))
+    .map(name => {
+      const text = fs.readFileSync(path.join(dir, name), 'utf8')
+      let issues = 0
+      try {
+        issues = parseAnalysis(text).analysis.issues.length
+      } catch {}
+      return { kind: 'recorded', text, issues }
+    })
+}
+
+function percentile(sorted: number[], p: number): number {
+  return sorted.length ? sorted[Math.min(sorted.length - 1, Math.floor((sorted.length * p) / 100))] : 0
+}
+
+function run(samples: Sample[]): Result[] {
+  const results = new Map<string, Result>()
+  for (const sample of samples) {
+    const result = results.get(sample.kind)
+      || { kind: sample.kind, samples: 0, jsonParse: 0, repaired: 0, issues: 0, recovered: 0, times: [] }
+    results.set(sample.kind, result)
+    result.samples++
+    result.issues += sample.issues
+
+    try {
+      JSON.parse(sample.text)
+      result.jsonParse++
+    } catch {}
+
+    const start = process.hrtime.bigint()
+    try {
+      const parsed = parseAnalysis(sample.text)
+      result.times.push(Number(process.hrtime.bigint() - start) / 1e3)
+      result.repaired++
+      result.recovered += Math.min(parsed.analysis.issues.length, sample.issues)
+    } catch {
+      result.times.push(Number(process.hrtime.bigint() - start) / 1e3)
+    }
+  }
+  return [...results.values()]
+}
+
+function main() {
+  const args = process.argv.slice(2)
+  const arg = (name: string) => {
+    const index = args.indexOf(name)
+    return index === -1 ? undefined : args[index + 1]
+  }
+  const samples = buildCorpus(parseInt(arg('--cuts') || '200', 10))
+  if (arg('--dir')) samples.push(...loadDir(arg('--dir')!))
+
+  run(samples) // warm-up
+  const results = run(samples)
+  const bytes = samples.reduce((sum, sample) => sum + Buffer.byteLength(sample.text), 0)
+
+  console.log(`${samples.length} responses, ${(bytes / 1024).toFixed(0)} KB\n`)
+  console.log('kind              n  JSON.parse  parseAnalysis  issues recovered   p50 µs   p99 µs')
+  for (const result of results) {
+    const times = [...result.times].sort((a, b) => a - b)
+    const pct = (count: number, total: number) => `${total ? Math.round((count / total) * 100) : 100}%`.padStart(4)
+    console.log(
+      result.kind.padEnd(15),
+      String(result.samples).padStart(4),
+      `${pct(result.jsonParse, result.samples)}`.padStart(11),
+      `${pct(result.repaired, result.samples)}`.padStart(14),
+      `${result.recovered}/${result.issues} ${pct(result.recovered, result.issues)}`.padStart(17),
+      percentile(times, 50).toFixed(0).padStart(8),
+      percentile(times, 99).toFixed(0).padStart(8)
+    )
+  }
+
+  const totalMs = results.reduce((sum, r) => sum + r.times.reduce((a, b) => a + b, 0), 0) / 1000
+  console.log(`\nparseAnalysis: ${((bytes / (1024 * 1024)) / (totalMs / 1000)).toFixed(1)} MB/s`)
+}
+
+main()
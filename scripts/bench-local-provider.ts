@@ -0,0 +1,109 @@
+/**
+ * Local model benchmark: full analysis of the sample contracts on CPU
+ *
+ * Extracts and parses each contract, runs the rule pre-pass, then analyzes it
+ * with the LocalProvider against a llama.cpp server, once as a single call and
+ * once as clause-level chunks sent concurrently (batched by the server across
+ * its slots). Reports wall time, first token, generation speed and prompt
+ * tokens served from the server's KV cache.
+ *
+ * Start the server first, e.g.
+ *   llama-server -m model.gguf -c 32768 --parallel 4 --port 8080
+ * With --fake the benchmark runs against scripts/fake-llm-server.ts instead,
+ * to check the plumbing without a model.
+ *
+ * Usage: npm run bench:local -- [files...] [--fake] [--chunk-chars 4000] [--parallel 4]
+ *        (defaults to the sample contracts in the repo root)
+ */
+import fs from 'fs'
+import path from 'path'
+import { createAIProvider } from '@/lib/ai/provider'
+import type { AIAnalysisResponse } from '@/lib/ai/provider'
+import { analyzeDocument } from '@/lib/ai/map-reduce'
+import { evaluateRules } from '@/lib/analysis/rules'
+import {
+  extractTextFromPDF,
+  extractTextFromDOCX,
+  parseDocumentStructure,
+} from '@/lib/document-processing/extractor'
+import { startFakeLLMServer } from './fake-llm-server'
+
+const ROOT = path.join(__dirname, '..')
+
+process.env.EXTRACTION_POOL = process.env.EXTRACTION_POOL || 'off'
+
+function describe(label: string, response: AIAnalysisResponse, ms: number): string {
+  const metadata = response.metadata || {}
+  return [
+    `    ${label.padEnd(11)}`,
+    `${(ms / 1000).toFixed(1).padStart(6)} s`,
+    `first token ${String(metadata.first_token_ms ?? '-').padStart(6)} ms`,
+    `${String(metadata.input_tokens ?? 0).padStart(6)} in`,
+    `${String(metadata.prompt_cache_read_tokens ?? 0).padStart(6)} cached`,
+    `${String(metadata.output_tokens ?? 0).padStart(5)} out`,
+    metadata.tokens_per_second ? `${metadata.tokens_per_second} tok/s` : '',
+    `${response.analysis.issues.length} issues`,
+  ].join('  ')
+}
+
+async function main() {
+  const args = process.argv.slice(2)
+  const arg = (name: string) => {
+    const index = args.indexOf(name)
+    return index === -1 ? undefined : args[index + 1]
+  }
+  const optionValues = new Set(['--chunk-chars', '--parallel'].map(arg))
+  const files = args.filter(a => !a.startsWith('--') && !optionValues.has(a))
+  const targets = files.length > 0
+    ? files.map(file => path.resolve(file))
+    : fs.readdirSync(ROOT)
+      .filter(name => /^test-contract-.*\.pdf$/.test(name) || name.endsWith('.docx'))
+      .sort()
+      .map(name => path.join(ROOT, name))
+
+  const chunkChars = parseInt(arg('--chunk-chars') || '4000', 10)
+  const parallel = parseInt(arg('--parallel') || '4', 10)
+  const fake = args.includes('--fake') ? await startFakeLLMServer(0, { openai: { latencyMs: 300 } }) : null
+  const provider = createAIProvider({
+    provider: 'local',
+    apiKey: process.env.LOCAL_LLM_API_KEY || '',
+    model: process.env.LOCAL_LLM_MODEL || 'local-gguf',
+    baseURL: fake?.url || process.env.LOCAL_LLM_URL,
+    maxTokens: 2000,
+    temperature: 0.2,
+  })
+
+  try {
+    for (const file of targets) {
+      const buffer = fs.readFileSync(file)
+      const processed = file.endsWith('.pdf') ? await extractTextFromPDF(buffer) : await extractTextFromDOCX(buffer)
+      const clauses = parseDocumentStructure(processed.text)
+      const rules = evaluateRules(clauses)
+      const request = { documentText: processed.text, contractType: rules.contract_type }
+      console.log(`\n${path.basename(file)}: ${processed.text.length} chars, ${clauses.length} clauses,`,
+        `rules ${rules.elapsed_ms} ms (${rules.contract_type}, ${rules.issues.length} issues)`)
+
+      for (const mode of ['single', 'map_reduce'] as const) {
+        const start = Date.now()
+        try {
+          const response = await analyzeDocument(provider, request, clauses, {
+            mode,
+            chunkChars,
+            concurrency: parallel,
+          })
+          const label = mode === 'single' ? 'single' : `${response.metadata?.chunks} chunks`
+          console.log(describe(label, response, Date.now() - start))
+        } catch (error: any) {
+          console.log(`    ${mode.padEnd(11)} failed: ${error.message}`)
+        }
+      }
+    }
+  } finally {
+    await fake?.close()
+  }
+}
+
+main().catch(error => {
+  console.error(error)
+  process.exit(1)
+})
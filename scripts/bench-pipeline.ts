@@ -0,0 +1,361 @@
+/**
+ * End-to-end pipeline benchmark: upload -> analyze -> view
+ *
+ * Runs the pipeline for N concurrent users against local stand-ins: the
+ * in-memory Supabase of scripts/fake-supabase.ts (each call waits --db-latency)
+ * and scripts/fake-llm-server.ts answering the LocalProvider with
+ * MockProvider's analysis padded to --output-tokens, streamed at
+ * --tokens-per-second. Each user takes the next sample contract (the PDFs and
+ * DOCX in the repo root, or the given files) and goes through the same steps
+ * as the routes: upload (storage + document row), analyze (queue the job, run
+ * it in an inline worker like the analyze route's after(), wait for the
+ * document to be analyzed) and view (the viewer's RPC, then the next window
+ * of clauses when there is one).
+ *
+ * Reports p50/p95/p99 per stage, documents per minute and Supabase calls per
+ * document, and compares them with the baseline in --baseline: a p50 or p95
+ * more than --tolerance slower (and 5 ms), or throughput that much lower,
+ * fails the run. --save-baseline records the run as the new baseline; record
+ * it on the machine the comparisons will run on.
+ *
+ * Usage: npm run bench:pipeline -- [files...] [--users 4] [--documents 24]
+ *          [--db-latency 5] [--llm-latency 300] [--output-tokens 600]
+ *          [--tokens-per-second 200] [--baseline scripts/baselines/pipeline.json]
+ *          [--save-baseline] [--tolerance 0.2]
+ */
+import fs from 'fs'
+import os from 'os'
+import path from 'path'
+import type { SupabaseClient } from '@supabase/supabase-js'
+import { runAnalysisJob } from '@/lib/analysis/pipeline'
+import { InMemoryJobQueue } from '@/lib/jobs/queues/memory'
+import { WorkerPool } from '@/lib/jobs/worker'
+import { validateUpload, buildStoragePath, contentTypeForFilename } from '@/lib/document-processing/upload'
+import { loadDocumentView, listClauseRange, INITIAL_CLAUSES } from '@/lib/documents/view'
+import { startFakeLLMServer } from './fake-llm-server'
+import { createFakeSupabase } from './fake-supabase'
+import type { FakeSupabase } from './fake-supabase'
+
+const ROOT = path.join(__dirname, '..')
+const STAGES = ['upload', 'analyze', 'view', 'total'] as const
+type Stage = typeof STAGES[number]
+
+interface StageSummary {
+  p50: number
+  p95: number
+  p99: number
+}
+
+interface BenchResult {
+  config: Record<string, any>
+  stages: Record<Stage, StageSummary>
+  documents_per_minute: number
+  failed: number
+  recorded_at: string
+  machine: string
+}
+
+interface Sample {
+  name: string
+  type: string
+  data: Buffer
+}
+
+// Quiet the pipeline's progress logs; the report is printed with `log`
+const log = console.log.bind(console)
+console.log = () => {}
+console.warn = () => {}
+
+process.env.EXTRACTION_POOL = process.env.EXTRACTION_POOL || 'off'
+
+function percentile(sorted: number[], p: number): number {
+  return sorted.length ? sorted[Math.min(sorted.length - 1, Math.floor((sorted.length * p) / 100))] : 0
+}
+
+function summarize(times: number[]): StageSummary {
+  const sorted = [...times].sort((a, b) => a - b)
+  return { p50: percentile(sorted, 50), p95: percentile(sorted, 95), p99: percentile(sorted, 99) }
+}
+
+/**
+ * The upload route: validate, store the file, insert the document row, audit
+ */
+async function upload(supabase: SupabaseClient, userId: string, sample: Sample): Promise<string> {
+  const validationError = validateUpload({ type: sample.type, size: sample.data.length })
+  if (validationError) throw new Error(validationError)
+
+  const filePath = buildStoragePath(userId, sample.name)
+  const { error: uploadError } = await supabase.storage
+    .from('documents')
+    .upload(filePath, sample.data, { contentType: sample.type, upsert: false })
+  if (uploadError) throw new Error('Upload failed: ' + uploadError.message)
+
+  const { data: document, error } = await supabase
+    .from('documents')
+    .insert({
+      user_id: userId,
+      filename: sample.name,
+      file_size: sample.data.length,
+      file_type: sample.type,
+      storage_path: filePath,
+      status: 'uploading',
+    })
+    .select()
+    .single()
+  if (error || !document) throw new Error('Document insert failed: ' + error?.message)
+
+  await supabase.from('audit_logs').insert({
+    user_id: userId,
+    action: 'document_upload',
+    resource_type: 'document',
+    resource_id: document.id,
+    details: { filename: sample.name, file_size: sample.data.length, file_type: sample.type },
+  })
+  return document.id
+}
+
+/**
+ * The analyze route and its inline worker; resolves once the document is
+ * analyzed (by this worker or another user's)
+ */
+async function analyze(
+  store: FakeSupabase,
+  supabase: SupabaseClient,
+  queue: InMemoryJobQueue,
+  userId: string,
+  documentId: string
+): Promise<void> {
+  const { data: document } = await supabase
+    .from('documents')
+    .select('id, status')
+    .eq('id', documentId)
+    .eq('user_id', userId)
+    .single()
+  if (!document) throw new Error('Document not found')
+
+  await supabase
+    .from('analyses')
+    .select('id, status')
+    .eq('document_id', documentId)
+    .in('status', ['pending', 'in_progress'])
+    .limit(1)
+    .maybeSingle()
+
+  await queue.enqueue({
+    document_id: documentId,
+    requested_by: userId,
+    ai_provider: 'local',
+    model_version: 'local-gguf',
+    max_attempts: 1,
+    payload: { mode: 'full' },
+  })
+  await supabase.from('documents').update({ status: 'processing' }).eq('id', documentId)
+
+  const service = store.client()
+  const pool = new WorkerPool(queue, (job, context) => runAnalysisJob(service, job, context), {
+    concurrency: 1,
+    onJobFailed: async (job, _error, willRetry) => {
+      if (!willRetry) await service.from('documents').update({ status: 'failed' }).eq('id', job.document_id)
+    },
+  })
+  await pool.drain({ maxJobs: 1 })
+
+  // The inline worker may have run another user's job; wait for this one
+  for (;;) {
+    const status = store.table('documents').find(row => row.id === documentId)?.status
+    if (status === 'analyzed') return
+    if (status === 'failed') throw new Error('Analysis failed')
+    await new Promise(resolve => setTimeout(resolve, 5))
+  }
+}
+
+/**
+ * The viewer: first window in one RPC, then the next clauses as the user scrolls
+ */
+async function view(supabase: SupabaseClient, documentId: string): Promise<void> {
+  const documentView = await loadDocumentView(supabase, documentId)
+  if (!documentView) throw new Error('Viewer could not load the document')
+  if (documentView.comment_count === 0) throw new Error('Analyzed document has no comments')
+  if (documentView.clause_count > INITIAL_CLAUSES) {
+    await listClauseRange(supabase, documentId, INITIAL_CLAUSES, INITIAL_CLAUSES)
+  }
+}
+
+function loadSamples(files: string[]): Sample[] {
+  const targets = files.length > 0
+    ? files.map(file => path.resolve(file))
+    : fs.readdirSync(ROOT)
+      .filter(name => /^test-contract-.*\.pdf$/.test(name) || name.endsWith('.docx'))
+      .sort()
+      .map(name => path.join(ROOT, name))
+  return targets.map(file => ({
+    name: path.basename(file),
+    type: contentTypeForFilename(file),
+    data: fs.readFileSync(file),
+  }))
+}
+
+/**
+ * Stages more than `tolerance` slower than the baseline (and at least 5 ms,
+ * so sub-millisecond noise does not count), or throughput that much lower
+ */
+function findRegressions(result: BenchResult, baseline: BenchResult, tolerance: number): string[] {
+  const regressions: string[] = []
+  for (const stage of STAGES) {
+    for (const key of ['p50', 'p95'] as const) {
+      const before = baseline.stages[stage]?.[key]
+      const after = result.stages[stage][key]
+      if (before !== undefined && after > before * (1 + tolerance) && after - before > 5) {
+        regressions.push(`${stage} ${key} ${before.toFixed(0)} -> ${after.toFixed(0)} ms`)
+      }
+    }
+  }
+  if (result.documents_per_minute < baseline.documents_per_minute * (1 - tolerance)) {
+    regressions.push(
+      `throughput ${baseline.documents_per_minute.toFixed(1)} -> ${result.documents_per_minute.toFixed(1)} documents/min`
+    )
+  }
+  if (result.failed > baseline.failed) {
+    regressions.push(`failed documents ${baseline.failed} -> ${result.failed}`)
+  }
+  return regressions
+}
+
+async function main() {
+  const args = process.argv.slice(2)
+  const arg = (name: string) => {
+    const index = args.indexOf(name)
+    return index === -1 ? undefined : args[index + 1]
+  }
+  const valueOptions = ['--users', '--documents', '--db-latency', '--llm-latency', '--output-tokens',
+    '--tokens-per-second', '--baseline', '--tolerance']
+  const optionValues = new Set(valueOptions.map(arg))
+  const files = args.filter(a => !a.startsWith('--') && !optionValues.has(a))
+
+  const config = {
+    users: parseInt(arg('--users') || '4', 10),
+    documents: parseInt(arg('--documents') || '24', 10),
+    db_latency_ms: parseInt(arg('--db-latency') || '5', 10),
+    llm_latency_ms: parseInt(arg('--llm-latency') || '300', 10),
+    output_tokens: parseInt(arg('--output-tokens') || '600', 10),
+    tokens_per_second: parseFloat(arg('--tokens-per-second') || '200'),
+    samples: [] as string[],
+  }
+  const baselinePath = path.resolve(arg('--baseline') || path.join(ROOT, 'scripts/baselines/pipeline.json'))
+  const tolerance = parseFloat(arg('--tolerance') || '0.2')
+
+  const samples = loadSamples(files)
+  if (samples.length === 0) throw new Error('No sample contracts found')
+  config.samples = samples.map(sample => sample.name)
+
+  const llm = await startFakeLLMServer(0, {
+    openai: {
+      latencyMs: config.llm_latency_ms,
+      outputTokens: config.output_tokens,
+      tokensPerSecond: config.tokens_per_second,
+    },
+  })
+  // The real provider stack (router, map-reduce) against the fake server;
+  // no cache, or every repeat of a sample would skip the model
+  Object.assign(process.env, {
+    AI_PROVIDER: 'local',
+    AI_FALLBACK_PROVIDER: '',
+    LOCAL_LLM_URL: llm.url,
+    LOCAL_LLM_CONTEXT: process.env.LOCAL_LLM_CONTEXT || '200000',
+    ANALYSIS_CACHE: 'off',
+    RAG_BACKEND: process.env.RAG_BACKEND || 'off',
+  })
+
+  const store = createFakeSupabase({ latencyMs: config.db_latency_ms })
+  const queue = new InMemoryJobQueue()
+  const times: Record<Stage, number[]> = { upload: [], analyze: [], view: [], total: [] }
+  const errors: string[] = []
+  let next = 0
+
+  log(`${config.users} users, ${config.documents} documents from ${samples.length} samples,`,
+    `Supabase ${config.db_latency_ms} ms/call, LLM ${config.llm_latency_ms} ms + ${config.output_tokens} tokens`,
+    `at ${config.tokens_per_second} tok/s\n`)
+
+  const start = performance.now()
+  await Promise.all(Array.from({ length: config.users }, async (_, user) => {
+    const userId = `00000000-0000-4000-8000-${String(user + 1).padStart(12, '0')}`
+    const supabase = store.client(userId)
+    for (let index = next++; index < config.documents; index = next++) {
+      const sample = samples[index % samples.length]
+      const stageStart = performance.now()
+      try {
+        const documentId = await upload(supabase, userId, sample)
+        const uploaded = performance.now()
+        await analyze(store, supabase, queue, userId, documentId)
+        const analyzed = performance.now()
+        await view(supabase, documentId)
+        const viewed = performance.now()
+
+        times.upload.push(uploaded - stageStart)
+        times.analyze.push(analyzed - uploaded)
+        times.view.push(viewed - analyzed)
+        times.total.push(viewed - stageStart)
+      } catch (error: any) {
+        errors.push(`${sample.name}: ${error.message}`)
+      }
+    }
+  }))
+  const elapsed = performance.now() - start
+  await llm.close()
+
+  const completed = times.total.length
+  const result: BenchResult = {
+    config,
+    stages: Object.fromEntries(STAGES.map(stage => [stage, summarize(times[stage])])) as Record<Stage, StageSummary>,
+    documents_per_minute: completed / (elapsed / 60_000),
+    failed: errors.length,
+    recorded_at: new Date().toISOString(),
+    machine: `${os.cpus()[0]?.model || 'unknown'} x${os.cpus().length}, node ${process.version}`,
+  }
+
+  for (const stage of STAGES) {
+    const { p50, p95, p99 } = result.stages[stage]
+    log(
+      `  ${stage.padEnd(8)}`,
+      `p50 ${p50.toFixed(0).padStart(7)} ms`,
+      `p95 ${p95.toFixed(0).padStart(7)} ms`,
+      `p99 ${p99.toFixed(0).padStart(7)} ms`
+    )
+  }
+  log(`\n  ${completed} documents in ${(elapsed / 1000).toFixed(1)} s:`,
+    `${result.documents_per_minute.toFixed(1)} documents/min,`,
+    `${((store.stats.queries + store.stats.rpcs) / Math.max(1, completed)).toFixed(1)} Supabase calls and`,
+    `${(llm.stats.requests.openai / Math.max(1, completed)).toFixed(1)} LLM calls per document`)
+  if (errors.length > 0) {
+    log(`  ${errors.length} FAILED:`, [...new Set(errors)].slice(0, 5).join('; '))
+  }
+
+  if (args.includes('--save-baseline')) {
+    fs.mkdirSync(path.dirname(baselinePath), { recursive: true })
+    fs.writeFileSync(baselinePath, JSON.stringify(result, null, 2) + '\n')
+    log(`\n  Baseline saved to ${path.relative(process.cwd(), baselinePath)}`)
+    return
+  }
+
+  if (!fs.existsSync(baselinePath)) {
+    log(`\n  No baseline at ${path.relative(process.cwd(), baselinePath)}; record one with --save-baseline`)
+    return
+  }
+  const baseline: BenchResult = JSON.parse(fs.readFileSync(baselinePath, 'utf8'))
+  if (JSON.stringify(baseline.config) !== JSON.stringify(result.config)) {
+    log('\n  Baseline was recorded with other options, not comparing:', JSON.stringify(baseline.config))
+    return
+  }
+  const regressions = findRegressions(result, baseline, tolerance)
+  log(`\n  Baseline from ${baseline.recorded_at} (${baseline.machine}):`,
+    regressions.length ? '' : `no regression beyond ${tolerance * 100}%`)
+  if (regressions.length > 0) {
+    regressions.forEach(regression => log('    REGRESSION', regression))
+    process.exitCode = 1
+  }
+}
+
+main().catch(error => {
+  console.error(error)
+  process.exit(1)
+})
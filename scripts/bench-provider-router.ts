@@ -0,0 +1,141 @@
+/**
+ * Provider router benchmark against the fake LLM server
+ *
+ * Runs bursts of analyses through the real Claude/OpenAI providers pointed at
+ * scripts/fake-llm-server.ts, once directly and once through the
+ * ProviderRouter, under injected 429s, overload errors, a server-side
+ * requests-per-minute limit and a primary outage. Reports successes, retries,
+ * failovers, latency and the deepest router queue.
+ *
+ * Usage: npm run bench:router
+ */
+import { startFakeLLMServer } from './fake-llm-server'
+import type { FakeApiBehavior, FakeLLMServer } from './fake-llm-server'
+import { createAIProvider } from '@/lib/ai/provider'
+import type { IAIProvider } from '@/lib/ai/provider'
+import { ProviderRouter } from '@/lib/ai/router'
+import type { ProviderLimits } from '@/lib/ai/router'
+
+interface Scenario {
+  name: string
+  requests: number
+  anthropic: FakeApiBehavior
+  openai?: FakeApiBehavior
+  limits?: ProviderLimits
+}
+
+const SCENARIOS: Scenario[] = [
+  {
+    name: 'random 429/529 (15%)',
+    requests: 60,
+    anthropic: { latencyMs: 150, rateLimitRate: 0.1, errorRate: 0.05 },
+    limits: { maxConcurrent: 8 },
+  },
+  {
+    name: 'server limit 20 rpm, 26 calls',
+    requests: 26,
+    anthropic: { latencyMs: 150, requestsPerMinute: 20 },
+    limits: { requestsPerMinute: 20, maxConcurrent: 8 },
+  },
+  {
+    name: 'primary down',
+    requests: 30,
+    anthropic: { down: true },
+    openai: { latencyMs: 150 },
+    limits: { maxConcurrent: 8 },
+  },
+]
+
+const DOCUMENT = 'CONTRACT DE PRESTARI SERVICII\n1. Obiectul contractului ...\n'.repeat(40)
+
+function provider(name: 'claude-sonnet-4' | 'gpt-4'): IAIProvider {
+  return createAIProvider({
+    provider: name,
+    apiKey: 'fake-key',
+    model: name === 'claude-sonnet-4' ? 'claude-sonnet-4-20250514' : 'gpt-4-turbo',
+    maxTokens: 4000,
+    temperature: 0.3,
+  })
+}
+
+function percentile(sorted: number[], p: number): number {
+  return sorted.length ? sorted[Math.min(sorted.length - 1, Math.floor((sorted.length * p) / 100))] : 0
+}
+
+async function run(server: FakeLLMServer, scenario: Scenario, routed: boolean) {
+  server.setBehavior('anthropic', scenario.anthropic)
+  server.setBehavior('openai', scenario.openai || {})
+  const before = { ...server.stats.rate_limited }
+
+  const target: IAIProvider = routed
+    ? new ProviderRouter(
+        [
+          { provider: provider('claude-sonnet-4'), limits: scenario.limits },
+          { provider: provider('gpt-4'), limits: scenario.limits },
+        ],
+        { baseDelayMs: 200, maxDelayMs: 10_000 }
+      )
+    : provider('claude-sonnet-4')
+
+  let maxQueue = 0
+  const sampler = routed
+    ? setInterval(() => { maxQueue = Math.max(maxQueue, (target as ProviderRouter).queueDepth) }, 20)
+    : null
+
+  const latencies: number[] = []
+  let failed = 0
+  const start = Date.now()
+  await Promise.all(Array.from({ length: scenario.requests }, async () => {
+    const callStart = Date.now()
+    try {
+      await target.analyze({ documentText: DOCUMENT })
+      latencies.push(Date.now() - callStart)
+    } catch {
+      failed++
+    }
+  }))
+  if (sampler) clearInterval(sampler)
+  latencies.sort((a, b) => a - b)
+
+  const stats = routed ? (target as ProviderRouter).getStats() : []
+  console.log(
+    `  ${(routed ? 'router' : 'direct').padEnd(7)}`,
+    `ok ${String(latencies.length).padStart(3)}/${scenario.requests}`,
+    `failed ${String(failed).padStart(3)}`,
+    `| 429s seen ${String(server.stats.rate_limited.anthropic - before.anthropic).padStart(3)}`,
+    `| retries ${String(stats.reduce((sum, s) => sum + s.retries, 0)).padStart(3)}`,
+    `failovers ${String(stats.reduce((sum, s) => sum + s.failovers, 0)).padStart(3)}`,
+    `| p50 ${String(percentile(latencies, 50)).padStart(5)} ms`,
+    `p99 ${String(percentile(latencies, 99)).padStart(5)} ms`,
+    `| max queue ${String(maxQueue).padStart(3)}`,
+    `| total ${((Date.now() - start) / 1000).toFixed(1)} s`
+  )
+}
+
+async function main() {
+  const server = await startFakeLLMServer()
+  process.env.ANTHROPIC_BASE_URL = server.url
+  process.env.OPENAI_BASE_URL = `${server.url}/v1`
+
+  // Providers log every failed call; the summary lines are what matters here
+  const { error: logError, warn: logWarn } = console
+  console.error = () => {}
+  console.warn = () => {}
+
+  try {
+    for (const scenario of SCENARIOS) {
+      console.log(`\n${scenario.name} (${scenario.requests} concurrent analyses)`)
+      await run(server, scenario, false)
+      await run(server, scenario, true)
+    }
+  } finally {
+    console.error = logError
+    console.warn = logWarn
+    await server.close()
+  }
+}
+
+main().catch(error => {
+  console.error(error)
+  process.exit(1)
+})
@@ -0,0 +1,155 @@
+/**
+ * Build the legal retrieval index and benchmark it
+ *
+ * Embeds the active legislative_docs with the configured embedder
+ * (RAG_EMBEDDER), writes the local HNSW index to --out (default
+ * RAG_INDEX_PATH) and, with --pgvector, replaces the articles' rows in the
+ * embeddings table. Then times retrieval for the clauses of the sample
+ * contracts in the repo root and reports p50/p99 per contract.
+ *
+ * --synthetic <n> indexes n generated articles instead of the database, to
+ * benchmark at realistic corpus sizes without credentials.
+ *
+ * Usage: npm run rag:index -- [--out file] [--pgvector] [--synthetic 20000]
+ */
+import fs from 'fs'
+import path from 'path'
+import { createServiceClient } from '@/lib/supabase/server'
+import {
+  extractTextFromPDF,
+  extractTextFromDOCX,
+  parseDocumentStructure,
+} from '@/lib/document-processing/extractor'
+import type { ClauseStructure } from '@/lib/document-processing/extractor'
+import { getDefaultEmbedder } from '@/lib/rag/embedder'
+import type { IEmbedder } from '@/lib/rag/embedder'
+import { LocalLegalIndex, articleEmbeddingText, loadLegalArticles } from '@/lib/rag/legal-index'
+import type { LegalArticle } from '@/lib/rag/legal-index'
+import { retrieveLegalMatches, selectLegalContext } from '@/lib/rag/retrieval'
+
+const ROOT = path.join(__dirname, '..')
+const BENCH_ITERATIONS = 200
+const INSERT_BATCH = 100
+
+process.env.EXTRACTION_POOL = process.env.EXTRACTION_POOL || 'off'
+
+function argument(name: string): string | undefined {
+  const index = process.argv.indexOf(name)
+  return index === -1 ? undefined : process.argv[index + 1]
+}
+
+/**
+ * Deterministic pseudo-articles built from the vocabulary of the sample contracts
+ */
+function syntheticArticles(count: number, clauses: ClauseStructure[]): LegalArticle[] {
+  const words = clauses.flatMap(clause => clause.content.split(/\s+/)).filter(word => word.length > 3)
+  let state = 1
+  const next = () => (state = (state * 1103515245 + 12345) % 2 ** 31)
+
+  return Array.from({ length: count }, (_, i) => ({
+    id: `synthetic-${i}`,
+    law_name: `Synthetic Law ${i % 50}`,
+    law_number: null,
+    article_number: `Art. ${i}`,
+    jurisdiction: i % 2 ? 'eu' : 'romania',
+    title: Array.from({ length: 4 }, () => words[next() % words.length]).join(' '),
+    content: Array.from({ length: 60 }, () => words[next() % words.length]).join(' '),
+    source_url: null,
+  }))
+}
+
+async function loadSampleClauses(): Promise<{ name: string; clauses: ClauseStructure[] }[]> {
+  const files = fs.readdirSync(ROOT)
+    .filter(name => /^test-contract-.*\.pdf$/.test(name) || name.endsWith('.docx'))
+    .sort()
+
+  const samples: { name: string; clauses: ClauseStructure[] }[] = []
+  for (const name of files) {
+    const buffer = fs.readFileSync(path.join(ROOT, name))
+    const processed = name.endsWith('.pdf')
+      ? await extractTextFromPDF(buffer)
+      : await extractTextFromDOCX(buffer)
+    samples.push({ name, clauses: parseDocumentStructure(processed.text) })
+  }
+  return samples
+}
+
+async function upsertPgvector(articles: LegalArticle[], embedder: IEmbedder) {
+  const supabase = createServiceClient()
+  const { error: deleteError } = await supabase
+    .from('embeddings')
+    .delete()
+    .not('legislative_doc_id', 'is', null)
+    .eq('metadata->>model', embedder.model)
+  if (deleteError) throw new Error(`Failed to clear embeddings: ${deleteError.message}`)
+
+  for (let start = 0; start < articles.length; start += INSERT_BATCH) {
+    const batch = articles.slice(start, start + INSERT_BATCH)
+    const texts = batch.map(articleEmbeddingText)
+    const vectors = await embedder.embed(texts)
+    const { error } = await supabase.from('embeddings').insert(batch.map((article, i) => ({
+      legislative_doc_id: article.id,
+      content: texts[i],
+      embedding: Array.from(vectors[i]),
+      chunk_index: 0,
+      metadata: { model: embedder.model },
+    })))
+    if (error) throw new Error(`Failed to store embeddings: ${error.message}`)
+  }
+  console.log('Stored', articles.length, 'embeddings in pgvector')
+}
+
+function percentile(sorted: number[], p: number): number {
+  return sorted[Math.min(sorted.length - 1, Math.floor((sorted.length * p) / 100))]
+}
+
+async function main() {
+  const embedder = getDefaultEmbedder()
+  const synthetic = argument('--synthetic')
+  const out = argument('--out') || process.env.RAG_INDEX_PATH
+
+  const samples = await loadSampleClauses()
+  const articles = synthetic
+    ? syntheticArticles(parseInt(synthetic, 10), samples.flatMap(sample => sample.clauses))
+    : await loadLegalArticles(createServiceClient())
+  console.log('Embedder:', embedder.model, '| articles:', articles.length)
+
+  const buildStart = Date.now()
+  const index = await LocalLegalIndex.build(articles, embedder)
+  console.log('Built HNSW index in', Date.now() - buildStart, 'ms')
+
+  if (out) {
+    index.save(out)
+    const loadStart = Date.now()
+    LocalLegalIndex.load(out)
+    console.log('Wrote', out, `(${(fs.statSync(out).size / 1024 / 1024).toFixed(1)} MB), loads in`, Date.now() - loadStart, 'ms')
+  }
+  if (process.argv.includes('--pgvector') && !synthetic) {
+    await upsertPgvector(articles, embedder)
+  }
+
+  console.log('\nRetrieval latency per contract (embed + search all clauses)\n')
+  for (const sample of samples) {
+    const timings: number[] = []
+    let context: string[] = []
+    for (let i = 0; i < BENCH_ITERATIONS; i++) {
+      const start = process.hrtime.bigint()
+      const { byClause } = await retrieveLegalMatches(index, embedder, sample.clauses)
+      context = selectLegalContext(byClause)
+      timings.push(Number(process.hrtime.bigint() - start) / 1e6)
+    }
+    timings.sort((a, b) => a - b)
+    console.log(
+      sample.name.padEnd(40),
+      `${String(sample.clauses.length).padStart(5)} clauses`,
+      `p50 ${percentile(timings, 50).toFixed(2).padStart(7)} ms`,
+      `p99 ${percentile(timings, 99).toFixed(2).padStart(7)} ms`,
+      `${context.length} articles`
+    )
+  }
+}
+
+main().catch(error => {
+  console.error(error)
+  process.exit(1)
+})
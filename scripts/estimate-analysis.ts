@@ -0,0 +1,97 @@
+/**
+ * Pre-flight estimate of analysis cost and latency
+ *
+ * Extracts each contract, counts prompt tokens locally and prints, per
+ * provider, the predicted tokens, cost and latency of single-shot and
+ * chunked analysis plus the mode auto would pick. With --history the latency
+ * models are fitted from completed analyses (needs Supabase credentials),
+ * otherwise the per-provider defaults are used.
+ *
+ * Usage: npm run estimate -- [files...] [--history]
+ *        (defaults to the sample contracts in the repo root)
+ */
+import fs from 'fs'
+import path from 'path'
+import { createAIProvider } from '@/lib/ai/provider'
+import { buildOutline, chunkByClauses } from '@/lib/ai/map-reduce'
+import {
+  chooseAnalysisMode,
+  estimateCalls,
+  getDefaultLatencyModel,
+  getLatencyModel,
+} from '@/lib/ai/estimator'
+import type { AnalysisEstimate } from '@/lib/ai/estimator'
+import {
+  extractTextFromPDF,
+  extractTextFromDOCX,
+  parseDocumentStructure,
+} from '@/lib/document-processing/extractor'
+import { createServiceClient } from '@/lib/supabase/server'
+import type { AIProvider } from '@/lib/types/database'
+
+const ROOT = path.join(__dirname, '..')
+const PROVIDERS: { provider: AIProvider; model: string }[] = [
+  { provider: 'claude-sonnet-4', model: 'claude-sonnet-4-20250514' },
+  { provider: 'gpt-4', model: 'gpt-4-turbo' },
+]
+
+process.env.EXTRACTION_POOL = process.env.EXTRACTION_POOL || 'off'
+
+function describe(estimate: AnalysisEstimate): string {
+  return [
+    `${estimate.calls} call${estimate.calls === 1 ? ' ' : 's'}`,
+    `${String(estimate.input_tokens).padStart(7)} in`,
+    `${String(estimate.output_tokens).padStart(6)} out`,
+    `$${estimate.cost_usd.toFixed(4)}`,
+    `${estimate.latency_seconds.toFixed(1).padStart(6)} s`,
+  ].join('  ')
+}
+
+async function main() {
+  const args = process.argv.slice(2)
+  const useHistory = args.includes('--history')
+  const files = args.filter(arg => !arg.startsWith('--'))
+  const targets = files.length > 0
+    ? files.map(file => path.resolve(file))
+    : fs.readdirSync(ROOT)
+      .filter(name => /^test-contract-.*\.pdf$/.test(name) || name.endsWith('.docx'))
+      .sort()
+      .map(name => path.join(ROOT, name))
+
+  const chunkChars = parseInt(process.env.ANALYSIS_CHUNK_CHARS || '15000', 10)
+  const concurrency = parseInt(process.env.ANALYSIS_CHUNK_CONCURRENCY || '4', 10)
+  const supabase = useHistory ? createServiceClient() : null
+
+  for (const file of targets) {
+    const buffer = fs.readFileSync(file)
+    const processed = file.endsWith('.pdf') ? await extractTextFromPDF(buffer) : await extractTextFromDOCX(buffer)
+    const clauses = parseDocumentStructure(processed.text)
+    const chunks = chunkByClauses(processed.text, clauses, chunkChars)
+    const outline = buildOutline(clauses)
+
+    console.log(`\n${path.basename(file)}: ${processed.text.length} chars, ${clauses.length} clauses, ${chunks.length} chunks`)
+    for (const { provider: name, model } of PROVIDERS) {
+      const provider = createAIProvider({ provider: name, apiKey: 'estimate-only', model, maxTokens: 4000 })
+      const latency = supabase ? await getLatencyModel(supabase, provider) : getDefaultLatencyModel(name)
+      const request = { documentText: processed.text }
+      const single = estimateCalls(provider, [request], latency)
+      const chunked = chunks.length > 1
+        ? estimateCalls(provider, chunks.map((chunk, index) => ({
+            documentText: chunk.text,
+            chunk: { index, total: chunks.length, outline },
+          })), latency, concurrency)
+        : single
+      const choice = chooseAnalysisMode(single, chunked, processed.text.length)
+
+      console.log(`  ${name} (${latency.samples ? `fitted on ${latency.samples} analyses` : 'default latency'})`)
+      console.log(`    single     ${describe(single)}`)
+      if (chunks.length > 1) console.log(`    map_reduce ${describe(chunked)}`)
+      console.log(`    auto ->    ${choice.mode} (${choice.reason})`)
+    }
+  }
+}
+
+main().catch(error => {
+  console.error(error)
+  process.exit(1)
+})
@@ -0,0 +1,303 @@
+/**
+ * Fake LLM HTTP server for exercising the provider router offline
+ *
+ * Speaks just enough of the Anthropic Messages API (POST /v1/messages) and
+ * the OpenAI Chat Completions API (POST /v1/chat/completions), streaming or
+ * not, to drive the real SDK clients. Each API can be given latency, a
+ * requests-per-minute budget (excess calls get 429 with retry-after, like the
+ * real services), and random 429/5xx failures. Given a token count, replies
+ * are MockProvider's analysis with its issues repeated up to that size, and a
+ * token rate paces the stream like a model generating it.
+ *
+ * Point the SDKs at it with ANTHROPIC_BASE_URL=http://127.0.0.1:<port> and
+ * OPENAI_BASE_URL=http://127.0.0.1:<port>/v1.
+ *
+ * Usage: npx tsx scripts/fake-llm-server.ts [--port 8787] [--latency 300]
+ *          [--rpm 60] [--rate-limit-rate 0.05] [--error-rate 0.02] [--down anthropic|openai]
+ *          [--output-tokens 1500] [--tokens-per-second 60]
+ */
+import http from 'http'
+import type { AddressInfo } from 'net'
+import { TokenBucket } from '@/lib/utils/token-bucket'
+import { getMockAnalysis } from '@/lib/ai/providers/mock'
+import { countTokens } from '@/lib/ai/estimator'
+
+export type FakeApi = 'anthropic' | 'openai'
+
+export interface FakeApiBehavior {
+  /** Mean response latency (uniform 0.5x-1.5x) */
+  latencyMs?: number
+  /** Requests per minute before the server answers 429 */
+  requestsPerMinute?: number
+  /** Share of calls answered with a random 429 */
+  rateLimitRate?: number
+  /** Share of calls answered with 500/503 (529 for anthropic) */
+  errorRate?: number
+  /** Every call fails with 503 */
+  down?: boolean
+  /** Reply with MockProvider's analysis padded to about this many tokens */
+  outputTokens?: number
+  /** Generation speed: streamed replies are paced, others sent when done */
+  tokensPerSecond?: number
+}
+
+export interface FakeServerStats {
+  requests: Record<FakeApi, number>
+  rate_limited: Record<FakeApi, number>
+  errors: Record<FakeApi, number>
+  /** Most calls in flight at once */
+  max_concurrent: Record<FakeApi, number>
+}
+
+export interface FakeLLMServer {
+  url: string
+  stats: FakeServerStats
+  setBehavior(api: FakeApi, behavior: FakeApiBehavior): void
+  close(): Promise<void>
+}
+
+const SAMPLE_ANALYSIS = {
+  contract_type: 'b2b_services',
+  overall_risk_score: 0.6,
+  compliance_score: 0.7,
+  issues: [
+    {
+      title: 'Unlimited liability',
+      description: 'The supplier accepts liability without any cap.',
+      risk_level: 'high',
+      category: 'liability',
+      legal_references: [{ law: 'Codul Civil', article: 'Art. 1350', relevance_score: 0.8 }],
+      suggested_revision: 'Cap liability at the fees paid in the previous 12 months.',
+      confidence: 0.85,
+    },
+  ],
+  clauses: [],
+}
+
+export async function startFakeLLMServer(
+  port = 0,
+  behaviors: Partial<Record<FakeApi, FakeApiBehavior>> = {}
+): Promise<FakeLLMServer> {
+  const state: Record<FakeApi, { behavior: FakeApiBehavior; bucket: TokenBucket | null; active: number }> = {
+    anthropic: { behavior: {}, bucket: null, active: 0 },
+    openai: { behavior: {}, bucket: null, active: 0 },
+  }
+  const stats: FakeServerStats = {
+    requests: { anthropic: 0, openai: 0 },
+    rate_limited: { anthropic: 0, openai: 0 },
+    errors: { anthropic: 0, openai: 0 },
+    max_concurrent: { anthropic: 0, openai: 0 },
+  }
+
+  const setBehavior = (api: FakeApi, behavior: FakeApiBehavior) => {
+    state[api] = {
+      behavior,
+      bucket: behavior.requestsPerMinute ? new TokenBucket(behavior.requestsPerMinute) : null,
+      active: 0,
+    }
+  }
+  for (const api of ['anthropic', 'openai'] as FakeApi[]) {
+    setBehavior(api, behaviors[api] || {})
+  }
+
+  const server = http.createServer(async (req, res) => {
+    const api: FakeApi | null = req.url?.endsWith('/messages')
+      ? 'anthropic'
+      : req.url?.endsWith('/chat/completions') ? 'openai' : null
+    if (req.method !== 'POST' || !api) {
+      res.writeHead(404).end()
+      return
+    }
+
+    const chunks: Buffer[] = []
+    for await (const chunk of req) chunks.push(chunk as Buffer)
+    const body = JSON.parse(Buffer.concat(chunks).toString('utf8') || '{}')
+
+    const apiState = state[api]
+    const { behavior } = apiState
+    stats.requests[api]++
+
+    const fail = (status: number, retryAfterSeconds?: number) => {
+      if (status === 429) stats.rate_limited[api]++
+      else stats.errors[api]++
+      res.writeHead(status, {
+        'content-type': 'application/json',
+        ...(retryAfterSeconds !== undefined ? { 'retry-after': String(retryAfterSeconds) } : {}),
+      })
+      res.end(JSON.stringify({ type: 'error', error: { type: 'fake_error', message: `Fake ${status}` } }))
+    }
+
+    if (behavior.down) return fail(503)
+    const wait = apiState.bucket?.waitTime(1) || 0
+    if (wait > 0) return fail(429, Math.max(1, Math.ceil(wait / 1000)))
+    apiState.bucket?.take(1)
+    if (Math.random() < (behavior.rateLimitRate || 0)) return fail(429, 1)
+    if (Math.random() < (behavior.errorRate || 0)) return fail(api === 'anthropic' ? 529 : 503)
+
+    apiState.active++
+    stats.max_concurrent[api] = Math.max(stats.max_concurrent[api], apiState.active)
+    const latency = (behavior.latencyMs || 0) * (0.5 + Math.random())
+    await new Promise(resolve => setTimeout(resolve, latency))
+    apiState.active--
+
+    const text = behavior.outputTokens ? mockResponse(behavior.outputTokens) : JSON.stringify(SAMPLE_ANALYSIS)
+    const usage = { input: Math.ceil(JSON.stringify(body).length / 4), output: Math.ceil(text.length / 4) }
+    // Time to generate one streamed slice (or, unstreamed, the whole reply)
+    const msPerChar = behavior.tokensPerSecond ? 1000 / (behavior.tokensPerSecond * 4) : 0
+    if (!body.stream) {
+      await new Promise(resolve => setTimeout(resolve, text.length * msPerChar))
+    }
+    if (api === 'anthropic') {
+      await sendAnthropic(res, body, text, usage, msPerChar)
+    } else {
+      await sendOpenAI(res, body, text, usage, msPerChar)
+    }
+  })
+
+  await new Promise<void>(resolve => server.listen(port, '127.0.0.1', resolve))
+  const address = server.address() as AddressInfo
+
+  return {
+    url: `http://127.0.0.1:${address.port}`,
+    stats,
+    setBehavior,
+    close: () => new Promise(resolve => server.close(() => resolve())),
+  }
+}
+
+const mockResponses = new Map<number, string>()
+
+/**
+ * MockProvider's analysis with its issues repeated until the JSON is about
+ * `tokens` long. Repeats get their own category so they are not merged away
+ * as duplicates.
+ */
+function mockResponse(tokens: number): string {
+  const cached = mockResponses.get(tokens)
+  if (cached) return cached
+
+  const analysis = getMockAnalysis()
+  const issues = [...analysis.issues]
+  let text = JSON.stringify(analysis)
+  for (let i = 0; countTokens(text) < tokens; i++) {
+    const issue = analysis.issues[i % analysis.issues.length]
+    issues.push({ ...issue, category: `${issue.category}_${i + 1}` })
+    text = JSON.stringify({ ...analysis, issues })
+  }
+  mockResponses.set(tokens, text)
+  return text
+}
+
+async function sendAnthropic(
+  res: http.ServerResponse,
+  body: any,
+  text: string,
+  usage: { input: number; output: number },
+  msPerChar: number
+) {
+  const message = {
+    id: `msg_fake_${Date.now()}`,
+    type: 'message',
+    role: 'assistant',
+    model: body.model,
+    stop_reason: 'end_turn',
+    stop_sequence: null,
+  }
+
+  if (!body.stream) {
+    res.writeHead(200, { 'content-type': 'application/json' })
+    res.end(JSON.stringify({
+      ...message,
+      content: [{ type: 'text', text }],
+      usage: { input_tokens: usage.input, output_tokens: usage.output },
+    }))
+    return
+  }
+
+  res.writeHead(200, { 'content-type': 'text/event-stream', 'cache-control': 'no-cache' })
+  const send = (event: string, data: object) => res.write(`event: ${event}\ndata: ${JSON.stringify(data)}\n\n`)
+  send('message_start', {
+    type: 'message_start',
+    message: { ...message, content: [], stop_reason: null, usage: { input_tokens: usage.input, output_tokens: 0 } },
+  })
+  send('content_block_start', { type: 'content_block_start', index: 0, content_block: { type: 'text', text: '' } })
+  for (const piece of slices(text, 64)) {
+    await pace(piece, msPerChar)
+    send('content_block_delta', { type: 'content_block_delta', index: 0, delta: { type: 'text_delta', text: piece } })
+  }
+  send('content_block_stop', { type: 'content_block_stop', index: 0 })
+  send('message_delta', {
+    type: 'message_delta',
+    delta: { stop_reason: 'end_turn', stop_sequence: null },
+    usage: { output_tokens: usage.output },
+  })
+  send('message_stop', { type: 'message_stop' })
+  res.end()
+}
+
+async function sendOpenAI(
+  res: http.ServerResponse,
+  body: any,
+  text: string,
+  usage: { input: number; output: number },
+  msPerChar: number
+) {
+  const base = { id: `chatcmpl-fake-${Date.now()}`, created: Math.floor(Date.now() / 1000), model: body.model }
+  const totals = { prompt_tokens: usage.input, completion_tokens: usage.output, total_tokens: usage.input + usage.output }
+
+  if (!body.stream) {
+    res.writeHead(200, { 'content-type': 'application/json' })
+    res.end(JSON.stringify({
+      ...base,
+      object: 'chat.completion',
+      choices: [{ index: 0, message: { role: 'assistant', content: text }, finish_reason: 'stop' }],
+      usage: totals,
+    }))
+    return
+  }
+
+  res.writeHead(200, { 'content-type': 'text/event-stream', 'cache-control': 'no-cache' })
+  const send = (data: object) => res.write(`data: ${JSON.stringify({ ...base, object: 'chat.completion.chunk', ...data })}\n\n`)
+  for (const piece of slices(text, 64)) {
+    await pace(piece, msPerChar)
+    send({ choices: [{ index: 0, delta: { content: piece }, finish_reason: null }] })
+  }
+  send({ choices: [{ index: 0, delta: {}, finish_reason: 'stop' }] })
+  send({ choices: [], usage: totals })
+  res.write('data: [DONE]\n\n')
+  res.end()
+}
+
+function pace(piece: string, msPerChar: number): Promise<void> | void {
+  if (msPerChar > 0) return new Promise(resolve => setTimeout(resolve, piece.length * msPerChar))
+}
+
+function slices(text: string, size: number): string[] {
+  const parts: string[] = []
+  for (let i = 0; i < text.length; i += size) parts.push(text.slice(i, i + size))
+  return parts
+}
+
+if (require.main === module) {
+  const arg = (name: string) => {
+    const index = process.argv.indexOf(name)
+    return index === -1 ? undefined : process.argv[index + 1]
+  }
+  const behavior: FakeApiBehavior = {
+    latencyMs: parseInt(arg('--latency') || '300', 10),
+    requestsPerMinute: arg('--rpm') ? parseInt(arg('--rpm')!, 10) : undefined,
+    rateLimitRate: parseFloat(arg('--rate-limit-rate') || '0'),
+    errorRate: parseFloat(arg('--error-rate') || '0'),
+    outputTokens: arg('--output-tokens') ? parseInt(arg('--output-tokens')!, 10) : undefined,
+    tokensPerSecond: arg('--tokens-per-second') ? parseFloat(arg('--tokens-per-second')!) : undefined,
+  }
+  const down = arg('--down') as FakeApi | undefined
+
+  startFakeLLMServer(parseInt(arg('--port') || '8787', 10), {
+    anthropic: { ...behavior, down: down === 'anthropic' },
+    openai: { ...behavior, down: down === 'openai' },
+  }).then(server => {
+    console.log('Fake LLM server on', server.url)
+    console.log(`  ANTHROPIC_BASE_URL=${server.url}  OPENAI_BASE_URL=${server.url}/v1`)
+  })
+}
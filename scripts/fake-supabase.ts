@@ -0,0 +1,454 @@
+/**
+ * In-memory Supabase stand-in for benchmarks
+ *
+ * Implements the part of the supabase-js client that the upload, analysis and
+ * viewer code paths use, over plain arrays:
+ * - from(): select/insert/update/upsert/delete with eq, neq, in, gt, gte, lt,
+ *   lte, is, order, limit, range, single and maybeSingle
+ * - rpc(): sync_document_clauses, store_analysis_results and
+ *   get_document_view, following schema.sql
+ * - storage: upload, download and remove
+ * Every call waits `latencyMs` (uniform 0.5x-1.5x) like a round trip to the
+ * database, and storage calls also pay for their bytes, so the number of calls
+ * a code path makes shows in its timings.
+ *
+ * This is not a database: there are no constraints, RLS or triggers, apart
+ * from get_document_view answering only the client's own user (auth.uid()).
+ *
+ * Usage: const supabase = createFakeSupabase({ latencyMs: 5 })
+ *        supabase.client(userId)  // or supabase.client() for the service role
+ */
+import { randomUUID } from 'crypto'
+import type { SupabaseClient } from '@supabase/supabase-js'
+
+type Row = Record<string, any>
+
+export interface FakeSupabaseOptions {
+  /** Mean latency of each call */
+  latencyMs?: number
+  /** Storage transfer speed */
+  storageMBps?: number
+}
+
+export interface FakeSupabaseStats {
+  queries: number
+  rpcs: number
+  storage: number
+}
+
+export interface FakeSupabase {
+  tables: Map<string, Row[]>
+  files: Map<string, Buffer>
+  stats: FakeSupabaseStats
+  /** Client acting as `userId` (auth.uid()), or as the service role */
+  client(userId?: string): SupabaseClient
+  /** Rows of a table, read without latency (for checks in the benchmark itself) */
+  table(name: string): Row[]
+}
+
+interface Result {
+  data: any
+  error: { message: string; code?: string } | null
+  count?: number | null
+}
+
+const SINGLE_ROW_ERROR = { message: 'JSON object requested, multiple (or no) rows returned', code: 'PGRST116' }
+
+export function createFakeSupabase(options: FakeSupabaseOptions = {}): FakeSupabase {
+  const latencyMs = options.latencyMs ?? 5
+  const bytesPerMs = (options.storageMBps ?? 100) * 1024 * 1024 / 1000
+  const tables = new Map<string, Row[]>()
+  const files = new Map<string, Buffer>()
+  const stats: FakeSupabaseStats = { queries: 0, rpcs: 0, storage: 0 }
+
+  const table = (name: string) => {
+    if (!tables.has(name)) tables.set(name, [])
+    return tables.get(name)!
+  }
+  const roundTrip = (bytes = 0) =>
+    new Promise(resolve => setTimeout(resolve, latencyMs * (0.5 + Math.random()) + bytes / bytesPerMs))
+
+  const client = (userId?: string): SupabaseClient => {
+    const rpcs: Record<string, (params: Row) => any> = {
+      sync_document_clauses: params => syncDocumentClauses(table, params),
+      store_analysis_results: params => storeAnalysisResults(table, params),
+      get_document_view: params => getDocumentView(table, params, userId),
+    }
+
+    return {
+      from: (name: string) => new FakeQuery(table(name), async () => {
+        stats.queries++
+        await roundTrip()
+      }),
+      rpc: async (name: string, params: Row = {}): Promise<Result> => {
+        stats.rpcs++
+        await roundTrip()
+        if (!rpcs[name]) {
+          return { data: null, error: { message: `Could not find the function public.${name}`, code: 'PGRST202' } }
+        }
+        return { data: structuredClone(rpcs[name](structuredClone(params))), error: null }
+      },
+      storage: {
+        from: (bucket: string) => ({
+          upload: async (path: string, body: ArrayBuffer | Buffer | Blob, fileOptions: { upsert?: boolean } = {}) => {
+            const data = Buffer.from(body instanceof Blob ? await body.arrayBuffer() : body as ArrayBuffer)
+            stats.storage++
+            await roundTrip(data.length)
+            const key = `${bucket}/${path}`
+            if (files.has(key) && !fileOptions.upsert) {
+              return { data: null, error: { message: 'The resource already exists', statusCode: '409' } }
+            }
+            files.set(key, data)
+            return { data: { path }, error: null }
+          },
+          download: async (path: string) => {
+            const data = files.get(`${bucket}/${path}`)
+            stats.storage++
+            await roundTrip(data?.length)
+            return data
+              ? { data: new Blob([new Uint8Array(data)]), error: null }
+              : { data: null, error: { message: 'Object not found', statusCode: '404' } }
+          },
+          remove: async (paths: string[]) => {
+            stats.storage++
+            await roundTrip()
+            paths.forEach(path => files.delete(`${bucket}/${path}`))
+            return { data: paths.map(name => ({ name })), error: null }
+          },
+        }),
+      },
+    } as unknown as SupabaseClient
+  }
+
+  return { tables, files, stats, client, table }
+}
+
+/**
+ * Query builder over one table's rows, resolved when awaited
+ */
+class FakeQuery implements PromiseLike<Result> {
+  private action: 'select' | 'insert' | 'upsert' | 'update' | 'delete' = 'select'
+  private values: Row[] = []
+  private columns: string | null = '*'
+  private countRows = false
+  private head = false
+  private filters: Array<(row: Row) => boolean> = []
+  private orders: Array<{ column: string; ascending: boolean }> = []
+  private from = 0
+  private to = Infinity
+  private cardinality: 'many' | 'single' | 'maybe' = 'many'
+
+  constructor(private rows: Row[], private roundTrip: () => Promise<void>) {}
+
+  select(columns = '*', options: { count?: string; head?: boolean } = {}): this {
+    if (columns.includes('(')) {
+      throw new Error(`Fake Supabase does not embed related tables: ${columns}`)
+    }
+    this.columns = columns
+    this.countRows = !!options.count
+    this.head = !!options.head
+    return this
+  }
+
+  insert(values: Row | Row[]): this {
+    return this.write('insert', values)
+  }
+
+  upsert(values: Row | Row[]): this {
+    return this.write('upsert', values)
+  }
+
+  update(values: Row): this {
+    return this.write('update', values)
+  }
+
+  delete(): this {
+    return this.write('delete', [])
+  }
+
+  eq(column: string, value: any): this {
+    return this.where(row => row[column] === value)
+  }
+
+  neq(column: string, value: any): this {
+    return this.where(row => row[column] !== value)
+  }
+
+  in(column: string, values: any[]): this {
+    return this.where(row => values.includes(row[column]))
+  }
+
+  gt(column: string, value: any): this {
+    return this.where(row => row[column] != null && row[column] > value)
+  }
+
+  gte(column: string, value: any): this {
+    return this.where(row => row[column] != null && row[column] >= value)
+  }
+
+  lt(column: string, value: any): this {
+    return this.where(row => row[column] != null && row[column] < value)
+  }
+
+  lte(column: string, value: any): this {
+    return this.where(row => row[column] != null && row[column] <= value)
+  }
+
+  is(column: string, value: null | boolean): this {
+    return this.where(row => (row[column] ?? null) === value)
+  }
+
+  order(column: string, options: { ascending?: boolean } = {}): this {
+    this.orders.push({ column, ascending: options.ascending ?? true })
+    return this
+  }
+
+  limit(count: number): this {
+    this.to = this.from + count - 1
+    return this
+  }
+
+  range(from: number, to: number): this {
+    this.from = from
+    this.to = to
+    return this
+  }
+
+  single(): this {
+    this.cardinality = 'single'
+    return this
+  }
+
+  maybeSingle(): this {
+    this.cardinality = 'maybe'
+    return this
+  }
+
+  then<T1 = Result, T2 = never>(
+    onFulfilled?: ((value: Result) => T1 | PromiseLike<T1>) | null,
+    onRejected?: ((reason: any) => T2 | PromiseLike<T2>) | null
+  ): PromiseLike<T1 | T2> {
+    return this.roundTrip().then(() => this.execute()).then(onFulfilled, onRejected)
+  }
+
+  private write(action: FakeQuery['action'], values: Row | Row[]): this {
+    this.action = action
+    this.values = Array.isArray(values) ? values : [values]
+    // Writes return no rows unless .select() follows
+    this.columns = null
+    return this
+  }
+
+  private where(filter: (row: Row) => boolean): this {
+    this.filters.push(filter)
+    return this
+  }
+
+  private execute(): Result {
+    let rows: Row[]
+    const now = new Date().toISOString()
+
+    switch (this.action) {
+      case 'insert':
+        rows = this.values.map(value => ({ id: randomUUID(), created_at: now, updated_at: now, ...structuredClone(value) }))
+        this.rows.push(...rows)
+        break
+      case 'upsert':
+        rows = this.values.map(value => {
+          const existing = value.id && this.rows.find(row => row.id === value.id)
+          if (existing) return Object.assign(existing, structuredClone(value), { updated_at: now })
+          const row = { id: randomUUID(), created_at: now, updated_at: now, ...structuredClone(value) }
+          this.rows.push(row)
+          return row
+        })
+        break
+      case 'update':
+        rows = this.matching()
+        rows.forEach(row => Object.assign(row, structuredClone(this.values[0]), { updated_at: now }))
+        break
+      case 'delete':
+        rows = this.matching()
+        for (const row of rows) this.rows.splice(this.rows.indexOf(row), 1)
+        break
+      default:
+        rows = this.matching()
+    }
+
+    const count = this.countRows ? rows.length : null
+    if (this.orders.length > 0) rows = sortRows(rows, this.orders)
+    rows = rows.slice(this.from, this.to + 1)
+
+    if (this.columns === null || this.head) {
+      return { data: null, error: null, count }
+    }
+    const data = rows.map(row => project(row, this.columns!))
+
+    if (this.cardinality === 'many') return { data, error: null, count }
+    if (data.length > 1 || (data.length === 0 && this.cardinality === 'single')) {
+      return { data: null, error: SINGLE_ROW_ERROR, count }
+    }
+    return { data: data[0] ?? null, error: null, count }
+  }
+
+  private matching(): Row[] {
+    return this.rows.filter(row => this.filters.every(filter => filter(row)))
+  }
+}
+
+function project(row: Row, columns: string): Row {
+  if (columns.trim() === '*') return structuredClone(row)
+  const result: Row = {}
+  for (const column of columns.split(',').map(name => name.trim())) {
+    result[column] = structuredClone(row[column] ?? null)
+  }
+  return result
+}
+
+function sortRows(rows: Row[], orders: Array<{ column: string; ascending: boolean }>): Row[] {
+  return [...rows].sort((a, b) => {
+    for (const { column, ascending } of orders) {
+      if (a[column] === b[column]) continue
+      // Postgres sorts NULLs last ascending, first descending
+      if (a[column] == null) return ascending ? 1 : -1
+      if (b[column] == null) return ascending ? -1 : 1
+      return (a[column] < b[column] ? -1 : 1) * (ascending ? 1 : -1)
+    }
+    return 0
+  })
+}
+
+function syncDocumentClauses(table: (name: string) => Row[], params: Row): number {
+  const clauses = table('document_clauses')
+  const comments = table('comments')
+  const ids = new Set((params.p_clauses as Row[]).map(clause => clause.id))
+
+  for (const clause of params.p_clauses as Row[]) {
+    const existing = clauses.find(row => row.id === clause.id)
+    if (existing) Object.assign(existing, clause, { document_id: params.p_document_id })
+    else clauses.push({ ...clause, document_id: params.p_document_id, created_at: new Date().toISOString() })
+  }
+  const removed = new Set(
+    clauses.filter(row => row.document_id === params.p_document_id && !ids.has(row.id)).map(row => row.id)
+  )
+  removeWhere(clauses, row => removed.has(row.id))
+  // ON DELETE CASCADE
+  removeWhere(comments, row => removed.has(row.clause_id))
+
+  const ai = (row: Row) => row.document_id === params.p_document_id && row.is_ai_generated
+  if (params.p_comment_policy === 'replace') {
+    removeWhere(comments, ai)
+    return 0
+  }
+  if (params.p_comment_policy === 'carry_clause') {
+    removeWhere(comments, row => ai(row) && !row.clause_id)
+  }
+  const carried = comments.filter(ai)
+  carried.forEach(row => {
+    row.analysis_id = params.p_analysis_id
+  })
+  return carried.length
+}
+
+function storeAnalysisResults(table: (name: string) => Row[], params: Row): Row {
+  const comments = table('comments')
+  const now = new Date().toISOString()
+  const deleted = new Set(params.p_deleted_comment_ids as string[])
+  removeWhere(comments, row => deleted.has(row.id) && row.document_id === params.p_document_id && row.is_ai_generated)
+
+  for (const comment of params.p_comments as Row[]) {
+    const row = {
+      ...comment,
+      document_id: params.p_document_id,
+      analysis_id: params.p_analysis_id,
+      is_ai_generated: true,
+      legal_references: comment.legal_references || [],
+      status: 'open',
+    }
+    const existing = comments.find(stored => stored.id === comment.id)
+    if (existing) Object.assign(existing, row, { updated_at: now })
+    else comments.push({ ...row, created_at: now, updated_at: now })
+  }
+
+  for (const { id, content_hash } of params.p_clause_hashes as Row[]) {
+    const clause = table('document_clauses').find(row => row.id === id && row.document_id === params.p_document_id)
+    if (clause) clause.content_hash = content_hash
+  }
+
+  const own = comments.filter(row => row.analysis_id === params.p_analysis_id && row.is_ai_generated)
+  const counts = {
+    issues_found: own.length,
+    high_risk_count: own.filter(row => row.risk_level === 'high' || row.risk_level === 'critical').length,
+    medium_risk_count: own.filter(row => row.risk_level === 'medium').length,
+    low_risk_count: own.filter(row => row.risk_level === 'low').length,
+  }
+
+  const analysis = table('analyses').find(row => row.id === params.p_analysis_id)
+  if (analysis) {
+    const { metadata, ...summary } = params.p_analysis
+    Object.assign(analysis, summary, counts, { metadata: metadata ?? analysis.metadata })
+  }
+
+  const document = table('documents').find(row => row.id === params.p_document_id)
+  if (document) {
+    const { contract_type, ...fields } = params.p_document
+    Object.assign(document, Object.fromEntries(Object.entries(fields).filter(([, value]) => value != null)), {
+      status: 'analyzed',
+      analyzed_at: now,
+      updated_at: now,
+      high_risk_issues: counts.high_risk_count,
+      contract_type: contract_type ?? document.contract_type,
+    })
+  }
+
+  table('audit_logs').push({
+    id: randomUUID(),
+    user_id: params.p_user_id,
+    action: 'analysis_completed',
+    resource_type: 'document',
+    resource_id: params.p_document_id,
+    details: { ...params.p_audit_details, issues_found: counts.issues_found },
+    created_at: now,
+  })
+  return counts
+}
+
+function getDocumentView(table: (name: string) => Row[], params: Row, userId?: string): Row | null {
+  const document = table('documents').find(row => row.id === params.p_document_id && row.user_id === userId)
+  if (!document) return null
+
+  const { metadata: _metadata, ...documentFields } = document
+  const analysis = sortRows(
+    table('analyses').filter(row => row.document_id === document.id),
+    [{ column: 'started_at', ascending: false }]
+  )[0]
+  const clauses = sortRows(
+    table('document_clauses').filter(row => row.document_id === document.id),
+    [{ column: 'order_index', ascending: true }, { column: 'id', ascending: true }]
+  )
+  const comments = sortRows(
+    table('comments').filter(row => row.document_id === document.id),
+    [{ column: 'created_at', ascending: false }, { column: 'id', ascending: false }]
+  )
+
+  return {
+    document: documentFields,
+    analysis: analysis
+      ? (({ payload: _payload, progress: _progress, metadata: _analysisMetadata, ...fields }) => fields)(analysis)
+      : null,
+    clauses: clauses
+      .slice(0, params.p_clause_limit)
+      .map(row => project(row, 'id, clause_number, heading, content, order_index')),
+    clause_count: clauses.length,
+    comments: comments
+      .slice(0, params.p_comment_limit)
+      .map(row => project(row, 'id, clause_id, comment_type, risk_level, status, title, content, suggested_revision, is_ai_generated, confidence_score, legal_references, created_at')),
+    comment_count: comments.length,
+    high_risk_count: comments.filter(row => row.risk_level === 'high' || row.risk_level === 'critical').length,
+  }
+}
+
+function removeWhere(rows: Row[], predicate: (row: Row) => boolean) {
+  for (let i = rows.length - 1; i >= 0; i--) {
+    if (predicate(rows[i])) rows.splice(i, 1)
+  }
+}
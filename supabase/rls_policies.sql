@@ -16,6 +16,7 @@ ALTER TABLE public.users ENABLE ROW LEVEL SECURITY;
 ALTER TABLE public.organizations ENABLE ROW LEVEL SECURITY;
 ALTER TABLE public.documents ENABLE ROW LEVEL SECURITY;
 ALTER TABLE public.document_versions ENABLE ROW LEVEL SECURITY;
+ALTER TABLE public.document_batches ENABLE ROW LEVEL SECURITY;
 ALTER TABLE public.document_clauses ENABLE ROW LEVEL SECURITY;
 ALTER TABLE public.analyses ENABLE ROW LEVEL SECURITY;
 ALTER TABLE public.comments ENABLE ROW LEVEL SECURITY;
@@ -25,6 +26,8 @@ ALTER TABLE public.embeddings ENABLE ROW LEVEL SECURITY;
 ALTER TABLE public.audit_logs ENABLE ROW LEVEL SECURITY;
 ALTER TABLE public.data_retention_policies ENABLE ROW LEVEL SECURITY;
 ALTER TABLE public.legislative_changes ENABLE ROW LEVEL SECURITY;
+ALTER TABLE public.analysis_cache ENABLE ROW LEVEL SECURITY; -- no policies: service role only
+ALTER TABLE public.document_stats ENABLE ROW LEVEL SECURITY; -- written only by the documents trigger
 
 -- ============================================
 -- USERS TABLE POLICIES
@@ -99,6 +102,63 @@ CREATE POLICY "Users can update own documents" ON public.documents
 CREATE POLICY "Users can delete own documents" ON public.documents
   FOR DELETE USING (user_id = auth.uid());
 
+-- ============================================
+-- DOCUMENT STATS POLICIES
+-- ============================================
+
+-- Users can read their own and their organization's counters
+CREATE POLICY "Users can read own document stats" ON public.document_stats
+  FOR SELECT USING (
+    (scope = 'user' AND scope_id = auth.uid())
+    OR
+    (scope = 'organization' AND EXISTS (
+      SELECT 1 FROM public.users
+      WHERE users.id = auth.uid()
+      AND users.organization_id = document_stats.scope_id
+    ))
+  );
+
+-- ============================================
+-- DOCUMENT VERSIONS POLICIES
+-- ============================================
+
+-- Users can read versions of their own documents
+CREATE POLICY "Users can read own document versions" ON public.document_versions
+  FOR SELECT USING (
+    EXISTS (
+      SELECT 1 FROM public.documents
+      WHERE documents.id = document_versions.document_id
+      AND documents.user_id = auth.uid()
+    )
+  );
+
+-- Users can add versions to their own documents
+CREATE POLICY "Users can insert own document versions" ON public.document_versions
+  FOR INSERT WITH CHECK (
+    created_by = auth.uid()
+    AND EXISTS (
+      SELECT 1 FROM public.documents
+      WHERE documents.id = document_versions.document_id
+      AND documents.user_id = auth.uid()
+    )
+  );
+
+-- ============================================
+-- DOCUMENT BATCHES POLICIES
+-- ============================================
+
+-- Users can read their own batches
+CREATE POLICY "Users can read own document batches" ON public.document_batches
+  FOR SELECT USING (user_id = auth.uid());
+
+-- Users can create batches for themselves
+CREATE POLICY "Users can insert own document batches" ON public.document_batches
+  FOR INSERT WITH CHECK (user_id = auth.uid());
+
+-- Users can update their own batches (file counts grow as uploads arrive)
+CREATE POLICY "Users can update own document batches" ON public.document_batches
+  FOR UPDATE USING (user_id = auth.uid());
+
 -- ============================================
 -- DOCUMENT CLAUSES POLICIES
 -- ============================================
@@ -20,6 +20,7 @@ ALTER TABLE public.users ENABLE ROW LEVEL SECURITY;
 ALTER TABLE public.organizations ENABLE ROW LEVEL SECURITY;
 ALTER TABLE public.documents ENABLE ROW LEVEL SECURITY;
 ALTER TABLE public.document_versions ENABLE ROW LEVEL SECURITY;
+ALTER TABLE public.document_batches ENABLE ROW LEVEL SECURITY;
 ALTER TABLE public.document_clauses ENABLE ROW LEVEL SECURITY;
 ALTER TABLE public.analyses ENABLE ROW LEVEL SECURITY;
 ALTER TABLE public.comments ENABLE ROW LEVEL SECURITY;
@@ -29,6 +30,8 @@ ALTER TABLE public.embeddings ENABLE ROW LEVEL SECURITY;
 ALTER TABLE public.audit_logs ENABLE ROW LEVEL SECURITY;
 ALTER TABLE public.data_retention_policies ENABLE ROW LEVEL SECURITY;
 ALTER TABLE public.legislative_changes ENABLE ROW LEVEL SECURITY;
+ALTER TABLE public.analysis_cache ENABLE ROW LEVEL SECURITY; -- no policies: service role only
+ALTER TABLE public.document_stats ENABLE ROW LEVEL SECURITY; -- written only by the documents trigger
 
 -- ============================================
 -- DROP EXISTING POLICIES (if they exist)
@@ -49,6 +52,18 @@ DROP POLICY IF EXISTS "Users can insert own documents" ON public.documents;
 DROP POLICY IF EXISTS "Users can update own documents" ON public.documents;
 DROP POLICY IF EXISTS "Users can delete own documents" ON public.documents;
 
+-- Document stats
+DROP POLICY IF EXISTS "Users can read own document stats" ON public.document_stats;
+
+-- Document versions table
+DROP POLICY IF EXISTS "Users can read own document versions" ON public.document_versions;
+DROP POLICY IF EXISTS "Users can insert own document versions" ON public.document_versions;
+
+-- Document batches table
+DROP POLICY IF EXISTS "Users can read own document batches" ON public.document_batches;
+DROP POLICY IF EXISTS "Users can insert own document batches" ON public.document_batches;
+DROP POLICY IF EXISTS "Users can update own document batches" ON public.document_batches;
+
 -- Document clauses table
 DROP POLICY IF EXISTS "Users can read accessible clauses" ON public.document_clauses;
 
@@ -147,6 +162,57 @@ CREATE POLICY "Users can update own documents" ON public.documents
 CREATE POLICY "Users can delete own documents" ON public.documents
   FOR DELETE USING (user_id = auth.uid());
 
+-- ============================================
+-- DOCUMENT STATS POLICIES
+-- ============================================
+
+CREATE POLICY "Users can read own document stats" ON public.document_stats
+  FOR SELECT USING (
+    (scope = 'user' AND scope_id = auth.uid())
+    OR
+    (scope = 'organization' AND EXISTS (
+      SELECT 1 FROM public.users
+      WHERE users.id = auth.uid()
+      AND users.organization_id = document_stats.scope_id
+    ))
+  );
+
+-- ============================================
+-- DOCUMENT VERSIONS POLICIES
+-- ============================================
+
+CREATE POLICY "Users can read own document versions" ON public.document_versions
+  FOR SELECT USING (
+    EXISTS (
+      SELECT 1 FROM public.documents
+      WHERE documents.id = document_versions.document_id
+      AND documents.user_id = auth.uid()
+    )
+  );
+
+CREATE POLICY "Users can insert own document versions" ON public.document_versions
+  FOR INSERT WITH CHECK (
+    created_by = auth.uid()
+    AND EXISTS (
+      SELECT 1 FROM public.documents
+      WHERE documents.id = document_versions.document_id
+      AND documents.user_id = auth.uid()
+    )
+  );
+
+-- ============================================
+-- DOCUMENT BATCHES POLICIES
+-- ============================================
+
+CREATE POLICY "Users can read own document batches" ON public.document_batches
+  FOR SELECT USING (user_id = auth.uid());
+
+CREATE POLICY "Users can insert own document batches" ON public.document_batches
+  FOR INSERT WITH CHECK (user_id = auth.uid());
+
+CREATE POLICY "Users can update own document batches" ON public.document_batches
+  FOR UPDATE USING (user_id = auth.uid());
+
 -- ============================================
 -- DOCUMENT CLAUSES POLICIES
 -- ============================================
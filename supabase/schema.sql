@@ -59,11 +59,23 @@ CREATE TABLE public.organizations (
   settings JSONB DEFAULT '{}'::jsonb
 );
 
+-- Document batches (bulk uploads, e.g. a due-diligence data room)
+CREATE TABLE public.document_batches (
+  id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+  user_id UUID NOT NULL REFERENCES public.users(id) ON DELETE CASCADE,
+  organization_id UUID REFERENCES public.organizations(id) ON DELETE CASCADE,
+  name TEXT,
+  total_files INTEGER NOT NULL DEFAULT 0, -- Files accepted so far (a batch may be filled by several requests)
+  created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+  metadata JSONB DEFAULT '{}'::jsonb
+);
+
 -- Documents
 CREATE TABLE public.documents (
   id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
   user_id UUID NOT NULL REFERENCES public.users(id) ON DELETE CASCADE,
   organization_id UUID REFERENCES public.organizations(id) ON DELETE CASCADE,
+  batch_id UUID REFERENCES public.document_batches(id) ON DELETE SET NULL,
   
   -- File metadata
   filename TEXT NOT NULL,
@@ -85,6 +97,7 @@ CREATE TABLE public.documents (
   -- Analysis summary
   overall_risk_score NUMERIC(3,2), -- 0.00 to 1.00
   compliance_score NUMERIC(3,2), -- 0.00 to 1.00
+  high_risk_issues INTEGER NOT NULL DEFAULT 0, -- High/critical issues from the latest analysis
   
   created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
   updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
@@ -121,6 +134,7 @@ CREATE TABLE public.document_clauses (
   start_char INTEGER NOT NULL,
   end_char INTEGER NOT NULL,
   page_number INTEGER,
+  content_hash TEXT, -- Whitespace-insensitive hash, used to diff document versions
   
   -- Parent-child relationships
   parent_clause_id UUID REFERENCES public.document_clauses(id) ON DELETE CASCADE,
@@ -154,7 +168,17 @@ CREATE TABLE public.analyses (
   high_risk_count INTEGER DEFAULT 0,
   medium_risk_count INTEGER DEFAULT 0,
   low_risk_count INTEGER DEFAULT 0,
-  
+
+  -- Job queue (analyses are processed asynchronously by workers)
+  requested_by UUID REFERENCES public.users(id),
+  attempts INTEGER NOT NULL DEFAULT 0,
+  max_attempts INTEGER NOT NULL DEFAULT 3,
+  run_after TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+  leased_by TEXT,
+  lease_expires_at TIMESTAMPTZ,
+  payload JSONB DEFAULT '{}'::jsonb,
+  progress JSONB DEFAULT '{}'::jsonb, -- Live stage/issue counts while the job runs
+
   error_message TEXT,
   metadata JSONB DEFAULT '{}'::jsonb
 );
@@ -256,7 +280,28 @@ CREATE TABLE public.embeddings (
 );
 
 -- Create index for vector similarity search
-CREATE INDEX embeddings_vector_idx ON public.embeddings USING ivfflat (embedding vector_cosine_ops);
+-- HNSW rather than ivfflat: no training step, so it stays accurate as articles are added
+CREATE INDEX embeddings_vector_idx ON public.embeddings USING hnsw (embedding vector_cosine_ops);
+
+-- ============================================
+-- ANALYSIS CACHE
+-- ============================================
+
+-- Provider responses keyed by a hash of (prompt version, model, contract text, ...).
+-- Identical uploads reuse the stored analysis instead of paying for a new LLM call.
+CREATE TABLE public.analysis_cache (
+  cache_key TEXT PRIMARY KEY, -- sha256 hex
+  ai_provider ai_provider NOT NULL,
+  model_version TEXT NOT NULL,
+  prompt_version TEXT NOT NULL,
+  response JSONB NOT NULL, -- AIAnalysisResponse
+  hit_count INTEGER NOT NULL DEFAULT 0,
+  created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+  last_hit_at TIMESTAMPTZ,
+  expires_at TIMESTAMPTZ NOT NULL
+);
+
+CREATE INDEX idx_analysis_cache_expires_at ON public.analysis_cache(expires_at);
 
 -- ============================================
 -- AUDIT & COMPLIANCE TABLES
@@ -323,22 +368,33 @@ CREATE INDEX idx_documents_user_id ON public.documents(user_id);
 CREATE INDEX idx_documents_organization_id ON public.documents(organization_id);
 CREATE INDEX idx_documents_status ON public.documents(status);
 CREATE INDEX idx_documents_created_at ON public.documents(created_at DESC);
+-- Keyset pagination of a user's document list (lib/documents/list.ts)
+CREATE INDEX idx_documents_user_created ON public.documents(user_id, created_at DESC, id DESC);
+CREATE INDEX idx_documents_batch_id ON public.documents(batch_id);
+CREATE INDEX idx_document_batches_user_id ON public.document_batches(user_id);
 
 CREATE INDEX idx_document_clauses_document_id ON public.document_clauses(document_id);
 CREATE INDEX idx_document_clauses_parent_id ON public.document_clauses(parent_clause_id);
+CREATE INDEX idx_document_clauses_content_hash ON public.document_clauses(document_id, content_hash);
+CREATE INDEX idx_document_clauses_order ON public.document_clauses(document_id, order_index, id);
 
 CREATE INDEX idx_comments_document_id ON public.comments(document_id);
 CREATE INDEX idx_comments_clause_id ON public.comments(clause_id);
 CREATE INDEX idx_comments_status ON public.comments(status);
+CREATE INDEX idx_comments_analysis_id ON public.comments(analysis_id);
+CREATE INDEX idx_comments_document_created ON public.comments(document_id, created_at DESC, id DESC);
 
 CREATE INDEX idx_analyses_document_id ON public.analyses(document_id);
 CREATE INDEX idx_analyses_status ON public.analyses(status);
+CREATE INDEX idx_analyses_queue ON public.analyses(run_after) WHERE status IN ('pending', 'in_progress');
 
 CREATE INDEX idx_audit_logs_user_id ON public.audit_logs(user_id);
 CREATE INDEX idx_audit_logs_created_at ON public.audit_logs(created_at DESC);
 
 CREATE INDEX idx_legislative_docs_jurisdiction ON public.legislative_docs(jurisdiction);
 CREATE INDEX idx_legislative_docs_is_active ON public.legislative_docs(is_active);
+-- Upsert key for bulk ingestion (ingest_legislation.py)
+CREATE UNIQUE INDEX idx_legislative_docs_article ON public.legislative_docs(law_number, article_number);
 
 -- ============================================
 -- FUNCTIONS & TRIGGERS
@@ -360,6 +416,401 @@ CREATE TRIGGER update_documents_updated_at BEFORE UPDATE ON public.documents FOR
 CREATE TRIGGER update_comments_updated_at BEFORE UPDATE ON public.comments FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
 CREATE TRIGGER update_legislative_docs_updated_at BEFORE UPDATE ON public.legislative_docs FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
 
+-- ============================================
+-- DOCUMENT STATS
+-- ============================================
+
+-- Dashboard counters per user and per organization, kept in step with
+-- public.documents by a trigger so the dashboard reads one row instead of
+-- counting a user's whole document history on every page view.
+CREATE TABLE public.document_stats (
+  scope TEXT NOT NULL CHECK (scope IN ('user', 'organization')),
+  scope_id UUID NOT NULL, -- users.id or organizations.id
+  total_documents INTEGER NOT NULL DEFAULT 0,
+  analyzed_documents INTEGER NOT NULL DEFAULT 0,
+  processing_documents INTEGER NOT NULL DEFAULT 0, -- Being analyzed ('uploading' is the resting state of unanalyzed uploads)
+  high_risk_documents INTEGER NOT NULL DEFAULT 0, -- overall_risk_score above 0.7
+  high_risk_issues INTEGER NOT NULL DEFAULT 0,
+  updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+  PRIMARY KEY (scope, scope_id)
+);
+
+-- Add (p_sign = 1) or remove (p_sign = -1) one document's contribution
+CREATE OR REPLACE FUNCTION public.add_document_stats(p_document public.documents, p_sign INTEGER)
+RETURNS VOID AS $$
+DECLARE
+  v_analyzed INTEGER := CASE WHEN p_document.status = 'analyzed' THEN p_sign ELSE 0 END;
+  v_processing INTEGER := CASE WHEN p_document.status = 'processing' THEN p_sign ELSE 0 END;
+  v_high_risk INTEGER := CASE WHEN p_document.overall_risk_score > 0.7 THEN p_sign ELSE 0 END;
+  v_issues INTEGER := COALESCE(p_document.high_risk_issues, 0) * p_sign;
+BEGIN
+  INSERT INTO public.document_stats AS s (
+    scope, scope_id, total_documents, analyzed_documents, processing_documents,
+    high_risk_documents, high_risk_issues
+  )
+  SELECT k.scope, k.scope_id, p_sign, v_analyzed, v_processing, v_high_risk, v_issues
+  FROM (VALUES ('user', p_document.user_id), ('organization', p_document.organization_id)) AS k(scope, scope_id)
+  WHERE k.scope_id IS NOT NULL
+  ON CONFLICT (scope, scope_id) DO UPDATE SET
+    total_documents = s.total_documents + EXCLUDED.total_documents,
+    analyzed_documents = s.analyzed_documents + EXCLUDED.analyzed_documents,
+    processing_documents = s.processing_documents + EXCLUDED.processing_documents,
+    high_risk_documents = s.high_risk_documents + EXCLUDED.high_risk_documents,
+    high_risk_issues = s.high_risk_issues + EXCLUDED.high_risk_issues,
+    updated_at = NOW();
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION public.update_document_stats()
+RETURNS TRIGGER AS $$
+BEGIN
+  -- Most updates (metadata, updated_at) do not move any counter
+  IF TG_OP = 'UPDATE'
+    AND OLD.user_id = NEW.user_id
+    AND OLD.organization_id IS NOT DISTINCT FROM NEW.organization_id
+    AND OLD.status = NEW.status
+    AND OLD.overall_risk_score IS NOT DISTINCT FROM NEW.overall_risk_score
+    AND OLD.high_risk_issues = NEW.high_risk_issues
+  THEN
+    RETURN NULL;
+  END IF;
+
+  IF TG_OP IN ('UPDATE', 'DELETE') THEN
+    PERFORM public.add_document_stats(OLD, -1);
+  END IF;
+  IF TG_OP IN ('INSERT', 'UPDATE') THEN
+    PERFORM public.add_document_stats(NEW, 1);
+  END IF;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+CREATE TRIGGER update_document_stats AFTER INSERT OR UPDATE OR DELETE ON public.documents
+  FOR EACH ROW EXECUTE FUNCTION public.update_document_stats();
+
+-- Backfill for databases that already hold documents
+INSERT INTO public.document_stats (
+  scope, scope_id, total_documents, analyzed_documents, processing_documents,
+  high_risk_documents, high_risk_issues
+)
+SELECT k.scope, k.scope_id,
+       COUNT(*),
+       COUNT(*) FILTER (WHERE d.status = 'analyzed'),
+       COUNT(*) FILTER (WHERE d.status = 'processing'),
+       COUNT(*) FILTER (WHERE d.overall_risk_score > 0.7),
+       COALESCE(SUM(d.high_risk_issues), 0)
+FROM public.documents d
+CROSS JOIN LATERAL (VALUES ('user', d.user_id), ('organization', d.organization_id)) AS k(scope, scope_id)
+WHERE k.scope_id IS NOT NULL
+GROUP BY k.scope, k.scope_id
+ON CONFLICT (scope, scope_id) DO NOTHING;
+
+-- ============================================
+-- DOCUMENT VIEWER
+-- ============================================
+
+-- Everything the document page needs in one round trip: the document, its
+-- latest analysis, the first p_clause_limit clauses and p_comment_limit
+-- comments (the viewer fetches the rest by range as they scroll into view),
+-- and the totals. Runs as the caller, so RLS applies; NULL if the caller does
+-- not own the document.
+CREATE OR REPLACE FUNCTION public.get_document_view(
+  p_document_id UUID,
+  p_clause_limit INTEGER,
+  p_comment_limit INTEGER
+)
+RETURNS JSONB AS $$
+  SELECT jsonb_build_object(
+    'document', to_jsonb(d) - 'metadata',
+    'analysis', (
+      SELECT to_jsonb(a) - 'payload' - 'progress' - 'metadata'
+      FROM public.analyses a
+      WHERE a.document_id = d.id
+      ORDER BY a.started_at DESC
+      LIMIT 1
+    ),
+    'clauses', COALESCE((
+      SELECT jsonb_agg(c ORDER BY c.order_index, c.id)
+      FROM (
+        SELECT id, clause_number, heading, content, order_index
+        FROM public.document_clauses
+        WHERE document_id = d.id
+        ORDER BY order_index, id
+        LIMIT p_clause_limit
+      ) c
+    ), '[]'::jsonb),
+    'clause_count', (SELECT COUNT(*) FROM public.document_clauses WHERE document_id = d.id),
+    'comments', COALESCE((
+      SELECT jsonb_agg(c ORDER BY c.created_at DESC, c.id DESC)
+      FROM (
+        SELECT id, clause_id, comment_type, risk_level, status, title, content, suggested_revision,
+               is_ai_generated, confidence_score, legal_references, created_at
+        FROM public.comments
+        WHERE document_id = d.id
+        ORDER BY created_at DESC, id DESC
+        LIMIT p_comment_limit
+      ) c
+    ), '[]'::jsonb),
+    'comment_count', counts.total,
+    'high_risk_count', counts.high_risk
+  )
+  FROM public.documents d
+  CROSS JOIN LATERAL (
+    SELECT COUNT(*) AS total,
+           COUNT(*) FILTER (WHERE risk_level IN ('high', 'critical')) AS high_risk
+    FROM public.comments
+    WHERE document_id = d.id
+  ) counts
+  WHERE d.id = p_document_id
+    AND d.user_id = auth.uid();
+$$ LANGUAGE sql STABLE;
+
+-- ============================================
+-- ANALYSIS JOB QUEUE
+-- ============================================
+
+-- Lease the next runnable analysis job.
+-- Pending jobs whose run_after has passed and in-progress jobs whose lease
+-- expired (crashed worker) are both eligible. SKIP LOCKED lets many workers
+-- poll concurrently without handing out the same job twice.
+CREATE OR REPLACE FUNCTION public.lease_analysis_job(p_worker_id TEXT, p_lease_seconds INTEGER)
+RETURNS SETOF public.analyses AS $$
+BEGIN
+  -- Jobs that lost their lease after the final attempt are dead
+  UPDATE public.analyses
+  SET status = 'failed',
+      completed_at = NOW(),
+      leased_by = NULL,
+      lease_expires_at = NULL,
+      error_message = COALESCE(error_message, 'Worker lease expired')
+  WHERE status = 'in_progress'
+    AND lease_expires_at < NOW()
+    AND attempts >= max_attempts;
+
+  RETURN QUERY
+  UPDATE public.analyses a
+  SET status = 'in_progress',
+      attempts = a.attempts + 1,
+      leased_by = p_worker_id,
+      lease_expires_at = NOW() + make_interval(secs => p_lease_seconds),
+      started_at = NOW()
+  WHERE a.id = (
+    SELECT q.id FROM public.analyses q
+    WHERE (q.status = 'pending' AND q.run_after <= NOW())
+       OR (q.status = 'in_progress' AND q.lease_expires_at < NOW() AND q.attempts < q.max_attempts)
+    ORDER BY q.run_after
+    LIMIT 1
+    FOR UPDATE SKIP LOCKED
+  )
+  RETURNING a.*;
+END;
+$$ LANGUAGE plpgsql;
+
+-- ============================================
+-- ANALYSIS RESULTS
+-- ============================================
+
+-- Store the clauses of a document before it is analyzed, in one transaction.
+-- Clauses in p_clauses are upserted (unchanged ones keep their id and comments),
+-- every other clause of the document is deleted along with its comments.
+-- p_comment_policy decides what happens to the remaining AI comments:
+--   'replace'      - delete them all (full analysis)
+--   'carry'        - move them to p_analysis_id
+--   'carry_clause' - move clause-linked ones, delete document-level ones
+-- Returns the number of AI comments carried forward.
+CREATE OR REPLACE FUNCTION public.sync_document_clauses(
+  p_document_id UUID,
+  p_analysis_id UUID,
+  p_clauses JSONB,
+  p_comment_policy TEXT
+)
+RETURNS INTEGER AS $$
+DECLARE
+  v_carried INTEGER := 0;
+BEGIN
+  INSERT INTO public.document_clauses (
+    id, document_id, clause_number, clause_type, heading, content,
+    start_char, end_char, page_number, content_hash, parent_clause_id, order_index
+  )
+  SELECT c.id, p_document_id, c.clause_number, c.clause_type, c.heading, c.content,
+         c.start_char, c.end_char, c.page_number, c.content_hash, c.parent_clause_id, c.order_index
+  FROM jsonb_populate_recordset(NULL::public.document_clauses, p_clauses) c
+  ON CONFLICT (id) DO UPDATE SET
+    clause_number = EXCLUDED.clause_number,
+    clause_type = EXCLUDED.clause_type,
+    heading = EXCLUDED.heading,
+    content = EXCLUDED.content,
+    start_char = EXCLUDED.start_char,
+    end_char = EXCLUDED.end_char,
+    page_number = EXCLUDED.page_number,
+    content_hash = EXCLUDED.content_hash,
+    parent_clause_id = EXCLUDED.parent_clause_id,
+    order_index = EXCLUDED.order_index;
+
+  -- Runs after the upsert so kept children are already re-parented
+  -- when their old parent cascades away
+  DELETE FROM public.document_clauses
+  WHERE document_id = p_document_id
+    AND id NOT IN (SELECT (c->>'id')::UUID FROM jsonb_array_elements(p_clauses) c);
+
+  IF p_comment_policy = 'replace' THEN
+    DELETE FROM public.comments
+    WHERE document_id = p_document_id AND is_ai_generated;
+  ELSE
+    IF p_comment_policy = 'carry_clause' THEN
+      DELETE FROM public.comments
+      WHERE document_id = p_document_id AND is_ai_generated AND clause_id IS NULL;
+    END IF;
+
+    UPDATE public.comments
+    SET analysis_id = p_analysis_id
+    WHERE document_id = p_document_id AND is_ai_generated;
+    GET DIAGNOSTICS v_carried = ROW_COUNT;
+  END IF;
+
+  RETURN v_carried;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Write the results of an analysis run in one transaction: reconcile its AI
+-- comments, mark analyzed clauses as done (content_hash), fill in the analysis
+-- summary, update the document and append the audit entry.
+-- Risk counts are computed here from the comments the analysis ends up with
+-- (new and carried forward), and returned.
+CREATE OR REPLACE FUNCTION public.store_analysis_results(
+  p_analysis_id UUID,
+  p_document_id UUID,
+  p_user_id UUID,
+  p_comments JSONB,
+  p_deleted_comment_ids UUID[],
+  p_clause_hashes JSONB,
+  p_analysis JSONB,
+  p_document JSONB,
+  p_audit_details JSONB
+)
+RETURNS JSONB AS $$
+DECLARE
+  v_counts JSONB;
+BEGIN
+  DELETE FROM public.comments
+  WHERE id = ANY(p_deleted_comment_ids)
+    AND document_id = p_document_id
+    AND is_ai_generated;
+
+  INSERT INTO public.comments (
+    id, document_id, clause_id, analysis_id, comment_type, risk_level, title, content,
+    suggested_revision, is_ai_generated, confidence_score, legal_references, status
+  )
+  SELECT c.id, p_document_id, c.clause_id, p_analysis_id, c.comment_type, c.risk_level, c.title, c.content,
+         c.suggested_revision, TRUE, c.confidence_score, COALESCE(c.legal_references, '[]'::jsonb), 'open'
+  FROM jsonb_populate_recordset(NULL::public.comments, p_comments) c
+  ON CONFLICT (id) DO UPDATE SET
+    clause_id = EXCLUDED.clause_id,
+    comment_type = EXCLUDED.comment_type,
+    risk_level = EXCLUDED.risk_level,
+    title = EXCLUDED.title,
+    content = EXCLUDED.content,
+    suggested_revision = EXCLUDED.suggested_revision,
+    confidence_score = EXCLUDED.confidence_score,
+    legal_references = EXCLUDED.legal_references;
+
+  UPDATE public.document_clauses dc
+  SET content_hash = h.content_hash
+  FROM jsonb_to_recordset(p_clause_hashes) AS h(id UUID, content_hash TEXT)
+  WHERE dc.id = h.id AND dc.document_id = p_document_id;
+
+  SELECT jsonb_build_object(
+    'issues_found', COUNT(*),
+    'high_risk_count', COUNT(*) FILTER (WHERE c.risk_level IN ('high', 'critical')),
+    'medium_risk_count', COUNT(*) FILTER (WHERE c.risk_level = 'medium'),
+    'low_risk_count', COUNT(*) FILTER (WHERE c.risk_level = 'low')
+  )
+  INTO v_counts
+  FROM public.comments c
+  WHERE c.analysis_id = p_analysis_id AND c.is_ai_generated;
+
+  UPDATE public.analyses
+  SET duration_seconds = (p_analysis->>'duration_seconds')::INTEGER,
+      tokens_used = (p_analysis->>'tokens_used')::INTEGER,
+      cost_usd = (p_analysis->>'cost_usd')::NUMERIC,
+      metadata = COALESCE(p_analysis->'metadata', metadata),
+      issues_found = (v_counts->>'issues_found')::INTEGER,
+      high_risk_count = (v_counts->>'high_risk_count')::INTEGER,
+      medium_risk_count = (v_counts->>'medium_risk_count')::INTEGER,
+      low_risk_count = (v_counts->>'low_risk_count')::INTEGER
+  WHERE id = p_analysis_id;
+
+  UPDATE public.documents
+  SET status = 'analyzed',
+      analyzed_at = NOW(),
+      page_count = COALESCE((p_document->>'page_count')::INTEGER, page_count),
+      word_count = COALESCE((p_document->>'word_count')::INTEGER, word_count),
+      has_scanned_pages = COALESCE((p_document->>'has_scanned_pages')::BOOLEAN, has_scanned_pages),
+      metadata = COALESCE(p_document->'metadata', metadata),
+      overall_risk_score = (p_document->>'overall_risk_score')::NUMERIC,
+      compliance_score = (p_document->>'compliance_score')::NUMERIC,
+      high_risk_issues = (v_counts->>'high_risk_count')::INTEGER,
+      -- Unknown types from the model keep the current value instead of failing the write
+      contract_type = CASE
+        WHEN p_document->>'contract_type' = ANY(enum_range(NULL::contract_type)::TEXT[])
+          THEN (p_document->>'contract_type')::contract_type
+        ELSE contract_type
+      END
+  WHERE id = p_document_id;
+
+  INSERT INTO public.audit_logs (user_id, action, resource_type, resource_id, details)
+  VALUES (
+    p_user_id, 'analysis_completed', 'document', p_document_id,
+    COALESCE(p_audit_details, '{}'::jsonb) || jsonb_build_object('issues_found', v_counts->'issues_found')
+  );
+
+  RETURN v_counts;
+END;
+$$ LANGUAGE plpgsql;
+
+-- ============================================
+-- LEGAL RETRIEVAL
+-- ============================================
+
+-- Active legislative articles nearest to a query embedding, best first.
+-- Only embeddings from the same embedder (metadata->>'model') are comparable.
+-- Articles are embedded per paragraph chunk: the nearest chunks are fetched
+-- through the vector index, then grouped so each article appears once.
+CREATE OR REPLACE FUNCTION match_legal_articles(
+  p_query_embedding vector(1536),
+  p_match_count INTEGER,
+  p_model TEXT
+)
+RETURNS TABLE (
+  id UUID,
+  law_name TEXT,
+  law_number TEXT,
+  article_number TEXT,
+  jurisdiction TEXT,
+  title TEXT,
+  content TEXT,
+  source_url TEXT,
+  similarity FLOAT
+) AS $$
+  WITH nearest AS (
+    SELECT e.legislative_doc_id, 1 - (e.embedding <=> p_query_embedding) AS similarity
+    FROM public.embeddings e
+    WHERE e.legislative_doc_id IS NOT NULL
+      AND e.metadata->>'model' = p_model
+    ORDER BY e.embedding <=> p_query_embedding
+    LIMIT p_match_count * 4
+  )
+  SELECT d.id, d.law_name, d.law_number, d.article_number, d.jurisdiction,
+    d.title, d.content, d.source_url,
+    MAX(n.similarity) AS similarity
+  FROM nearest n
+  JOIN public.legislative_docs d ON d.id = n.legislative_doc_id
+  WHERE d.is_active
+  GROUP BY d.id
+  ORDER BY similarity DESC
+  LIMIT p_match_count;
+$$ LANGUAGE sql STABLE;
+
 -- ============================================
 -- INITIAL DATA (Mock Legislative Texts)
 -- ============================================
@@ -381,9 +832,11 @@ INSERT INTO public.legislative_docs (law_name, law_number, article_number, juris
 -- ============================================
 
 COMMENT ON TABLE public.documents IS 'Stores uploaded contract documents and their analysis status';
+COMMENT ON TABLE public.document_batches IS 'Groups documents uploaded together for bulk analysis';
 COMMENT ON TABLE public.document_clauses IS 'Hierarchical structure of document sections and clauses';
 COMMENT ON TABLE public.comments IS 'AI-generated and user-added comments on document clauses';
 COMMENT ON TABLE public.analyses IS 'Tracks AI analysis runs and their results';
 COMMENT ON TABLE public.embeddings IS 'Vector embeddings for RAG-based legal reference retrieval';
 COMMENT ON TABLE public.legislative_docs IS 'Romanian and EU legal texts for compliance checking';
 COMMENT ON TABLE public.audit_logs IS 'Audit trail for GDPR compliance';
+COMMENT ON TABLE public.analysis_cache IS 'Content-addressed cache of AI analysis responses (service role only)';
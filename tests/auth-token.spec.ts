@@ -0,0 +1,69 @@
+import { test, expect } from '@playwright/test';
+import http from 'http';
+import type { AddressInfo } from 'net';
+import { verifyAccessToken } from '../lib/auth/jwt';
+
+const encode = (value: string | Uint8Array) => Buffer.from(value).toString('base64url');
+
+async function sign(key: CryptoKey, header: Record<string, string>, claims: Record<string, any>): Promise<string> {
+  const body = `${encode(JSON.stringify(header))}.${encode(JSON.stringify(claims))}`;
+  const signature = await crypto.subtle.sign({ name: 'ECDSA', hash: 'SHA-256' }, key, new TextEncoder().encode(body));
+  return `${body}.${encode(new Uint8Array(signature))}`;
+}
+
+test.describe('Access token verification', () => {
+  let server: http.Server;
+  let privateKey: CryptoKey;
+  let claims: Record<string, any>;
+  const header = { alg: 'ES256', kid: 'test-key', typ: 'JWT' };
+
+  test.beforeAll(async () => {
+    const pair = await crypto.subtle.generateKey({ name: 'ECDSA', namedCurve: 'P-256' }, true, ['sign', 'verify']);
+    privateKey = pair.privateKey;
+    const jwk = { ...(await crypto.subtle.exportKey('jwk', pair.publicKey)), kid: 'test-key', alg: 'ES256' };
+
+    server = http.createServer((req, res) => {
+      res.setHeader('content-type', 'application/json');
+      res.end(JSON.stringify(req.url?.endsWith('/.well-known/jwks.json') ? { keys: [jwk] } : {}));
+    });
+    await new Promise<void>(resolve => server.listen(0, '127.0.0.1', resolve));
+    const url = `http://127.0.0.1:${(server.address() as AddressInfo).port}`;
+    process.env.NEXT_PUBLIC_SUPABASE_URL = url;
+
+    claims = {
+      sub: 'user-1',
+      email: 'user@example.com',
+      aud: 'authenticated',
+      iss: `${url}/auth/v1`,
+      exp: Math.floor(Date.now() / 1000) + 3600,
+    };
+  });
+
+  test.afterAll(() => {
+    server.close();
+  });
+
+  test('should accept a token signed with the published key', async () => {
+    const token = await sign(privateKey, header, claims);
+    expect((await verifyAccessToken(token))?.sub).toBe('user-1');
+  });
+
+  test('should reject a malformed signature instead of throwing', async () => {
+    const [body, payload] = (await sign(privateKey, header, claims)).split('.');
+    expect(await verifyAccessToken(`${body}.${payload}.!!!not-base64!!!`)).toBeNull();
+    expect(await verifyAccessToken(`${body}.${payload}.`)).toBeNull();
+    expect(await verifyAccessToken('not-a-token')).toBeNull();
+  });
+
+  test('should reject a tampered payload', async () => {
+    const [body, , signature] = (await sign(privateKey, header, claims)).split('.');
+    const forged = encode(JSON.stringify({ ...claims, sub: 'admin-1' }));
+    expect(await verifyAccessToken(`${body}.${forged}.${signature}`)).toBeNull();
+  });
+
+  test('should reject a token naming another algorithm than its key', async () => {
+    const [, payload, signature] = (await sign(privateKey, header, claims)).split('.');
+    const rsHeader = encode(JSON.stringify({ ...header, alg: 'RS256' }));
+    expect(await verifyAccessToken(`${rsHeader}.${payload}.${signature}`)).toBeNull();
+  });
+});
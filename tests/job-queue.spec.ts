@@ -0,0 +1,113 @@
+import { test, expect } from '@playwright/test';
+import { InMemoryJobQueue } from '../lib/jobs/queues/memory';
+import { WorkerPool } from '../lib/jobs/worker';
+
+const sleep = (ms: number) => new Promise(resolve => setTimeout(resolve, ms));
+
+const input = (maxAttempts = 3) => ({
+  document_id: 'doc-1',
+  ai_provider: 'mock' as const,
+  model_version: 'test-model',
+  requested_by: 'user-1',
+  max_attempts: maxAttempts,
+});
+
+test.describe('In-memory job queue', () => {
+  test('should lease each job to one worker at a time', async () => {
+    const queue = new InMemoryJobQueue();
+    const job = await queue.enqueue(input());
+
+    const leased = await queue.lease('worker-a', 60_000);
+    expect(leased?.id).toBe(job.id);
+    expect(leased?.attempts).toBe(1);
+    expect(await queue.lease('worker-b', 60_000)).toBeNull();
+    expect(await queue.depth()).toBe(0);
+
+    await queue.complete(job.id, 'worker-a');
+    expect((await queue.get(job.id))?.status).toBe('completed');
+  });
+
+  test('should hand an expired lease to another worker and ignore the old one', async () => {
+    const queue = new InMemoryJobQueue();
+    const job = await queue.enqueue(input());
+
+    await queue.lease('worker-a', 5);
+    await sleep(20);
+
+    const retaken = await queue.lease('worker-b', 60_000);
+    expect(retaken?.id).toBe(job.id);
+    expect(retaken?.attempts).toBe(2);
+
+    // The first worker lost its lease: none of its writes land
+    expect(await queue.extendLease(job.id, 'worker-a', 60_000)).toBe(false);
+    await queue.complete(job.id, 'worker-a');
+    expect((await queue.get(job.id))?.status).toBe('in_progress');
+    expect((await queue.get(job.id))?.leased_by).toBe('worker-b');
+  });
+
+  test('should fail a job whose lease expired on its last attempt', async () => {
+    const queue = new InMemoryJobQueue();
+    const job = await queue.enqueue(input(1));
+
+    await queue.lease('worker-a', 5);
+    await sleep(20);
+
+    expect(await queue.lease('worker-b', 60_000)).toBeNull();
+    const failed = await queue.get(job.id);
+    expect(failed?.status).toBe('failed');
+    expect(failed?.error_message).toBe('Worker lease expired');
+  });
+
+  test('should retry after the delay and fail once attempts are used up', async () => {
+    const queue = new InMemoryJobQueue();
+    const job = await queue.enqueue(input(2));
+
+    await queue.lease('worker-a', 60_000);
+    expect(await queue.fail(job.id, 'worker-a', 'Provider timeout', { retryDelayMs: 50 })).toBe('pending');
+    expect(await queue.lease('worker-a', 60_000)).toBeNull();
+
+    await sleep(70);
+    const retried = await queue.lease('worker-a', 60_000);
+    expect(retried?.attempts).toBe(2);
+    expect(retried?.error_message).toBe('Provider timeout');
+
+    expect(await queue.fail(job.id, 'worker-a', 'Provider timeout again')).toBe('failed');
+    const failed = await queue.get(job.id);
+    expect(failed?.status).toBe('failed');
+    expect(failed?.error_message).toBe('Provider timeout again');
+    expect(failed?.completed_at).toBeTruthy();
+  });
+
+  test('should not retry permanent failures', async () => {
+    const queue = new InMemoryJobQueue();
+    const job = await queue.enqueue(input(3));
+
+    await queue.lease('worker-a', 60_000);
+    expect(await queue.fail(job.id, 'worker-a', 'Document has no text', { permanent: true })).toBe('failed');
+    expect(await queue.lease('worker-a', 60_000)).toBeNull();
+    expect((await queue.get(job.id))?.attempts).toBe(1);
+  });
+
+  test('should keep running a job when a lease renewal errors', async () => {
+    const queue = new InMemoryJobQueue();
+    const extendLease = queue.extendLease.bind(queue);
+    let renewals = 0;
+    queue.extendLease = async (...args) => {
+      if (++renewals === 1) throw new Error('connection reset');
+      return extendLease(...args);
+    };
+    const job = await queue.enqueue(input());
+
+    let aborted = false;
+    const pool = new WorkerPool(queue, async (_job, { signal }) => {
+      await sleep(100);
+      aborted = signal.aborted;
+    }, { leaseMs: 60, concurrency: 1 });
+    const stats = await pool.drain({ maxJobs: 1 });
+
+    expect(renewals).toBeGreaterThan(1);
+    expect(aborted).toBe(false);
+    expect(stats.succeeded).toBe(1);
+    expect((await queue.get(job.id))?.status).toBe('completed');
+  });
+});